@@ -1,1310 +1,44 @@
 from amazon_advertising_api.regions import regions
 from amazon_advertising_api.versions import versions
-from io import BytesIO
-try:
-    # Python 3
-    import urllib.request
-    import urllib.parse
-    PYTHON = 3
-except ImportError:
-    # Python 2
-    from six.moves import urllib
-    PYTHON = 2
-import gzip
-import json
-
-
-class AdvertisingApi(object):
-
-    """Lightweight client library for Amazon Sponsored Products API."""
-
-    def __init__(self,
-                 client_id,
-                 client_secret,
-                 region,
-                 profile_id=None,
-                 access_token=None,
-                 refresh_token=None,
-                 sandbox=False):
-        """
-        Client initialization.
-
-        :param client_id: Login with Amazon client Id that has been whitelisted
-            for cpc_advertising:campaign_management
-        :type client_id: string
-        :param client_secret: Login with Amazon client secret key.
-        :type client_id: string
-        :param region: Region code for endpoint. See regions.py.
-        :type region: string
-        :param access_token: The access token for the advertiser account.
-        :type access_token: string
-        :param refresh_token: The refresh token for the advertiser account.
-        :type refresh_token: string
-        :param sandbox: Indicate whether you are operating in sandbox or prod.
-        :type sandbox: boolean
-        """
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self._access_token = access_token
-        self.refresh_token = refresh_token
-
-        self.api_version = versions['api_version']
-        self.user_agent = 'AdvertisingAPI Python Client Library v{}'.format(
-            versions['application_version'])
-        self.profile_id = profile_id
-        self.token_url = None
-        self.sandbox = sandbox
-
-        if region in regions:
-            if sandbox:
-                self.endpoint = regions[region]['sandbox']
-            else:
-                self.endpoint = regions[region]['prod']
-            self.token_url = regions[region]['token_url']
-        else:
-            raise KeyError('Region {} not found in regions.'.format(region))
-
-    @property
-    def access_token(self):
-        return self._access_token
-
-    @access_token.setter
-    def access_token(self, value):
-        """Set access_token"""
-        self._access_token = value
-
-    def do_refresh_token(self):
-        if self.refresh_token is None:
-            return {'success': False,
-                    'code': 0,
-                    'response': 'refresh_token is empty.'}
-
-        if self._access_token:
-            self._access_token = urllib.parse.unquote(self._access_token)
-        self.refresh_token = urllib.parse.unquote(self.refresh_token)
-
-        params = {
-            'grant_type': 'refresh_token',
-            'refresh_token': self.refresh_token,
-            'client_id': self.client_id,
-            'client_secret': self.client_secret}
-
-        data = urllib.parse.urlencode(params)
-
-        req = urllib.request.Request(
-            url='https://{}'.format(self.token_url),
-            data=data.encode('utf-8'))
-
-        try:
-            f = urllib.request.urlopen(req)
-            response = f.read().decode('utf-8')
-            if 'access_token' in response:
-                json_data = json.loads(response)
-                self._access_token = json_data['access_token']
-                return {'success': True,
-                        'code': f.code,
-                        'response': self._access_token}
-            else:
-                return {'success': False,
-                        'code': f.code,
-                        'response': 'access_token not in response.'}
-        except urllib.error.HTTPError as e:
-            return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
-
-    def register_profile(self, country_code):
-        """
-        Registers a sandbox profile.
-
-        :PUT: /profiles/register
-        :param country_code: The country in which to register the profile.
-                             Country code can be one of the following:
-                             US, CA, UK, DE, FR, ES, IT, IN, CN, JP
-        :returns:
-           :200: Success
-           :401: Unauthorized
-        """
-        interface = 'profiles/register'
-        params = {"countryCode": country_code}
-        method = 'PUT'
-        return self._operation(interface, params, method)
-
-    def get_profiles(self):
-        """
-        Retrieves profiles associated with an auth token.
-
-        :GET: /profiles
-        :returns:
-            :200: Success
-            :401: Unauthorized
-        """
-        interface = 'profiles'
-        return self._operation(interface)
-
-    def get_profile(self, profile_id):
-        """
-        Retrieves a single profile by Id.
-
-        :GET: /profiles/{profileId}
-        :param profile_id: The Id of the requested profile.
-        :type profile_id: string
-        :returns:
-            :200: List of **Profile**
-            :401: Unauthorized
-            :404: Profile not found
-        """
-        interface = 'profiles/{}'.format(profile_id)
-        return self._operation(interface)
-
-    def update_profiles(self, data):
-        """
-        Updates one or more profiles. Advertisers are identified using their
-        profileIds.
-
-        :PUT: /profiles
-        :param data: A list of updates containing **profileId** and the
-            mutable fields to be modified. Only daily budgets are mutable at
-            this time.
-        :type data: List of **Profile**
-        :returns:
-            :207: List of **ProfileResponse** reflecting the same order as the
-                input
-            :401: Unauthorized
-        """
-        interface = 'profiles'
-        return self._operation(interface, data, method='PUT')
-
-    def list_portfolios(self, data=None):
-        interface = 'portfolios'
-        return self._operation(interface, data)
-
-    def get_portfolio(self, portfolio_id):
-        interface = 'portfolios/{}'. format(portfolio_id)
-        return self._operation(interface)
-
-    def create_portfolios(self, data):
-        interface = 'portfolios'
-        return self._operation(interface, data, method='POST')
-
-    def update_portfolios(self, data):
-        interface = 'portfolios'
-        return self._operation(interface, data, method='PUT')
-
-    def get_campaign(self, campaign_id, campaign_type='sp'):
-        """
-        Retrieves a campaign by Id. Note that this call returns the minimal
-        set of campaign fields, but is more efficient than **getCampaignEx**.
-
-        :GET: {campaignType}/campaigns/{campaignId}
-        :param campaign_id: The Id of the requested campaign.
-        :type campaign_id: string
-        :param campaign_type: The campaignType of the requested campaign ('sp' or 'hsa')
-          Defaults to 'sp'
-        :type campaign_type: string
-        :returns:
-            :200: Campaign
-            :401: Unauthorized
-            :404: Campaign not found
-        """
-        interface = '{}/campaigns/{}'. format(campaign_type, campaign_id)
-        return self._operation(interface)
-
-    def get_campaign_ex(self, campaign_id, campaign_type='sp'):
-        """
-        Retrieves a campaign and its extended fields by ID. Note that this
-        call returns the complete set of campaign fields (including serving
-        status and other read-only fields), but is less efficient than
-        **getCampaign**.
-
-        :GET: {campaignType}/campaigns/extended/{campaignId}
-        :param campaign_id: The Id of the requested campaign.
-        :type campaign_id: string
-        :param campaign_type: The campaignType of the requested campaign ('sp' or 'hsa')
-          Defaults to 'sp'
-        :type campaign_type: string
-        :returns:
-            :200: Campaign
-            :401: Unauthorized
-            :404: Campaign not found
-
-        """
-        interface = '{}/campaigns/extended/{}'. format(campaign_type, campaign_id)
-        return self._operation(interface)
-
-    def create_campaigns(self, data):
-        """
-        Creates one or more campaigns. Successfully created campaigns will be
-        assigned unique **campaignIds**.
-
-        :POST: /campaigns
-        :param data: A list of up to 100 campaigns to be created.  Required
-            fields for campaign creation are **name**, **campaignType**,
-            **targetingType**, **state**, **dailyBudget** and **startDate**.
-        :type data: List of **Campaign**
-        :returns:
-            :207: List of **CampaignResponse** reflecting the same order as the
-                input.
-            :401: Unauthorized
-        """
-        interface = 'campaigns'
-        return self._operation(interface, data, method='POST')
-
-    def update_campaigns(self, data):
-        """
-        Updates one or more campaigns.  Campaigns are identified using their
-        **campaignIds**.
-
-        :PUT: /campaigns
-        :param data: A list of up to 100 updates containing **campaignIds** and
-            the mutable fields to be modified. Mutable fields are **name**,
-            **state**, **dailyBudget**, **startDate**, and **endDate**.
-        :type data: List of **Campaign**
-        :returns:
-            :207: List of **CampaignResponse** reflecting the same order as the
-                input
-            :401: Unauthorized
-        """
-        interface = 'campaigns'
-        return self._operation(interface, data, method='PUT')
-
-    def update_campaigns_sb(self, data):
-        interface = 'sb/campaigns'
-        return self._operation(interface, data, method='PUT', ignore_version=True)
-
-
-    def archive_campaign(self, campaign_id):
-        """
-        Sets the campaign status to archived. This same operation can be
-        performed via an update, but is included for completeness.
-
-        :DELETE: /campaigns/{campaignId}
-        :param campaign_id: The Id of the campaign to be archived.
-        :type campaign_id: string
-        :returns:
-            :200: Success, campaign response
-            :401: Unauthorized
-            :404: Campaign not found
-        """
-        interface = 'campaigns/{}'.format(campaign_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_campaigns(self, data=None, campaign_type='sp'):
-        """
-        Retrieves a list of campaigns satisfying optional criteria.
-
-        :GET: /{campaignType}/campaigns
-        :param campaign_type: The campaignType to retrieve campaigns for ('sp' or 'hsa')
-          Defaults to 'sp'
-        :type campaign_type: string
-        :param data: Optional, search criteria containing the following
-            parameters.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result set.
-            Defaults to 0.
-        :type startIndex: Integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: Integer
-        :param campaignType: Restricts results to campaigns of a single
-            campaign type. Must be **sponsoredProducts**.
-        :type campaignType: String
-        :param stateFilter: Restricts results to campaigns with state within
-            the specified comma-separatedlist. Must be one of **enabled**,
-            **paused**, **archived**. Default behavior is to include all.
-        :param name: Restricts results to campaigns with the specified name.
-        :type name: String
-        :param campaignFilterId: Restricts results to campaigns specified in
-            comma-separated list.
-        :type campaignFilterId: String
-        :returns:
-            :200: Success. list of campaign
-            :401: Unauthorized
-        """
-        interface = '{}/campaigns' .format(campaign_type)
-        return self._operation(interface, data)
-
-    def list_campaigns_ex(self, data=None, campaign_type='sp'):
-        """
-        Retrieves a list of campaigns with extended fields satisfying
-        optional filtering criteria.
-
-        :GET: /{campaignType}/campaigns/extended
-        :param campaign_type: campaignType of the requested campaigns ('sp' or 'hsa')
-          Defaults to 'sp'
-        :type campaign_type: string
-        :param data: Optional, search criteria containing the following
-            parameters.
-        :type data: JSON string
-        """
-        interface = '{}/campaigns/extended' .format(campaign_type)
-        return self._operation(interface, data)
-
-    def get_ad_group(self, ad_group_id):
-        """
-        Retrieves an ad group by Id. Note that this call returns the minimal
-        set of ad group fields, but is more efficient than getAdGroupEx.
-
-        :GET: /sp/adGroups/{adGroupId}
-        :param ad_group_id: The Id of the requested ad group.
-        :type ad_group_id: string
-
-        :returns:
-            :200: Success, AdGroup response
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'sp/adGroups/{}'.format(ad_group_id)
-        return self._operation(interface)
-
-    def get_ad_group_ex(self, ad_group_id):
-        """
-        Retrieves an ad group and its extended fields by ID. Note that this
-        call returns the complete set of ad group fields (including serving
-        status and other read-only fields), but is less efficient than
-        getAdGroup.
-
-        :GET: /sp/adGroups/extended/{adGroupId}
-        :param ad_group_id: The Id of the requested ad group.
-        :type ad_group_id: string
-
-        :returns:
-            :200: Success, AdGroup response
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'sp/adGroups/extended/{}'.format(ad_group_id)
-        return self._operation(interface)
-
-    def create_ad_groups(self, data):
-        """
-        Creates one or more ad groups. Successfully created ad groups will
-        be assigned unique adGroupIds.
-
-        :POST: /adGroups
-        :param data: A list of up to 100 ad groups to be created. Required
-            fields for ad group creation are campaignId, name, state and
-            defaultBid.
-        :type data: List of **AdGroup**
-
-        :returns:
-            :207: Multi-status. List of AdGroupResponse reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'adGroups'
-        return self._operation(interface, data, method='POST')
-
-    def update_ad_groups(self, data):
-        """
-        Updates one or more ad groups. Ad groups are identified using their
-        adGroupIds.
-
-        :PUT: /adGroups
-        :param data: A list of up to 100 updates containing adGroupIds and the
-            mutable fields to be modified.
-        :type data: List of **AdGroup**
-
-        :returns:
-            :207: Multi-status. List of AdGroupResponse reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'adGroups'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_ad_group(self, ad_group_id):
-        """
-        Sets the ad group status to archived. This same operation can be
-        performed via an update, but is included for completeness.
-
-        :DELETE: /adGroup/{adGroupId}
-        :param ad_group_id: The Id of the ad group to be archived.
-        :type ad_group_id: string
-
-        :returns:
-            :200: Success. AdGroupResponse
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'adGroups/{}'.format(ad_group_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_ad_groups(self, data=None):
-        """
-        Retrieves a list of ad groups satisfying optional criteria.
-
-        :GET: /sp/adGroups
-        :param data: Parameter list of criteria.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result
-            set. Defaults to 0.
-        :type startIndex: integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: integer
-        :param campaignType: Restricts results to ad groups belonging to
-            campaigns of the specified type. Must be sponsoredProducts
-        :type campaignType: string
-        :param campaignIdFilter: Restricts results to ad groups within
-            campaigns specified in comma-separated list.
-        :type campaignIdFilter: string
-        :param adGroupIdFilter: Restricts results to ad groups specified in
-            comma-separated list.
-        :type adGroupIdFilter: string
-        :param stateFilter: Restricts results to keywords with state within the
-            specified comma-separatedlist. Must be one of enabled, paused,
-            archived.  Default behavior is to include all.
-        :type stateFilter: string
-        :param name: Restricts results to ad groups with the specified name.
-        :type name: string
-
-        :returns:
-            :200: Success. List of adGroup.
-            :401: Unauthorized.
-
-        """
-        interface = 'sp/adGroups'
-        return self._operation(interface, data)
-
-    def list_ad_groups_ex(self, data=None):
-        """
-        Retrieves a list of ad groups satisfying optional criteria.
-
-        :GET: /sp/adGroups/extended
-        :param data: Parameter list of criteria.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result
-            set. Defaults to 0.
-        :type startIndex: integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: integer
-        :param campaignType: Restricts results to ad groups belonging to
-            campaigns of the specified type. Must be sponsoredProducts
-        :type campaignType: string
-        :param campaignIdFilter: Restricts results to ad groups within
-            campaigns specified in comma-separated list.
-        :type campaignIdFilter: string
-        :param adGroupIdFilter: Restricts results to ad groups specified in
-            comma-separated list.
-        :type adGroupIdFilter: string
-        :param stateFilter: Restricts results to keywords with state within the
-            specified comma-separatedlist. Must be one of enabled, paused,
-            archived.  Default behavior is to include all.
-        :type stateFilter: string
-        :param name: Restricts results to ad groups with the specified name.
-        :type name: string
-
-        :returns:
-            :200: Success. List of adGroup.
-            :401: Unauthorized.
-        """
-        interface = 'sp/adGroups/extended'
-        return self._operation(interface, data)
-
-    def get_target(self, target_id):
-        """
-        Retrieves a target by Id. Note that this call returns the minimal
-        set of fields, but is more efficient than getTargetEx.
-
-        :GET: /sp/targets/{targetId}
-        :param target_id: The Id of the requested target.
-        :type target_id: string
-
-        :returns:
-            :200: Success, Target response
-            :401: Unauthorized
-            :404: Target not found
-        """
-        interface = 'sp/targets/{}'.format(target_id)
-        return self._operation(interface)
-
-    # todo - remove?
-    def get_target_ex(self, target_id):
-        """
-        Retrieves a target and its extended fields by ID. Note that this
-        call returns the complete set of target fields (including serving
-        status and other read-only fields), but is less efficient than
-        getTarget.
-
-        :GET: /sp/targets/extended/{target_id}
-        :param target_id: The Id of the requested target.
-        :type target_id: string
-
-        :returns:
-            :200: Success, Target response
-            :401: Unauthorized
-            :404: Target not found
-        """
-        interface = 'sp/targets/extended/{}'.format(target_id)
-        return self._operation(interface)
-
-    # todo - remove?
-    def create_targets(self, data):
-        """
-        Creates one or more ad groups. Successfully created ad groups will
-        be assigned unique adGroupIds.
-
-        :POST: /targets
-        :param data: A list of up to 100 targets to be created.
-        :type data: List of **Target**
-
-        :returns:
-            :207: Multi-status. List of AdGroupResponse reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'sp/targets'
-        return self._operation(interface, data, method='POST')
-
-    # todo - remove?
-    def update_targets(self, data):
-        """
-        Updates one or more targets. Targets are identified using their
-        targetId.
-
-        :PUT: /targets
-        :param data: A list of up to 100 updates containing targetIds and the
-            mutable fields to be modified.
-        :type data: List of **Target**
-
-        :returns:
-            :207: Multi-status. List of Targets reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'sp/targets'
-        return self._operation(interface, data, method='PUT')
-
-    # todo - remove?
-    def archive_target(self, ad_group_id):
-        """
-        Sets the ad group status to archived. This same operation can be
-        performed via an update, but is included for completeness.
-
-        :DELETE: /targets/{targetId}
-        :param target_id: The Id of the ad group to be archived.
-        :type target_id: string
-
-        :returns:
-            :200: Success. TargetResponse
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'sp/targets/{}'.format(target_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_targets(self, data=None):
-        interface = 'sp/targets'
-        return self._operation(interface, data)
-
-    def list_target_brands(self, data=None):
-        interface = 'sp/targets/brands'
-        return self._operation(interface, data)
-
-    def list_target_categories(self, data=None):
-        interface = 'sp/targets/categories'
-        return self._operation(interface, data)
-
-    def refine_target_categories(self, data=None):
-        interface = 'sp/targets/categories/refinements'
-        return self._operation(interface, data)
-
-    def list_target_product_recommendations(self, data=None):
-        interface = 'sp/targets/productRecommendations'
-        return self._operation(interface, data, method='POST')
-
-    # todo - remove?
-    def list_targets_ex(self, data=None):
-        """
-        Retrieves a list of targets satisfying optional criteria.
-
-        :GET: /sp/targets/extended
-        :param data: Parameter list of criteria.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result
-            set. Defaults to 0.
-        :type startIndex: integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: integer
-        :param expressionTypeFilter: Restricts results to targets
-            with expression types within the specified comma-separated list.
-            Possible filter types are: auto and manual
-        :type expressionTypeFilter: string
-        :param expressionTextFilter: Content of the targeting expression
-        :type expressionTextFilter: string
-        :param campaignIdFilter: Restricts results to ad groups within
-            campaigns specified in comma-separated list.
-        :type campaignIdFilter: string
-        :param adGroupIdFilter: Restricts results to ad groups specified in
-            comma-separated list.
-        :type adGroupIdFilter: string
-        :param stateFilter: Restricts results to targets with state within the
-            specified comma-separatedlist. Must be one of enabled, paused,
-            archived.  Default behavior is to include all.
-        :type stateFilter: string
-        :returns:
-            :200: Success. List of Targets.
-            :401: Unauthorized.
-        """
-        interface = 'sp/targets/extended'
-        return self._operation(interface, data)
-
-    # todo - remove?
-    def get_negative_target(self, target_id):
-        """
-        Retrieves an ad group by Id. Note that this call returns the minimal
-        set of ad group fields, but is more efficient than getAdGroupEx.
-
-        :GET: /sp/negativeTargets/{targetId}
-        :param target_id: The Id of the requested ad group.
-        :type target_id: string
-
-        :returns:
-            :200: Success, Target response
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'sp/negativeTargets/{}'.format(ad_group_id)
-        return self._operation(interface)
-
-    # todo - remove?
-    def get_negative_target_ex(self, target_id):
-        """
-        Retrieves a target and its extended fields by ID. Note that this
-        call returns the complete set of target fields (including serving
-        status and other read-only fields), but is less efficient than
-        getTarget.
-
-        :GET: /sp/negativeTargets/extended/{adGroupId}
-        :param target_id: The Id of the requested target.
-        :type target_id: string
-
-        :returns:
-            :200: Success, Target response
-            :401: Unauthorized
-            :404: Target not found
-        """
-        interface = 'sp/negativeTargets/extended/{}'.format(ad_group_id)
-        return self._operation(interface)
-
-    # todo - remove?
-    def create_negative_targets(self, data):
-        """
-        Creates one or more ad groups. Successfully created ad groups will
-        be assigned unique adGroupIds.
-
-        :POST: /negativeTargets
-        :param data: A list of up to 100 negativeTargets to be created.
-        :type data: List of **Target**
-
-        :returns:
-            :207: Multi-status. List of AdGroupResponse reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'negativeTargets'
-        return self._operation(interface, data, method='POST')
-
-    # todo - remove?
-    def update_negative_targets(self, data):
-        """
-        Updates one or more negativeTargets. negativeTargets are identified using their
-        targetId.
-
-        :PUT: /negativeTargets
-        :param data: A list of up to 100 updates containing targetIds and the
-            mutable fields to be modified.
-        :type data: List of **Target**
-
-        :returns:
-            :207: Multi-status. List of negativeTargets reflecting the same
-                order as the input
-            :401: Unauthorized
-        """
-        interface = 'negativeTargets'
-        return self._operation(interface, data, method='PUT')
-
-    # todo - remove?
-    def archive_negative_target(self, ad_group_id):
-        """
-        Sets the ad group status to archived. This same operation can be
-        performed via an update, but is included for completeness.
-
-        :DELETE: /negativeTargets/{targetId}
-        :param target_id: The Id of the ad group to be archived.
-        :type target_id: string
-
-        :returns:
-            :200: Success. TargetResponse
-            :401: Unauthorized
-            :404: Ad group not found
-        """
-        interface = 'negativeTargets/{}'.format(target_id)
-        return self._operation(interface, method='DELETE')
-
-    # todo - remove?
-    def list_negative_targets(self, data=None):
-        """
-        Retrieves a list of negativeTargets satisfying optional criteria.
-
-        :GET: /sp/negativeTargets
-        :param data: Parameter list of criteria.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result
-            set. Defaults to 0.
-        :type startIndex: integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: integer
-        :param expressionTypeFilter: Restricts results to negativeTargets
-            with expression types within the specified comma-separated list.
-            Possible filter types are: auto and manual
-        :type expressionTypeFilter: string
-        :param expressionTextFilter: Content of the targeting expression
-        :type expressionTextFilter: string
-        :param campaignIdFilter: Restricts results to ad groups within
-            campaigns specified in comma-separated list.
-        :type campaignIdFilter: string
-        :param adGroupIdFilter: Restricts results to ad groups specified in
-            comma-separated list.
-        :type adGroupIdFilter: string
-        :param stateFilter: Restricts results to negativeTargets with state within the
-            specified comma-separatedlist. Must be one of enabled, paused,
-            archived.  Default behavior is to include all.
-        :type stateFilter: string
-        :returns:
-            :200: Success. List of negativeTargets.
-            :401: Unauthorized.
-        """
-        interface = 'sp/negativeTargets'
-        return self._operation(interface, data)
-
-    # todo - remove?
-    def list_negative_targets_ex(self, data=None):
-        """
-        Retrieves a list of negativeTargets satisfying optional criteria.
-
-        :GET: /sp/negativeTargets/extended
-        :param data: Parameter list of criteria.
-
-        data may contain the following optional parameters:
-
-        :param startIndex: 0-indexed record offset for the result
-            set. Defaults to 0.
-        :type startIndex: integer
-        :param count: Number of records to include in the paged response.
-            Defaults to max page size.
-        :type count: integer
-        :param expressionTypeFilter: Restricts results to negativeTargets
-            with expression types within the specified comma-separated list.
-            Possible filter types are: auto and manual
-        :type expressionTypeFilter: string
-        :param expressionTextFilter: Content of the targeting expression
-        :type expressionTextFilter: string
-        :param campaignIdFilter: Restricts results to ad groups within
-            campaigns specified in comma-separated list.
-        :type campaignIdFilter: string
-        :param adGroupIdFilter: Restricts results to ad groups specified in
-            comma-separated list.
-        :type adGroupIdFilter: string
-        :param stateFilter: Restricts results to negativeTargets with state within the
-            specified comma-separatedlist. Must be one of enabled, paused,
-            archived.  Default behavior is to include all.
-        :type stateFilter: string
-        :returns:
-            :200: Success. List of negativeTargets.
-            :401: Unauthorized.
-        """
-        interface = 'sp/negativeTargets/extended'
-        return self._operation(interface, data)
-
-    def create_search_terms(self, data):
-        """
-        Creates one search terms report.
-
-        :POST: /targets/report
-        :param data: keyword search terms report to be created.
-        :type data: dictionary
-
-        :returns:
-            :202: report response
-            :401: Unauthorized
-        """
-        interface = 'sp/targets/report'
-        return self._operation(interface, data, method='POST')
-
-    def create_search_terms_old(self, data):
-        """
-        Creates one search terms report.
-
-        :POST: /keywords/report
-        :param data:  keyword search terms report to be created.
-        :type data: dictionary
-
-        :returns:
-            :202: report response
-            :401: Unauthorized
-        """
-        interface = 'sp/keywords/report'
-        return self._operation(interface, data, method='POST')
-
-    def get_biddable_keyword(self, keyword_id, campaign_type='sp'):
-        """
-        Retrieves a keyword by ID. Note that this call returns the minimal set
-        of keyword fields, but is more efficient than getBiddableKeywordEx.
-
-        :GET: /{campaignType}/keywords/{keywordId}
-        :param keyword_id: The Id of the requested keyword.
-        :type keyword_id: string
-        :param campaign_type: The campaignType for the requested keyword
-          Defaults to 'sp'
-        :type campaign_type: string
-
-        :returns:
-            :200: Success. Keyword.
-            :401: Unauthorized.
-            :404: Keyword not found.
-        """
-        interface = '{}/keywords/{}'.format(campaign_type, keyword_id)
-        return self._operation(interface)
-
-    def get_biddable_keyword_ex(self, keyword_id):
-        """
-        Retrieves a keyword and its extended fields by ID. Note that this call
-        returns the complete set of keyword fields (including serving status
-        and other read-only fields), but is less efficient than
-        getBiddableKeyword.
-
-        :GET: /keywords/extended/{keywordId}
-        :param keyword_id: The Id of the requested keyword.
-        :type keyword_id: string
-
-        :returns:
-            :200: Success. Keyword.
-            :401: Unauthorized.
-            :404: Keyword not found.
-        """
-        interface = 'sp/keywords/extended/{}'.format(keyword_id)
-        return self._operation(interface)
-
-    def create_biddable_keywords(self, data):
-        """
-        Creates one or more keywords. Successfully created keywords will be
-        assigned unique keywordIds.
-
-        :POST: /keywords
-        :param data: A list of up to 1000 keywords to be created. Required
-            fields for keyword creation are campaignId, adGroupId, keywordText,
-            matchType and state.
-        :type data: List of **Keyword**
-        """
-        interface = 'keywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_biddable_keywords(self, data):
-        interface = 'keywords'
-        return self._operation(interface, data, method='PUT')
-
-    def update_biddable_keywords_sb(self, data):
-        interface = 'sb/keywords'
-        return self._operation(interface, data, method='PUT', ignore_version=True)
-
-    def archive_biddable_keyword(self, keyword_id):
-        interface = 'keywords/{}'.format(keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_biddable_keywords(self, data=None):
-        interface = 'sp/keywords'
-        return self._operation(interface, data)
-
-    def list_biddable_keywords_ex(self, data=None):
-        interface = 'sp/keywords/extended'
-        return self._operation(interface, data)
-
-    def get_negative_keyword(self, negative_keyword_id):
-        interface = 'sp/negativeKeywords/{}'.format(negative_keyword_id)
-        return self._operation(interface)
-
-    def get_negative_keyword_ex(self, negative_keyword_id):
-        interface = 'sp/negativeKeywords/extended/{}'.format(negative_keyword_id)
-        return self._operation(interface)
-
-    def create_negative_keywords(self, data):
-        interface = 'negativeKeywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_negative_keywords(self, data):
-        interface = 'negativeKeywords'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_negative_keyword(self, negative_keyword_id):
-        interface = 'negativeKeywords/{}'.format(negative_keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_negative_keywords(self, data=None):
-        interface = 'sp/negativeKeywords'
-        return self._operation(interface, data)
-
-    def list_negative_keywords_ex(self, data=None):
-        interface = 'sp/negativeKeywords/extended'
-        return self._operation(interface, data)
-
-    def get_campaign_negative_keyword(self, campaign_negative_keyword_id):
-        interface = 'sp/campaignNegativeKeywords/{}'.format(
-            campaign_negative_keyword_id)
-        return self._operation(interface)
-
-    def get_campaign_negative_keyword_ex(self, campaign_negative_keyword_id):
-        interface = 'sp/campaignNegativeKeywords/extended/{}'.format(
-            campaign_negative_keyword_id)
-        return self._operation(interface)
-
-    def create_campaign_negative_keywords(self, data):
-        interface = 'campaignNegativeKeywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_campaign_negative_keywords(self, data):
-        interface = 'campaignNegativeKeywords'
-        return self._operation(interface, data, method='PUT')
-
-    def remove_campaign_negative_keyword(self, campaign_negative_keyword_id):
-        interface = 'campaignNegativeKeywords/{}'.format(
-            campaign_negative_keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_campaign_negative_keywords(self, data=None):
-        interface = 'sp/campaignNegativeKeywords'
-        return self._operation(interface, data)
-
-    def list_campaign_negative_keywords_ex(self, data=None):
-        interface = 'sp/campaignNegativeKeywords/extended'
-        return self._operation(interface, data)
-
-    def get_product_ad(self, product_ad_id):
-        interface = 'sp/productAds/{}'.format(product_ad_id)
-        return self._operation(interface)
-
-    def get_product_ad_ex(self, product_ad_id):
-        interface = 'sp/productAds/extended/{}'.format(product_ad_id)
-        return self._operation(interface)
-
-    def create_product_ads(self, data):
-        interface = 'productAds'
-        return self._operation(interface, data, method='POST')
-
-    def update_product_ads(self, data):
-        interface = 'productAds'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_product_ads(self):
-        pass
-
-    def list_product_ads(self, data=None):
-        interface = 'sp/productAds'
-        return self._operation(interface, data)
-
-    def list_product_ads_ex(self, data=None):
-        interface = 'sp/productAds/extended'
-        return self._operation(interface, data)
-
-    def request_snapshot(self, record_type=None, snapshot_id=None, data=None, campaign_type='sp'):
-        """
-        :POST: /snapshots
-
-        Required data:
-        * :campaignType: The type of campaign for which snapshot should be
-          generated. Must be one of 'sponsoredProducts' or 'headlineSearch'
-          Defaults to 'sponsoredProducts.
-        """
-        if not data:
-            data = {}
-
-        if record_type is not None:
-            interface = '{}/{}/snapshot'.format(campaign_type, record_type)
-            return self._operation(interface, data, method='POST')
-        elif snapshot_id is not None:
-            interface = 'snapshots/{}'.format(snapshot_id)
-            return self._operation(interface, data)
-        else:
-            return {'success': False,
-                    'code': 0,
-                    'response': 'record_type and snapshot_id are both empty.'}
-
-    def request_report(self, record_type=None, report_id=None, data=None, campaign_type='sp'):
-        """
-        :POST: /{campaignType}/reports
-
-        :param campaign_type: The campaignType to request the report for ('sp' or 'hsa')
-          Defaults to 'sp'
-        :type data: string
-        """
-        if record_type is not None:
-            interface = '{}/{}/report'.format(campaign_type, record_type)
-            return self._operation(interface, data, method='POST')
-        elif report_id is not None:
-            interface = 'reports/{}'.format(report_id)
-            return self._operation(interface)
-        else:
-            return {'success': False,
-                    'code': 0,
-                    'response': 'record_type and report_id are both empty.'}
-
-    def get_report(self, report_id):
-        interface = 'reports/{}'.format(report_id)
-        res = self._operation(interface)
-        if res['code'] == 200 and json.loads(res['response'])['status'] == 'SUCCESS':
-            res = self._download(
-                location=json.loads(res['response'])['location'])
-            return res
-        else:
-            return res
-
-    def get_snapshot(self, snapshot_id):
-        interface = 'snapshots/{}'.format(snapshot_id)
-        res = self._operation(interface)
-        if json.loads(res['response'])['status'] == 'SUCCESS':
-            res = self._download(
-                location=json.loads(res['response'])['location'])
-            return res
-        else:
-            return res
-
-    def get_ad_group_bid_recommendations(self, ad_group_id):
-        """Request bid recommendations for specified ad group."""
-        interface = 'adGroups/{}/bidRecommendations'.format(ad_group_id)
-        return self._operation(interface)
-
-    def get_keyword_bid_recommendations(self, ad_group_id, keywords):
-        """
-        Request bid recommendations for:
-        * a list of up to 100 keywords
-
-        A list of keywords must be in the KeywordBidRecommendationsData format:
-
-        ```
-        int adGroupId: []
-        ```
-        """
-        interface = 'keywords/bidRecommendations'
-
-        data = {
-            'adGroupId': ad_group_id,
-            'keywords': keywords
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def get_sb_keyword_bid_recommendations(self, campaign_id, keywords):
-        interface = 'recommendations/bids'
-
-        data = {
-            'campaignId': campaign_id,
-            'keywords': keywords
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def get_sb_target_bid_recommendations(self, campaign_id, keywords):
-        interface = 'recommendations/bids'
-
-        data = {
-            'campaignId': campaign_id,
-            'targets': keywords
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def get_bid_recommendations(self, expressions, keywords):
-        """
-        Request bid recommendations for:
-        * a list of up to 100 targets
-        Keywords Example
-        {
-          "expressions": [
-            [
-              {
-                "type": "queryExactMatches",
-                "value": "oranges"
-              }
-            ]
-          ],
-          "adGroupId": 217706707887211
-        }
-
-        Auto Example
-        {
-          "expressions": [
-            [
-              {
-                "type": "queryBroadRelMatches",
-                "value": "apples"
-              }
-            ]
-          ],
-          "adGroupId": 163368712670649
-        }
-
-        {
-          "expressions": [
-            [
-              {
-                "type": "asinCategorySameAs",
-                "value": "166099011"
-              },
-              {
-                "type": "asinReviewRatingBetween",
-                "value": "4.5-5"
-              }
-            ]
-          ],
-          "adGroupId": 163368712670649
-        }
-        """
-        interface = 'targets/bidRecommendations'
-
-        data = {
-            'adGroupId': ad_group_id,
-            'expressions': expressions
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def _download(self, location):
-        headers = {'Authorization': 'Bearer {}'.format(self._access_token),
-                   'Content-Type': 'application/json',
-                   'User-Agent': self.user_agent}
-
-        if self.profile_id is not None:
-            headers['Amazon-Advertising-API-Scope'] = self.profile_id
-        else:
-            raise ValueError('Invalid profile Id.')
-
-        opener = urllib.request.build_opener(NoRedirectHandler())
-        urllib.request.install_opener(opener)
-        req = urllib.request.Request(url=location, headers=headers, data=None)
-        try:
-            response = urllib.request.urlopen(req)
-            if 'location' in response:
-                if response['location'] is not None:
-                    req = urllib.request.Request(url=response['location'])
-                    res = urllib.request.urlopen(req)
-                    res_data = res.read()
-                    buf = BytesIO(res_data)
-                    f = gzip.GzipFile(fileobj=buf)
-                    data = f.read()
-                    return {'success': True,
-                            'code': res.code,
-                            'response': json.loads(data.decode('utf-8'))}
-                else:
-                    return {'success': False,
-                            'code': response.code,
-                            'response': 'Location is empty.'}
-            else:
-                return {'success': False,
-                        'code': response.code,
-                        'response': 'Location not found.'}
-        except urllib.error.HTTPError as e:
-            return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
-
-    def _operation(self, interface, params=None, method='GET', ignore_version=False):
-        """
-        Makes that actual API call.
-
-        :param interface: Interface used for this call.
-        :type interface: string
-        :param params: Parameters associated with this call.
-        :type params: GET: string POST: dictionary
-        :param method: Call method. Should be either 'GET', 'PUT', or 'POST'
-        :type method: string
-        """
-        if self._access_token is None:
-            return {'success': False,
-                    'code': 0,
-                    'response': 'access_token is empty.'}
-
-        headers = {'Authorization': 'Bearer {}'.format(self._access_token),
-                   'Amazon-Advertising-API-ClientId': self.client_id,
-                   'Content-Type': 'application/json',
-                   'User-Agent': self.user_agent}
-
-        if self.sandbox:
-            headers['BIDDING_CONTROLS_ON'] = 'true'
-
-        if self.profile_id is not None and self.profile_id != '':
-            headers['Amazon-Advertising-API-Scope'] = self.profile_id
-        elif 'profiles' not in interface:
-            # Profile ID is required for all calls beyond authentication and getting profile info
-            return {'success': False,
-                    'code': 0,
-                    'response': 'profile_id is empty.'}
-
-        data = None
-
-        if method == 'GET':
-            if params is not None:
-                p = '?{}'.format(urllib.parse.urlencode(params))
-            else:
-                p = ''
-
-            if ignore_version:
-                url = 'https://{host}/{interface}{params}'.format(
-                    host=self.endpoint,
-                    interface=interface,
-                    params=p)
-            else:
-                url = 'https://{host}/{api_version}/{interface}{params}'.format(
-                    host=self.endpoint,
-                    api_version=self.api_version,
-                    interface=interface,
-                    params=p)
-        else:
-            if params is not None:
-                data = json.dumps(params).encode('utf-8')
-
-            if ignore_version:
-                url = 'https://{host}/{interface}'.format(
-                    host=self.endpoint,
-                    interface=interface)
-            else:
-                url = 'https://{host}/{api_version}/{interface}'.format(
-                    host=self.endpoint,
-                    api_version=self.api_version,
-                    interface=interface)
-
-        if PYTHON == 3:
-            req = urllib.request.Request(url=url, headers=headers, data=data)
-        else:
-            req = MethodRequest(url=url, headers=headers, data=data, method=method)
-        req.method = method
-
-        try:
-            f = urllib.request.urlopen(req)
-            return {'success': True,
-                    'code': f.code,
-                    'response': f.read().decode('utf-8')}
-        except urllib.error.HTTPError as e:
-            return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
-
+from amazon_advertising_api.auth import TokenManager
+from amazon_advertising_api.transport import (DEFAULT_CHUNK_SIZE,
+                                              get_default_transport)
+from amazon_advertising_api.bulk import DEFAULT_BULK_WORKERS, bulk_call
+from amazon_advertising_api.codec import get_codec
+from amazon_advertising_api.columnar import DEFAULT_BATCH_SIZE, iter_batches
+from amazon_advertising_api.concurrency import (CallContext, bound,
+                                                get_default_executor,
+                                                request_scope)
+from amazon_advertising_api.download import (DEFAULT_DOWNLOAD_RETRIES,
+                                             INTERRUPTED_ERRORS, PartialFile)
+from amazon_advertising_api.errors import ApiError
+from amazon_advertising_api.fanout import (DEFAULT_FANOUT_WORKERS,
+                                           DEFAULT_PROFILE_CONCURRENCY,
+                                           fan_out)
+from amazon_advertising_api.instrumentation import (RequestEvent, as_hooks,
+                                                    observed)
+from amazon_advertising_api.models import ApiResponse, decoded
+from amazon_advertising_api.pagination import paginate
+from amazon_advertising_api.ratelimit import RateLimiter
+from amazon_advertising_api.streaming import iter_rows, load_rows
+from amazon_advertising_api.endpoints import (ADVERTISING_API_DOCS,
+                                              ADVERTISING_API_ENDPOINTS,
+                                              ADVERTISING_API_V3_DOCS,
+                                              ADVERTISING_API_V3_ENDPOINTS,
+                                              bind)
+import copy
+import hashlib
+import urllib.parse
+import time
+
+
+class _AdvertisingApiBase(object):
+    """
+    State and plumbing shared by the API clients.
 
-class AdvertisingApiV3(object):
-    """Lightweight client library for Amazon Sponsored Products API."""
+    The wrapper methods themselves are generated from the endpoint tables in
+    endpoints.py.
+    """
 
     def __init__(self,
                  client_id,
@@ -1313,35 +47,87 @@ class AdvertisingApiV3(object):
                  profile_id=None,
                  access_token=None,
                  refresh_token=None,
-                 sandbox=False):
+                 sandbox=False,
+                 transport=None,
+                 rate_limiter=None,
+                 token_cache=None,
+                 token_manager=None,
+                 cache=None,
+                 coalescer=None,
+                 hooks=None,
+                 executor=None,
+                 thread_safe=False):
         """
         Client initialization.
 
-        :param client_id: Application client Id that has been whitelisted
+        :param client_id: Login with Amazon client Id that has been whitelisted
             for cpc_advertising:campaign_management
         :type client_id: string
-        :param client_secret: Application client secret key.
+        :param client_secret: Login with Amazon client secret key.
         :type client_id: string
         :param region: Region code for endpoint. See regions.py.
         :type region: string
-        :param access_token: The access token for the advertiser account. Optional
+        :param access_token: The access token for the advertiser account.
         :type access_token: string
         :param refresh_token: The refresh token for the advertiser account.
         :type refresh_token: string
         :param sandbox: Indicate whether you are operating in sandbox or prod.
         :type sandbox: boolean
+        :param transport: HTTP transport. Defaults to the process-wide pooled
+            transport shared by all clients. See transport.py.
+        :type transport: Transport
+        :param rate_limiter: Paces API calls and retries throttled ones.
+            Clients given the same limiter share its budget. Defaults to a
+            RateLimiter that only reacts to throttling. See ratelimit.py.
+        :type rate_limiter: RateLimiter
+        :param token_cache: File shared by clients and processes using the
+            same refresh token, so that each does not request its own access
+            token. See auth.py.
+        :type token_cache: string
+        :param token_manager: Keeps the access token fresh. Defaults to a
+            TokenManager of refresh_token, if given; pass one to share it
+            between clients or to refresh in the background.
+        :type token_manager: TokenManager
+        :param cache: Read-through cache for GET calls; off by default.
+            Clients given the same cache share its entries. See cache.py.
+        :type cache: ResponseCache
+        :param coalescer: Has identical GET calls made at the same time share
+            one request; off by default. Clients given the same coalescer
+            share their in-flight calls. See coalesce.py.
+        :type coalescer: SingleFlight
+        :param hooks: Notified of every HTTP request with its timings, e.g.
+            an instrumentation.Metrics; a list of hooks is called in order.
+            See instrumentation.py.
+        :type hooks: Hooks
+        :param executor: Runs the calls given to :meth:`submit` and
+            :meth:`map`. Defaults to the process-wide thread pool shared by
+            all clients. See concurrency.py.
+        :type executor: concurrent.futures.Executor
+        :param thread_safe: Make profile_id and access_token read-only, so
+            that the client can be shared between threads without one
+            changing the calls of another. Use :meth:`for_profile` for other
+            profiles and a token_manager to renew the token.
+        :type thread_safe: boolean
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self._access_token = access_token
-        self.refresh_token = refresh_token
+        self._refresh_token = refresh_token
+        self._token_cache = token_cache
 
         self.api_version = versions['api_version']
         self.user_agent = 'AdvertisingAPI Python Client Library v{}'.format(
             versions['application_version'])
-        self.profile_id = profile_id
+        self._profile_id = profile_id
         self.token_url = None
         self.sandbox = sandbox
+        self.transport = transport or get_default_transport()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self.coalescer = coalescer
+        self.hooks = as_hooks(hooks)
+        self.executor = executor
+        self.thread_safe = thread_safe
 
         if region in regions:
             if sandbox:
@@ -1352,523 +138,73 @@ class AdvertisingApiV3(object):
         else:
             raise KeyError('Region {} not found in regions.'.format(region))
 
+        if token_manager is None and refresh_token is not None:
+            token_manager = self._new_token_manager(refresh_token)
+        self.token_manager = token_manager
+
+    _token_manager_class = TokenManager
+
+    def _new_token_manager(self, refresh_token):
+        return self._token_manager_class(
+            self.client_id, self.client_secret, refresh_token, self.token_url,
+            self.transport, access_token=self._access_token,
+            cache_path=self._token_cache)
+
+    @property
+    def refresh_token(self):
+        return self._refresh_token
+
+    @refresh_token.setter
+    def refresh_token(self, value):
+        """Set refresh_token; the token_manager switches to it."""
+        self._refresh_token = value
+        if value is None:
+            self.token_manager = None
+        elif self.token_manager is None:
+            self.token_manager = self._new_token_manager(value)
+        else:
+            self.token_manager.set_refresh_token(value)
+
     @property
     def access_token(self):
+        if self.token_manager is not None:
+            return self.token_manager.access_token
         return self._access_token
 
     @access_token.setter
     def access_token(self, value):
         """Set access_token"""
+        if self.thread_safe:
+            raise AttributeError('The access token of a thread-safe client '
+                                 'is renewed by its token_manager.')
+        if self.token_manager is not None:
+            self.token_manager.set_token(value)
         self._access_token = value
 
-    def do_refresh_token(self):
-        if self.refresh_token is None:
-            return {'success': False,
-                    'code': 0,
-                    'response': 'refresh_token is empty.'}
-
-        if self._access_token:
-            self._access_token = urllib.parse.unquote(self._access_token)
-        self.refresh_token = urllib.parse.unquote(self.refresh_token)
-
-        params = {
-            'grant_type': 'refresh_token',
-            'refresh_token': self.refresh_token,
-            'client_id': self.client_id,
-            'client_secret': self.client_secret}
-
-        data = urllib.parse.urlencode(params)
-
-        req = urllib.request.Request(
-            url='https://{}'.format(self.token_url),
-            data=data.encode('utf-8'))
-
-        try:
-            f = urllib.request.urlopen(req)
-            response = f.read().decode('utf-8')
-            if 'access_token' in response:
-                json_data = json.loads(response)
-                self._access_token = json_data['access_token']
-                return {'success': True,
-                        'code': f.code,
-                        'response': self._access_token}
-            else:
-                return {'success': False,
-                        'code': f.code,
-                        'response': 'access_token not in response.'}
-        except urllib.error.HTTPError as e:
-            return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
-
-    """ *********************************************************************
-    PROFILE MANAGEMENT
-    ********************************************************************* """
-    def register_profile(self, country_code):
-        """
-        Registers a sandbox profile.
-        """
-        interface = 'profiles/register'
-        params = {"countryCode": country_code}
-        return self._operation(interface, params, method='PUT')
-
-    def list_profiles(self):
-        interface = 'profiles'
-        return self._operation(interface)
-
-    def get_profile(self, profile_id):
-        interface = 'profiles/{}'.format(profile_id)
-        return self._operation(interface)
-
-    def update_profiles(self, data):
-        interface = 'profiles'
-        return self._operation(interface, data, method='PUT')
-
-    """ *********************************************************************
-    PORTFOLIO MANAGEMENT
-    ********************************************************************* """
-    def list_portfolios(self, data=None, extended=False):
-        interface = 'portfolios{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    def get_portfolio(self, portfolio_id, extended=False):
-        interface = 'portfolios{}/{}'. format('/extended' if extended else '', portfolio_id)
-        return self._operation(interface)
-
-    def create_portfolios(self, data):
-        interface = 'portfolios'
-        return self._operation(interface, data, method='POST')
-
-    def update_portfolios(self, data):
-        interface = 'portfolios'
-        return self._operation(interface, data, method='PUT')
-
-    """ *********************************************************************
-    CHANGE HISTORY
-    ********************************************************************* """
-    def list_changes(self, data):
-        interface = 'history'
-        return self._operation(interface, data, method='POST', version=None)
-
-    """ *********************************************************************
-    PRODUCT ELIGIBILITY
-    ********************************************************************* """
-    def list_eligibility(self, data):
-        interface = 'eligibility/product/list'
-        return self._operation(interface, data, method='POST', version=None)
-
-    """ *********************************************************************
-    SP CAMPAIGN MANAGEMENT
-    ********************************************************************* """
-    def get_campaign(self, campaign_id, extended=False):
-        interface = 'sp/campaigns{}/{}'.format('/extended' if extended else '', campaign_id)
-        return self._operation(interface)
-
-    def create_campaigns(self, data):
-        """
-        Creates one or more campaigns. Successfully created campaigns will be
-        assigned unique **campaignIds**.
-        :param data: A list of up to 100 campaigns to be created.  Required
-            fields for campaign creation are **name**, **campaignType**,
-            **targetingType**, **state**, **dailyBudget** and **startDate**.
-        """
-        interface = 'sp/campaigns'
-        return self._operation(interface, data, method='POST')
-
-    def update_campaigns(self, data):
-        """
-        Updates one or more campaigns.
-        :param data: A list of up to 100 updates containing **campaignIds** and
-            the mutable fields to be modified. Mutable fields are **name**,
-            **state**, **dailyBudget**, **startDate**, and **endDate**.
-        """
-        interface = 'sp/campaigns'
-        return self._operation(interface, data, method='PUT')
-
-
-    def archive_campaign(self, campaign_id):
-        """
-        Sets the campaign status to archived. This same operation can be
-        performed via an update, but is included for completeness.
-        """
-        interface = 'sp/campaigns/{}'.format(campaign_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_campaigns(self, data=None, extended=False):
-        """
-        Retrieves a list of campaigns satisfying optional criteria.
-        """
-        interface = 'sp/campaigns{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP BUDGET RECOMMENDATIONS
-    ********************************************************************* """
-    def list_budget_recommendations(self, data):
-        interface = 'sp/campaigns/budgetRecommendations'
-        return self._operation(interface, data, method='POST')
-
-    """ *********************************************************************
-    SP AD GROUP MANAGEMENT
-    ********************************************************************* """
-    def get_ad_group(self, ad_group_id, extended=False):
-        interface = 'sp/adGroups{}/{}'.format('/extended' if extended else '', ad_group_id)
-        return self._operation(interface)
-
-    def create_ad_groups(self, data):
-        interface = 'sp/adGroups'
-        return self._operation(interface, data, method='POST')
-
-    def update_ad_groups(self, data):
-        interface = 'sp/adGroups'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_ad_group(self, ad_group_id):
-        interface = 'sp/adGroups/{}'.format(ad_group_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_ad_groups(self, data=None, extended=False):
-        interface = 'sp/adGroups{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP PRODUCT AD MANAGEMENT
-    ********************************************************************* """
-    def get_product_ad(self, product_ad_id, extended=False):
-        interface = 'sp/productAds{}/{}'.format('/extended' if extended else '', product_ad_id)
-        return self._operation(interface)
-
-    def create_product_ads(self, data):
-        interface = 'sp/productAds'
-        return self._operation(interface, data, method='POST')
-
-    def update_product_ads(self, data):
-        interface = 'sp/productAds'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_product_ad(self, product_ad_id, extended=False):
-        interface = 'sp/productAds/{}'.format(product_ad_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_product_ads(self, data=None, extended=False):
-        interface = 'sp/productAds{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP KEYWORD MANAGEMENT
-    ********************************************************************* """
-    def get_keyword(self, keyword_id, extended=False):
-        interface = 'sp/keywords{}/{}'.format('/extended' if extended else '', keyword_id)
-        return self._operation(interface)
-
-    def create_keywords(self, data):
-        """
-        :param data: A list of up to 1000 keywords to be created. Required
-            fields for keyword creation are campaignId, adGroupId, keywordText,
-            matchType and state.
-        """
-        interface = 'sp/keywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_keywords(self, data):
-        interface = 'sp/keywords'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_keyword(self, keyword_id):
-        interface = 'sp/keywords/{}'.format(keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_biddable_keywords(self, data=None, extended=False):
-        interface = 'sp/keywords{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP SUGGESTED KEYWORDS
-    ********************************************************************* """
-    def list_suggested_keywords_for_ad_group(self, ad_group_id, extended=False):
-        interface = 'sp/adGroups/{}/suggested/keywords{}'.format(ad_group_id, '/extended' if extended else '')
-        return self._operation(interface)
-
-    def list_suggested_keywords_for_asin(self, asin):
-        interface = 'sp/asins/{}/suggested/keywords'.format(asin)
-        return self._operation(interface)
-
-    def list_suggested_keywords_for_asins(self, data):
-        interface = 'sp/asins/suggested/keywords'
-        return self._operation(interface, data, method='POST')
-
-    """ *********************************************************************
-    SP KEYWORD RANK RECOMMENDATIONS
-    ********************************************************************* """
-    def list_keyword_rank_recommendations(self, data):
-        # TODO - determine what should go in data
-        interface = 'sp/targets/keywords/recommendation'
-        return self._operation(interface, data, method='POST')
-
-    """ *********************************************************************
-    SP BID RECOMMENDATIONS
-    ********************************************************************* """
-    def list_bid_recommendations_for_ad_group(self, ad_group_id):
-        interface = 'sp/adGroups/{}/bidRecommendations'.format(ad_group_id)
-        return self._operation(interface)
-
-    def list_bid_recommendations_for_keyword(self, keyword_id):
-        interface = 'sp/keywords/{}/bidRecommendations'.format(keyword_id)
-        return self._operation(interface)
-
-    def list_bid_recommendations_for_keywords(self, ad_group_id, keywords):
-        interface = 'sp/keywords/bidRecommendations'
-        data = {
-            'adGroupId': ad_group_id,
-            'keywords': keywords
-        }
-        return self._operation(interface, data, method='POST')
-
-    def list_bid_recommendations_for_targets(self, ad_group_id, expressions):
-        interface = 'sp/targets/bidRecommendations'
-        data = {
-            'adGroupId': ad_group_id,
-            'expressions': expressions
-        }
-        return self._operation(interface, data, method='POST')
-
-    """ *********************************************************************
-    SP NEGATIVE KEYWORD MANAGEMENT
-    ********************************************************************* """
-    def get_negative_keyword(self, negative_keyword_id, extended=False):
-        interface = 'sp/negativeKeywords{}/{}'.format('/extended' if extended else '', negative_keyword_id)
-        return self._operation(interface)
-
-    def create_negative_keywords(self, data):
-        interface = 'sp/negativeKeywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_negative_keywords(self, data):
-        interface = 'sp/negativeKeywords'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_negative_keyword(self, negative_keyword_id):
-        interface = 'sp/negativeKeywords/{}'.format(negative_keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_negative_keywords(self, data=None, extended=False):
-        interface = 'sp/negativeKeywords{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP CAMPAIGN NEGATIVE KEYWORD MANAGEMENT
-    ********************************************************************* """
-    def get_campaign_negative_keyword(self, campaign_negative_keyword_id, extended=False):
-        interface = 'sp/campaignNegativeKeywords{}/{}'.format('/extended' if extended else '', campaign_negative_keyword_id)
-        return self._operation(interface)
-
-    def create_campaign_negative_keywords(self, data):
-        interface = 'sp/campaignNegativeKeywords'
-        return self._operation(interface, data, method='POST')
-
-    def update_campaign_negative_keywords(self, data):
-        interface = 'sp/campaignNegativeKeywords'
-        return self._operation(interface, data, method='PUT')
-
-    def remove_campaign_negative_keyword(self, campaign_negative_keyword_id):
-        interface = 'sp/campaignNegativeKeywords/{}'.format(campaign_negative_keyword_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_campaign_negative_keywords(self, data=None, extended=False):
-        interface = 'sp/campaignNegativeKeywords{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP TARGET MANAGEMENT
-    ********************************************************************* """
-    def get_target(self, target_id, extended=False):
-        interface = 'sp/targets{}/{}'.format('/extended' if extended else '', target_id)
-        return self._operation(interface)
-
-    def create_targets(self, data):
-        """
-        :param data: A list of up to 100 targets to be created.
-        """
-        interface = 'sp/targets'
-        return self._operation(interface, data, method='POST')
-
-    def update_targets(self, data):
-        """
-        :param data: A list of up to 100 updates containing targetIds and the
-            mutable fields to be modified.
-        """
-        interface = 'sp/targets'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_target(self, ad_group_id):
-        interface = 'sp/targets/{}'.format(target_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_targets(self, data=None, extended=False):
-        interface = 'sp/targets{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    def list_target_brands(self, data=None):
-        """ Recommended brands for targeting """
-        interface = 'sp/targets/brands'
-        return self._operation(interface, data)
-
-    def list_target_categories(self, data=None):
-        """ Recommended categories for targeting """
-        interface = 'sp/targets/categories'
-        return self._operation(interface, data)
-
-    def refine_target_categories(self, data=None):
-        """ Refinements for a single category """
-        interface = 'sp/targets/categories/refinements'
-        return self._operation(interface, data)
-
-    def list_target_product_recommendations(self, data=None):
-        """ Recommended products for targeting """
-        interface = 'sp/targets/productRecommendations'
-        return self._operation(interface, data, method='POST')
-
-    """ *********************************************************************
-    SP NEGATIVE TARGET MANAGEMENT
-    ********************************************************************* """
-    def get_negative_target(self, target_id, extended=False):
-        interface = 'sp/negativeTargets{}/{}'.format('/extended' if extended else '', ad_group_id)
-        return self._operation(interface)
-
-    def create_negative_targets(self, data):
-        interface = 'sp/negativeTargets'
-        return self._operation(interface, data, method='POST')
-
-    def update_negative_targets(self, data):
-        interface = 'sp/negativeTargets'
-        return self._operation(interface, data, method='PUT')
-
-    def archive_negative_target(self, ad_group_id):
-        interface = 'sp/negativeTargets/{}'.format(target_id)
-        return self._operation(interface, method='DELETE')
-
-    def list_negative_targets(self, data=None, extended=False):
-        interface = 'sp/negativeTargets{}'.format('/extended' if extended else '')
-        return self._operation(interface, data)
-
-    """ *********************************************************************
-    SP REPORTS
-    ********************************************************************* """
-    def request_report(self, record_type, data={}):
-        """
-        :POST: /{campaignType}/reports
-        """
-        interface = 'sp/{}/report'.format(record_type)
-        return self._operation(interface, data, method='POST')
-
-    def get_report(self, report_id):
-        interface = 'reports/{}'.format(report_id)
-        res = self._operation(interface)
-        if res['code'] == 200 and json.loads(res['response'])['status'] == 'SUCCESS':
-            return self._download(location=json.loads(res['response'])['location'])
-        else:
-            return res
-
-    """ *********************************************************************
-    SP SNAPSHOTS
-    ********************************************************************* """
-    def request_snapshot(self, record_type, data={}):
-        interface = 'sp/{}/snapshot'.format(record_type)
-        return self._operation(interface, data, method='POST')
-
-    def get_snapshot(self, snapshot_id):
-        interface = 'snapshots/{}'.format(snapshot_id)
-        res = self._operation(interface)
-        if res['code'] == 200 and json.loads(res['response'])['status'] == 'SUCCESS':
-            return self._download(location=json.loads(res['response'])['location'])
-        else:
-            return res
-
-
-
-    """ *********************************************************************
-    SB / TO REMOVE
-    ********************************************************************* """
-
-
-    def get_sb_keyword_bid_recommendations(self, campaign_id, keywords):
-        interface = 'recommendations/bids'
-        data = {
-            'campaignId': campaign_id,
-            'keywords': keywords
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def get_sb_target_bid_recommendations(self, campaign_id, keywords):
-        interface = 'recommendations/bids'
-
-        data = {
-            'campaignId': campaign_id,
-            'targets': keywords
-        }
-
-        return self._operation(interface, data, method='POST')
-
-    def create_search_terms(self, data):
-        """
-        Creates one search terms report.
-
-        :POST: /targets/report
-        :param data: keyword search terms report to be created.
-        :type data: dictionary
+    @property
+    def profile_id(self):
+        return self._profile_id
 
-        :returns:
-            :202: report response
-            :401: Unauthorized
-        """
-        interface = 'sp/targets/report'
-        return self._operation(interface, data, method='POST')
+    @profile_id.setter
+    def profile_id(self, value):
+        if self.thread_safe:
+            raise AttributeError('The profile of a thread-safe client cannot '
+                                 'change; use for_profile().')
+        self._profile_id = value
 
-    def create_search_terms_old(self, data):
+    def context(self):
         """
-        Creates one search terms report.
-
-        :POST: /keywords/report
-        :param data:  keyword search terms report to be created.
-        :type data: dictionary
-
-        :returns:
-            :202: report response
-            :401: Unauthorized
+        The profile and access token a call made now would use, as an
+        immutable :class:`~amazon_advertising_api.concurrency.CallContext`.
         """
-        interface = 'sp/keywords/report'
-        return self._operation(interface, data, method='POST')
+        return CallContext(self._profile_id, self.access_token)
 
-
-    # def request_report(self, record_type=None, report_id=None, data=None, campaign_type='sp'):
-    #     """
-    #     :POST: /{campaignType}/reports
-    #
-    #     :param campaign_type: The campaignType to request the report for ('sp' or 'hsa')
-    #       Defaults to 'sp'
-    #     :type data: string
-    #     """
-    #     if record_type is not None:
-    #         interface = '{}/{}/report'.format(campaign_type, record_type)
-    #         return self._operation(interface, data, method='POST')
-    #     elif report_id is not None:
-    #         interface = 'reports/{}'.format(report_id)
-    #         return self._operation(interface)
-    #     else:
-    #         return {'success': False,
-    #                 'code': 0,
-    #                 'response': 'record_type and report_id are both empty.'}
-    #
-    # def get_report(self, report_id):
-    #     interface = 'reports/{}'.format(report_id)
-    #     res = self._operation(interface)
-    #     if res['code'] == 200 and json.loads(res['response'])['status'] == 'SUCCESS':
-    #         res = self._download(
-    #             location=json.loads(res['response'])['location'])
-    #         return res
-    #     else:
-    #         return res
+    def do_refresh_token(self):
+        if self.token_manager is None:
+            return {'success': False,
+                    'code': 0,
+                    'response': 'refresh_token is empty.'}
+        return self.token_manager.refresh()
 
     def request_snapshot(self, record_type=None, snapshot_id=None, data=None, campaign_type='sp'):
         """
@@ -1893,81 +229,466 @@ class AdvertisingApiV3(object):
                     'code': 0,
                     'response': 'record_type and snapshot_id are both empty.'}
 
+    def get_report(self, report_id):
+        res = self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._download(location=location)
+        return res
+
     def get_snapshot(self, snapshot_id):
-        interface = 'snapshots/{}'.format(snapshot_id)
-        res = self._operation(interface)
-        if json.loads(res['response'])['status'] == 'SUCCESS':
-            res = self._download(
-                location=json.loads(res['response'])['location'])
-            return res
-        else:
-            return res
+        res = self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._download(location=location)
+        return res
+
+    def stream_report(self, report_id):
+        """
+        Yields the rows of a finished report one at a time.
+
+        The download is decompressed and parsed as it arrives, so memory use
+        does not grow with the size of the report.
+
+        :param report_id: The Id of the requested report.
+        :type report_id: string
+        :raises ApiError: The report is not finished or the download failed.
+        """
+        res = self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is None:
+            raise ApiError(res)
+        for row in self._stream(location):
+            yield row
+
+    def stream_snapshot(self, snapshot_id):
+        """
+        Yields the records of a finished snapshot one at a time. See
+        :meth:`stream_report`.
+
+        :param snapshot_id: The Id of the requested snapshot.
+        :type snapshot_id: string
+        :raises ApiError: The snapshot is not finished or the download failed.
+        """
+        res = self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is None:
+            raise ApiError(res)
+        for row in self._stream(location):
+            yield row
+
+    def report_batches(self, report_id, metrics=None, schema=None,
+                       batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yields the rows of a finished report as columnar batches, streamed
+        from the download without building a list of rows::
+
+            for batch in api.report_batches(report_id, metrics):
+                writer.write_batch(batch.to_arrow())
+
+        :param report_id: The Id of the requested report.
+        :type report_id: string
+        :param metrics: The metrics the report was requested with; they set
+            the column types. See columnar.py.
+        :param schema: Column types overriding the derived ones.
+        :type schema: dictionary
+        :param batch_size: Rows per batch.
+        :type batch_size: integer
+        :raises ApiError: The report is not finished or the download failed.
+        """
+        return iter_batches(self.stream_report(report_id), metrics, schema,
+                            batch_size)
+
+    def snapshot_batches(self, snapshot_id, schema=None,
+                         batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yields the records of a finished snapshot as columnar batches. See
+        :meth:`report_batches`.
+        """
+        return iter_batches(self.stream_snapshot(snapshot_id), None, schema,
+                            batch_size)
+
+    def download_report(self, report_id, path, decompress=False, resume=True,
+                        chunk_size=DEFAULT_CHUNK_SIZE,
+                        retries=DEFAULT_DOWNLOAD_RETRIES):
+        """
+        Writes a finished report to a local file instead of memory.
+
+        The payload is written in ``chunk_size`` pieces to ``path + '.part'``
+        and renamed to ``path`` when complete. An interrupted transfer is
+        resumed with an HTTP Range request, up to ``retries`` times within
+        this call; the partial file is kept so a later call resumes it too.
+
+        :param report_id: The Id of the requested report.
+        :type report_id: string
+        :param path: Destination file.
+        :type path: string
+        :param decompress: Write the decompressed JSON rather than the gzip
+            file as downloaded.
+        :type decompress: boolean
+        :param resume: Continue from an existing ``.part`` file.
+        :type resume: boolean
+        :param chunk_size: Bytes per read and write.
+        :type chunk_size: integer
+        :param retries: Resume attempts after an interrupted transfer.
+        :type retries: integer
+        :returns: On success, response is a **DownloadResult** with the path,
+            byte counts and timing. The report status otherwise.
+        """
+        res = self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._download_to_file(location, path, decompress, resume,
+                                          chunk_size, retries)
+        return res
+
+    def download_snapshot(self, snapshot_id, path, decompress=False,
+                          resume=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                          retries=DEFAULT_DOWNLOAD_RETRIES):
+        """
+        Writes a finished snapshot to a local file. See
+        :meth:`download_report`.
+        """
+        res = self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._download_to_file(location, path, decompress, resume,
+                                          chunk_size, retries)
+        return res
+
+    def process_report(self, report_id, processor, metrics=None):
+        """
+        Downloads a finished report and has a process pool decompress,
+        parse and convert it to columnar batches, keeping that CPU work off
+        this process's GIL.
+
+        :param report_id: The Id of the requested report.
+        :type report_id: string
+        :param processor: The pool to use. See processing.py.
+        :type processor: ReportProcessor
+        :param metrics: The metrics the report was requested with; they set
+            the column types.
+        :returns: On success, response is the list of **ColumnBatch**. The
+            report status otherwise.
+        """
+        res = self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._process(location, processor, metrics)
+        return res
+
+    def process_snapshot(self, snapshot_id, processor):
+        """
+        Downloads a finished snapshot and converts it in a process pool. See
+        :meth:`process_report`.
+        """
+        res = self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return self._process(location, processor, None)
+        return res
+
+    def bulk(self, name, items, max_workers=DEFAULT_BULK_WORKERS, **kwargs):
+        """
+        Sends any number of entities through a create/update endpoint.
+
+        The entities are split by the endpoint's limit (100, or 1000 for
+        keywords) and the chunks are sent concurrently. The per-entity
+        results come back as one list in input order::
+
+            api.bulk('update_keywords', keyword_updates)
+            api.bulk('list_bid_recommendations_for_keywords', keywords,
+                     ad_group_id=ad_group_id)
+
+        :param name: Name of the endpoint method, e.g. 'update_keywords'.
+        :type name: string
+        :param items: Entities to send.
+        :type items: iterable
+        :param max_workers: Calls in flight at once.
+        :type max_workers: integer
+        :param kwargs: Other arguments of the endpoint method.
+        :returns: success is True only when every chunk succeeded; response
+            is the decoded list of per-entity results.
+        """
+        return bulk_call(self, name, items, max_workers=max_workers, **kwargs)
+
+    def for_profile(self, profile_id):
+        """
+        A client for another profile that shares this one's transport,
+        access token and rate limiter.
+
+        :param profile_id: The profile sent as the API scope.
+        :type profile_id: string
+        """
+        clone = copy.copy(self)
+        clone._profile_id = str(profile_id)
+        return clone
+
+    def submit(self, operation, *args, **kwargs):
+        """
+        Schedules a call on the client's executor::
 
+            future = api.submit('get_campaign', campaign_id)
+            campaign = future.result()
 
-    """ *********************************************************************
-    INTERNAL METHODS
-    ********************************************************************* """
+        :param operation: A method name, or a callable taking this client
+            and the other arguments.
+        :returns: concurrent.futures.Future of the call's result.
+        :raises KeyError: The client has no such method.
+        """
+        executor = self.executor or get_default_executor()
+        return executor.submit(bound(self, operation), *args, **kwargs)
+
+    def map(self, operation, *iterables, timeout=None):
+        """
+        Like the builtin map, with the calls made concurrently on the
+        client's executor; results are yielded in input order::
+
+            for res in api.map('get_campaign', campaign_ids):
+                ...
+
+        :param operation: A method name, or a callable taking this client
+            and one item of each iterable.
+        :param timeout: Seconds to wait for the results, None for no limit.
+        :type timeout: float
+        :raises KeyError: The client has no such method.
+        """
+        executor = self.executor or get_default_executor()
+        return executor.map(bound(self, operation), *iterables,
+                            timeout=timeout)
+
+    def fan_out(self, profiles, operations,
+                max_workers=DEFAULT_FANOUT_WORKERS,
+                per_profile=DEFAULT_PROFILE_CONCURRENCY, **kwargs):
+        """
+        Runs the same operations for many profiles, yielding each result as
+        it completes::
+
+            for item in api.fan_out(api.list_profiles(), 'list_campaigns'):
+                if item.success:
+                    campaigns[item.profile_id] = item.result['response']
+
+        :param profiles: Profile ids, profile dictionaries, or the result of
+            list_profiles.
+        :param operations: A method name, a callable taking the profile's
+            client, or a list of these.
+        :param max_workers: Operations in flight at once.
+        :type max_workers: integer
+        :param per_profile: Operations in flight at once for one profile.
+        :type per_profile: integer
+        :param kwargs: Arguments passed to every operation.
+        :returns: Generator of **ProfileResult**. See fanout.py.
+        """
+        return fan_out(self, profiles, operations, max_workers=max_workers,
+                       per_profile=per_profile, **kwargs)
+
+    def _call(self, endpoint, interface, data):
+        """Dispatches a call from a generated endpoint method."""
+        raise NotImplementedError
+
+    def _paginate(self, endpoint, interface, data, page_size, prefetch):
+        """Walks the pages of a paginated endpoint for a generated iter_*."""
+        def call(params):
+            return self._call(endpoint, interface, params)
+        return paginate(call, data, page_size, prefetch)
+
+    def _send(self, method, url, headers=None, body=None):
+        return self.transport.request(method, url, headers, body)
+
+    def _sent(self, interface, send, request, attempt=0):
+        """
+        ``send(*request)``, reported to the hooks. Returns ``(event,
+        response)``; the event is None when the client has no hooks.
+        """
+        hooks = self.hooks
+        if hooks is None:
+            return None, send(*request)
+        event = RequestEvent(hooks, interface, request[0], request[1],
+                             request_scope(request), attempt, request[3])
+        return event, observed(hooks, event, send, request)
+
+    def _execute(self, interface, request):
+        """
+        Answers an API call, sharing the response of an identical call in
+        flight when the client has a coalescer.
+        """
+        coalescer = self.coalescer
+        if coalescer is not None:
+            key = coalescer.key(self._cache_scope(request), request)
+            if key is not None:
+                return coalescer.do(key, self._read_through, interface,
+                                    request)
+        return self._read_through(interface, request)
+
+    def _read_through(self, interface, request):
+        """
+        Answers an API call from the cache when possible, otherwise sends it
+        through the rate limiter.
+        """
+        if self.cache is None:
+            return self._dispatch(interface, request)
+        scope = self._cache_scope(request)
+        key, entry, request = self.cache.lookup(scope, interface, request)
+        if entry is not None and entry.fresh:
+            return entry.response()
+        response = self._dispatch(interface, request)
+        return self.cache.update(scope, interface, request, key, entry,
+                                 response)
+
+    def _cache_scope(self, request):
+        profile_id = request_scope(request)
+        if profile_id:
+            return str(profile_id)
+        # Calls made without a profile (e.g. get_profiles) are per account.
+        account = self.refresh_token or _bearer(request)
+        return 'account:{}'.format(
+            hashlib.sha256(account.encode('utf-8')).hexdigest()[:16])
+
+    def _dispatch(self, interface, request):
+        """
+        Sends an API call through the rate limiter, retrying it while it is
+        throttled.
+        """
+        limiter = self.rate_limiter
+        bucket = limiter.bucket(request_scope(request), interface)
+        attempt = 0
+        replayed = False
+        while True:
+            wait = limiter.acquire(bucket)
+            if wait:
+                time.sleep(wait)
+            event, response = self._sent(interface, self._send, request,
+                                         attempt + replayed)
+            if response.code == 401 and not replayed and \
+                    self.token_manager is not None:
+                # The token expired early or was revoked: refresh it (once,
+                # whoever got the 401 first) and replay with the new one.
+                replayed = True
+                res = self.token_manager.refresh(stale=_bearer(request))
+                if res['success']:
+                    request = _with_token(request, res['response'])
+                    if event is not None:
+                        self.hooks.on_retry(event, 0.0)
+                    continue
+            delay = limiter.retry_delay(bucket, response, attempt)
+            if delay is None:
+                return response
+            if event is not None:
+                self.hooks.on_retry(event, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_stream(self, method, url, headers=None, body=None):
+        return self.transport.stream(method, url, headers, body)
 
     def _download(self, location):
-        headers = {'Authorization': 'Bearer {}'.format(self._access_token),
+        response = self._open_download(location)
+        if isinstance(response, dict):
+            return response
+        with response:
+            rows = load_rows(response.iter_content(),
+                             getattr(response, 'event', None))
+        return {'success': True,
+                'code': response.code,
+                'response': rows}
+
+    def _stream(self, location):
+        response = self._open_download(location)
+        if isinstance(response, dict):
+            raise ApiError(response)
+        with response:
+            for row in iter_rows(response.iter_content(),
+                                 getattr(response, 'event', None)):
+                yield row
+
+    def _process(self, location, processor, metrics):
+        response = self._open_download(location)
+        if isinstance(response, dict):
+            return response
+        with response:
+            payload = response.read()
+        return {'success': True,
+                'code': response.code,
+                'response': processor.process(payload, metrics)}
+
+    def _download_to_file(self, location, path, decompress, resume,
+                          chunk_size, retries):
+        part = PartialFile(path, resume)
+        while True:
+            try:
+                response = self._open_download(location,
+                                               part.request_headers())
+                if isinstance(response, dict):
+                    if response['code'] == 416 and part.offset:
+                        # The partial file does not match the payload any
+                        # more.
+                        part.restart()
+                        continue
+                    return response
+                with response, part.open(response) as fp:
+                    for chunk in response.iter_content(chunk_size):
+                        part.write(fp, chunk)
+            except INTERRUPTED_ERRORS:
+                if part.attempts > retries:
+                    raise
+                continue
+            return part.result(response.code, decompress, chunk_size)
+
+    def _open_download(self, location, headers=None):
+        """
+        The streamed report/snapshot file behind ``location``, or the failure
+        dictionary.
+
+        :param headers: Extra headers for the redirected request, e.g. Range.
+        """
+        _, response = self._sent(
+            'download/location', self._send,
+            ('GET', location, self._download_headers(), None))
+        redirect = _redirect_location(response)
+        if isinstance(redirect, dict):
+            return redirect
+        _, res = self._sent('download/file', self._send_stream,
+                            ('GET', redirect, headers, None))
+        if not res.ok:
+            with res:
+                return _error_response(res, res.read())
+        return res
+
+    def _download_headers(self):
+        context = self.context()
+        headers = {'Authorization': 'Bearer {}'.format(context.access_token),
                    'Content-Type': 'application/json',
                    'User-Agent': self.user_agent}
 
-        if self.profile_id is not None:
-            headers['Amazon-Advertising-API-Scope'] = self.profile_id
+        if context.profile_id is not None:
+            headers['Amazon-Advertising-API-Scope'] = context.profile_id
         else:
             raise ValueError('Invalid profile Id.')
+        return headers
 
-        opener = urllib.request.build_opener(NoRedirectHandler())
-        urllib.request.install_opener(opener)
-        req = urllib.request.Request(url=location, headers=headers, data=None)
-        try:
-            response = urllib.request.urlopen(req)
-            if 'location' in response:
-                if response['location'] is not None:
-                    req = urllib.request.Request(url=response['location'])
-                    res = urllib.request.urlopen(req)
-                    res_data = res.read()
-                    buf = BytesIO(res_data)
-                    f = gzip.GzipFile(fileobj=buf)
-                    data = f.read()
-                    return {'success': True,
-                            'code': res.code,
-                            'response': json.loads(data.decode('utf-8'))}
-                else:
-                    return {'success': False,
-                            'code': response.code,
-                            'response': 'Location is empty.'}
-            else:
-                return {'success': False,
-                        'code': response.code,
-                        'response': 'Location not found.'}
-        except urllib.error.HTTPError as e:
-            return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
+    def _fresh_token(self):
+        """Refreshes the access token first if it is about to expire."""
+        if self.token_manager is not None:
+            self.token_manager.token()
 
-    def _operation(self, interface, params=None, method='GET', version='v2'):
+    def _prepare(self, interface, params, method, version):
+        """
+        Builds the ``(method, url, headers, body)`` for an API call, or the
+        failure dictionary when the call cannot be made.
+        """
         if version is None:
             use_version = ''
         else:
             use_version = '/{}'.format(version)
-        """
-        Makes that actual API call.
 
-        :param interface: Interface used for this call.
-        :type interface: string
-        :param params: Parameters associated with this call.
-        :type params: GET: string POST: dictionary
-        :param method: Call method. Should be either 'GET', 'PUT', or 'POST'
-        :type method: string
-        """
-        if self._access_token is None:
+        # Read once: the call must not see a concurrent change half-way.
+        context = self.context()
+        if context.access_token is None:
             return {'success': False,
                     'code': 0,
                     'response': 'access_token is empty.'}
 
-        headers = {'Authorization': 'Bearer {}'.format(self._access_token),
+        headers = {'Authorization': 'Bearer {}'.format(context.access_token),
                    'Amazon-Advertising-API-ClientId': self.client_id,
                    'Content-Type': 'application/json',
                    'User-Agent': self.user_agent}
@@ -1975,8 +696,8 @@ class AdvertisingApiV3(object):
         if self.sandbox:
             headers['BIDDING_CONTROLS_ON'] = 'true'
 
-        if self.profile_id is not None and self.profile_id != '':
-            headers['Amazon-Advertising-API-Scope'] = self.profile_id
+        if context.profile_id is not None and context.profile_id != '':
+            headers['Amazon-Advertising-API-Scope'] = context.profile_id
         elif 'profiles' not in interface:
             # Profile ID is required for all calls beyond authentication and getting profile info
             return {'success': False,
@@ -1998,61 +719,156 @@ class AdvertisingApiV3(object):
                 params=p)
         else:
             if params is not None:
-                data = json.dumps(params).encode('utf-8')
+                data = get_codec().dumps(params)
 
             url = 'https://{host}{api_version}/{interface}'.format(
                 host=self.endpoint,
                 api_version=use_version,
                 interface=interface)
 
-        if PYTHON == 3:
-            req = urllib.request.Request(url=url, headers=headers, data=data)
+        return method, url, headers, data
+
+
+@bind(ADVERTISING_API_ENDPOINTS, ADVERTISING_API_DOCS)
+class AdvertisingApi(_AdvertisingApiBase):
+
+    """Lightweight client library for Amazon Sponsored Products API."""
+
+    def archive_product_ads(self):
+        pass
+
+    def request_report(self, record_type=None, report_id=None, data=None, campaign_type='sp'):
+        """
+        :POST: /{campaignType}/reports
+
+        :param campaign_type: The campaignType to request the report for ('sp' or 'hsa')
+          Defaults to 'sp'
+        :type data: string
+        """
+        if record_type is not None:
+            interface = '{}/{}/report'.format(campaign_type, record_type)
+            return self._operation(interface, data, method='POST')
+        elif report_id is not None:
+            interface = 'reports/{}'.format(report_id)
+            return self._operation(interface)
         else:
-            req = MethodRequest(url=url, headers=headers, data=data, method=method)
-        req.method = method
-
-        try:
-            f = urllib.request.urlopen(req)
-            return {'success': True,
-                    'code': f.code,
-                    'response': f.read().decode('utf-8')}
-        except urllib.error.HTTPError as e:
             return {'success': False,
-                    'code': e.code,
-                    'response': '{msg}: {details}'.format(msg=e.msg, details=e.read())}
+                    'code': 0,
+                    'response': 'record_type and report_id are both empty.'}
 
+    def _call(self, endpoint, interface, data):
+        return self._operation(interface, data, endpoint.method,
+                               endpoint.version is None)
 
-class NoRedirectHandler(urllib.request.HTTPErrorProcessor):
-    """Handles report and snapshot redirects."""
+    def _operation(self, interface, params=None, method='GET', ignore_version=False):
+        """
+        Makes that actual API call.
+
+        :param interface: Interface used for this call.
+        :type interface: string
+        :param params: Parameters associated with this call.
+        :type params: GET: string POST: dictionary
+        :param method: Call method. Should be either 'GET', 'PUT', or 'POST'
+        :type method: string
+        """
+        version = None if ignore_version else self.api_version
+        self._fresh_token()
+        request = self._prepare(interface, params, method, version)
+        if isinstance(request, dict):
+            return request
+        return _operation_result(self._execute(interface, request),
+                                 interface)
+
+
+@bind(ADVERTISING_API_V3_ENDPOINTS, ADVERTISING_API_V3_DOCS)
+class AdvertisingApiV3(_AdvertisingApiBase):
+    """Lightweight client library for Amazon Sponsored Products API."""
+
+    def request_report(self, record_type, data={}):
+        """
+        :POST: /{campaignType}/reports
+        """
+        interface = 'sp/{}/report'.format(record_type)
+        return self._operation(interface, data, method='POST')
+
+    def _call(self, endpoint, interface, data):
+        return self._operation(interface, data, endpoint.method,
+                               endpoint.version)
+
+    def _operation(self, interface, params=None, method='GET', version='v2'):
+        """
+        Makes that actual API call.
+
+        :param interface: Interface used for this call.
+        :type interface: string
+        :param params: Parameters associated with this call.
+        :type params: GET: string POST: dictionary
+        :param method: Call method. Should be either 'GET', 'PUT', or 'POST'
+        :type method: string
+        """
+        self._fresh_token()
+        request = self._prepare(interface, params, method, version)
+        if isinstance(request, dict):
+            return request
+        return _operation_result(self._execute(interface, request),
+                                 interface)
+
+
+def _bearer(request):
+    """The access token a prepared request was sent with."""
+    return request[2]['Authorization'][len('Bearer '):]
 
-    def http_response(self, request, response):
-        if response.code == 307:
-            if 'Location' in response.headers:
-                return {'code': 307,
-                        'location': response.headers['Location']}
-            else:
-                return {'code': response.code, 'location': None}
-        else:
-            return urllib.request.HTTPErrorProcessor.http_response(
-                self, request, response)
 
-    https_response = http_response
+def _with_token(request, access_token):
+    """A copy of a prepared request carrying another access token."""
+    method, url, headers, data = request
+    headers = dict(headers, Authorization='Bearer {}'.format(access_token))
+    return method, url, headers, data
 
 
-class MethodRequest(urllib.request.Request):
+def _error_response(res, body=None):
+    """Result dictionary for a non-2xx transport response."""
+    if body is None:
+        body = res.body
+    return {'success': False,
+            'code': res.code,
+            'response': '{msg}: {details}'.format(msg=res.reason, details=body)}
+
+
+def _operation_result(f, interface=None):
+    """Result dictionary, an ApiResponse, for an API call response."""
+    if not f.ok:
+        return ApiResponse(False, f.code, '{msg}: {details}'.format(
+            msg=f.reason, details=f.body), interface)
+    # response is decoded to a string only if a caller reads it.
+    return ApiResponse(True, f.code, None, interface, f.body)
+
+
+def _completed_location(res):
+    """Download location of a finished report or snapshot, else None."""
+    if res['code'] != 200:
+        return None
+    status = decoded(res)
+    if status['status'] == 'SUCCESS':
+        return status['location']
+    return None
+
+
+def _redirect_location(response):
     """
-    When not using Python 3 and the requests library.
-    Source: Ed Marshall, https://gist.github.com/logic/2715756
+    The redirect target of a report/snapshot location response, or the
+    failure dictionary when there is none.
     """
-    def __init__(self, *args, **kwargs):
-        if 'method' in kwargs:
-            self._method = kwargs['method']
-            del kwargs['method']
-        else:
-            self._method = None
-        return urllib.request.Request.__init__(self, *args, **kwargs)
-
-    def get_method(self, *args, **kwargs):
-        if self._method is not None:
-            return self._method
-        return urllib.request.Request.get_method(self, *args, **kwargs)
+    if response.code == 307:
+        redirect = response.header('Location')
+        if redirect is not None:
+            return redirect
+        return {'success': False,
+                'code': response.code,
+                'response': 'Location is empty.'}
+    elif not response.ok:
+        return _error_response(response)
+    else:
+        return {'success': False,
+                'code': response.code,
+                'response': 'Location not found.'}
@@ -0,0 +1,413 @@
+"""
+asyncio client for the Amazon Advertising API.
+
+:class:`AsyncAdvertisingApiV3` exposes the same methods as
+:class:`~amazon_advertising_api.advertising_api.AdvertisingApiV3`, as
+coroutines. Endpoint methods are generated from the same endpoint table as the
+synchronous client and the remaining public methods are mirrored from it when
+the class is created, so the two cannot drift apart.
+"""
+import asyncio
+import functools
+import inspect
+
+from amazon_advertising_api.advertising_api import (AdvertisingApiV3,
+                                                    _bearer,
+                                                    _completed_location,
+                                                    _error_response,
+                                                    _operation_result,
+                                                    _redirect_location,
+                                                    _with_token)
+from amazon_advertising_api.async_transport import AsyncPooledTransport
+from amazon_advertising_api.auth import AsyncTokenManager
+from amazon_advertising_api.transport import DEFAULT_CHUNK_SIZE
+from amazon_advertising_api.bulk import DEFAULT_BULK_WORKERS, async_bulk_call
+from amazon_advertising_api.columnar import (DEFAULT_BATCH_SIZE,
+                                             async_iter_batches)
+from amazon_advertising_api.concurrency import bound, request_scope
+from amazon_advertising_api.endpoints import (ADVERTISING_API_V3_DOCS,
+                                              ADVERTISING_API_V3_ENDPOINTS,
+                                              bind)
+from amazon_advertising_api.download import (DEFAULT_DOWNLOAD_RETRIES,
+                                             INTERRUPTED_ERRORS, PartialFile)
+from amazon_advertising_api.errors import ApiError
+from amazon_advertising_api.fanout import (DEFAULT_FANOUT_WORKERS,
+                                           DEFAULT_PROFILE_CONCURRENCY,
+                                           async_fan_out)
+from amazon_advertising_api.instrumentation import (RequestEvent,
+                                                    async_observed)
+from amazon_advertising_api.pagination import async_paginate
+from amazon_advertising_api.streaming import (async_iter_rows,
+                                              async_load_rows)
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def _coroutine(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    return wrapper
+
+
+def _mirror(base):
+    """
+    Class decorator adding a coroutine twin of every public method of
+    ``base`` (and its bases) the decorated class does not define itself.
+    """
+    def decorate(cls):
+        own = set(vars(cls))
+        for klass in base.__mro__:
+            for name, member in vars(klass).items():
+                if name.startswith('_') or name in own:
+                    continue
+                own.add(name)
+                if inspect.isfunction(member):
+                    setattr(cls, name, _coroutine(member))
+        return cls
+    return decorate
+
+
+@_mirror(AdvertisingApiV3)
+@bind(ADVERTISING_API_V3_ENDPOINTS, ADVERTISING_API_V3_DOCS, asynchronous=True)
+class AsyncAdvertisingApiV3(AdvertisingApiV3):
+    """asyncio client library for Amazon Sponsored Products API."""
+
+    def __init__(self,
+                 client_id,
+                 client_secret,
+                 region,
+                 profile_id=None,
+                 access_token=None,
+                 refresh_token=None,
+                 sandbox=False,
+                 transport=None,
+                 rate_limiter=None,
+                 token_cache=None,
+                 token_manager=None,
+                 cache=None,
+                 coalescer=None,
+                 hooks=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 thread_safe=False):
+        """
+        Client initialization.
+
+        Takes the same arguments as AdvertisingApiV3, plus:
+
+        :param transport: asyncio HTTP transport. Clients that should share
+            one connection pool can be given the same transport. Defaults to
+            a new AsyncPooledTransport.
+        :type transport: AsyncPooledTransport
+        :param token_manager: Defaults to an AsyncTokenManager.
+        :type token_manager: AsyncTokenManager
+        :param max_concurrency: Maximum requests in flight through this
+            client at once.
+        :type max_concurrency: integer
+        """
+        super(AsyncAdvertisingApiV3, self).__init__(
+            client_id, client_secret, region,
+            profile_id=profile_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            sandbox=sandbox,
+            transport=transport or AsyncPooledTransport(),
+            rate_limiter=rate_limiter,
+            token_cache=token_cache,
+            token_manager=token_manager,
+            cache=cache,
+            coalescer=coalescer,
+            hooks=hooks,
+            thread_safe=thread_safe)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    _token_manager_class = AsyncTokenManager
+
+    async def close(self):
+        """Closes the pooled connections of this client's transport."""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def do_refresh_token(self):
+        if self.token_manager is None:
+            return {'success': False,
+                    'code': 0,
+                    'response': 'refresh_token is empty.'}
+        return await self.token_manager.refresh()
+
+    async def get_report(self, report_id):
+        res = await self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._download(location=location)
+        return res
+
+    async def get_snapshot(self, snapshot_id):
+        res = await self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._download(location=location)
+        return res
+
+    async def stream_report(self, report_id):
+        res = await self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is None:
+            raise ApiError(res)
+        async for row in self._stream(location):
+            yield row
+
+    async def stream_snapshot(self, snapshot_id):
+        res = await self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is None:
+            raise ApiError(res)
+        async for row in self._stream(location):
+            yield row
+
+    def report_batches(self, report_id, metrics=None, schema=None,
+                       batch_size=DEFAULT_BATCH_SIZE):
+        return async_iter_batches(self.stream_report(report_id), metrics,
+                                  schema, batch_size)
+
+    def snapshot_batches(self, snapshot_id, schema=None,
+                         batch_size=DEFAULT_BATCH_SIZE):
+        return async_iter_batches(self.stream_snapshot(snapshot_id), None,
+                                  schema, batch_size)
+
+    async def download_report(self, report_id, path, decompress=False,
+                              resume=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                              retries=DEFAULT_DOWNLOAD_RETRIES):
+        res = await self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._download_to_file(location, path, decompress,
+                                                resume, chunk_size, retries)
+        return res
+
+    async def download_snapshot(self, snapshot_id, path, decompress=False,
+                                resume=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                                retries=DEFAULT_DOWNLOAD_RETRIES):
+        res = await self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._download_to_file(location, path, decompress,
+                                                resume, chunk_size, retries)
+        return res
+
+    async def process_report(self, report_id, processor, metrics=None):
+        res = await self._operation('reports/{}'.format(report_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._process(location, processor, metrics)
+        return res
+
+    async def process_snapshot(self, snapshot_id, processor):
+        res = await self._operation('snapshots/{}'.format(snapshot_id))
+        location = _completed_location(res)
+        if location is not None:
+            return await self._process(location, processor, None)
+        return res
+
+    async def bulk(self, name, items, max_workers=DEFAULT_BULK_WORKERS,
+                   **kwargs):
+        return await async_bulk_call(self, name, items,
+                                     max_workers=max_workers, **kwargs)
+
+    def for_profile(self, profile_id):
+        return super(AsyncAdvertisingApiV3, self).for_profile(profile_id)
+
+    def context(self):
+        return super(AsyncAdvertisingApiV3, self).context()
+
+    def submit(self, operation, *args, **kwargs):
+        """
+        Schedules a call as an asyncio task on the running loop; see
+        AdvertisingApiV3.submit.
+        """
+        return asyncio.ensure_future(
+            bound(self, operation)(*args, **kwargs))
+
+    async def map(self, operation, *iterables):
+        """
+        The results of calling ``operation`` with one item of each iterable,
+        concurrently and in input order; see AdvertisingApiV3.map.
+        """
+        call = bound(self, operation)
+        return await asyncio.gather(*[call(*args)
+                                      for args in zip(*iterables)])
+
+    def fan_out(self, profiles, operations,
+                max_workers=DEFAULT_FANOUT_WORKERS,
+                per_profile=DEFAULT_PROFILE_CONCURRENCY, **kwargs):
+        """
+        Async generator of **ProfileResult**; see
+        AdvertisingApiV3.fan_out. Clones share this client's concurrency
+        limit as well.
+        """
+        return async_fan_out(self, profiles, operations,
+                             max_workers=max_workers,
+                             per_profile=per_profile, **kwargs)
+
+    async def _call(self, endpoint, interface, data):
+        return await self._operation(interface, data, endpoint.method,
+                                     endpoint.version)
+
+    def _paginate(self, endpoint, interface, data, page_size, prefetch):
+        def call(params):
+            return self._call(endpoint, interface, params)
+        return async_paginate(call, data, page_size, prefetch)
+
+    async def _send(self, method, url, headers=None, body=None):
+        async with self._semaphore:
+            return await self.transport.request(method, url, headers, body)
+
+    async def _sent(self, interface, send, request, attempt=0):
+        hooks = self.hooks
+        if hooks is None:
+            return None, await send(*request)
+        event = RequestEvent(hooks, interface, request[0], request[1],
+                             request_scope(request), attempt, request[3])
+        return event, await async_observed(hooks, event, send, request)
+
+    async def _execute(self, interface, request):
+        coalescer = self.coalescer
+        if coalescer is not None:
+            key = coalescer.key(self._cache_scope(request), request)
+            if key is not None:
+                return await coalescer.do_async(key, self._read_through,
+                                                interface, request)
+        return await self._read_through(interface, request)
+
+    async def _read_through(self, interface, request):
+        if self.cache is None:
+            return await self._dispatch(interface, request)
+        scope = self._cache_scope(request)
+        key, entry, request = self.cache.lookup(scope, interface, request)
+        if entry is not None and entry.fresh:
+            return entry.response()
+        response = await self._dispatch(interface, request)
+        return self.cache.update(scope, interface, request, key, entry,
+                                 response)
+
+    async def _dispatch(self, interface, request):
+        limiter = self.rate_limiter
+        bucket = limiter.bucket(request_scope(request), interface)
+        attempt = 0
+        replayed = False
+        while True:
+            wait = limiter.acquire(bucket)
+            if wait:
+                await asyncio.sleep(wait)
+            event, response = await self._sent(interface, self._send,
+                                               request, attempt + replayed)
+            if response.code == 401 and not replayed and \
+                    self.token_manager is not None:
+                replayed = True
+                res = await self.token_manager.refresh(stale=_bearer(request))
+                if res['success']:
+                    request = _with_token(request, res['response'])
+                    if event is not None:
+                        self.hooks.on_retry(event, 0.0)
+                    continue
+            delay = limiter.retry_delay(bucket, response, attempt)
+            if delay is None:
+                return response
+            if event is not None:
+                self.hooks.on_retry(event, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_stream(self, method, url, headers=None, body=None):
+        async with self._semaphore:
+            return await self.transport.stream(method, url, headers, body)
+
+    async def _download(self, location):
+        response = await self._open_download(location)
+        if isinstance(response, dict):
+            return response
+        async with response:
+            rows = await async_load_rows(response.iter_content(),
+                                         getattr(response, 'event', None))
+        return {'success': True,
+                'code': response.code,
+                'response': rows}
+
+    async def _stream(self, location):
+        response = await self._open_download(location)
+        if isinstance(response, dict):
+            raise ApiError(response)
+        async with response:
+            async for row in async_iter_rows(
+                    response.iter_content(),
+                    getattr(response, 'event', None)):
+                yield row
+
+    async def _process(self, location, processor, metrics):
+        response = await self._open_download(location)
+        if isinstance(response, dict):
+            return response
+        async with response:
+            payload = await response.read()
+        batches = await asyncio.wrap_future(
+            processor.submit(payload, metrics))
+        return {'success': True,
+                'code': response.code,
+                'response': batches}
+
+    async def _download_to_file(self, location, path, decompress, resume,
+                                chunk_size, retries):
+        part = PartialFile(path, resume)
+        while True:
+            try:
+                response = await self._open_download(location,
+                                                     part.request_headers())
+                if isinstance(response, dict):
+                    if response['code'] == 416 and part.offset:
+                        part.restart()
+                        continue
+                    return response
+                async with response:
+                    with part.open(response) as fp:
+                        async for chunk in response.iter_content(chunk_size):
+                            part.write(fp, chunk)
+            except INTERRUPTED_ERRORS:
+                if part.attempts > retries:
+                    raise
+                continue
+            return part.result(response.code, decompress, chunk_size)
+
+    async def _open_download(self, location, headers=None):
+        _, response = await self._sent(
+            'download/location', self._send,
+            ('GET', location, self._download_headers(), None))
+        redirect = _redirect_location(response)
+        if isinstance(redirect, dict):
+            return redirect
+        _, res = await self._sent('download/file', self._send_stream,
+                                  ('GET', redirect, headers, None))
+        if not res.ok:
+            async with res:
+                return _error_response(res, await res.read())
+        return res
+
+    async def _fresh_token(self):
+        if self.token_manager is not None:
+            await self.token_manager.token()
+
+    async def _operation(self, interface, params=None, method='GET', version='v2'):
+        await self._fresh_token()
+        request = self._prepare(interface, params, method, version)
+        if isinstance(request, dict):
+            return request
+        return _operation_result(await self._execute(interface, request),
+                                 interface)
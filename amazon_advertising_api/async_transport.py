@@ -0,0 +1,391 @@
+"""
+asyncio HTTP/1.1 transport with per-host keep-alive connection pools.
+
+The async counterpart of :class:`~amazon_advertising_api.transport.PooledTransport`.
+It speaks just enough HTTP/1.1 for the Advertising API: fixed-length and
+chunked bodies, keep-alive, streamed downloads, no redirects.
+"""
+import asyncio
+from collections import deque
+import socket
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from amazon_advertising_api.instrumentation import current_event
+from amazon_advertising_api.transport import (DEFAULT_CHUNK_SIZE,
+                                              DEFAULT_IDLE_TIMEOUT,
+                                              DEFAULT_POOL_SIZE,
+                                              DEFAULT_TIMEOUT,
+                                              Response, replayable)
+
+
+class _Connection(object):
+
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool(object):
+    """Idle keep-alive connections to a single scheme/host/port."""
+
+    def __init__(self, scheme, host, port,
+                 maxsize=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context
+        self._idle = deque()
+
+    async def _new_conn(self, event=None):
+        context = None
+        if self.scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+        if event is None:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=context)
+            return _Connection(reader, writer)
+        # Resolved separately so name resolution is timed on its own; the
+        # TLS handshake is part of 'connect'.
+        started = time.perf_counter()
+        family, _, _, _, address = (await asyncio.get_running_loop()
+                                    .getaddrinfo(self.host, self.port,
+                                                 type=socket.SOCK_STREAM))[0]
+        resolved = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            address[0], address[1], ssl=context, family=family,
+            server_hostname=self.host if context else None)
+        event.add('dns', resolved - started)
+        event.add('connect', time.perf_counter() - resolved)
+        return _Connection(reader, writer)
+
+    async def get(self, event=None):
+        now = time.time()
+        while self._idle:
+            conn, released = self._idle.pop()
+            if now - released <= self.idle_timeout and \
+                    not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+        return await self._new_conn(event), False
+
+    def put(self, conn):
+        if len(self._idle) < self.maxsize:
+            self._idle.append((conn, time.time()))
+        else:
+            conn.close()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop()[0].close()
+
+
+class AsyncPooledTransport(object):
+    """
+    asyncio transport that keeps persistent connections per host.
+
+    :param maxsize: Idle connections kept per host.
+    :type maxsize: integer
+    :param idle_timeout: Seconds an idle connection may be reused after.
+    :type idle_timeout: float
+    :param timeout: Seconds allowed for connecting, for sending a request
+        and reading the response headers, and again for reading the body
+        (each chunk when streaming).
+    :type timeout: float
+    :param ssl_context: Optional ``ssl.SSLContext`` for https hosts.
+    """
+
+    def __init__(self,
+                 maxsize=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 timeout=DEFAULT_TIMEOUT,
+                 ssl_context=None):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._pools = {}
+
+    def pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = AsyncConnectionPool(scheme, host, port,
+                                       maxsize=self.maxsize,
+                                       idle_timeout=self.idle_timeout,
+                                       ssl_context=self.ssl_context)
+            self._pools[key] = pool
+        return pool
+
+    async def request(self, method, url, headers=None, body=None):
+        """Sends a single request and returns a :class:`Response`."""
+        pool, conn, head = await self._open(method, url, headers, body)
+        event = current_event()
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(
+                _read_body(conn.reader, head), self.timeout)
+            if event is not None:
+                event.add('read', time.perf_counter() - started)
+        except BaseException:
+            conn.close()
+            raise
+        if head.keep_alive:
+            pool.put(conn)
+        else:
+            conn.close()
+        return Response(head.code, head.reason, head.headers, data)
+
+    async def stream(self, method, url, headers=None, body=None):
+        """
+        Sends a single request and returns an
+        :class:`AsyncStreamingResponse` with the body unread.
+        """
+        pool, conn, head = await self._open(method, url, headers, body)
+
+        def release(complete):
+            if complete and head.keep_alive:
+                pool.put(conn)
+            else:
+                conn.close()
+
+        return AsyncStreamingResponse(head, conn.reader, release,
+                                      self.timeout)
+
+    async def _open(self, method, url, headers, body):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        host = parts.hostname
+        if parts.port:
+            host = '{}:{}'.format(host, parts.port)
+        request_head = _encode_head(method, path, host, headers, body)
+        pool = self.pool(scheme, parts.hostname, port)
+        event = current_event()
+
+        conn, reused = await asyncio.wait_for(pool.get(event), self.timeout)
+        started = time.perf_counter()
+        written = False
+        try:
+            deadline = time.monotonic() + self.timeout
+            await asyncio.wait_for(_write(conn, request_head, body),
+                                   self.timeout)
+            written = True
+            head = await asyncio.wait_for(
+                _read_head(conn.reader, method),
+                max(0.0, deadline - time.monotonic()))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            conn.close()
+            if not replayable(method, reused, written):
+                raise
+            conn = await asyncio.wait_for(pool._new_conn(), self.timeout)
+            try:
+                head = await asyncio.wait_for(
+                    _exchange(conn, method, request_head, body), self.timeout)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        if event is not None:
+            # Sending and waiting for the headers.
+            event.add('server', time.perf_counter() - started)
+        return pool, conn, head
+
+    async def close(self):
+        pools = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+class _ResponseHead(object):
+
+    __slots__ = ('code', 'reason', 'headers', 'length', 'chunked',
+                 'keep_alive', 'bodyless')
+
+    def __init__(self, code, reason, headers, length, chunked, keep_alive,
+                 bodyless):
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+        self.length = length
+        self.chunked = chunked
+        self.keep_alive = keep_alive
+        self.bodyless = bodyless
+
+
+class AsyncStreamingResponse(object):
+    """
+    An HTTP response whose body is read incrementally, the async counterpart
+    of :class:`~amazon_advertising_api.transport.StreamingResponse`.
+    """
+
+    def __init__(self, head, reader, release, timeout=DEFAULT_TIMEOUT):
+        self.code = head.code
+        self.reason = head.reason
+        self.headers = head.headers
+        self.timeout = timeout
+        self.event = None
+        self._head = head
+        self._reader = reader
+        self._release = release
+
+    ok = Response.ok
+    header = Response.header
+
+    async def iter_content(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields the body in chunks of at most ``chunk_size`` bytes."""
+        chunks = _iter_body(self._reader, self._head, chunk_size)
+        event = self.event
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(),
+                                                   self.timeout)
+                except StopAsyncIteration:
+                    break
+                if event is not None:
+                    event.add('read', time.perf_counter() - started)
+                    event.bytes_received += len(chunk)
+                yield chunk
+        except BaseException as e:
+            if event is not None and isinstance(e, Exception):
+                event.finish(e)
+            self.close()
+            raise
+        self._finish(True)
+
+    async def read(self):
+        """Reads the rest of the body."""
+        return b''.join([chunk async for chunk in self.iter_content()])
+
+    def close(self):
+        self._finish(False)
+
+    def _finish(self, complete):
+        release, self._release = self._release, None
+        if release is not None:
+            release(complete)
+        if self.event is not None:
+            self.event.finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+def _encode_head(method, path, host, headers, body):
+    lines = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}'.format(host)]
+    names = set()
+    for name, value in (headers or {}).items():
+        names.add(name.lower())
+        lines.append('{}: {}'.format(name, value))
+    if body is not None or method in ('POST', 'PUT'):
+        lines.append('Content-Length: {}'.format(len(body or b'')))
+    if 'accept-encoding' not in names:
+        lines.append('Accept-Encoding: identity')
+    lines.append('\r\n')
+    return '\r\n'.join(lines).encode('latin-1')
+
+
+async def _exchange(conn, method, head, body):
+    """Sends a request and reads the status line and headers."""
+    await _write(conn, head, body)
+    return await _read_head(conn.reader, method)
+
+
+async def _write(conn, head, body):
+    writer = conn.writer
+    writer.write(head + body if body else head)
+    await writer.drain()
+
+
+async def _read_head(reader, method):
+    """Reads the status line and headers of the response to ``method``."""
+    status_line = await reader.readuntil(b'\r\n')
+    version, code, reason = (status_line.decode('latin-1').rstrip('\r\n')
+                             .split(' ', 2) + [''])[:3]
+    code = int(code)
+
+    headers = []
+    length = None
+    chunked = False
+    close = version == 'HTTP/1.0'
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip(), value.strip()
+        headers.append((name, value))
+        lowered = name.lower()
+        if lowered == 'content-length':
+            length = int(value)
+        elif lowered == 'transfer-encoding':
+            chunked = 'chunked' in value.lower()
+        elif lowered == 'connection':
+            close = value.lower() == 'close'
+
+    bodyless = method == 'HEAD' or code in (204, 304) or 100 <= code < 200
+    if not bodyless and not chunked and length is None:
+        # Body delimited by the end of the connection.
+        close = True
+    return _ResponseHead(code, reason, headers, length, chunked, not close,
+                         bodyless)
+
+
+async def _iter_body(reader, head, chunk_size=DEFAULT_CHUNK_SIZE):
+    if head.bodyless:
+        return
+    if head.chunked:
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return
+            while size:
+                chunk = await reader.readexactly(min(size, chunk_size))
+                size -= len(chunk)
+                yield chunk
+            await reader.readexactly(2)
+    elif head.length is not None:
+        remaining = head.length
+        while remaining:
+            chunk = await reader.readexactly(min(remaining, chunk_size))
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _read_body(reader, head):
+    if head.bodyless:
+        return b''
+    if head.length is not None and not head.chunked:
+        return await reader.readexactly(head.length)
+    if not head.chunked:
+        return await reader.read()
+    return b''.join([chunk async for chunk in _iter_body(reader, head)])
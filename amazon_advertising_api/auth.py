@@ -0,0 +1,420 @@
+"""
+Access token management.
+
+:class:`TokenManager` keeps the access token of one refresh token together
+with its expiry. It refreshes the token shortly before it expires (inline, or
+from a background timer), lets concurrent callers share a single in-flight
+refresh, and can persist tokens to a local file so short-lived processes
+reuse a token another process obtained instead of requesting their own.
+:class:`AsyncTokenManager` is its asyncio counterpart.
+"""
+import asyncio
+from concurrent.futures import Future
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from amazon_advertising_api.codec import get_codec
+from amazon_advertising_api.files import write_json
+
+# Refresh this many seconds before the token expires.
+DEFAULT_REFRESH_MARGIN = 300.0
+# Lifetime assumed when the token response carries no expires_in.
+DEFAULT_EXPIRES_IN = 3600.0
+
+
+def token_request(client_id, client_secret, refresh_token, token_url):
+    """The ``(method, url, headers, body)`` of a refresh_token grant."""
+    params = {
+        'grant_type': 'refresh_token',
+        'refresh_token': refresh_token,
+        'client_id': client_id,
+        'client_secret': client_secret}
+
+    data = urllib.parse.urlencode(params)
+
+    return ('POST',
+            'https://{}'.format(token_url),
+            {'Content-Type': 'application/x-www-form-urlencoded'},
+            data.encode('utf-8'))
+
+
+def token_result(f):
+    """
+    Result dictionary of a token response. On success ``response`` is the
+    access token and ``expires_in`` its lifetime in seconds.
+    """
+    if not f.ok:
+        return {'success': False,
+                'code': f.code,
+                'response': '{msg}: {details}'.format(msg=f.reason,
+                                                      details=f.body)}
+    try:
+        json_data = get_codec().loads(f.body)
+    except ValueError:
+        json_data = None
+    if isinstance(json_data, dict) and 'access_token' in json_data:
+        return {'success': True,
+                'code': f.code,
+                'response': json_data['access_token'],
+                'expires_in': float(json_data.get('expires_in',
+                                                  DEFAULT_EXPIRES_IN))}
+    else:
+        return {'success': False,
+                'code': f.code,
+                'response': 'access_token not in response.'}
+
+
+class TokenCache(object):
+    """
+    Access tokens persisted to a JSON file, keyed by a hash of the client id
+    and refresh token (neither is written to the file).
+
+    Writes replace the file atomically. Where ``fcntl`` is available,
+    :meth:`locked` serialises refreshes across processes.
+
+    :param path: The cache file.
+    :type path: string
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    @staticmethod
+    def key(client_id, refresh_token):
+        digest = hashlib.sha256('{}\0{}'.format(client_id,
+                                                refresh_token).encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def _read_all(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """Returns ``(access_token, expires_at)`` or None."""
+        entry = self._read_all().get(key)
+        if not entry:
+            return None
+        return entry['access_token'], entry['expires_at']
+
+    def set(self, key, access_token, expires_at):
+        entries = self._read_all()
+        now = time.time()
+        entries = dict((k, v) for k, v in entries.items()
+                       if v.get('expires_at', 0) > now)
+        entries[key] = {'access_token': access_token,
+                        'expires_at': expires_at}
+        write_json(self.path, entries, mode=0o600)
+
+    def locked(self):
+        """Context manager holding an exclusive inter-process lock."""
+        return _FileLock(self.path + '.lock')
+
+
+class _FileLock(object):
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class _TokenState(object):
+    """Token, expiry and cache bookkeeping shared by both managers."""
+
+    def __init__(self, client_id, client_secret, refresh_token, token_url,
+                 transport, access_token=None, cache_path=None,
+                 margin=DEFAULT_REFRESH_MARGIN):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = urllib.parse.unquote(refresh_token)
+        self.token_url = token_url
+        self.transport = transport
+        self.margin = margin
+        self.cache = TokenCache(cache_path) if cache_path else None
+        self._key = TokenCache.key(client_id, self.refresh_token)
+        self.access_token = None
+        # Unknown expiry: trusted until the API answers 401.
+        self.expires_at = None
+        self.refreshes = 0
+        if access_token:
+            self.access_token = urllib.parse.unquote(access_token)
+        elif self.cache is not None:
+            self._load_cached(None)
+
+    def set_token(self, access_token, expires_at=None):
+        self.access_token = access_token
+        self.expires_at = expires_at
+
+    def set_refresh_token(self, refresh_token):
+        """Switches grants; the old access token is dropped."""
+        self.refresh_token = urllib.parse.unquote(refresh_token)
+        self._key = TokenCache.key(self.client_id, self.refresh_token)
+        self.set_token(None)
+        if self.cache is not None:
+            self._load_cached(None)
+
+    def expiring(self, now=None):
+        """The token is missing or within ``margin`` of its expiry."""
+        if self.access_token is None:
+            return True
+        if self.expires_at is None:
+            return False
+        return (now or time.time()) >= self.expires_at - self.margin
+
+    def expired(self):
+        return self.access_token is None or (
+            self.expires_at is not None and time.time() >= self.expires_at)
+
+    def is_current(self, stale):
+        """Another caller already replaced the ``stale`` token."""
+        return stale is not None and self.access_token is not None and \
+            self.access_token != stale and not self.expiring()
+
+    def current_result(self):
+        return {'success': True,
+                'code': 200,
+                'response': self.access_token}
+
+    def _load_cached(self, stale):
+        """Adopts a usable token another process cached. Returns success."""
+        cached = self.cache.get(self._key)
+        if cached is None:
+            return False
+        access_token, expires_at = cached
+        if access_token == stale or \
+                time.time() >= expires_at - self.margin:
+            return False
+        self.set_token(access_token, expires_at)
+        return True
+
+    def _request(self):
+        return token_request(self.client_id, self.client_secret,
+                             self.refresh_token, self.token_url)
+
+    def _store(self, res):
+        if res['success']:
+            expires_at = time.time() + res['expires_in']
+            self.set_token(res['response'], expires_at)
+            self.refreshes += 1
+            if self.cache is not None:
+                self.cache.set(self._key, self.access_token, expires_at)
+        return res
+
+
+class TokenManager(_TokenState):
+    """
+    Access token of one refresh token, refreshed ahead of expiry.
+
+    :param client_id: Login with Amazon client Id.
+    :type client_id: string
+    :param client_secret: Login with Amazon client secret key.
+    :type client_secret: string
+    :param refresh_token: The refresh token for the advertiser account.
+    :type refresh_token: string
+    :param token_url: Host and path of the token endpoint. See regions.py.
+    :type token_url: string
+    :param transport: HTTP transport for token requests.
+    :type transport: Transport
+    :param access_token: A token already obtained, of unknown expiry.
+    :type access_token: string
+    :param cache_path: File to share tokens through across processes.
+    :type cache_path: string
+    :param margin: Seconds before expiry a token is refreshed.
+    :type margin: float
+    :param background: Refresh from a timer thread rather than on the first
+        call inside the margin.
+    :type background: boolean
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token, token_url,
+                 transport, access_token=None, cache_path=None,
+                 margin=DEFAULT_REFRESH_MARGIN, background=False):
+        super(TokenManager, self).__init__(
+            client_id, client_secret, refresh_token, token_url, transport,
+            access_token=access_token, cache_path=cache_path, margin=margin)
+        self.background = background
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._timer = None
+        self._schedule()
+
+    def token(self):
+        """
+        Returns an access token that is not about to expire, refreshing it
+        first when needed. A token still valid is returned if the refresh
+        fails; None if there is none.
+        """
+        if not self.expiring():
+            return self.access_token
+        try:
+            self.refresh(stale=self.access_token)
+        except Exception:
+            if self.expired():
+                raise
+        if self.expired():
+            return None
+        return self.access_token
+
+    def refresh(self, stale=None):
+        """
+        Obtains a new access token. Concurrent calls share one request.
+
+        :param stale: The token the caller found unusable (e.g. on a 401).
+            Nothing is requested when another caller has already replaced it.
+        :type stale: string
+        :returns: Result dictionary with the access token as response.
+        """
+        with self._lock:
+            if self.is_current(stale):
+                return self.current_result()
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+        if not owner:
+            return future.result()
+        try:
+            res = self._refresh(stale)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+        future.set_result(res)
+        self._schedule()
+        return res
+
+    def _refresh(self, stale):
+        if self.cache is None:
+            return self._store(token_result(
+                self.transport.request(*self._request())))
+        with self.cache.locked():
+            # Another process may have refreshed while we waited.
+            if self._load_cached(stale):
+                return self.current_result()
+            return self._store(token_result(
+                self.transport.request(*self._request())))
+
+    def _schedule(self):
+        if not self.background or self.expires_at is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(0.0, self.expires_at - self.margin - time.time())
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh(stale=self.access_token)
+        except Exception:
+            # The next call refreshes inline instead.
+            pass
+
+    def close(self):
+        """Stops the background timer."""
+        self.background = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class AsyncTokenManager(_TokenState):
+    """
+    asyncio counterpart of :class:`TokenManager`; takes the same arguments
+    with an asyncio transport.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token, token_url,
+                 transport, access_token=None, cache_path=None,
+                 margin=DEFAULT_REFRESH_MARGIN, background=False):
+        super(AsyncTokenManager, self).__init__(
+            client_id, client_secret, refresh_token, token_url, transport,
+            access_token=access_token, cache_path=cache_path, margin=margin)
+        self.background = background
+        self._inflight = None
+        self._timer = None
+
+    async def token(self):
+        if not self.expiring():
+            return self.access_token
+        try:
+            await self.refresh(stale=self.access_token)
+        except Exception:
+            if self.expired():
+                raise
+        if self.expired():
+            return None
+        return self.access_token
+
+    async def refresh(self, stale=None):
+        if self.is_current(stale):
+            return self.current_result()
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh(stale))
+            self._inflight.add_done_callback(self._refreshed)
+        return await asyncio.shield(self._inflight)
+
+    def _refreshed(self, task):
+        self._inflight = None
+        if self.background and not task.cancelled() and \
+                task.exception() is None and self.expires_at is not None:
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = max(0.0, self.expires_at - self.margin - time.time())
+            self._timer = asyncio.get_event_loop().call_later(
+                delay, self._background_refresh)
+
+    def _background_refresh(self):
+        asyncio.ensure_future(self.refresh(stale=self.access_token))
+
+    async def _refresh(self, stale):
+        if self.cache is None:
+            return self._store(token_result(
+                await self.transport.request(*self._request())))
+        # Waiting for the file lock and reading and writing the cache file
+        # block: do them in the default executor, not on the event loop.
+        # Releasing the lock does not block.
+        loop = asyncio.get_running_loop()
+        lock = self.cache.locked()
+        await loop.run_in_executor(None, lock.__enter__)
+        try:
+            # Another process may have refreshed while we waited.
+            if await loop.run_in_executor(None, self._load_cached, stale):
+                return self.current_result()
+            res = token_result(
+                await self.transport.request(*self._request()))
+            return await loop.run_in_executor(None, self._store, res)
+        finally:
+            lock.__exit__(None, None, None)
+
+    def close(self):
+        self.background = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
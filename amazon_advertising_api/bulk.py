@@ -0,0 +1,165 @@
+"""
+Bulk dispatch of create/update calls larger than an endpoint accepts at once.
+
+The entities are split by the endpoint's ``batch_limit``, the chunks are sent
+concurrently with bounded parallelism, and the per-entity results of the
+multi-status (207) responses are stitched back together in input order.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from amazon_advertising_api.models import decoded
+
+DEFAULT_BULK_WORKERS = 8
+
+
+def chunked(items, size):
+    """Yields lists of at most ``size`` items from any iterable."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def batch_endpoint(client, name):
+    """
+    The endpoint behind a bulk call.
+
+    :raises KeyError: ``name`` is not an endpoint of the client.
+    :raises ValueError: The endpoint does not take a list payload.
+    """
+    endpoints = getattr(client, 'endpoints', {})
+    if name not in endpoints:
+        raise KeyError('Endpoint {} not found.'.format(name))
+    endpoint = endpoints[name]
+    if endpoint.batch_limit is None:
+        raise ValueError('Endpoint {} does not accept batches.'.format(name))
+    return endpoint
+
+
+def chunk_items(result, size):
+    """
+    Per-entity results of one chunk's result dictionary.
+
+    A failed chunk, or one whose response does not hold exactly one result
+    per entity, yields one failure entry per entity it held, so the stitched
+    list keeps its alignment with the input.
+    """
+    if result['success']:
+        try:
+            response = decoded(result)
+        except ValueError as e:
+            return chunk_items(_failure(e), size)
+        if isinstance(response, dict):
+            # Bid recommendations wrap the per-entity list.
+            response = response.get('recommendations', [response])
+        if isinstance(response, list) and len(response) == size:
+            return response
+        count = len(response) if isinstance(response, list) else 'none'
+        return chunk_items(_failure(ValueError(
+            'Expected {} results, got {}.'.format(size, count))), size)
+    failure = {'code': str(result['code']), 'details': result['response']}
+    return [dict(failure) for _ in range(size)]
+
+
+def stitch(results):
+    """
+    Combines ``(result, chunk_size)`` pairs, in input order, into a single
+    result dictionary.
+
+    ``response`` is the decoded list of per-entity results. ``success`` is
+    only True when every chunk succeeded; ``code`` is then 207, otherwise the
+    code of the first failed chunk.
+    """
+    items = []
+    success = True
+    code = 207
+    for result, size in results:
+        if success and not result['success']:
+            success = False
+            code = result['code']
+        items.extend(chunk_items(result, size))
+    return {'success': success,
+            'code': code,
+            'response': items}
+
+
+def _failure(error):
+    return {'success': False,
+            'code': 0,
+            'response': '{}: {}'.format(type(error).__name__, error)}
+
+
+def _call_chunk(method, argument, chunk, kwargs):
+    try:
+        return method(**dict(kwargs, **{argument: chunk}))
+    except Exception as e:
+        return _failure(e)
+
+
+def bulk_call(client, name, items, max_workers=DEFAULT_BULK_WORKERS, **kwargs):
+    """
+    Sends ``items`` through the endpoint method ``name`` in as many calls as
+    its ``batch_limit`` requires, ``max_workers`` at a time.
+
+    Chunks are read lazily from ``items`` and at most ``2 * max_workers`` are
+    held in memory at once. A chunk that raises is reported as a failure with
+    code 0 rather than aborting the chunks already sent.
+
+    :param client: An AdvertisingApi or AdvertisingApiV3.
+    :param name: Name of the endpoint method, e.g. 'update_keywords'.
+    :type name: string
+    :param items: Entities to send.
+    :type items: iterable
+    :param max_workers: Calls in flight at once.
+    :type max_workers: integer
+    :param kwargs: Other arguments of the endpoint method.
+    :returns: See :func:`stitch`.
+    """
+    endpoint = batch_endpoint(client, name)
+    method = getattr(client, name)
+    argument = endpoint.batch_argument
+    window = max(1, max_workers) * 2
+    results = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunked(items, endpoint.batch_limit):
+            if len(pending) >= window:
+                future, size = pending.popleft()
+                results.append((future.result(), size))
+            pending.append((executor.submit(_call_chunk, method, argument,
+                                            chunk, kwargs), len(chunk)))
+        while pending:
+            future, size = pending.popleft()
+            results.append((future.result(), size))
+    return stitch(results)
+
+
+async def async_bulk_call(client, name, items,
+                          max_workers=DEFAULT_BULK_WORKERS, **kwargs):
+    """
+    asyncio counterpart of :func:`bulk_call`; ``max_workers`` bounds the
+    chunks in flight on top of the client's own concurrency limit.
+    """
+    endpoint = batch_endpoint(client, name)
+    method = getattr(client, name)
+    argument = endpoint.batch_argument
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def send(chunk):
+        async with semaphore:
+            try:
+                result = await method(**dict(kwargs, **{argument: chunk}))
+            except Exception as e:
+                result = _failure(e)
+        return result, len(chunk)
+
+    # Chunks are created as tasks up front; memory is bounded by the input
+    # itself, which an asyncio caller already holds.
+    tasks = [asyncio.ensure_future(send(chunk))
+             for chunk in chunked(items, endpoint.batch_limit)]
+    return stitch(await asyncio.gather(*tasks))
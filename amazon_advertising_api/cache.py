@@ -0,0 +1,400 @@
+"""
+Read-through cache for GET calls.
+
+Responses are cached per scope (the profile, or the account for calls made
+without one), interface and query parameters for a TTL chosen by interface
+prefix. Entries carrying an ``ETag`` or ``Last-Modified`` validator are kept
+past their TTL and revalidated with a conditional request; a 304 renews them
+without transferring the body again. A successful create, update or archive
+call drops the cached reads of the same entity family (see
+:func:`cache_family`) in its scope.
+
+Two backends evict least recently used entries beyond an entry count and a
+byte budget: :class:`MemoryBackend` and :class:`SqliteBackend`, the latter
+persisting across runs and shareable between processes.
+"""
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from amazon_advertising_api.ratelimit import endpoint_family
+from amazon_advertising_api.transport import Response
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Seconds responses are cached for, by interface prefix; the longest
+# matching prefix wins. 0 disables caching: report and snapshot status is
+# polled and must not be served stale.
+DEFAULT_TTLS = {
+    'profiles': 3600.0,
+    'portfolios': 900.0,
+    'sp/targets/brands': 86400.0,
+    'sp/targets/categories': 86400.0,
+    'reports': 0,
+    'snapshots': 0,
+}
+
+# Families invalidated in every scope: profiles are listed per account.
+ACCOUNT_FAMILIES = ('profiles',)
+
+# Response headers kept with a cached entry.
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified')
+
+# Sponsored Products resources AdvertisingApi writes without the 'sp/' prefix
+# it reads them with, e.g. PUT campaigns and GET sp/campaigns.
+_SP_RESOURCES = ('campaigns', 'adGroups', 'productAds', 'keywords',
+                 'negativeKeywords', 'campaignNegativeKeywords', 'targets',
+                 'negativeTargets')
+
+
+def cache_family(interface):
+    """
+    The entity family of an interface for invalidation: its
+    ratelimit.endpoint_family, with the unprefixed v1 Sponsored Products
+    resources mapped to their 'sp/' family.
+    """
+    family = endpoint_family(interface)
+    if family in _SP_RESOURCES:
+        return 'sp/' + family
+    return family
+
+
+class CacheEntry(object):
+    """A cached response and its freshness."""
+
+    __slots__ = ('scope', 'family', 'code', 'reason', 'headers', 'body',
+                 'expires')
+
+    def __init__(self, scope, family, code, reason, headers, body, expires):
+        self.scope = scope
+        self.family = family
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+    @property
+    def size(self):
+        return len(self.body) + 64
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires
+
+    def header(self, name):
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    @property
+    def validated(self):
+        """The entry can be revalidated once stale."""
+        return self.header('ETag') is not None or \
+            self.header('Last-Modified') is not None
+
+    def response(self):
+        return Response(self.code, self.reason, list(self.headers), self.body)
+
+
+class MemoryBackend(object):
+    """
+    In-process LRU store.
+
+    :param max_entries: Entries kept at most.
+    :type max_entries: integer
+    :param max_bytes: Body bytes kept at most.
+    :type max_bytes: integer
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._remove(key)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._families.setdefault((entry.scope, entry.family),
+                                      set()).add(key)
+            self.bytes += entry.size
+            while len(self._entries) > self.max_entries or \
+                    self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate(self, scope, family):
+        """Drops the entries of ``family``; in every scope if None."""
+        with self._lock:
+            for (entry_scope, entry_family), keys in list(
+                    self._families.items()):
+                if entry_family == family and scope in (None, entry_scope):
+                    for key in list(keys):
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._families.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry.size
+        group = (entry.scope, entry.family)
+        keys = self._families[group]
+        keys.discard(key)
+        if not keys:
+            del self._families[group]
+
+
+class SqliteBackend(object):
+    """
+    LRU store in a local sqlite database.
+
+    :param path: Database file; ``':memory:'`` for a private one.
+    :type path: string
+    :param max_entries: Entries kept at most.
+    :type max_entries: integer
+    :param max_bytes: Body bytes kept at most.
+    :type max_bytes: integer
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, scope TEXT, family TEXT, code INTEGER, '
+            'reason TEXT, headers TEXT, body BLOB, expires REAL, '
+            'size INTEGER, used REAL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_family '
+                         'ON entries (family, scope)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_used '
+                         'ON entries (used)')
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM entries'
+                                    ).fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT scope, family, code, reason, headers, body, expires '
+                'FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE entries SET used = ? WHERE key = ?',
+                             (time.time(), key))
+        scope, family, code, reason, headers, body, expires = row
+        return CacheEntry(scope, family, code, reason,
+                          [tuple(h) for h in json.loads(headers)],
+                          bytes(body), expires)
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            self.delete(key)
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.scope, entry.family, entry.code, entry.reason,
+                 json.dumps(entry.headers), entry.body, entry.expires,
+                 entry.size, time.time()))
+            self._evict()
+
+    def _evict(self):
+        count, total = self._db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        excess = max(0, count - self.max_entries)
+        doomed = []
+        for key, size in self._db.execute(
+                'SELECT key, size FROM entries ORDER BY used'):
+            if excess <= 0 and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            excess -= 1
+            total -= size
+        self._db.executemany('DELETE FROM entries WHERE key = ?', doomed)
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def invalidate(self, scope, family):
+        with self._lock:
+            if scope is None:
+                self._db.execute('DELETE FROM entries WHERE family = ?',
+                                 (family,))
+            else:
+                self._db.execute('DELETE FROM entries WHERE family = ? '
+                                 'AND scope = ?', (family, scope))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM entries')
+
+    def close(self):
+        self._db.close()
+
+
+class ResponseCache(object):
+    """
+    Read-through cache for the GET calls of one or more clients.
+
+    :param backend: Where entries are kept. Defaults to a MemoryBackend.
+    :param ttls: Seconds to cache by interface prefix, e.g.
+        ``{'sp/campaigns': 300}``; merged over DEFAULT_TTLS.
+    :type ttls: dictionary
+    :param default_ttl: Seconds for interfaces no prefix matches.
+    :type default_ttl: float
+    """
+
+    def __init__(self, backend=None, ttls=None, default_ttl=DEFAULT_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._invalidations = 0
+
+    def ttl(self, interface):
+        path = interface.split('?', 1)[0]
+        best = None
+        for prefix in self.ttls:
+            if (path == prefix or path.startswith(prefix + '/')) and \
+                    (best is None or len(prefix) > len(best)):
+                best = prefix
+        if best is None:
+            return self.default_ttl
+        return self.ttls[best]
+
+    @staticmethod
+    def key(scope, url):
+        """Cache key of a GET ``url``, ignoring query parameter order."""
+        parts = urllib.parse.urlsplit(url)
+        query = urllib.parse.urlencode(
+            sorted(urllib.parse.parse_qsl(parts.query, True)))
+        return '{}\0{}{}?{}'.format(scope, parts.netloc, parts.path, query)
+
+    def lookup(self, scope, interface, request):
+        """
+        Looks up a prepared request.
+
+        :returns: ``(key, entry, request)``: key is None when the request is
+            not cacheable. A fresh entry can be served as is; otherwise the
+            request is to be sent, conditionally when the entry is stale.
+        """
+        method, url, headers, data = request
+        if method != 'GET' or not self.ttl(interface):
+            return None, None, request
+        key = self.key(scope, url)
+        entry = self.backend.get(key)
+        if entry is not None and entry.fresh:
+            self._count('_hits')
+            return key, entry, request
+        self._count('_misses')
+        if entry is None or not entry.validated:
+            return key, None, request
+        headers = dict(headers)
+        etag = entry.header('ETag')
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        modified = entry.header('Last-Modified')
+        if modified is not None:
+            headers['If-Modified-Since'] = modified
+        return key, entry, (method, url, headers, data)
+
+    def update(self, scope, interface, request, key, entry, response):
+        """
+        Records the response to a request :meth:`lookup` let through and
+        returns the response to hand to the caller.
+        """
+        method = request[0]
+        if method != 'GET':
+            if response.ok:
+                self.invalidate(scope, interface)
+            return response
+        if key is None:
+            return response
+        if response.code == 304 and entry is not None:
+            self._count('_revalidated')
+            entry.expires = time.time() + self.ttl(interface)
+            self.backend.set(key, entry)
+            return entry.response()
+        if response.code != 200:
+            return response
+        headers = [(k, v) for k, v in response.headers
+                   if k.lower() in _KEPT_HEADERS]
+        self.backend.set(key, CacheEntry(
+            scope, cache_family(interface), response.code,
+            response.reason, headers, response.body,
+            time.time() + self.ttl(interface)))
+        return response
+
+    def invalidate(self, scope, interface):
+        """Drops the cached reads of the entity family of ``interface``."""
+        family = cache_family(interface)
+        self._count('_invalidations')
+        if family in ACCOUNT_FAMILIES:
+            scope = None
+        self.backend.invalidate(scope, family)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def stats(self):
+        """Counters since creation: hits, misses, revalidated (304s) and
+        invalidations."""
+        with self._lock:
+            return {'hits': self._hits,
+                    'misses': self._misses,
+                    'revalidated': self._revalidated,
+                    'invalidations': self._invalidations}
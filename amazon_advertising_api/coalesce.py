@@ -0,0 +1,127 @@
+"""
+Coalescing of identical concurrent GET calls.
+
+When several threads (or tasks) ask for the same thing at once, e.g.
+``get_campaign(campaign_id)`` for a popular campaign, a client given a
+:class:`SingleFlight` sends the first call and has the others wait for its
+response instead of sending their own. Calls are identical when they are
+GETs of the same URL, query parameters in any order, in the same scope
+(profile, or account for calls made without one) with the same
+``Accept``/``Content-Type`` headers. Nothing is kept once the call
+completes; see cache.py for reusing responses over time::
+
+    flights = SingleFlight()
+    api = AdvertisingApiV3(..., coalescer=flights)
+    campaigns = list(api.map('get_campaign', campaign_ids))
+    flights.stats  # {'flights': ..., 'coalesced': ..., 'in_flight': 0}
+
+Clients given the same SingleFlight coalesce their calls with each other.
+"""
+import asyncio
+import threading
+
+from amazon_advertising_api.cache import ResponseCache
+
+# Request headers that change the response of a GET.
+_KEY_HEADERS = ('accept', 'content-type')
+
+
+class _Flight(object):
+    """One call in flight and what its followers wait on."""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Shares one in-flight call between identical concurrent calls.
+
+    The response, or the exception, of the call is handed to every caller
+    that joined it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._tasks = {}
+        self._flown = 0
+        self._coalesced = 0
+
+    @staticmethod
+    def key(scope, request):
+        """
+        Key of a prepared GET request, or None when the request is not
+        coalesced.
+        """
+        method, url, headers, data = request
+        if method != 'GET':
+            return None
+        varying = tuple(sorted((k.lower(), v) for k, v in headers.items()
+                               if k.lower() in _KEY_HEADERS))
+        return ResponseCache.key(scope, url), varying
+
+    def do(self, key, function, *args):
+        """
+        ``function(*args)``, unless a call of the same key is in flight, in
+        which case its outcome.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._flown += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+        try:
+            flight.response = function(*args)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.response
+
+    async def do_async(self, key, function, *args):
+        """
+        :meth:`do` for a coroutine function. The call runs as a task of its
+        own, so cancelling the caller that started it does not cancel it
+        for the others.
+        """
+        key = (asyncio.get_event_loop(), key)
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(
+                    function(*args))
+                task.add_done_callback(lambda _: self._land(key))
+                self._flown += 1
+            else:
+                self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _land(self, key):
+        with self._lock:
+            self._tasks.pop(key, None)
+
+    @property
+    def stats(self):
+        """Counters since creation: flights (calls sent), coalesced (calls
+        that shared one) and in_flight."""
+        with self._lock:
+            return {'flights': self._flown,
+                    'coalesced': self._coalesced,
+                    'in_flight': len(self._flights) + len(self._tasks)}
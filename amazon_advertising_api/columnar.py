@@ -0,0 +1,411 @@
+"""
+Columnar conversion of report and snapshot rows.
+
+Rows are consumed one at a time, typically straight from
+``stream_report``/``stream_snapshot``, and appended to typed columns: integer
+and float metrics go into ``array`` buffers of machine values, text into
+lists. Every ``batch_size`` rows a :class:`ColumnBatch` is emitted, so no
+list of row dictionaries is ever built.
+
+Column types come from the requested ``metrics``: identifiers and counts are
+integers, money and rates floats, names and text strings. Pickled batches
+(e.g. sent back from a worker process) travel as raw buffers: integers
+narrowed to the smallest type that holds them, text dictionary-encoded when
+values repeat and as one UTF-8 buffer otherwise. Batches convert to
+Apache Arrow record batches, Parquet files or NumPy arrays when pyarrow or
+numpy is installed; neither is required for the batches themselves.
+"""
+from array import array
+from itertools import accumulate
+import json
+import re
+
+DEFAULT_BATCH_SIZE = 64 * 1024
+
+INT = 'int'
+FLOAT = 'float'
+STRING = 'string'
+
+# Columns that are text although their name suggests otherwise.
+_STRING_COLUMNS = frozenset((
+    'adGroupName', 'asin', 'attributedSalesSameSkuCurrency', 'bidding',
+    'campaignName',
+    'campaignBudgetType', 'campaignStatus', 'currency', 'date',
+    'expression', 'keywordText', 'matchType', 'otherAsin', 'placement',
+    'query', 'resolvedExpression', 'sku', 'state', 'targetingExpression',
+    'targetingText', 'targetingType'))
+
+# Words naming money and ratio columns: the whole name ('bid') or its last
+# word ('defaultBid'), the latter optionally followed by an attribution
+# window or variant ('attributedSales14dSameSKU'). 'bidding' and
+# 'premiumBidAdjustment' are not floats.
+_FLOAT_MARKERS = ('cost', 'sales', 'spend', 'rate', 'budget', 'bid',
+                  'percentage', 'cpc', 'acos', 'roas')
+_FLOAT_NAME = re.compile(
+    r'(?:^(?:{})|(?<=[a-z0-9])(?:{}))(?:NewToBrand|Percentage|SameSKU|\d+d)*$'
+    .format('|'.join(_FLOAT_MARKERS),
+            '|'.join(marker.capitalize() for marker in _FLOAT_MARKERS)))
+
+# Name prefixes of count columns.
+_INT_PREFIXES = ('impressions', 'clicks', 'attributedConversions',
+                 'attributedUnitsOrdered', 'attributedOrders',
+                 'attributedDetailPageView', 'viewImpressions', 'orders',
+                 'units', 'purchases', 'unitsSold', 'newToBrand')
+
+# array type codes of the numeric column types.
+_TYPECODES = {INT: 'q', FLOAT: 'd'}
+
+# Signed and unsigned array type codes by increasing size, for narrowing.
+_SIGNED = ('b', 'h', 'i', 'q')
+_UNSIGNED = ('B', 'H', 'I', 'Q')
+
+
+def column_type(name):
+    """The column type a report column is stored as."""
+    if name in _STRING_COLUMNS:
+        return STRING
+    if name.endswith('Id'):
+        return INT
+    if _FLOAT_NAME.search(name):
+        return FLOAT
+    if name.startswith(_INT_PREFIXES):
+        return INT
+    return STRING
+
+
+def metric_names(metrics):
+    """Column names from a ``metrics`` string ('a,b') or list."""
+    if metrics is None:
+        return []
+    if isinstance(metrics, str):
+        metrics = metrics.split(',')
+    return [metric.strip() for metric in metrics if metric.strip()]
+
+
+def schema_for(columns, overrides=None):
+    """
+    Column types of ``columns``.
+
+    :param overrides: Types to use instead of the derived ones, e.g.
+        ``{'keywordId': 'string'}``.
+    :type overrides: dictionary
+    :returns: List of ``(name, type)`` pairs.
+    """
+    overrides = overrides or {}
+    return [(name, overrides.get(name) or column_type(name))
+            for name in columns]
+
+
+class ColumnBatch(object):
+    """
+    Rows held column by column.
+
+    :ivar schema: List of ``(name, type)`` pairs.
+    :ivar columns: Column values by name: ``array('q')`` for integers,
+        ``array('d')`` for floats, lists for strings. Missing numeric values
+        are stored as 0 and flagged in ``nulls``.
+    :ivar nulls: ``bytearray`` by name, 1 where the value is missing, for
+        the numeric columns that have missing values.
+    :ivar num_rows: Number of rows.
+    """
+
+    __slots__ = ('schema', 'columns', 'nulls', 'num_rows')
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns = dict(
+            (name, array(_TYPECODES[kind]) if kind in _TYPECODES else [])
+            for name, kind in schema)
+        self.nulls = {}
+        self.num_rows = 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def append(self, row):
+        """
+        Adds a row dictionary. Keys outside the schema are ignored.
+
+        :raises ValueError: A value does not fit its column type.
+        """
+        # Values are converted first so a bad row leaves no partial trace.
+        values = []
+        for name, kind in self.schema:
+            value = row.get(name)
+            if kind == STRING:
+                value = _text(value)
+            elif value is not None and value != '':
+                try:
+                    value = int(value) if kind == INT else float(value)
+                except (TypeError, ValueError):
+                    raise ValueError('Column {} expects {} values, got {!r}.'
+                                     .format(name, kind, value))
+            else:
+                value = None
+            values.append(value)
+        index = self.num_rows
+        for (name, kind), value in zip(self.schema, values):
+            column = self.columns[name]
+            if kind == STRING:
+                column.append(value)
+                continue
+            nulls = self.nulls.get(name)
+            if value is None:
+                if nulls is None:
+                    nulls = self.nulls[name] = bytearray(index)
+                nulls.append(1)
+                column.append(0)
+                continue
+            column.append(value)
+            if nulls is not None:
+                nulls.append(0)
+        self.num_rows = index + 1
+
+    def __getstate__(self):
+        columns = {}
+        for name, kind in self.schema:
+            column = self.columns[name]
+            if kind == STRING:
+                columns[name] = _pack_strings(column)
+            elif kind == INT:
+                columns[name] = _pack_ints(column)
+            else:
+                columns[name] = (column.typecode, column.tobytes())
+        return (self.schema, columns,
+                dict((name, bytes(nulls))
+                     for name, nulls in self.nulls.items()),
+                self.num_rows)
+
+    def __setstate__(self, state):
+        schema, packed, nulls, num_rows = state
+        columns = {}
+        for name, kind in schema:
+            if kind == STRING:
+                columns[name] = _unpack_strings(packed[name])
+            else:
+                typecode, data = packed[name]
+                column = array(typecode, data)
+                if typecode != _TYPECODES[kind]:
+                    column = array(_TYPECODES[kind], column)
+                columns[name] = column
+        self.schema = schema
+        self.columns = columns
+        self.nulls = dict((name, bytearray(data))
+                          for name, data in nulls.items())
+        self.num_rows = num_rows
+
+    def to_arrow(self):
+        """The batch as a ``pyarrow.RecordBatch``."""
+        pa = _require('pyarrow')
+        types = {INT: pa.int64(), FLOAT: pa.float64(), STRING: pa.string()}
+        arrays = []
+        for name, kind in self.schema:
+            column = self.columns[name]
+            nulls = self.nulls.get(name)
+            if kind == STRING:
+                arrays.append(pa.array(column, types[kind]))
+            elif nulls is None:
+                # Numeric buffers are handed over without copying.
+                arrays.append(pa.Array.from_buffers(
+                    types[kind], len(column), [None, pa.py_buffer(column)]))
+            else:
+                arrays.append(pa.array(
+                    [None if null else value
+                     for value, null in zip(column, nulls)], types[kind]))
+        return pa.RecordBatch.from_arrays(
+            arrays, names=[name for name, _ in self.schema])
+
+    def to_numpy(self):
+        """
+        The columns as NumPy arrays. Numeric columns share the memory of
+        their buffers; those with missing values are masked arrays.
+        """
+        np = _require('numpy')
+        result = {}
+        for name, kind in self.schema:
+            column = self.columns[name]
+            if kind == STRING:
+                result[name] = np.array(column, dtype=object)
+                continue
+            values = np.frombuffer(column, dtype=np.int64 if kind == INT
+                                   else np.float64)
+            nulls = self.nulls.get(name)
+            if nulls is not None:
+                values = np.ma.masked_array(
+                    values, mask=np.frombuffer(nulls, dtype=np.uint8) > 0)
+            result[name] = values
+        return result
+
+
+def _narrowest(low, high, signed=True):
+    """The smallest array type code holding integers in [low, high]."""
+    for typecode in (_SIGNED if signed else _UNSIGNED):
+        bits = 8 * array(typecode).itemsize
+        if signed and -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+            return typecode
+        if not signed and high < 1 << bits:
+            return typecode
+    return 'q' if signed else 'Q'
+
+
+def _pack_ints(column):
+    """``(typecode, bytes)`` of an integer column, narrowed."""
+    if not column:
+        return column.typecode, b''
+    typecode = _narrowest(min(column), max(column))
+    if typecode != column.typecode:
+        column = array(typecode, column)
+    return typecode, column.tobytes()
+
+
+def _pack_strings(values):
+    """
+    A text column as buffers: ``('dict', distinct values, codes typecode,
+    codes)`` when values repeat, ``('utf8', text, lengths typecode,
+    lengths, nulls)`` otherwise.
+    """
+    codes = {}
+    for value in values:
+        if value not in codes:
+            codes[value] = len(codes)
+            if 2 * len(codes) > len(values):
+                break
+    else:
+        typecode = _narrowest(0, max(len(codes) - 1, 0), signed=False)
+        return ('dict', list(codes), typecode,
+                array(typecode, [codes[value] for value in values]).tobytes())
+    nulls = None
+    if None in codes:
+        nulls = bytes(value is None for value in values)
+        values = ['' if value is None else value for value in values]
+    lengths = [len(value) for value in values]
+    typecode = _narrowest(0, max(lengths, default=0), signed=False)
+    return ('utf8', ''.join(values).encode('utf-8'), typecode,
+            array(typecode, lengths).tobytes(), nulls)
+
+
+def _unpack_strings(packed):
+    if packed[0] == 'dict':
+        _, distinct, typecode, codes = packed
+        return [distinct[code] for code in array(typecode, codes)]
+    _, data, typecode, lengths, nulls = packed
+    text = data.decode('utf-8')
+    ends = list(accumulate(array(typecode, lengths)))
+    values = [text[start:end] for start, end in zip([0] + ends, ends)]
+    if nulls is not None:
+        values = [None if null else value
+                  for value, null in zip(values, nulls)]
+    return values
+
+
+def _text(value):
+    """String column value; lists and dicts as canonical JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return str(value)
+
+
+def _require(module):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ImportError('{} is required for this conversion: '
+                          'pip install {}'.format(module, module))
+
+
+def _schema(row, metrics, overrides):
+    columns = metric_names(metrics)
+    columns += [name for name in row if name not in columns]
+    # Nested values (bidding, expressions) are stored as JSON text.
+    nested = dict((name, STRING) for name in columns
+                  if isinstance(row.get(name), (dict, list)))
+    nested.update(overrides or {})
+    return schema_for(columns, nested)
+
+
+def iter_batches(rows, metrics=None, schema=None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Groups rows into :class:`ColumnBatch` objects of ``batch_size`` rows.
+
+    :param rows: Row dictionaries, e.g. ``api.stream_report(report_id)``.
+    :param metrics: The metrics the report was requested with, as the
+        comma-separated string or a list. The other columns of the first
+        row (record ids, names) are appended after them.
+    :param schema: Column types overriding the derived ones.
+    :type schema: dictionary
+    :param batch_size: Rows per batch.
+    :type batch_size: integer
+    """
+    batch = None
+    for row in rows:
+        if batch is None:
+            columns = _schema(row, metrics, schema)
+            batch = ColumnBatch(columns)
+        batch.append(row)
+        if batch.num_rows >= batch_size:
+            yield batch
+            batch = ColumnBatch(columns)
+    if batch is not None and batch.num_rows:
+        yield batch
+
+
+async def async_iter_batches(rows, metrics=None, schema=None,
+                             batch_size=DEFAULT_BATCH_SIZE):
+    """:func:`iter_batches` over an async iterable of rows."""
+    batch = None
+    async for row in rows:
+        if batch is None:
+            columns = _schema(row, metrics, schema)
+            batch = ColumnBatch(columns)
+        batch.append(row)
+        if batch.num_rows >= batch_size:
+            yield batch
+            batch = ColumnBatch(columns)
+    if batch is not None and batch.num_rows:
+        yield batch
+
+
+def to_arrow(rows, metrics=None, schema=None, batch_size=DEFAULT_BATCH_SIZE):
+    """All rows as a ``pyarrow.Table`` built batch by batch."""
+    pa = _require('pyarrow')
+    return pa.Table.from_batches(
+        [batch.to_arrow() for batch in
+         iter_batches(rows, metrics, schema, batch_size)])
+
+
+def write_parquet(rows, path, metrics=None, schema=None,
+                  batch_size=DEFAULT_BATCH_SIZE, compression='snappy'):
+    """
+    Streams rows into a Parquet file, one row group per batch.
+
+    :returns: Number of rows written.
+    """
+    _require('pyarrow')
+    import pyarrow.parquet as pq
+    writer = None
+    written = 0
+    try:
+        for batch in iter_batches(rows, metrics, schema, batch_size):
+            record_batch = batch.to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(path, record_batch.schema,
+                                          compression=compression)
+            writer.write_batch(record_batch)
+            written += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def to_numpy(rows, metrics=None, schema=None):
+    """
+    All rows as one NumPy array per column. The rows are collected into a
+    single batch, then handed to NumPy without copying numeric columns.
+    """
+    for batch in iter_batches(rows, metrics, schema, batch_size=float('inf')):
+        return batch.to_numpy()
+    return {}
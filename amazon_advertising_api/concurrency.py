@@ -0,0 +1,83 @@
+"""
+Support for using the clients from many threads.
+
+Each API call reads the client's profile and access token once, into an
+immutable :class:`CallContext`, and everything after that (headers, rate
+limiter bucket, cache scope, instrumentation) works from the prepared
+request. A call therefore never mixes the profile or token of two states of
+the client, even while another thread changes them. Clients created with
+``thread_safe=True`` go further and refuse such changes: a thread that needs
+another profile takes its own clone with ``for_profile``.
+
+Blocking calls can be fanned out with the clients' ``submit`` and ``map``,
+which run them on a thread pool shared by every client of the process
+unless a client is given its own executor::
+
+    futures = [api.submit('get_campaign', campaign_id) for ...]
+    for result in api.map('list_ad_groups', filters):
+        ...
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+DEFAULT_EXECUTOR_WORKERS = 32
+
+
+class CallContext(object):
+    """
+    The profile and access token one API call is made with.
+
+    :ivar profile_id: Value of the Amazon-Advertising-API-Scope header, or
+        None.
+    :ivar access_token: The bearer token, or None.
+    """
+
+    __slots__ = ('profile_id', 'access_token')
+
+    def __init__(self, profile_id, access_token):
+        object.__setattr__(self, 'profile_id', profile_id)
+        object.__setattr__(self, 'access_token', access_token)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CallContext is immutable.')
+
+    def __repr__(self):
+        return 'CallContext(profile_id={!r})'.format(self.profile_id)
+
+
+def request_scope(request):
+    """The profile a prepared ``(method, url, headers, body)`` is sent for."""
+    headers = request[2]
+    if not headers:
+        return None
+    return headers.get('Amazon-Advertising-API-Scope')
+
+
+def bound(client, operation):
+    """
+    ``operation`` as a callable: a method name of ``client``, or a callable
+    that takes the client as its first argument.
+
+    :raises KeyError: The client has no such method.
+    """
+    if callable(operation):
+        return lambda *args, **kwargs: operation(client, *args, **kwargs)
+    if not hasattr(client, operation):
+        raise KeyError('Operation {} not found.'.format(operation))
+    return getattr(client, operation)
+
+
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_default_executor():
+    """Returns the process-wide executor of ``submit`` and ``map``."""
+    global _default_executor
+    if _default_executor is None:
+        with _default_lock:
+            if _default_executor is None:
+                _default_executor = ThreadPoolExecutor(
+                    max_workers=DEFAULT_EXECUTOR_WORKERS,
+                    thread_name_prefix='amazon-advertising-api')
+    return _default_executor
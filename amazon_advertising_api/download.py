@@ -0,0 +1,165 @@
+"""
+Resumable report and snapshot downloads to local files.
+
+The redirected payload is written in fixed-size chunks to ``<path>.part``.
+When a transfer is interrupted the partial file is kept, and the next attempt
+(in the same call or a later one) asks only for the missing bytes with an
+HTTP ``Range`` header. The finished file is renamed into place, decompressed
+first when asked to.
+"""
+import asyncio
+import http.client as http_client
+import os
+import shutil
+import time
+
+from amazon_advertising_api.streaming import Decompressor
+from amazon_advertising_api.transport import DEFAULT_CHUNK_SIZE
+
+DEFAULT_DOWNLOAD_RETRIES = 3
+
+# Errors after which a transfer is resumed rather than given up.
+INTERRUPTED_ERRORS = (http_client.HTTPException,
+                      ConnectionError,
+                      TimeoutError,
+                      asyncio.TimeoutError,
+                      asyncio.IncompleteReadError)
+
+
+class DownloadResult(object):
+    """
+    Outcome of a download to disk.
+
+    :ivar path: The finished file.
+    :ivar bytes_received: Payload bytes transferred by this call.
+    :ivar bytes_written: Size of the finished file.
+    :ivar resumed_from: Bytes already on disk when the call started.
+    :ivar attempts: Requests made for the payload.
+    :ivar elapsed: Seconds the call took.
+    """
+
+    __slots__ = ('path', 'bytes_received', 'bytes_written', 'resumed_from',
+                 'attempts', 'elapsed')
+
+    def __init__(self, path, bytes_received, bytes_written, resumed_from,
+                 attempts, elapsed):
+        self.path = path
+        self.bytes_received = bytes_received
+        self.bytes_written = bytes_written
+        self.resumed_from = resumed_from
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return ('DownloadResult(path={!r}, bytes_received={}, '
+                'bytes_written={}, resumed_from={}, attempts={}, '
+                'elapsed={:.3f})').format(
+            self.path, self.bytes_received, self.bytes_written,
+            self.resumed_from, self.attempts, self.elapsed)
+
+
+class PartialFile(object):
+    """
+    The ``.part`` file of a download in progress.
+
+    :param path: Final path of the download.
+    :type path: string
+    :param resume: Keep bytes left by an earlier, interrupted download.
+    :type resume: boolean
+    """
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.part_path = path + '.part'
+        if not resume and os.path.exists(self.part_path):
+            os.remove(self.part_path)
+        self.offset = self.initial = self._size()
+        self.received = 0
+        self.attempts = 0
+        self.started = time.time()
+
+    def _size(self):
+        try:
+            return os.path.getsize(self.part_path)
+        except OSError:
+            return 0
+
+    def request_headers(self):
+        """Headers asking for the bytes not on disk yet."""
+        self.attempts += 1
+        if self.offset:
+            return {'Range': 'bytes={}-'.format(self.offset)}
+        return None
+
+    def restart(self):
+        """Discards the partial file, e.g. after a 416 response."""
+        self.offset = 0
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def open(self, response):
+        """
+        Opens the partial file for the body of ``response``: appending on a
+        206 that continues where the file ends, truncating otherwise.
+        """
+        append = False
+        if response.code == 206 and self.offset:
+            content_range = response.header('Content-Range', '')
+            append = content_range.startswith('bytes {}-'.format(self.offset))
+        if not append:
+            self.offset = 0
+        return open(self.part_path, 'ab' if append else 'wb')
+
+    def write(self, fp, chunk):
+        fp.write(chunk)
+        self.offset += len(chunk)
+        self.received += len(chunk)
+
+    def finish(self, decompress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Moves the completed file into place and returns the result."""
+        if decompress:
+            _decompress_file(self.part_path, self.path, chunk_size)
+            os.remove(self.part_path)
+        else:
+            os.replace(self.part_path, self.path)
+        return DownloadResult(self.path, self.received,
+                              os.path.getsize(self.path), self.initial,
+                              self.attempts, time.time() - self.started)
+
+    def result(self, code, decompress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        return {'success': True,
+                'code': code,
+                'response': self.finish(decompress, chunk_size)}
+
+
+def _decompress_file(source, destination, chunk_size):
+    """
+    Writes the decompressed content of a gzip (or plain) file, every member
+    of a multi-member gzip file.
+
+    :raises EOFError: The compressed stream is truncated; ``destination`` is
+        removed.
+    """
+    try:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            head = src.read(1)
+            src.seek(0)
+            if head not in (b'\x1f', b'\x78'):
+                shutil.copyfileobj(src, dst, chunk_size)
+                return
+            decompressor = Decompressor()
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                while data:
+                    dst.write(decompressor.decompress(data, chunk_size))
+                    data = decompressor.unconsumed_tail
+            dst.write(decompressor.flush())
+            if not decompressor.eof:
+                raise EOFError('{} ended before the end of the compressed '
+                               'stream.'.format(source))
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
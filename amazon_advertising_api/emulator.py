@@ -0,0 +1,686 @@
+"""
+In-process emulator of the Advertising API.
+
+:class:`Emulator` is a transport that answers the calls of AdvertisingApiV3
+from in-memory state instead of the network: profiles, portfolios and the
+Sponsored Products entities can be listed (with filters, pagination and
+``/extended``), created, updated and archived; the change history records
+every write; reports and snapshots are generated from the entities and
+downloaded through the usual status, 307 and gzip file sequence. Latency,
+jitter, random throttling and a server-side rate limit can be injected, so
+a pipeline can be load-tested end to end without a network::
+
+    emulator = Emulator(latency=0.02, rate=10)
+    profile_id = emulator.populate(campaigns=20)[0]
+    api = AdvertisingApiV3('id', 'secret', 'na', profile_id=profile_id,
+                           access_token='token', transport=emulator)
+
+``emulator.asynchronous()`` serves AsyncAdvertisingApiV3 from the same
+state. Generated data and injected faults come from a seeded random
+generator, so runs with the same calls are reproducible.
+"""
+from collections import OrderedDict
+import asyncio
+import gzip
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from amazon_advertising_api.ratelimit import endpoint_family
+from amazon_advertising_api.transport import (DEFAULT_CHUNK_SIZE, Response,
+                                              Transport)
+
+# Id field and change history entity type of each collection.
+COLLECTIONS = {
+    'portfolios': ('portfolioId', None),
+    'sp/campaigns': ('campaignId', 'CAMPAIGN'),
+    'sp/adGroups': ('adGroupId', 'AD_GROUP'),
+    'sp/productAds': ('adId', 'AD'),
+    'sp/keywords': ('keywordId', 'KEYWORD'),
+    'sp/negativeKeywords': ('keywordId', 'NEGATIVE_KEYWORD'),
+    'sp/campaignNegativeKeywords': ('keywordId',
+                                    'CAMPAIGN_NEGATIVE_KEYWORD'),
+    'sp/targets': ('targetId', 'PRODUCT_TARGETING'),
+    'sp/negativeTargets': ('targetId', 'NEGATIVE_PRODUCT_TARGETING'),
+}
+
+# Fields only /extended listings return.
+EXTENDED_FIELDS = ('creationDate', 'lastUpdatedDate', 'servingStatus')
+
+# Parent id fields copied into report rows.
+_PARENT_FIELDS = ('campaignId', 'adGroupId')
+
+_VERSION = re.compile(r'^/(v\d+/)?')
+_ENTITY = re.compile(r'^(portfolios|sp/\w+?)(/extended)?(?:/([^/]+))?$')
+_RECORD_REQUEST = re.compile(r'^sp/(\w+)/(report|snapshot)$')
+_RECORD_STATUS = re.compile(r'^(reports|snapshots)/([^/]+)(/download)?$')
+_BID_RECOMMENDATIONS = re.compile(
+    r'^sp/(adGroups|keywords)/(\d+)/bidRecommendations$')
+
+_REASONS = {200: 'OK', 202: 'Accepted', 207: 'Multi-Status',
+            307: 'Temporary Redirect', 400: 'Bad Request',
+            401: 'Unauthorized', 404: 'Not Found',
+            429: 'Too Many Requests'}
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _response(code, payload=None, headers=None, body=None):
+    if body is None:
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    return Response(code, _REASONS.get(code, ''),
+                    [('Content-Type', 'application/json'),
+                     ('Content-Length', str(len(body)))] + (headers or []),
+                    body)
+
+
+def _error(code, error, details):
+    return _response(code, {'code': error, 'details': details})
+
+
+class Emulator(Transport):
+    """
+    Transport answering API calls from in-memory state.
+
+    :param latency: Seconds every request takes.
+    :type latency: float
+    :param jitter: Extra seconds, uniformly up to this, added per request.
+    :type jitter: float
+    :param throttle_rate: Share of requests answered with a 429 at random.
+    :type throttle_rate: float
+    :param rate: Requests per second allowed per profile and endpoint
+        family before the emulator throttles, or None for no limit.
+    :type rate: float
+    :param burst: Requests allowed at once under ``rate``.
+    :type burst: float
+    :param report_polls: Status checks a report or snapshot stays
+        IN_PROGRESS for.
+    :type report_polls: integer
+    :param require_auth: Accept only access tokens the emulator's token
+        endpoint issued.
+    :type require_auth: boolean
+    :param seed: Seed of the generated data and injected faults.
+    :type seed: integer
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, rate=None,
+                 burst=None, report_polls=0, require_auth=False, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.report_polls = report_polls
+        self.require_auth = require_auth
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self._profiles = OrderedDict()
+        self._entities = {}
+        self._events = []
+        self._records = {}
+        self._files = {}
+        self._tokens = set()
+        self._buckets = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # State.
+
+    def add_profile(self, profile_id=None, country_code='US',
+                    currency_code='USD', timezone='America/Los_Angeles'):
+        """Adds an advertiser profile. Returns its id, as a string."""
+        with self._lock:
+            if profile_id is None:
+                profile_id = 1000000 + next(self._ids)
+            self._profiles[str(profile_id)] = {
+                'profileId': int(profile_id),
+                'countryCode': country_code,
+                'currencyCode': currency_code,
+                'dailyBudget': 1000.0,
+                'timezone': timezone,
+                'accountInfo': {'marketplaceStringId': 'ATVPDKIKX0DER',
+                                'id': 'A{}'.format(profile_id),
+                                'type': 'seller'}}
+        return str(profile_id)
+
+    def add(self, profile_id, collection, entities):
+        """
+        Creates entities as a POST would. Returns them with their ids.
+
+        :param collection: A key of COLLECTIONS, e.g. 'sp/keywords'.
+        :raises KeyError: ``collection`` is not emulated.
+        """
+        if collection not in COLLECTIONS:
+            raise KeyError('Collection {} not found.'.format(collection))
+        with self._lock:
+            return [self._create(str(profile_id), collection, entity)
+                    for entity in entities]
+
+    def remove(self, profile_id, collection, ids):
+        """
+        Deletes entities outright, so listings no longer return them. The
+        change history records a DELETED event for each.
+        """
+        with self._lock:
+            store = self._store(str(profile_id), collection)
+            for entity_id in ids:
+                if store.pop(entity_id, None) is not None:
+                    self._event(str(profile_id), collection, entity_id,
+                                'DELETED')
+
+    def entities(self, profile_id, collection):
+        """The entities of a collection, in creation order."""
+        with self._lock:
+            return list(self._store(str(profile_id), collection).values())
+
+    def populate(self, profiles=1, campaigns=10, ad_groups=10, keywords=20,
+                 product_ads=2, targets=0):
+        """
+        Fills the emulator with generated accounts: per profile
+        ``campaigns`` campaigns, per campaign ``ad_groups`` ad groups, and
+        per ad group ``keywords`` keywords, ``product_ads`` ads and
+        ``targets`` product targets. Returns the new profile ids.
+        """
+        ids = []
+        with self._lock:
+            for _ in range(profiles):
+                profile_id = self.add_profile()
+                ids.append(profile_id)
+                for c in range(campaigns):
+                    campaign = self._create(profile_id, 'sp/campaigns', {
+                        'name': 'Campaign {}'.format(c),
+                        'campaignType': 'sponsoredProducts',
+                        'targetingType': 'manual', 'state': 'enabled',
+                        'dailyBudget': 50.0, 'startDate': '20200101',
+                        'premiumBidAdjustment': False})
+                    for g in range(ad_groups):
+                        ad_group = self._create(profile_id, 'sp/adGroups', {
+                            'name': 'Ad group {}-{}'.format(c, g),
+                            'campaignId': campaign['campaignId'],
+                            'defaultBid': 0.75, 'state': 'enabled'})
+                        parents = {'campaignId': campaign['campaignId'],
+                                   'adGroupId': ad_group['adGroupId']}
+                        for k in range(keywords):
+                            self._create(profile_id, 'sp/keywords', dict(
+                                parents, keywordText='keyword {} {} {}'.format(
+                                    c, g, k),
+                                matchType=('exact', 'phrase', 'broad')[k % 3],
+                                state='enabled',
+                                bid=round(self.random.uniform(0.2, 2.0), 2)))
+                        for a in range(product_ads):
+                            self._create(profile_id, 'sp/productAds', dict(
+                                parents, sku='SKU-{}-{}-{}'.format(c, g, a),
+                                asin='B0{:08d}'.format(
+                                    self.random.randrange(10 ** 8)),
+                                state='enabled'))
+                        for t in range(targets):
+                            self._create(profile_id, 'sp/targets', dict(
+                                parents, expressionType='manual',
+                                expression=[{'type': 'asinSameAs',
+                                             'value': 'B1{:08d}'.format(
+                                                 self.random.randrange(
+                                                     10 ** 8))}],
+                                state='enabled',
+                                bid=round(self.random.uniform(0.2, 2.0), 2)))
+        return ids
+
+    @property
+    def stats(self):
+        """Requests served and requests throttled so far."""
+        with self._lock:
+            return {'requests': self.requests, 'throttled': self.throttled}
+
+    def asynchronous(self):
+        """A transport for AsyncAdvertisingApiV3 sharing this state."""
+        return AsyncAdapter(self)
+
+    # Transport.
+
+    def request(self, method, url, headers=None, body=None):
+        delay, response = self._exchange(method, url, headers, body)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def _exchange(self, method, url, headers=None, body=None):
+        """``(delay, Response)`` for a request."""
+        headers = headers or {}
+        parts = urlsplit(url)
+        with self._lock:
+            self.requests += 1
+            delay = self.latency
+            if self.jitter:
+                delay += self.random.uniform(0, self.jitter)
+            if parts.path == '/auth/o2/token':
+                return delay, self._token(body)
+            if parts.path.startswith('/_files/'):
+                payload = self._files.get(parts.path[len('/_files/'):])
+                if payload is None:
+                    return delay, _error(404, 'NOT_FOUND', 'No such file.')
+                return delay, _response(200, body=payload)
+            if self.require_auth:
+                authorization = _header(headers, 'Authorization') or ''
+                if authorization[len('Bearer '):] not in self._tokens:
+                    return delay, _error(401, 'UNAUTHORIZED',
+                                         'Not authorized.')
+            interface = _VERSION.sub('', parts.path)
+            profile_id = _header(headers, 'Amazon-Advertising-API-Scope')
+            throttled = self._throttle(profile_id, interface)
+            if throttled is not None:
+                self.throttled += 1
+                return delay, throttled
+            data = None
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    return delay, _error(400, 'INVALID_ARGUMENT',
+                                         'Body is not JSON.')
+            query = dict(parse_qsl(parts.query))
+            return delay, self._route(method, interface, query, data,
+                                      profile_id, parts.netloc)
+
+    def _throttle(self, profile_id, interface):
+        if self.throttle_rate and self.random.random() < self.throttle_rate:
+            return self._throttled(1.0)
+        if self.rate is None:
+            return None
+        key = (profile_id, endpoint_family(interface))
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets[key] = (tokens, now)
+            return self._throttled((1.0 - tokens) / self.rate)
+        self._buckets[key] = (tokens - 1.0, now)
+        return None
+
+    @staticmethod
+    def _throttled(retry_after):
+        return _response(429, {'code': 'THROTTLED',
+                               'details': 'Request was throttled.'},
+                         [('Retry-After', '{:.3f}'.format(retry_after))])
+
+    def _token(self, body):
+        grant = dict(parse_qsl((body or b'').decode('utf-8')))
+        if grant.get('grant_type') != 'refresh_token' or \
+                not grant.get('refresh_token'):
+            return _response(400, {'error': 'invalid_request'})
+        token = 'Atza|emulated-{}'.format(next(self._ids))
+        self._tokens.add(token)
+        return _response(200, {'access_token': token,
+                               'refresh_token': grant['refresh_token'],
+                               'token_type': 'bearer',
+                               'expires_in': 3600})
+
+    # Routing.
+
+    def _route(self, method, interface, query, data, profile_id, host):
+        if interface == 'profiles':
+            if method == 'GET':
+                return _response(200, list(self._profiles.values()))
+            return _response(207, [
+                {'code': 'SUCCESS', 'profileId': item.get('profileId')}
+                for item in data or []])
+        if interface.startswith('profiles/'):
+            profile = self._profiles.get(interface[len('profiles/'):])
+            if profile is None:
+                return _error(404, 'NOT_FOUND', 'Profile not found.')
+            return _response(200, profile)
+        if profile_id is None or str(profile_id) not in self._profiles:
+            return _error(400, 'INVALID_ARGUMENT',
+                          'Unknown Amazon-Advertising-API-Scope.')
+        profile_id = str(profile_id)
+        if interface == 'history' and method == 'POST':
+            return self._history(profile_id, data or {})
+        if method == 'POST' and interface in ('sp/keywords/bidRecommendations',
+                                              'sp/targets/bidRecommendations'):
+            return self._bid_recommendations(data or {})
+        match = _BID_RECOMMENDATIONS.match(interface)
+        if match and method == 'GET':
+            return self._entity_bid_recommendation(profile_id, *match.groups())
+        match = _RECORD_REQUEST.match(interface)
+        if match and method == 'POST':
+            return self._request_record(profile_id, match.group(1),
+                                        match.group(2), data or {})
+        match = _RECORD_STATUS.match(interface)
+        if match and method == 'GET':
+            return self._record_status(profile_id, match.group(2),
+                                       match.group(3), host)
+        match = _ENTITY.match(interface)
+        if match and match.group(1) in COLLECTIONS:
+            collection, extended, entity_id = match.groups()
+            return self._entity_call(method, profile_id, collection,
+                                     bool(extended), entity_id, query, data)
+        return _error(404, 'NOT_FOUND',
+                      '{} {} is not emulated.'.format(method, interface))
+
+    def _store(self, profile_id, collection):
+        key = (profile_id, collection)
+        store = self._entities.get(key)
+        if store is None:
+            store = self._entities[key] = OrderedDict()
+        return store
+
+    def _event(self, profile_id, collection, entity_id, change_type):
+        entity_type = COLLECTIONS[collection][1]
+        if entity_type is not None:
+            self._events.append({'profileId': profile_id,
+                                 'entityType': entity_type,
+                                 'entityId': entity_id,
+                                 'changeType': change_type,
+                                 'timestamp': _now_ms()})
+
+    def _create(self, profile_id, collection, entity):
+        id_field = COLLECTIONS[collection][0]
+        now = _now_ms()
+        entity = dict(entity)
+        entity[id_field] = next(self._ids)
+        entity.setdefault('state', 'enabled')
+        entity.update(creationDate=now, lastUpdatedDate=now,
+                      servingStatus='ELIGIBLE')
+        self._store(profile_id, collection)[entity[id_field]] = entity
+        self._event(profile_id, collection, entity[id_field], 'CREATED')
+        return entity
+
+    def _entity_call(self, method, profile_id, collection, extended,
+                     entity_id, query, data):
+        id_field = COLLECTIONS[collection][0]
+        store = self._store(profile_id, collection)
+        if entity_id is not None:
+            try:
+                entity = store.get(int(entity_id))
+            except ValueError:
+                entity = None
+            if entity is None:
+                return _error(404, 'NOT_FOUND', 'Entity not found.')
+            if method == 'GET':
+                return _response(200, _view(entity, extended))
+            if method == 'DELETE':
+                entity['state'] = 'archived'
+                entity['lastUpdatedDate'] = _now_ms()
+                self._event(profile_id, collection, entity[id_field],
+                            'ARCHIVED')
+                return _response(200, {'code': 'SUCCESS',
+                                       id_field: entity[id_field]})
+        elif method == 'GET':
+            return _response(200, self._list(store, extended, query))
+        elif method == 'POST':
+            return _response(207, [
+                {'code': 'SUCCESS',
+                 id_field: self._create(profile_id, collection,
+                                        item)[id_field]}
+                for item in data or []])
+        elif method == 'PUT':
+            return _response(207, [
+                self._update(profile_id, collection, store, item)
+                for item in data or []])
+        return _error(400, 'INVALID_ARGUMENT',
+                      '{} is not supported here.'.format(method))
+
+    def _update(self, profile_id, collection, store, item):
+        id_field = COLLECTIONS[collection][0]
+        entity = store.get(item.get(id_field))
+        if entity is None:
+            return {'code': 'NOT_FOUND', id_field: item.get(id_field),
+                    'description': 'Entity not found.'}
+        entity.update((key, value) for key, value in item.items()
+                      if key not in EXTENDED_FIELDS)
+        entity['lastUpdatedDate'] = _now_ms()
+        self._event(profile_id, collection, entity[id_field], 'UPDATED')
+        return {'code': 'SUCCESS', id_field: entity[id_field]}
+
+    @staticmethod
+    def _list(store, extended, query):
+        filters = []
+        for key, value in query.items():
+            if key == 'stateFilter':
+                filters.append(('state', set(value.split(','))))
+            elif key.endswith('IdFilter'):
+                filters.append((key[:-len('Filter')], set(value.split(','))))
+        start = int(query.get('startIndex', 0))
+        count = int(query.get('count', len(store)))
+        entities = [entity for entity in store.values()
+                    if all(str(entity.get(field)) in values
+                           for field, values in filters)]
+        return [_view(entity, extended)
+                for entity in entities[start:start + count]]
+
+    def _history(self, profile_id, data):
+        since = data.get('fromDate', 0)
+        until = data.get('toDate', _now_ms())
+        event_types = data.get('eventTypes') or {}
+        events = [event for event in self._events
+                  if event['profileId'] == profile_id and
+                  since <= event['timestamp'] <= until and
+                  (not event_types or event['entityType'] in event_types)]
+        if (data.get('sort') or {}).get('direction') == 'DESC':
+            events.reverse()
+        offset = data.get('pageOffset', 0)
+        page = events[offset:offset + data.get('count', 200)]
+        return _response(200, {
+            'events': [dict((key, value) for key, value in event.items()
+                            if key != 'profileId') for event in page],
+            'totalRecords': len(events)})
+
+    def _bid(self, key):
+        rng = random.Random('{}:{}'.format(self.seed, key))
+        suggested = round(rng.uniform(0.3, 3.0), 2)
+        return {'rangeStart': round(suggested * 0.6, 2),
+                'rangeEnd': round(suggested * 1.5, 2),
+                'suggested': suggested}
+
+    def _bid_recommendations(self, data):
+        recommendations = []
+        for keyword in data.get('keywords') or []:
+            recommendations.append({
+                'code': 'SUCCESS',
+                'keyword': keyword.get('keyword'),
+                'matchType': keyword.get('matchType'),
+                'suggestedBid': self._bid('{}|{}'.format(
+                    keyword.get('keyword'), keyword.get('matchType')))})
+        for expression in data.get('expressions') or []:
+            recommendations.append({
+                'code': 'SUCCESS',
+                'expression': expression,
+                'suggestedBid': self._bid(json.dumps(expression,
+                                                     sort_keys=True))})
+        return _response(207, {'adGroupId': data.get('adGroupId'),
+                               'recommendations': recommendations})
+
+    def _entity_bid_recommendation(self, profile_id, kind, entity_id):
+        collection = 'sp/' + kind
+        id_field = COLLECTIONS[collection][0]
+        if int(entity_id) not in self._store(profile_id, collection):
+            return _error(404, 'NOT_FOUND', 'Entity not found.')
+        return _response(200, {id_field: int(entity_id),
+                               'suggestedBid': self._bid(entity_id)})
+
+    def _request_record(self, profile_id, record_type, kind, data):
+        key = 'reportId' if kind == 'report' else 'snapshotId'
+        record_id = 'emulated.{}.{}'.format(kind, next(self._ids))
+        self._records[record_id] = {'profile_id': profile_id,
+                                    'kind': kind,
+                                    'record_type': record_type,
+                                    'data': data,
+                                    'polls': 0}
+        return _response(202, {key: record_id,
+                               'recordType': record_type,
+                               'status': 'IN_PROGRESS',
+                               'statusDetails': '{} is being generated.'
+                               .format(kind.capitalize())})
+
+    def _record_status(self, profile_id, record_id, download, host):
+        record = self._records.get(record_id)
+        if record is None or record['profile_id'] != profile_id:
+            return _error(404, 'NOT_FOUND', 'Record not found.')
+        key = 'reportId' if record['kind'] == 'report' else 'snapshotId'
+        if download:
+            if record_id not in self._files:
+                return _error(404, 'NOT_FOUND', 'Record is not finished.')
+            return _response(307, headers=[
+                ('Location', 'https://{}/_files/{}'.format(host, record_id))])
+        record['polls'] += 1
+        if record['polls'] <= self.report_polls:
+            return _response(200, {key: record_id, 'status': 'IN_PROGRESS',
+                                   'statusDetails': 'Still generating.'})
+        if record_id not in self._files:
+            if record['kind'] == 'report':
+                rows = self._report_rows(record)
+            else:
+                rows = self._snapshot_rows(record)
+            self._files[record_id] = gzip.compress(
+                json.dumps(rows).encode('utf-8'))
+        return _response(200, {
+            key: record_id, 'status': 'SUCCESS',
+            'statusDetails': '{} has been successfully generated.'.format(
+                record['kind'].capitalize()),
+            'location': 'https://{}/v2/{}s/{}/download'.format(
+                host, record['kind'], record_id),
+            'fileSize': len(self._files[record_id])})
+
+    def _snapshot_rows(self, record):
+        collection = 'sp/' + record['record_type']
+        if collection not in COLLECTIONS:
+            return []
+        states = record['data'].get('stateFilter')
+        states = set(states.split(',')) if states else None
+        return [_view(entity, False) for entity
+                in self._store(record['profile_id'], collection).values()
+                if states is None or entity.get('state') in states]
+
+    def _report_rows(self, record):
+        collection = 'sp/' + record['record_type']
+        if collection not in COLLECTIONS:
+            return []
+        id_field = COLLECTIONS[collection][0]
+        metrics = record['data'].get('metrics') or \
+            'impressions,clicks,cost,attributedConversions14d,' \
+            'attributedSales14d'
+        if isinstance(metrics, str):
+            metrics = metrics.split(',')
+        rng = random.Random('{}:{}:{}'.format(
+            self.seed, record['record_type'],
+            record['data'].get('reportDate')))
+        rows = []
+        for entity in self._store(record['profile_id'],
+                                  collection).values():
+            if entity.get('state') == 'archived':
+                continue
+            row = dict((field, entity[field]) for field in _PARENT_FIELDS
+                       if field in entity)
+            row[id_field] = entity[id_field]
+            row.update(_metrics(rng, metrics, entity))
+            rows.append(row)
+        return rows
+
+
+def _view(entity, extended):
+    if extended:
+        return dict(entity)
+    return dict((key, value) for key, value in entity.items()
+                if key not in EXTENDED_FIELDS)
+
+
+def _metrics(rng, names, entity):
+    impressions = rng.randrange(0, 5000)
+    clicks = rng.randrange(0, impressions // 20 + 1)
+    conversions = rng.randrange(0, clicks // 5 + 1)
+    values = {}
+    for name in names:
+        name = name.strip()
+        if name in entity:
+            values[name] = entity[name]
+        elif name.startswith('impressions'):
+            values[name] = impressions
+        elif name.startswith('clicks'):
+            values[name] = clicks
+        elif name.startswith('cost'):
+            values[name] = round(clicks * rng.uniform(0.2, 2.0), 2)
+        elif name.startswith(('attributedConversions',
+                              'attributedUnitsOrdered')):
+            values[name] = conversions
+        elif name.startswith('attributedSales'):
+            values[name] = round(conversions * rng.uniform(10.0, 40.0), 2)
+        elif name:
+            values[name] = None
+    return values
+
+
+class AsyncAdapter(object):
+    """
+    asyncio face of an in-process transport (:class:`Emulator`,
+    recording.ReplayTransport): requests are answered from the shared state
+    and injected latency is awaited rather than slept.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def request(self, method, url, headers=None, body=None):
+        delay, response = self.transport._exchange(method, url, headers, body)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    async def stream(self, method, url, headers=None, body=None):
+        response = await self.request(method, url, headers, body)
+        return AsyncBufferedResponse(response)
+
+    async def close(self):
+        pass
+
+
+class AsyncBufferedResponse(object):
+    """A fully read Response behind the async streaming interface."""
+
+    def __init__(self, response):
+        self.code = response.code
+        self.reason = response.reason
+        self.headers = response.headers
+        self.event = None
+        self._body = response.body
+        self._closed = False
+
+    ok = Response.ok
+    header = Response.header
+
+    async def iter_content(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        body = self._body
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            if self.event is not None:
+                self.event.bytes_received += len(chunk)
+            yield chunk
+        self.close()
+
+    async def read(self):
+        return b''.join([chunk async for chunk in self.iter_content()])
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self.event is not None:
+                self.event.finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,1132 @@
+"""
+Declarative endpoint tables for the API clients.
+
+Each :class:`Endpoint` describes one API operation. :func:`bind` turns a table
+into client methods when the class is created: the interface template of every
+endpoint is compiled once into a plain string-concatenation expression, so
+calls do no template parsing or ``str.format`` work.
+
+The same tables drive the asyncio client, bulk dispatch and pagination.
+"""
+from string import Formatter
+
+from amazon_advertising_api.pagination import DEFAULT_PAGE_SIZE
+
+
+class Endpoint(object):
+    """
+    One API operation.
+
+    :param name: Name of the generated client method.
+    :type name: string
+    :param method: HTTP method.
+    :type method: string
+    :param path: Interface template. Each ``{field}`` becomes a method
+        argument; ``{extended}`` becomes an ``extended=False`` flag that
+        inserts ``/extended`` into the interface.
+    :type path: string
+    :param data: 'required' or 'optional' when the method takes a ``data``
+        argument, passed as query parameters for GET and as the JSON body
+        otherwise.
+    :type data: string
+    :param body: ``(key, argument)`` pairs of a JSON body built from method
+        arguments.
+    :type body: tuple
+    :param defaults: Default values for path fields.
+    :type defaults: dictionary
+    :param version: API version prefix, or None for unversioned interfaces.
+    :type version: string
+    :param batch_limit: Maximum number of entities the list payload of a
+        single call may hold.
+    :type batch_limit: integer
+    :param paginated: The endpoint pages its results with
+        ``startIndex``/``count``. An ``iter_*`` method walking every page is
+        generated next to it.
+    :type paginated: boolean
+    :param ignored: Arguments the method accepts but does not use, kept so
+        existing calls still work, e.g. ``('extended=False',)``.
+    :type ignored: tuple
+    """
+
+    __slots__ = ('name', 'method', 'path', 'data', 'body', 'defaults',
+                 'version', 'batch_limit', 'paginated', 'ignored', 'fields',
+                 'extended')
+
+    def __init__(self, name, method, path, data=None, body=(), defaults=None,
+                 version='v2', batch_limit=None, paginated=False, ignored=()):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.body = body
+        self.defaults = defaults or {}
+        self.version = version
+        self.batch_limit = batch_limit
+        self.paginated = paginated
+        self.ignored = ignored
+        self.fields = tuple(field for _, field, _, _ in Formatter().parse(path)
+                            if field)
+        self.extended = 'extended' in self.fields
+
+    def __repr__(self):
+        return 'Endpoint({!r}, {!r}, {!r})'.format(
+            self.name, self.method, self.path)
+
+    @property
+    def params(self):
+        """Argument list of the generated method, without ``self``."""
+        params = [f for f in self.fields
+                  if f != 'extended' and f not in self.defaults]
+        if self.data == 'required':
+            params.append('data')
+        elif self.data == 'optional':
+            params.append('data=None')
+        params.extend(arg for _, arg in self.body)
+        if self.extended:
+            params.append('extended=False')
+        params.extend('{}={!r}'.format(f, self.defaults[f])
+                      for f in self.fields if f in self.defaults)
+        params.extend(self.ignored)
+        return params
+
+    @property
+    def batch_argument(self):
+        """
+        Name of the argument holding the list payload ``batch_limit``
+        applies to: ``data``, or the last body argument.
+        """
+        if self.data:
+            return 'data'
+        if self.body:
+            return self.body[-1][1]
+        return None
+
+    @property
+    def iter_name(self):
+        """Name of the generated page-walking method, e.g. iter_campaigns."""
+        if self.name.startswith('list_'):
+            return 'iter_' + self.name[len('list_'):]
+        return 'iter_' + self.name
+
+    def interface(self, **kwargs):
+        """Renders the interface for the given path field values."""
+        values = dict(self.defaults, **kwargs)
+        if self.extended:
+            values['extended'] = '/extended' if values.get('extended') else ''
+        return self.path.format(**values)
+
+
+def _interface_source(path):
+    parts = []
+    for literal, field, _, _ in Formatter().parse(path):
+        if literal:
+            parts.append(repr(literal))
+        if field == 'extended':
+            parts.append("('/extended' if extended else '')")
+        elif field:
+            parts.append('str({})'.format(field))
+    return ' + '.join(parts)
+
+
+def _method_source(index, endpoint, asynchronous):
+    if endpoint.body:
+        data = '{{{}}}'.format(', '.join(
+            '{!r}: {}'.format(key, arg) for key, arg in endpoint.body))
+    elif endpoint.data:
+        data = 'data'
+    else:
+        data = 'None'
+    call = 'self._call(_endpoints[{}], {}, {})'.format(
+        index, _interface_source(endpoint.path), data)
+    if asynchronous:
+        source = 'async def {}({}):\n    return await {}\n'.format(
+            endpoint.name, ', '.join(['self'] + endpoint.params), call)
+    else:
+        source = 'def {}({}):\n    return {}\n'.format(
+            endpoint.name, ', '.join(['self'] + endpoint.params), call)
+    if endpoint.paginated:
+        # Returns a generator (async generator for asynchronous clients), so
+        # it is a plain function either way.
+        source += ('def {}({}, page_size=None, prefetch=False):\n'
+                   '    return self._paginate(_endpoints[{}], {}, data, '
+                   'page_size, prefetch)\n').format(
+            endpoint.iter_name, ', '.join(['self'] + endpoint.params), index,
+            _interface_source(endpoint.path))
+    return source
+
+
+_ITER_DOC = """
+        Iterates over every entity :meth:`{name}` returns, one page at a
+        time.
+
+        Takes the arguments of :meth:`{name}`; ``startIndex`` and ``count``
+        in ``data`` are managed by the iterator.
+
+        :param page_size: Entities requested per page. Defaults to
+            {page_size}.
+        :type page_size: integer
+        :param prefetch: Fetch the next page in the background while the
+            current one is consumed.
+        :type prefetch: boolean
+        :returns: Generator of parsed entities (an async generator on
+            asynchronous clients). Raises **ApiError** when a page request
+            fails.
+        """
+
+
+def bind(endpoints, docs=None, asynchronous=False):
+    """
+    Class decorator adding one method per endpoint.
+
+    Generated methods call ``self._call(endpoint, interface, data)``;
+    the ``iter_*`` methods of paginated endpoints call
+    ``self._paginate(endpoint, interface, data, page_size, prefetch)``. The
+    table is also stored on the class as ``endpoints``, keyed by method name.
+
+    :param endpoints: The endpoint table.
+    :type endpoints: List of **Endpoint**
+    :param docs: Docstrings keyed by method name.
+    :type docs: dictionary
+    :param asynchronous: Generate coroutine methods.
+    :type asynchronous: boolean
+    """
+    def decorate(cls):
+        namespace = {'_endpoints': endpoints}
+        source = '\n'.join(_method_source(i, endpoint, asynchronous)
+                           for i, endpoint in enumerate(endpoints))
+        exec(compile(source, '<{} endpoints>'.format(cls.__name__), 'exec'),
+             namespace)
+        for endpoint in endpoints:
+            names = [(endpoint.name, (docs or {}).get(endpoint.name))]
+            if endpoint.paginated:
+                names.append((endpoint.iter_name, _ITER_DOC.format(
+                    name=endpoint.name, page_size=DEFAULT_PAGE_SIZE)))
+            for name, doc in names:
+                if name in vars(cls):
+                    raise TypeError('{}.{} is defined by hand and in the '
+                                    'endpoint table.'.format(cls.__name__,
+                                                             name))
+                method = namespace[name]
+                method.__module__ = cls.__module__
+                method.__qualname__ = '{}.{}'.format(cls.__qualname__, name)
+                method.__doc__ = doc
+                setattr(cls, name, method)
+        cls.endpoints = dict((e.name, e) for e in endpoints)
+        return cls
+    return decorate
+
+
+ADVERTISING_API_ENDPOINTS = [
+    Endpoint('register_profile', 'PUT', 'profiles/register', body=(('countryCode', 'country_code'),)),
+    Endpoint('get_profiles', 'GET', 'profiles'),
+    Endpoint('get_profile', 'GET', 'profiles/{profile_id}'),
+    Endpoint('update_profiles', 'PUT', 'profiles', data='required', batch_limit=100),
+    Endpoint('list_portfolios', 'GET', 'portfolios', data='optional'),
+    Endpoint('get_portfolio', 'GET', 'portfolios/{portfolio_id}'),
+    Endpoint('create_portfolios', 'POST', 'portfolios', data='required', batch_limit=100),
+    Endpoint('update_portfolios', 'PUT', 'portfolios', data='required', batch_limit=100),
+    Endpoint('get_campaign', 'GET', '{campaign_type}/campaigns/{campaign_id}', defaults={'campaign_type': 'sp'}),
+    Endpoint('get_campaign_ex', 'GET', '{campaign_type}/campaigns/extended/{campaign_id}', defaults={'campaign_type': 'sp'}),
+    Endpoint('create_campaigns', 'POST', 'campaigns', data='required', batch_limit=100),
+    Endpoint('update_campaigns', 'PUT', 'campaigns', data='required', batch_limit=100),
+    Endpoint('update_campaigns_sb', 'PUT', 'sb/campaigns', data='required', version=None, batch_limit=100),
+    Endpoint('archive_campaign', 'DELETE', 'campaigns/{campaign_id}'),
+    Endpoint('list_campaigns', 'GET', '{campaign_type}/campaigns', data='optional', defaults={'campaign_type': 'sp'}, paginated=True),
+    Endpoint('list_campaigns_ex', 'GET', '{campaign_type}/campaigns/extended', data='optional', defaults={'campaign_type': 'sp'}, paginated=True),
+    Endpoint('get_ad_group', 'GET', 'sp/adGroups/{ad_group_id}'),
+    Endpoint('get_ad_group_ex', 'GET', 'sp/adGroups/extended/{ad_group_id}'),
+    Endpoint('create_ad_groups', 'POST', 'adGroups', data='required', batch_limit=100),
+    Endpoint('update_ad_groups', 'PUT', 'adGroups', data='required', batch_limit=100),
+    Endpoint('archive_ad_group', 'DELETE', 'adGroups/{ad_group_id}'),
+    Endpoint('list_ad_groups', 'GET', 'sp/adGroups', data='optional', paginated=True),
+    Endpoint('list_ad_groups_ex', 'GET', 'sp/adGroups/extended', data='optional', paginated=True),
+    Endpoint('get_target', 'GET', 'sp/targets/{target_id}'),
+    Endpoint('get_target_ex', 'GET', 'sp/targets/extended/{target_id}'),
+    Endpoint('create_targets', 'POST', 'sp/targets', data='required', batch_limit=100),
+    Endpoint('update_targets', 'PUT', 'sp/targets', data='required', batch_limit=100),
+    Endpoint('archive_target', 'DELETE', 'sp/targets/{target_id}'),
+    Endpoint('list_targets', 'GET', 'sp/targets', data='optional', paginated=True),
+    Endpoint('list_target_brands', 'GET', 'sp/targets/brands', data='optional'),
+    Endpoint('list_target_categories', 'GET', 'sp/targets/categories', data='optional'),
+    Endpoint('refine_target_categories', 'GET', 'sp/targets/categories/refinements', data='optional'),
+    Endpoint('list_target_product_recommendations', 'POST', 'sp/targets/productRecommendations', data='optional'),
+    Endpoint('list_targets_ex', 'GET', 'sp/targets/extended', data='optional', paginated=True),
+    Endpoint('get_negative_target', 'GET', 'sp/negativeTargets/{target_id}'),
+    Endpoint('get_negative_target_ex', 'GET', 'sp/negativeTargets/extended/{target_id}'),
+    Endpoint('create_negative_targets', 'POST', 'negativeTargets', data='required', batch_limit=100),
+    Endpoint('update_negative_targets', 'PUT', 'negativeTargets', data='required', batch_limit=100),
+    Endpoint('archive_negative_target', 'DELETE', 'negativeTargets/{target_id}'),
+    Endpoint('list_negative_targets', 'GET', 'sp/negativeTargets', data='optional', paginated=True),
+    Endpoint('list_negative_targets_ex', 'GET', 'sp/negativeTargets/extended', data='optional', paginated=True),
+    Endpoint('create_search_terms', 'POST', 'sp/targets/report', data='required'),
+    Endpoint('create_search_terms_old', 'POST', 'sp/keywords/report', data='required'),
+    Endpoint('get_biddable_keyword', 'GET', '{campaign_type}/keywords/{keyword_id}', defaults={'campaign_type': 'sp'}),
+    Endpoint('get_biddable_keyword_ex', 'GET', 'sp/keywords/extended/{keyword_id}'),
+    Endpoint('create_biddable_keywords', 'POST', 'keywords', data='required', batch_limit=1000),
+    Endpoint('update_biddable_keywords', 'PUT', 'keywords', data='required', batch_limit=1000),
+    Endpoint('update_biddable_keywords_sb', 'PUT', 'sb/keywords', data='required', version=None, batch_limit=1000),
+    Endpoint('archive_biddable_keyword', 'DELETE', 'keywords/{keyword_id}'),
+    Endpoint('list_biddable_keywords', 'GET', 'sp/keywords', data='optional', paginated=True),
+    Endpoint('list_biddable_keywords_ex', 'GET', 'sp/keywords/extended', data='optional', paginated=True),
+    Endpoint('get_negative_keyword', 'GET', 'sp/negativeKeywords/{negative_keyword_id}'),
+    Endpoint('get_negative_keyword_ex', 'GET', 'sp/negativeKeywords/extended/{negative_keyword_id}'),
+    Endpoint('create_negative_keywords', 'POST', 'negativeKeywords', data='required', batch_limit=1000),
+    Endpoint('update_negative_keywords', 'PUT', 'negativeKeywords', data='required', batch_limit=1000),
+    Endpoint('archive_negative_keyword', 'DELETE', 'negativeKeywords/{negative_keyword_id}'),
+    Endpoint('list_negative_keywords', 'GET', 'sp/negativeKeywords', data='optional', paginated=True),
+    Endpoint('list_negative_keywords_ex', 'GET', 'sp/negativeKeywords/extended', data='optional', paginated=True),
+    Endpoint('get_campaign_negative_keyword', 'GET', 'sp/campaignNegativeKeywords/{campaign_negative_keyword_id}'),
+    Endpoint('get_campaign_negative_keyword_ex', 'GET', 'sp/campaignNegativeKeywords/extended/{campaign_negative_keyword_id}'),
+    Endpoint('create_campaign_negative_keywords', 'POST', 'campaignNegativeKeywords', data='required', batch_limit=1000),
+    Endpoint('update_campaign_negative_keywords', 'PUT', 'campaignNegativeKeywords', data='required', batch_limit=1000),
+    Endpoint('remove_campaign_negative_keyword', 'DELETE', 'campaignNegativeKeywords/{campaign_negative_keyword_id}'),
+    Endpoint('list_campaign_negative_keywords', 'GET', 'sp/campaignNegativeKeywords', data='optional', paginated=True),
+    Endpoint('list_campaign_negative_keywords_ex', 'GET', 'sp/campaignNegativeKeywords/extended', data='optional', paginated=True),
+    Endpoint('get_product_ad', 'GET', 'sp/productAds/{product_ad_id}'),
+    Endpoint('get_product_ad_ex', 'GET', 'sp/productAds/extended/{product_ad_id}'),
+    Endpoint('create_product_ads', 'POST', 'productAds', data='required', batch_limit=100),
+    Endpoint('update_product_ads', 'PUT', 'productAds', data='required', batch_limit=100),
+    Endpoint('list_product_ads', 'GET', 'sp/productAds', data='optional', paginated=True),
+    Endpoint('list_product_ads_ex', 'GET', 'sp/productAds/extended', data='optional', paginated=True),
+    Endpoint('get_ad_group_bid_recommendations', 'GET', 'adGroups/{ad_group_id}/bidRecommendations'),
+    Endpoint('get_keyword_bid_recommendations', 'POST', 'keywords/bidRecommendations', body=(('adGroupId', 'ad_group_id'), ('keywords', 'keywords')), batch_limit=100),
+    Endpoint('get_sb_keyword_bid_recommendations', 'POST', 'recommendations/bids', body=(('campaignId', 'campaign_id'), ('keywords', 'keywords'))),
+    Endpoint('get_sb_target_bid_recommendations', 'POST', 'recommendations/bids', body=(('campaignId', 'campaign_id'), ('targets', 'keywords'))),
+    Endpoint('get_bid_recommendations', 'POST', 'targets/bidRecommendations', body=(('adGroupId', 'ad_group_id'), ('expressions', 'expressions')), batch_limit=100),
+]
+
+ADVERTISING_API_DOCS = {
+    'register_profile': """
+        Registers a sandbox profile.
+
+        :PUT: /profiles/register
+        :param country_code: The country in which to register the profile.
+                             Country code can be one of the following:
+                             US, CA, UK, DE, FR, ES, IT, IN, CN, JP
+        :returns:
+           :200: Success
+           :401: Unauthorized
+        """,
+    'get_profiles': """
+        Retrieves profiles associated with an auth token.
+
+        :GET: /profiles
+        :returns:
+            :200: Success
+            :401: Unauthorized
+        """,
+    'get_profile': """
+        Retrieves a single profile by Id.
+
+        :GET: /profiles/{profileId}
+        :param profile_id: The Id of the requested profile.
+        :type profile_id: string
+        :returns:
+            :200: List of **Profile**
+            :401: Unauthorized
+            :404: Profile not found
+        """,
+    'update_profiles': """
+        Updates one or more profiles. Advertisers are identified using their
+        profileIds.
+
+        :PUT: /profiles
+        :param data: A list of updates containing **profileId** and the
+            mutable fields to be modified. Only daily budgets are mutable at
+            this time.
+        :type data: List of **Profile**
+        :returns:
+            :207: List of **ProfileResponse** reflecting the same order as the
+                input
+            :401: Unauthorized
+        """,
+    'get_campaign': """
+        Retrieves a campaign by Id. Note that this call returns the minimal
+        set of campaign fields, but is more efficient than **getCampaignEx**.
+
+        :GET: {campaignType}/campaigns/{campaignId}
+        :param campaign_id: The Id of the requested campaign.
+        :type campaign_id: string
+        :param campaign_type: The campaignType of the requested campaign ('sp' or 'hsa')
+          Defaults to 'sp'
+        :type campaign_type: string
+        :returns:
+            :200: Campaign
+            :401: Unauthorized
+            :404: Campaign not found
+        """,
+    'get_campaign_ex': """
+        Retrieves a campaign and its extended fields by ID. Note that this
+        call returns the complete set of campaign fields (including serving
+        status and other read-only fields), but is less efficient than
+        **getCampaign**.
+
+        :GET: {campaignType}/campaigns/extended/{campaignId}
+        :param campaign_id: The Id of the requested campaign.
+        :type campaign_id: string
+        :param campaign_type: The campaignType of the requested campaign ('sp' or 'hsa')
+          Defaults to 'sp'
+        :type campaign_type: string
+        :returns:
+            :200: Campaign
+            :401: Unauthorized
+            :404: Campaign not found
+        """,
+    'create_campaigns': """
+        Creates one or more campaigns. Successfully created campaigns will be
+        assigned unique **campaignIds**.
+
+        :POST: /campaigns
+        :param data: A list of up to 100 campaigns to be created.  Required
+            fields for campaign creation are **name**, **campaignType**,
+            **targetingType**, **state**, **dailyBudget** and **startDate**.
+        :type data: List of **Campaign**
+        :returns:
+            :207: List of **CampaignResponse** reflecting the same order as the
+                input.
+            :401: Unauthorized
+        """,
+    'update_campaigns': """
+        Updates one or more campaigns.  Campaigns are identified using their
+        **campaignIds**.
+
+        :PUT: /campaigns
+        :param data: A list of up to 100 updates containing **campaignIds** and
+            the mutable fields to be modified. Mutable fields are **name**,
+            **state**, **dailyBudget**, **startDate**, and **endDate**.
+        :type data: List of **Campaign**
+        :returns:
+            :207: List of **CampaignResponse** reflecting the same order as the
+                input
+            :401: Unauthorized
+        """,
+    'archive_campaign': """
+        Sets the campaign status to archived. This same operation can be
+        performed via an update, but is included for completeness.
+
+        :DELETE: /campaigns/{campaignId}
+        :param campaign_id: The Id of the campaign to be archived.
+        :type campaign_id: string
+        :returns:
+            :200: Success, campaign response
+            :401: Unauthorized
+            :404: Campaign not found
+        """,
+    'list_campaigns': """
+        Retrieves a list of campaigns satisfying optional criteria.
+
+        :GET: /{campaignType}/campaigns
+        :param campaign_type: The campaignType to retrieve campaigns for ('sp' or 'hsa')
+          Defaults to 'sp'
+        :type campaign_type: string
+        :param data: Optional, search criteria containing the following
+            parameters.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result set.
+            Defaults to 0.
+        :type startIndex: Integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: Integer
+        :param campaignType: Restricts results to campaigns of a single
+            campaign type. Must be **sponsoredProducts**.
+        :type campaignType: String
+        :param stateFilter: Restricts results to campaigns with state within
+            the specified comma-separatedlist. Must be one of **enabled**,
+            **paused**, **archived**. Default behavior is to include all.
+        :param name: Restricts results to campaigns with the specified name.
+        :type name: String
+        :param campaignFilterId: Restricts results to campaigns specified in
+            comma-separated list.
+        :type campaignFilterId: String
+        :returns:
+            :200: Success. list of campaign
+            :401: Unauthorized
+        """,
+    'list_campaigns_ex': """
+        Retrieves a list of campaigns with extended fields satisfying
+        optional filtering criteria.
+
+        :GET: /{campaignType}/campaigns/extended
+        :param campaign_type: campaignType of the requested campaigns ('sp' or 'hsa')
+          Defaults to 'sp'
+        :type campaign_type: string
+        :param data: Optional, search criteria containing the following
+            parameters.
+        :type data: JSON string
+        """,
+    'get_ad_group': """
+        Retrieves an ad group by Id. Note that this call returns the minimal
+        set of ad group fields, but is more efficient than getAdGroupEx.
+
+        :GET: /sp/adGroups/{adGroupId}
+        :param ad_group_id: The Id of the requested ad group.
+        :type ad_group_id: string
+
+        :returns:
+            :200: Success, AdGroup response
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'get_ad_group_ex': """
+        Retrieves an ad group and its extended fields by ID. Note that this
+        call returns the complete set of ad group fields (including serving
+        status and other read-only fields), but is less efficient than
+        getAdGroup.
+
+        :GET: /sp/adGroups/extended/{adGroupId}
+        :param ad_group_id: The Id of the requested ad group.
+        :type ad_group_id: string
+
+        :returns:
+            :200: Success, AdGroup response
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'create_ad_groups': """
+        Creates one or more ad groups. Successfully created ad groups will
+        be assigned unique adGroupIds.
+
+        :POST: /adGroups
+        :param data: A list of up to 100 ad groups to be created. Required
+            fields for ad group creation are campaignId, name, state and
+            defaultBid.
+        :type data: List of **AdGroup**
+
+        :returns:
+            :207: Multi-status. List of AdGroupResponse reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'update_ad_groups': """
+        Updates one or more ad groups. Ad groups are identified using their
+        adGroupIds.
+
+        :PUT: /adGroups
+        :param data: A list of up to 100 updates containing adGroupIds and the
+            mutable fields to be modified.
+        :type data: List of **AdGroup**
+
+        :returns:
+            :207: Multi-status. List of AdGroupResponse reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'archive_ad_group': """
+        Sets the ad group status to archived. This same operation can be
+        performed via an update, but is included for completeness.
+
+        :DELETE: /adGroup/{adGroupId}
+        :param ad_group_id: The Id of the ad group to be archived.
+        :type ad_group_id: string
+
+        :returns:
+            :200: Success. AdGroupResponse
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'list_ad_groups': """
+        Retrieves a list of ad groups satisfying optional criteria.
+
+        :GET: /sp/adGroups
+        :param data: Parameter list of criteria.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result
+            set. Defaults to 0.
+        :type startIndex: integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: integer
+        :param campaignType: Restricts results to ad groups belonging to
+            campaigns of the specified type. Must be sponsoredProducts
+        :type campaignType: string
+        :param campaignIdFilter: Restricts results to ad groups within
+            campaigns specified in comma-separated list.
+        :type campaignIdFilter: string
+        :param adGroupIdFilter: Restricts results to ad groups specified in
+            comma-separated list.
+        :type adGroupIdFilter: string
+        :param stateFilter: Restricts results to keywords with state within the
+            specified comma-separatedlist. Must be one of enabled, paused,
+            archived.  Default behavior is to include all.
+        :type stateFilter: string
+        :param name: Restricts results to ad groups with the specified name.
+        :type name: string
+
+        :returns:
+            :200: Success. List of adGroup.
+            :401: Unauthorized.
+        """,
+    'list_ad_groups_ex': """
+        Retrieves a list of ad groups satisfying optional criteria.
+
+        :GET: /sp/adGroups/extended
+        :param data: Parameter list of criteria.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result
+            set. Defaults to 0.
+        :type startIndex: integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: integer
+        :param campaignType: Restricts results to ad groups belonging to
+            campaigns of the specified type. Must be sponsoredProducts
+        :type campaignType: string
+        :param campaignIdFilter: Restricts results to ad groups within
+            campaigns specified in comma-separated list.
+        :type campaignIdFilter: string
+        :param adGroupIdFilter: Restricts results to ad groups specified in
+            comma-separated list.
+        :type adGroupIdFilter: string
+        :param stateFilter: Restricts results to keywords with state within the
+            specified comma-separatedlist. Must be one of enabled, paused,
+            archived.  Default behavior is to include all.
+        :type stateFilter: string
+        :param name: Restricts results to ad groups with the specified name.
+        :type name: string
+
+        :returns:
+            :200: Success. List of adGroup.
+            :401: Unauthorized.
+        """,
+    'get_target': """
+        Retrieves a target by Id. Note that this call returns the minimal
+        set of fields, but is more efficient than getTargetEx.
+
+        :GET: /sp/targets/{targetId}
+        :param target_id: The Id of the requested target.
+        :type target_id: string
+
+        :returns:
+            :200: Success, Target response
+            :401: Unauthorized
+            :404: Target not found
+        """,
+    'get_target_ex': """
+        Retrieves a target and its extended fields by ID. Note that this
+        call returns the complete set of target fields (including serving
+        status and other read-only fields), but is less efficient than
+        getTarget.
+
+        :GET: /sp/targets/extended/{target_id}
+        :param target_id: The Id of the requested target.
+        :type target_id: string
+
+        :returns:
+            :200: Success, Target response
+            :401: Unauthorized
+            :404: Target not found
+        """,
+    'create_targets': """
+        Creates one or more ad groups. Successfully created ad groups will
+        be assigned unique adGroupIds.
+
+        :POST: /targets
+        :param data: A list of up to 100 targets to be created.
+        :type data: List of **Target**
+
+        :returns:
+            :207: Multi-status. List of AdGroupResponse reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'update_targets': """
+        Updates one or more targets. Targets are identified using their
+        targetId.
+
+        :PUT: /targets
+        :param data: A list of up to 100 updates containing targetIds and the
+            mutable fields to be modified.
+        :type data: List of **Target**
+
+        :returns:
+            :207: Multi-status. List of Targets reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'archive_target': """
+        Sets the ad group status to archived. This same operation can be
+        performed via an update, but is included for completeness.
+
+        :DELETE: /targets/{targetId}
+        :param target_id: The Id of the ad group to be archived.
+        :type target_id: string
+
+        :returns:
+            :200: Success. TargetResponse
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'list_targets_ex': """
+        Retrieves a list of targets satisfying optional criteria.
+
+        :GET: /sp/targets/extended
+        :param data: Parameter list of criteria.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result
+            set. Defaults to 0.
+        :type startIndex: integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: integer
+        :param expressionTypeFilter: Restricts results to targets
+            with expression types within the specified comma-separated list.
+            Possible filter types are: auto and manual
+        :type expressionTypeFilter: string
+        :param expressionTextFilter: Content of the targeting expression
+        :type expressionTextFilter: string
+        :param campaignIdFilter: Restricts results to ad groups within
+            campaigns specified in comma-separated list.
+        :type campaignIdFilter: string
+        :param adGroupIdFilter: Restricts results to ad groups specified in
+            comma-separated list.
+        :type adGroupIdFilter: string
+        :param stateFilter: Restricts results to targets with state within the
+            specified comma-separatedlist. Must be one of enabled, paused,
+            archived.  Default behavior is to include all.
+        :type stateFilter: string
+        :returns:
+            :200: Success. List of Targets.
+            :401: Unauthorized.
+        """,
+    'get_negative_target': """
+        Retrieves an ad group by Id. Note that this call returns the minimal
+        set of ad group fields, but is more efficient than getAdGroupEx.
+
+        :GET: /sp/negativeTargets/{targetId}
+        :param target_id: The Id of the requested ad group.
+        :type target_id: string
+
+        :returns:
+            :200: Success, Target response
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'get_negative_target_ex': """
+        Retrieves a target and its extended fields by ID. Note that this
+        call returns the complete set of target fields (including serving
+        status and other read-only fields), but is less efficient than
+        getTarget.
+
+        :GET: /sp/negativeTargets/extended/{adGroupId}
+        :param target_id: The Id of the requested target.
+        :type target_id: string
+
+        :returns:
+            :200: Success, Target response
+            :401: Unauthorized
+            :404: Target not found
+        """,
+    'create_negative_targets': """
+        Creates one or more ad groups. Successfully created ad groups will
+        be assigned unique adGroupIds.
+
+        :POST: /negativeTargets
+        :param data: A list of up to 100 negativeTargets to be created.
+        :type data: List of **Target**
+
+        :returns:
+            :207: Multi-status. List of AdGroupResponse reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'update_negative_targets': """
+        Updates one or more negativeTargets. negativeTargets are identified using their
+        targetId.
+
+        :PUT: /negativeTargets
+        :param data: A list of up to 100 updates containing targetIds and the
+            mutable fields to be modified.
+        :type data: List of **Target**
+
+        :returns:
+            :207: Multi-status. List of negativeTargets reflecting the same
+                order as the input
+            :401: Unauthorized
+        """,
+    'archive_negative_target': """
+        Sets the ad group status to archived. This same operation can be
+        performed via an update, but is included for completeness.
+
+        :DELETE: /negativeTargets/{targetId}
+        :param target_id: The Id of the ad group to be archived.
+        :type target_id: string
+
+        :returns:
+            :200: Success. TargetResponse
+            :401: Unauthorized
+            :404: Ad group not found
+        """,
+    'list_negative_targets': """
+        Retrieves a list of negativeTargets satisfying optional criteria.
+
+        :GET: /sp/negativeTargets
+        :param data: Parameter list of criteria.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result
+            set. Defaults to 0.
+        :type startIndex: integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: integer
+        :param expressionTypeFilter: Restricts results to negativeTargets
+            with expression types within the specified comma-separated list.
+            Possible filter types are: auto and manual
+        :type expressionTypeFilter: string
+        :param expressionTextFilter: Content of the targeting expression
+        :type expressionTextFilter: string
+        :param campaignIdFilter: Restricts results to ad groups within
+            campaigns specified in comma-separated list.
+        :type campaignIdFilter: string
+        :param adGroupIdFilter: Restricts results to ad groups specified in
+            comma-separated list.
+        :type adGroupIdFilter: string
+        :param stateFilter: Restricts results to negativeTargets with state within the
+            specified comma-separatedlist. Must be one of enabled, paused,
+            archived.  Default behavior is to include all.
+        :type stateFilter: string
+        :returns:
+            :200: Success. List of negativeTargets.
+            :401: Unauthorized.
+        """,
+    'list_negative_targets_ex': """
+        Retrieves a list of negativeTargets satisfying optional criteria.
+
+        :GET: /sp/negativeTargets/extended
+        :param data: Parameter list of criteria.
+
+        data may contain the following optional parameters:
+
+        :param startIndex: 0-indexed record offset for the result
+            set. Defaults to 0.
+        :type startIndex: integer
+        :param count: Number of records to include in the paged response.
+            Defaults to max page size.
+        :type count: integer
+        :param expressionTypeFilter: Restricts results to negativeTargets
+            with expression types within the specified comma-separated list.
+            Possible filter types are: auto and manual
+        :type expressionTypeFilter: string
+        :param expressionTextFilter: Content of the targeting expression
+        :type expressionTextFilter: string
+        :param campaignIdFilter: Restricts results to ad groups within
+            campaigns specified in comma-separated list.
+        :type campaignIdFilter: string
+        :param adGroupIdFilter: Restricts results to ad groups specified in
+            comma-separated list.
+        :type adGroupIdFilter: string
+        :param stateFilter: Restricts results to negativeTargets with state within the
+            specified comma-separatedlist. Must be one of enabled, paused,
+            archived.  Default behavior is to include all.
+        :type stateFilter: string
+        :returns:
+            :200: Success. List of negativeTargets.
+            :401: Unauthorized.
+        """,
+    'create_search_terms': """
+        Creates one search terms report.
+
+        :POST: /targets/report
+        :param data: keyword search terms report to be created.
+        :type data: dictionary
+
+        :returns:
+            :202: report response
+            :401: Unauthorized
+        """,
+    'create_search_terms_old': """
+        Creates one search terms report.
+
+        :POST: /keywords/report
+        :param data:  keyword search terms report to be created.
+        :type data: dictionary
+
+        :returns:
+            :202: report response
+            :401: Unauthorized
+        """,
+    'get_biddable_keyword': """
+        Retrieves a keyword by ID. Note that this call returns the minimal set
+        of keyword fields, but is more efficient than getBiddableKeywordEx.
+
+        :GET: /{campaignType}/keywords/{keywordId}
+        :param keyword_id: The Id of the requested keyword.
+        :type keyword_id: string
+        :param campaign_type: The campaignType for the requested keyword
+          Defaults to 'sp'
+        :type campaign_type: string
+
+        :returns:
+            :200: Success. Keyword.
+            :401: Unauthorized.
+            :404: Keyword not found.
+        """,
+    'get_biddable_keyword_ex': """
+        Retrieves a keyword and its extended fields by ID. Note that this call
+        returns the complete set of keyword fields (including serving status
+        and other read-only fields), but is less efficient than
+        getBiddableKeyword.
+
+        :GET: /keywords/extended/{keywordId}
+        :param keyword_id: The Id of the requested keyword.
+        :type keyword_id: string
+
+        :returns:
+            :200: Success. Keyword.
+            :401: Unauthorized.
+            :404: Keyword not found.
+        """,
+    'create_biddable_keywords': """
+        Creates one or more keywords. Successfully created keywords will be
+        assigned unique keywordIds.
+
+        :POST: /keywords
+        :param data: A list of up to 1000 keywords to be created. Required
+            fields for keyword creation are campaignId, adGroupId, keywordText,
+            matchType and state.
+        :type data: List of **Keyword**
+        """,
+    'get_ad_group_bid_recommendations': """
+        Request bid recommendations for specified ad group.
+        """,
+    'get_keyword_bid_recommendations': """
+        Request bid recommendations for:
+        * a list of up to 100 keywords
+
+        A list of keywords must be in the KeywordBidRecommendationsData format:
+
+        ```
+        int adGroupId: []
+        ```
+        """,
+    'get_bid_recommendations': """
+        Request bid recommendations for:
+        * a list of up to 100 targets
+        Keywords Example
+        {
+          "expressions": [
+            [
+              {
+                "type": "queryExactMatches",
+                "value": "oranges"
+              }
+            ]
+          ],
+          "adGroupId": 217706707887211
+        }
+
+        Auto Example
+        {
+          "expressions": [
+            [
+              {
+                "type": "queryBroadRelMatches",
+                "value": "apples"
+              }
+            ]
+          ],
+          "adGroupId": 163368712670649
+        }
+
+        {
+          "expressions": [
+            [
+              {
+                "type": "asinCategorySameAs",
+                "value": "166099011"
+              },
+              {
+                "type": "asinReviewRatingBetween",
+                "value": "4.5-5"
+              }
+            ]
+          ],
+          "adGroupId": 163368712670649
+        }
+        """,
+}
+
+ADVERTISING_API_V3_ENDPOINTS = [
+    # Profile management
+    Endpoint('register_profile', 'PUT', 'profiles/register', body=(('countryCode', 'country_code'),)),
+    Endpoint('list_profiles', 'GET', 'profiles'),
+    Endpoint('get_profile', 'GET', 'profiles/{profile_id}'),
+    Endpoint('update_profiles', 'PUT', 'profiles', data='required', batch_limit=100),
+
+    # Portfolio management
+    Endpoint('list_portfolios', 'GET', 'portfolios{extended}', data='optional'),
+    Endpoint('get_portfolio', 'GET', 'portfolios{extended}/{portfolio_id}'),
+    Endpoint('create_portfolios', 'POST', 'portfolios', data='required', batch_limit=100),
+    Endpoint('update_portfolios', 'PUT', 'portfolios', data='required', batch_limit=100),
+
+    # Change history
+    Endpoint('list_changes', 'POST', 'history', data='required', version=None),
+
+    # Product eligibility
+    Endpoint('list_eligibility', 'POST', 'eligibility/product/list', data='required', version=None),
+
+    # SP campaign management
+    Endpoint('get_campaign', 'GET', 'sp/campaigns{extended}/{campaign_id}'),
+    Endpoint('create_campaigns', 'POST', 'sp/campaigns', data='required', batch_limit=100),
+    Endpoint('update_campaigns', 'PUT', 'sp/campaigns', data='required', batch_limit=100),
+    Endpoint('archive_campaign', 'DELETE', 'sp/campaigns/{campaign_id}'),
+    Endpoint('list_campaigns', 'GET', 'sp/campaigns{extended}', data='optional', paginated=True),
+
+    # SP budget recommendations
+    Endpoint('list_budget_recommendations', 'POST', 'sp/campaigns/budgetRecommendations', data='required'),
+
+    # SP ad group management
+    Endpoint('get_ad_group', 'GET', 'sp/adGroups{extended}/{ad_group_id}'),
+    Endpoint('create_ad_groups', 'POST', 'sp/adGroups', data='required', batch_limit=100),
+    Endpoint('update_ad_groups', 'PUT', 'sp/adGroups', data='required', batch_limit=100),
+    Endpoint('archive_ad_group', 'DELETE', 'sp/adGroups/{ad_group_id}'),
+    Endpoint('list_ad_groups', 'GET', 'sp/adGroups{extended}', data='optional', paginated=True),
+
+    # SP product ad management
+    Endpoint('get_product_ad', 'GET', 'sp/productAds{extended}/{product_ad_id}'),
+    Endpoint('create_product_ads', 'POST', 'sp/productAds', data='required', batch_limit=100),
+    Endpoint('update_product_ads', 'PUT', 'sp/productAds', data='required', batch_limit=100),
+    Endpoint('archive_product_ad', 'DELETE', 'sp/productAds/{product_ad_id}', ignored=('extended=False',)),
+    Endpoint('list_product_ads', 'GET', 'sp/productAds{extended}', data='optional', paginated=True),
+
+    # SP keyword management
+    Endpoint('get_keyword', 'GET', 'sp/keywords{extended}/{keyword_id}'),
+    Endpoint('create_keywords', 'POST', 'sp/keywords', data='required', batch_limit=1000),
+    Endpoint('update_keywords', 'PUT', 'sp/keywords', data='required', batch_limit=1000),
+    Endpoint('archive_keyword', 'DELETE', 'sp/keywords/{keyword_id}'),
+    Endpoint('list_biddable_keywords', 'GET', 'sp/keywords{extended}', data='optional', paginated=True),
+
+    # SP suggested keywords
+    Endpoint('list_suggested_keywords_for_ad_group', 'GET', 'sp/adGroups/{ad_group_id}/suggested/keywords{extended}'),
+    Endpoint('list_suggested_keywords_for_asin', 'GET', 'sp/asins/{asin}/suggested/keywords'),
+    Endpoint('list_suggested_keywords_for_asins', 'POST', 'sp/asins/suggested/keywords', data='required'),
+
+    # SP keyword rank recommendations
+    Endpoint('list_keyword_rank_recommendations', 'POST', 'sp/targets/keywords/recommendation', data='required'),
+
+    # SP bid recommendations
+    Endpoint('list_bid_recommendations_for_ad_group', 'GET', 'sp/adGroups/{ad_group_id}/bidRecommendations'),
+    Endpoint('list_bid_recommendations_for_keyword', 'GET', 'sp/keywords/{keyword_id}/bidRecommendations'),
+    Endpoint('list_bid_recommendations_for_keywords', 'POST', 'sp/keywords/bidRecommendations', body=(('adGroupId', 'ad_group_id'), ('keywords', 'keywords')), batch_limit=100),
+    Endpoint('list_bid_recommendations_for_targets', 'POST', 'sp/targets/bidRecommendations', body=(('adGroupId', 'ad_group_id'), ('expressions', 'expressions')), batch_limit=100),
+
+    # SP negative keyword management
+    Endpoint('get_negative_keyword', 'GET', 'sp/negativeKeywords{extended}/{negative_keyword_id}'),
+    Endpoint('create_negative_keywords', 'POST', 'sp/negativeKeywords', data='required', batch_limit=1000),
+    Endpoint('update_negative_keywords', 'PUT', 'sp/negativeKeywords', data='required', batch_limit=1000),
+    Endpoint('archive_negative_keyword', 'DELETE', 'sp/negativeKeywords/{negative_keyword_id}'),
+    Endpoint('list_negative_keywords', 'GET', 'sp/negativeKeywords{extended}', data='optional', paginated=True),
+
+    # SP campaign negative keyword management
+    Endpoint('get_campaign_negative_keyword', 'GET', 'sp/campaignNegativeKeywords{extended}/{campaign_negative_keyword_id}'),
+    Endpoint('create_campaign_negative_keywords', 'POST', 'sp/campaignNegativeKeywords', data='required', batch_limit=1000),
+    Endpoint('update_campaign_negative_keywords', 'PUT', 'sp/campaignNegativeKeywords', data='required', batch_limit=1000),
+    Endpoint('remove_campaign_negative_keyword', 'DELETE', 'sp/campaignNegativeKeywords/{campaign_negative_keyword_id}'),
+    Endpoint('list_campaign_negative_keywords', 'GET', 'sp/campaignNegativeKeywords{extended}', data='optional', paginated=True),
+
+    # SP target management
+    Endpoint('get_target', 'GET', 'sp/targets{extended}/{target_id}'),
+    Endpoint('create_targets', 'POST', 'sp/targets', data='required', batch_limit=100),
+    Endpoint('update_targets', 'PUT', 'sp/targets', data='required', batch_limit=100),
+    Endpoint('archive_target', 'DELETE', 'sp/targets/{target_id}'),
+    Endpoint('list_targets', 'GET', 'sp/targets{extended}', data='optional', paginated=True),
+    Endpoint('list_target_brands', 'GET', 'sp/targets/brands', data='optional'),
+    Endpoint('list_target_categories', 'GET', 'sp/targets/categories', data='optional'),
+    Endpoint('refine_target_categories', 'GET', 'sp/targets/categories/refinements', data='optional'),
+    Endpoint('list_target_product_recommendations', 'POST', 'sp/targets/productRecommendations', data='optional'),
+
+    # SP negative target management
+    Endpoint('get_negative_target', 'GET', 'sp/negativeTargets{extended}/{target_id}'),
+    Endpoint('create_negative_targets', 'POST', 'sp/negativeTargets', data='required', batch_limit=100),
+    Endpoint('update_negative_targets', 'PUT', 'sp/negativeTargets', data='required', batch_limit=100),
+    Endpoint('archive_negative_target', 'DELETE', 'sp/negativeTargets/{target_id}'),
+    Endpoint('list_negative_targets', 'GET', 'sp/negativeTargets{extended}', data='optional', paginated=True),
+
+    # SB / to remove
+    Endpoint('get_sb_keyword_bid_recommendations', 'POST', 'recommendations/bids', body=(('campaignId', 'campaign_id'), ('keywords', 'keywords'))),
+    Endpoint('get_sb_target_bid_recommendations', 'POST', 'recommendations/bids', body=(('campaignId', 'campaign_id'), ('targets', 'keywords'))),
+    Endpoint('create_search_terms', 'POST', 'sp/targets/report', data='required'),
+    Endpoint('create_search_terms_old', 'POST', 'sp/keywords/report', data='required'),
+]
+
+ADVERTISING_API_V3_DOCS = {
+    'register_profile': """
+        Registers a sandbox profile.
+        """,
+    'create_campaigns': """
+        Creates one or more campaigns. Successfully created campaigns will be
+        assigned unique **campaignIds**.
+        :param data: A list of up to 100 campaigns to be created.  Required
+            fields for campaign creation are **name**, **campaignType**,
+            **targetingType**, **state**, **dailyBudget** and **startDate**.
+        """,
+    'update_campaigns': """
+        Updates one or more campaigns.
+        :param data: A list of up to 100 updates containing **campaignIds** and
+            the mutable fields to be modified. Mutable fields are **name**,
+            **state**, **dailyBudget**, **startDate**, and **endDate**.
+        """,
+    'archive_campaign': """
+        Sets the campaign status to archived. This same operation can be
+        performed via an update, but is included for completeness.
+        """,
+    'list_campaigns': """
+        Retrieves a list of campaigns satisfying optional criteria.
+        """,
+    'create_keywords': """
+        :param data: A list of up to 1000 keywords to be created. Required
+            fields for keyword creation are campaignId, adGroupId, keywordText,
+            matchType and state.
+        """,
+    'create_targets': """
+        :param data: A list of up to 100 targets to be created.
+        """,
+    'update_targets': """
+        :param data: A list of up to 100 updates containing targetIds and the
+            mutable fields to be modified.
+        """,
+    'list_target_brands': """
+        Recommended brands for targeting
+        """,
+    'list_target_categories': """
+        Recommended categories for targeting
+        """,
+    'refine_target_categories': """
+        Refinements for a single category
+        """,
+    'list_target_product_recommendations': """
+        Recommended products for targeting
+        """,
+    'create_search_terms': """
+        Creates one search terms report.
+
+        :POST: /targets/report
+        :param data: keyword search terms report to be created.
+        :type data: dictionary
+
+        :returns:
+            :202: report response
+            :401: Unauthorized
+        """,
+    'create_search_terms_old': """
+        Creates one search terms report.
+
+        :POST: /keywords/report
+        :param data:  keyword search terms report to be created.
+        :type data: dictionary
+
+        :returns:
+            :202: report response
+            :401: Unauthorized
+        """,
+}
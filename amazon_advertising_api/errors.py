@@ -0,0 +1,23 @@
+"""
+Exceptions raised by the client helpers.
+
+The endpoint methods themselves report failures in their result dictionary.
+Helpers that cannot return one, such as the pagination iterators, raise
+:class:`ApiError` carrying it instead.
+"""
+
+
+class ApiError(Exception):
+    """
+    A failed API call.
+
+    :param result: The failure dictionary of the call.
+    :type result: dictionary
+    """
+
+    def __init__(self, result):
+        super(ApiError, self).__init__(
+            '{}: {}'.format(result['code'], result['response']))
+        self.result = result
+        self.code = result['code']
+        self.response = result['response']
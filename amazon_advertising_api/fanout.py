@@ -0,0 +1,177 @@
+"""
+Running the same operations across many advertiser profiles.
+
+A client is bound to one profile. :func:`fan_out` makes a lightweight clone
+per profile (see ``for_profile``) sharing the connection pool, access token
+and rate limiter of the original, runs the operations with bounded global and
+per-profile concurrency, and yields a :class:`ProfileResult` for each as soon
+as it completes.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from amazon_advertising_api.bulk import _failure
+from amazon_advertising_api.concurrency import bound
+from amazon_advertising_api.models import decoded
+
+DEFAULT_FANOUT_WORKERS = 16
+DEFAULT_PROFILE_CONCURRENCY = 2
+
+
+class ProfileResult(object):
+    """
+    Outcome of one operation for one profile.
+
+    :ivar profile_id: The profile the operation ran for.
+    :ivar operation: The method name, or the callable, that was run.
+    :ivar result: Its result dictionary; a code 0 failure if it raised.
+    :ivar error: The exception it raised, if any.
+    """
+
+    __slots__ = ('profile_id', 'operation', 'result', 'error')
+
+    def __init__(self, profile_id, operation, result, error=None):
+        self.profile_id = profile_id
+        self.operation = operation
+        self.result = result
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None and bool(self.result.get('success'))
+
+    def __repr__(self):
+        return 'ProfileResult(profile_id={!r}, operation={!r}, ' \
+            'success={})'.format(self.profile_id, _name(self.operation),
+                                 self.success)
+
+
+def profile_ids(profiles):
+    """
+    Profile ids from a list of ids, a list of profile dictionaries, or the
+    result dictionary of ``list_profiles``/``get_profiles``.
+
+    :raises ValueError: The result dictionary is a failure.
+    """
+    if isinstance(profiles, dict):
+        if not profiles.get('success'):
+            raise ValueError('Cannot fan out over a failed profile listing: '
+                             '{}'.format(profiles.get('response')))
+        profiles = decoded(profiles)
+    ids = []
+    for profile in profiles:
+        if isinstance(profile, dict):
+            profile = profile['profileId']
+        ids.append(str(profile))
+    return ids
+
+
+def _name(operation):
+    return getattr(operation, '__name__', operation)
+
+
+def _operations(operations):
+    if isinstance(operations, (list, tuple)):
+        return list(operations)
+    return [operations]
+
+
+def _run(client, profile_id, operation, kwargs):
+    try:
+        return ProfileResult(profile_id, operation,
+                             bound(client, operation)(**kwargs))
+    except Exception as e:
+        return ProfileResult(profile_id, operation, _failure(e), e)
+
+
+def fan_out(client, profiles, operations,
+            max_workers=DEFAULT_FANOUT_WORKERS,
+            per_profile=DEFAULT_PROFILE_CONCURRENCY, **kwargs):
+    """
+    Runs ``operations`` for every profile, yielding results as they finish.
+
+    Work is spread breadth first: every profile gets its first operation
+    before any gets its second. At most ``max_workers`` operations run at
+    once, and at most ``per_profile`` of them for the same profile.
+
+    :param client: An AdvertisingApi or AdvertisingApiV3.
+    :param profiles: See :func:`profile_ids`.
+    :param operations: A method name such as 'list_campaigns', a callable
+        taking the profile's client, or a list of these.
+    :param max_workers: Operations in flight at once.
+    :type max_workers: integer
+    :param per_profile: Operations in flight at once for one profile.
+    :type per_profile: integer
+    :param kwargs: Arguments passed to every operation.
+    :returns: Generator of :class:`ProfileResult`, in completion order.
+    """
+    ids = profile_ids(profiles)
+    clients = dict((profile_id, client.for_profile(profile_id))
+                   for profile_id in ids)
+    waiting = deque((profile_id, operation)
+                    for operation in _operations(operations)
+                    for profile_id in ids)
+    running = dict.fromkeys(ids, 0)
+    per_profile = max(1, per_profile)
+    max_workers = max(1, max_workers)
+    futures = {}
+
+    def schedule(executor):
+        # One pass over the queue; tasks of busy profiles keep their place.
+        for _ in range(len(waiting)):
+            if len(futures) >= max_workers:
+                return
+            profile_id, operation = waiting.popleft()
+            if running[profile_id] >= per_profile:
+                waiting.append((profile_id, operation))
+                continue
+            running[profile_id] += 1
+            future = executor.submit(_run, clients[profile_id], profile_id,
+                                     operation, kwargs)
+            futures[future] = profile_id
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        schedule(executor)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                running[futures.pop(future)] -= 1
+            schedule(executor)
+            for future in done:
+                yield future.result()
+
+
+async def async_fan_out(client, profiles, operations,
+                        max_workers=DEFAULT_FANOUT_WORKERS,
+                        per_profile=DEFAULT_PROFILE_CONCURRENCY, **kwargs):
+    """
+    asyncio counterpart of :func:`fan_out`: an async generator of
+    :class:`ProfileResult`. Operations of unfinished profiles are cancelled
+    when the generator is closed early.
+    """
+    ids = profile_ids(profiles)
+    overall = asyncio.Semaphore(max(1, max_workers))
+    limits = dict((profile_id, asyncio.Semaphore(max(1, per_profile)))
+                  for profile_id in ids)
+
+    async def run(profile_client, profile_id, operation):
+        async with limits[profile_id], overall:
+            try:
+                result = await bound(profile_client, operation)(**kwargs)
+            except Exception as e:
+                return ProfileResult(profile_id, operation, _failure(e), e)
+            return ProfileResult(profile_id, operation, result)
+
+    clients = dict((profile_id, client.for_profile(profile_id))
+                   for profile_id in ids)
+    tasks = [asyncio.ensure_future(run(clients[profile_id], profile_id,
+                                       operation))
+             for operation in _operations(operations)
+             for profile_id in ids]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
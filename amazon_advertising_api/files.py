@@ -0,0 +1,50 @@
+"""
+JSON files written atomically.
+
+Token caches, sync replicas and entity stores are written to a temporary file
+in the destination's directory and renamed over it, so a reader (possibly in
+another process) sees either the old file or the new one, never a partial
+write.
+"""
+import json
+import os
+import tempfile
+
+
+def write_json(path, data, mode=None):
+    """
+    Writes ``data`` as JSON to ``path``, atomically.
+
+    :param mode: Permission bits of the file, e.g. ``0o600``.
+    :type mode: integer
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.{}.'.format(name))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_replica(path):
+    """
+    The contents of a replica file: ``(watermarks, profiles)``, the
+    watermark of each profile id and its ``{collection: [entities]}``. Both
+    are empty if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path) as f:
+        state = json.load(f)
+    return state['watermarks'], state['profiles']
+
+
+def write_replica(path, watermarks, profiles):
+    """Writes a replica file, atomically; see :func:`read_replica`."""
+    write_json(path, {'watermarks': watermarks, 'profiles': profiles})
@@ -0,0 +1,518 @@
+"""
+Request instrumentation: hooks, latency histograms and byte counters.
+
+A client given ``hooks`` creates a :class:`RequestEvent` for every HTTP
+request it sends and passes it to the hooks before the request, after the
+response, on errors and before retries. While the request runs the event is
+the *current event*, and the transports and the download decoder add the
+time spent in each phase to it:
+
+``dns``, ``connect``, ``tls``
+    Opening a new connection (the async transport reports TLS as part of
+    ``connect``).
+``send``, ``server``
+    Writing the request, then waiting for the response headers.
+``read``
+    Reading the body.
+``decompress``, ``decode``
+    Gunzipping and parsing report and snapshot downloads. API responses are
+    decoded lazily, on first access, and are not timed.
+
+:class:`Metrics` keeps per-endpoint latency histograms and byte counters and
+exports them in the Prometheus text format; :class:`SpanRecorder` turns the
+events into OpenTelemetry-style span dictionaries. Clients without hooks
+skip all of this; the transports only look up the (empty) current event.
+"""
+from bisect import bisect_left
+from collections import deque
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+
+PHASES = ('dns', 'connect', 'tls', 'send', 'server', 'read', 'decompress',
+          'decode')
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+DEFAULT_MAX_SPANS = 10000
+
+_current = contextvars.ContextVar('amazon_advertising_api_event',
+                                  default=None)
+
+_ID_SEGMENT = re.compile(r'[^/]*\d[^/]*')
+
+
+def current_event():
+    """The :class:`RequestEvent` of the request in progress, or None."""
+    return _current.get()
+
+
+@functools.lru_cache(maxsize=1024)
+def endpoint_label(interface):
+    """
+    The interface with its ids replaced, so that all calls of an endpoint
+    share a label: 'sp/campaigns/123' becomes 'sp/campaigns/{id}'.
+    """
+    return _ID_SEGMENT.sub('{id}', interface.split('?', 1)[0])
+
+
+class Hooks(object):
+    """
+    Receives request events. Subclasses override the methods they need;
+    these are called on the thread (or task) making the request and should
+    return quickly.
+    """
+
+    def before_request(self, event):
+        pass
+
+    def after_response(self, event):
+        """The response arrived; for downloads, its body has been read."""
+        pass
+
+    def on_error(self, event, error):
+        """The request raised ``error`` and will not be retried."""
+        pass
+
+    def on_retry(self, event, delay):
+        """
+        The request ``event`` is sent again after ``delay`` seconds, because
+        it was throttled or its access token had to be refreshed.
+        """
+        pass
+
+
+class HookChain(Hooks):
+    """Calls several hooks in order."""
+
+    def __init__(self, hooks):
+        self.hooks = list(hooks)
+
+    def before_request(self, event):
+        for hooks in self.hooks:
+            hooks.before_request(event)
+
+    def after_response(self, event):
+        for hooks in self.hooks:
+            hooks.after_response(event)
+
+    def on_error(self, event, error):
+        for hooks in self.hooks:
+            hooks.on_error(event, error)
+
+    def on_retry(self, event, delay):
+        for hooks in self.hooks:
+            hooks.on_retry(event, delay)
+
+
+def as_hooks(hooks):
+    """A Hooks object from a Hooks object, a list of them, or None."""
+    if isinstance(hooks, (list, tuple)):
+        return HookChain(hooks) if hooks else None
+    return hooks
+
+
+class RequestEvent(object):
+    """
+    One HTTP request and its timings.
+
+    :ivar interface: API interface, e.g. 'sp/keywords', or 'download/file'.
+    :ivar method: HTTP method.
+    :ivar url: Request URL.
+    :ivar profile_id: The profile the client is bound to.
+    :ivar attempt: 0 for the first try, counting up on retries.
+    :ivar started: Start time, in epoch nanoseconds.
+    :ivar duration: Seconds from the start until the response was complete.
+    :ivar phases: Seconds spent in each phase, by phase name.
+    :ivar bytes_sent: Request body size.
+    :ivar bytes_received: Response body size.
+    :ivar code: HTTP status code, None until a response arrives.
+    :ivar error: The exception the request raised, if any.
+    """
+
+    __slots__ = ('interface', 'method', 'url', 'profile_id', 'attempt',
+                 'started', 'duration', 'phases', 'bytes_sent',
+                 'bytes_received', 'code', 'error', '_hooks', '_start')
+
+    def __init__(self, hooks, interface, method, url, profile_id=None,
+                 attempt=0, body=None):
+        self.interface = interface
+        self.method = method
+        self.url = url
+        self.profile_id = profile_id
+        self.attempt = attempt
+        self.started = time.time_ns()
+        self.duration = None
+        self.phases = {}
+        self.bytes_sent = len(body) if body else 0
+        self.bytes_received = 0
+        self.code = None
+        self.error = None
+        self._hooks = hooks
+        self._start = time.perf_counter()
+
+    @property
+    def endpoint(self):
+        return endpoint_label(self.interface)
+
+    @property
+    def finished(self):
+        return self.duration is not None
+
+    def add(self, phase, seconds):
+        """Adds ``seconds`` to a phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def finish(self, error=None):
+        """Ends the request and notifies the hooks; later calls are ignored."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error is None:
+            self._hooks.after_response(self)
+        else:
+            self.error = error
+            self._hooks.on_error(self, error)
+
+    def __repr__(self):
+        return 'RequestEvent({} {}, code={}, duration={})'.format(
+            self.method, self.interface, self.code, self.duration)
+
+
+def observed(hooks, event, send, request):
+    """
+    Sends ``request`` with ``send`` as the current event's request.
+
+    :returns: The transport's response; the event is finished unless the
+        response is a stream, whose event finishes once its body is read.
+    """
+    token = _current.set(event)
+    try:
+        hooks.before_request(event)
+        try:
+            response = send(*request)
+        except Exception as e:
+            event.finish(e)
+            raise
+    finally:
+        _current.reset(token)
+    _received(event, response)
+    return response
+
+
+async def async_observed(hooks, event, send, request):
+    """:func:`observed` for a coroutine ``send``."""
+    token = _current.set(event)
+    try:
+        hooks.before_request(event)
+        try:
+            response = await send(*request)
+        except Exception as e:
+            event.finish(e)
+            raise
+    finally:
+        _current.reset(token)
+    _received(event, response)
+    return response
+
+
+def _received(event, response):
+    event.code = response.code
+    body = getattr(response, 'body', None)
+    if body is not None:
+        event.bytes_received = len(body)
+        event.finish()
+    else:
+        response.event = event
+
+
+class Histogram(object):
+    """
+    Observation counts per bucket.
+
+    :ivar bounds: Bucket upper bounds, ascending.
+    :ivar counts: Observations per bucket, plus one for values above the
+        last bound.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """``(bound, count)`` pairs as Prometheus buckets, ending at +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics(Hooks):
+    """
+    Per-endpoint request counts, latency histograms and byte counters.
+
+    ::
+
+        metrics = Metrics()
+        api = AdvertisingApiV3(..., hooks=metrics)
+        ...
+        print(metrics.prometheus())
+
+    :param buckets: Histogram bucket upper bounds, in seconds.
+    :type buckets: tuple
+    :param phases: Keep a histogram per phase as well.
+    :type phases: boolean
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, phases=True):
+        self.buckets = tuple(buckets)
+        self.phases = phases
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.latency = {}
+        self.phase_latency = {}
+        self.bytes_sent = {}
+        self.bytes_received = {}
+        self._lock = threading.Lock()
+
+    def after_response(self, event):
+        endpoint = event.endpoint
+        key = (endpoint, event.method)
+        with self._lock:
+            code_key = key + (str(event.code),)
+            self.requests[code_key] = self.requests.get(code_key, 0) + 1
+            self._record(endpoint, key, event)
+
+    def on_error(self, event, error):
+        endpoint = event.endpoint
+        key = (endpoint, event.method)
+        with self._lock:
+            error_key = key + (type(error).__name__,)
+            self.errors[error_key] = self.errors.get(error_key, 0) + 1
+            self._record(endpoint, key, event)
+
+    def on_retry(self, event, delay):
+        endpoint = event.endpoint
+        with self._lock:
+            self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+
+    def _record(self, endpoint, key, event):
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.buckets)
+        histogram.observe(event.duration)
+        if self.phases:
+            for phase, seconds in event.phases.items():
+                phase_key = (endpoint, phase)
+                histogram = self.phase_latency.get(phase_key)
+                if histogram is None:
+                    histogram = self.phase_latency[phase_key] = Histogram(
+                        self.buckets)
+                histogram.observe(seconds)
+        self.bytes_sent[endpoint] = \
+            self.bytes_sent.get(endpoint, 0) + event.bytes_sent
+        self.bytes_received[endpoint] = \
+            self.bytes_received.get(endpoint, 0) + event.bytes_received
+
+    def reset(self):
+        with self._lock:
+            for counters in (self.requests, self.errors, self.retries,
+                             self.latency, self.phase_latency,
+                             self.bytes_sent, self.bytes_received):
+                counters.clear()
+
+    def summary(self):
+        """
+        Dictionary by endpoint of request, error and retry counts, bytes,
+        and the p50/p99 latency bucket bounds.
+        """
+        with self._lock:
+            result = {}
+
+            def entry(endpoint):
+                return result.setdefault(endpoint, {
+                    'requests': 0, 'errors': 0, 'retries': 0,
+                    'bytes_sent': self.bytes_sent.get(endpoint, 0),
+                    'bytes_received': self.bytes_received.get(endpoint, 0)})
+
+            for (endpoint, _, _), count in self.requests.items():
+                entry(endpoint)['requests'] += count
+            for (endpoint, _, _), count in self.errors.items():
+                entry(endpoint)['errors'] += count
+            for endpoint, count in self.retries.items():
+                entry(endpoint)['retries'] += count
+            for (endpoint, method), histogram in self.latency.items():
+                stats = entry(endpoint)
+                stats['p50'] = histogram.quantile(0.5)
+                stats['p99'] = histogram.quantile(0.99)
+            return result
+
+    def prometheus(self, prefix='amazon_ads'):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _counter(lines, prefix + '_requests_total',
+                     'API requests by endpoint, method and status code.',
+                     ('endpoint', 'method', 'code'), self.requests)
+            _counter(lines, prefix + '_request_errors_total',
+                     'API requests that raised, by exception type.',
+                     ('endpoint', 'method', 'error'), self.errors)
+            _counter(lines, prefix + '_request_retries_total',
+                     'API requests retried after throttling or a 401.',
+                     ('endpoint',), self.retries)
+            _counter(lines, prefix + '_bytes_sent_total',
+                     'Request body bytes.', ('endpoint',), self.bytes_sent)
+            _counter(lines, prefix + '_bytes_received_total',
+                     'Response body bytes.', ('endpoint',),
+                     self.bytes_received)
+            _histogram(lines, prefix + '_request_duration_seconds',
+                       'API request latency.', ('endpoint', 'method'),
+                       self.latency)
+            if self.phases:
+                _histogram(lines, prefix + '_request_phase_seconds',
+                           'Time spent in each phase of a request.',
+                           ('endpoint', 'phase'), self.phase_latency)
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(names, values, extra=''):
+    pairs = ['{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                              .replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def _key(key):
+    return key if isinstance(key, tuple) else (key,)
+
+
+def _counter(lines, name, help_text, names, counters):
+    lines.append('# HELP {} {}'.format(name, help_text))
+    lines.append('# TYPE {} counter'.format(name))
+    for key, value in sorted(counters.items()):
+        lines.append('{}{} {}'.format(name, _labels(names, _key(key)), value))
+
+
+def _histogram(lines, name, help_text, names, histograms):
+    lines.append('# HELP {} {}'.format(name, help_text))
+    lines.append('# TYPE {} histogram'.format(name))
+    for key, histogram in sorted(histograms.items()):
+        values = _key(key)
+        for bound, total in histogram.cumulative():
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append('{}_bucket{} {}'.format(
+                name, _labels(names, values, 'le="{}"'.format(le)), total))
+        lines.append('{}_sum{} {}'.format(name, _labels(names, values),
+                                          repr(histogram.sum)))
+        lines.append('{}_count{} {}'.format(name, _labels(names, values),
+                                            histogram.count))
+
+
+class SpanRecorder(Hooks):
+    """
+    Turns finished requests into span dictionaries following the
+    OpenTelemetry data model: ``name``, ``context`` (trace and span ids),
+    ``kind``, ``start_time``/``end_time`` in epoch nanoseconds,
+    ``attributes`` with the HTTP semantic convention names, one event per
+    phase with its duration, and ``status``.
+
+    :param exporter: Called with each span; without one, the latest
+        ``max_spans`` spans are kept for :meth:`spans`.
+    :type exporter: callable
+    :param max_spans: Spans kept without an exporter.
+    :type max_spans: integer
+    """
+
+    def __init__(self, exporter=None, max_spans=DEFAULT_MAX_SPANS):
+        self.exporter = exporter
+        self._spans = deque(maxlen=max_spans)
+
+    def after_response(self, event):
+        self._export(event, None)
+
+    def on_error(self, event, error):
+        self._export(event, error)
+
+    def spans(self):
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def _export(self, event, error):
+        span = to_span(event, error)
+        if self.exporter is not None:
+            self.exporter(span)
+        else:
+            self._spans.append(span)
+
+
+def to_span(event, error=None):
+    """An OpenTelemetry-style span dictionary of a finished event."""
+    end_time = event.started + int(event.duration * 1e9)
+    attributes = {'http.request.method': event.method,
+                  'url.full': event.url,
+                  'http.request.body.size': event.bytes_sent,
+                  'http.response.body.size': event.bytes_received,
+                  'amazon_ads.endpoint': event.endpoint,
+                  'amazon_ads.attempt': event.attempt}
+    if event.profile_id is not None:
+        attributes['amazon_ads.profile_id'] = str(event.profile_id)
+    if event.code is not None:
+        attributes['http.response.status_code'] = event.code
+    if error is not None:
+        status = {'status_code': 'ERROR',
+                  'description': '{}: {}'.format(type(error).__name__, error)}
+        attributes['error.type'] = type(error).__name__
+    elif event.code is not None and event.code >= 400:
+        status = {'status_code': 'ERROR', 'description': str(event.code)}
+        attributes['error.type'] = str(event.code)
+    else:
+        status = {'status_code': 'UNSET', 'description': ''}
+    # Phases are timed in the order they happen.
+    events = []
+    offset = event.started
+    for phase in PHASES:
+        if phase in event.phases:
+            offset += int(event.phases[phase] * 1e9)
+            events.append({'name': phase,
+                           'timestamp': offset,
+                           'attributes': {'duration': event.phases[phase]}})
+    return {'name': '{} {}'.format(event.method, event.endpoint),
+            'context': {'trace_id': os.urandom(16).hex(),
+                        'span_id': os.urandom(8).hex()},
+            'kind': 'CLIENT',
+            'start_time': event.started,
+            'end_time': end_time,
+            'attributes': attributes,
+            'events': events,
+            'status': status}
@@ -0,0 +1,371 @@
+"""
+Response objects and compact entity records.
+
+API calls return an :class:`ApiResponse`: the familiar ``{'success', 'code',
+'response'}`` dictionary, with ``response`` still the undecoded body (made a
+string only when read), plus attributes that decode the bytes once, on first
+use, and wrap entities in
+:class:`Record` classes. Records keep their fields in ``__slots__`` and
+intern enumerated values such as ``state``, so a full account held as records
+takes a fraction of the memory of the equivalent dictionaries.
+"""
+import re
+import sys
+
+from amazon_advertising_api.codec import get_codec
+
+_UNSET = object()
+
+# Fields whose few distinct values are shared between records.
+_ENUM_FIELDS = frozenset((
+    'campaignType', 'targetingType', 'state', 'servingStatus', 'matchType',
+    'expressionType', 'countryCode', 'currencyCode', 'timezone'))
+
+
+def _snake(name):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+class Record(object):
+    """
+    An API entity with one slot per documented field.
+
+    Attributes are the snake_case field names (``campaign.campaign_id``);
+    item access takes the API names (``campaign['campaignId']``), so code
+    written against the decoded dictionaries keeps working. Fields the
+    record type does not know are kept in ``extra``.
+
+    :param data: The decoded entity.
+    :type data: dictionary
+    """
+
+    __slots__ = ('extra',)
+    fields = ()
+    _attributes = {}
+    _names = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super(Record, cls).__init_subclass__(**kwargs)
+        cls._attributes = dict(zip(cls.fields, map(_snake, cls.fields)))
+        cls._names = frozenset(cls._attributes.values())
+
+    def __init__(self, data):
+        extra = None
+        attributes = self._attributes
+        for name, value in data.items():
+            attribute = attributes.get(name)
+            if attribute is None:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+                continue
+            if name in _ENUM_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, attribute, value)
+        self.extra = extra
+
+    def __getattr__(self, name):
+        # Unset slots of documented fields read as None.
+        if name in self._names:
+            return None
+        raise AttributeError(name)
+
+    def __getitem__(self, name):
+        attribute = self._attributes.get(name)
+        if attribute is not None:
+            value = getattr(self, attribute)
+            if value is not None:
+                return value
+        elif self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """The entity as the API sent it."""
+        data = {}
+        for name, attribute in self._attributes.items():
+            value = getattr(self, attribute)
+            if value is not None:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+
+class Campaign(Record):
+    fields = ('campaignId', 'name', 'campaignType', 'targetingType', 'state',
+              'dailyBudget', 'startDate', 'endDate', 'premiumBidAdjustment',
+              'bidding', 'portfolioId', 'creationDate', 'lastUpdatedDate',
+              'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class AdGroup(Record):
+    fields = ('adGroupId', 'name', 'campaignId', 'defaultBid', 'state',
+              'creationDate', 'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class Keyword(Record):
+    fields = ('keywordId', 'campaignId', 'adGroupId', 'state', 'keywordText',
+              'matchType', 'bid', 'creationDate', 'lastUpdatedDate',
+              'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class NegativeKeyword(Record):
+    fields = ('keywordId', 'campaignId', 'adGroupId', 'state', 'keywordText',
+              'matchType', 'creationDate', 'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class CampaignNegativeKeyword(Record):
+    fields = ('keywordId', 'campaignId', 'state', 'keywordText', 'matchType',
+              'creationDate', 'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class ProductAd(Record):
+    fields = ('adId', 'campaignId', 'adGroupId', 'sku', 'asin', 'state',
+              'creationDate', 'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class Target(Record):
+    fields = ('targetId', 'campaignId', 'adGroupId', 'state', 'expression',
+              'resolvedExpression', 'expressionType', 'bid', 'creationDate',
+              'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class NegativeTarget(Record):
+    fields = ('targetId', 'campaignId', 'adGroupId', 'state', 'expression',
+              'resolvedExpression', 'expressionType', 'creationDate',
+              'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class Portfolio(Record):
+    fields = ('portfolioId', 'name', 'budget', 'inBudget', 'state',
+              'creationDate', 'lastUpdatedDate', 'servingStatus')
+    __slots__ = tuple(map(_snake, fields))
+
+
+class Profile(Record):
+    fields = ('profileId', 'countryCode', 'currencyCode', 'dailyBudget',
+              'timezone', 'accountInfo')
+    __slots__ = tuple(map(_snake, fields))
+
+
+# Record type by the resource segment of an entity interface.
+RECORD_TYPES = {
+    'campaigns': Campaign,
+    'adGroups': AdGroup,
+    'keywords': Keyword,
+    'negativeKeywords': NegativeKeyword,
+    'campaignNegativeKeywords': CampaignNegativeKeyword,
+    'productAds': ProductAd,
+    'targets': Target,
+    'negativeTargets': NegativeTarget,
+    'portfolios': Portfolio,
+    'profiles': Profile,
+}
+
+# Entity listings and single entities, e.g. 'sp/campaigns/extended/123';
+# not sub-resources such as 'sp/keywords/bidRecommendations'.
+_ENTITY_INTERFACE = re.compile(
+    r'^(?:(?:sp|sb|sd|hsa)/)?(\w+)(?:/extended)?(?:/\d+)?$')
+
+
+def record_type(interface):
+    """The Record class of the entities an interface returns, or None."""
+    if interface is None:
+        return None
+    match = _ENTITY_INTERFACE.match(interface.split('?', 1)[0])
+    if match is None:
+        return None
+    return RECORD_TYPES.get(match.group(1))
+
+
+def records(entities, record_class):
+    """
+    Wraps decoded entities, e.g. the rows of a snapshot, in ``record_class``.
+    Items that are not dictionaries are passed through.
+    """
+    return [record_class(entity) if isinstance(entity, dict) else entity
+            for entity in entities]
+
+
+def decoded(result):
+    """
+    The decoded response of a result dictionary, reusing the decoding of an
+    ApiResponse.
+    """
+    if isinstance(result, ApiResponse):
+        return result.data
+    response = result['response']
+    if isinstance(response, (str, bytes)):
+        return get_codec().loads(response)
+    return response
+
+
+class ApiResponse(dict):
+    """
+    Result of an API call: a ``{'success', 'code', 'response'}`` dictionary
+    whose ``response`` is the body as a string, as before.
+
+    :ivar interface: The interface that was called.
+    :param response: The body as a string, or None to have it decoded from
+        ``body`` only when it is read.
+    :param body: The undecoded body as bytes, if at hand; it is decoded
+        directly instead of going through ``response``.
+    """
+
+    __slots__ = ('interface', '_body', '_data', '_entities', '_lazy')
+
+    def __init__(self, success, code, response, interface=None, body=None):
+        lazy = response is None and body is not None
+        super(ApiResponse, self).__init__(success=success, code=code,
+                                          response=body if lazy else response)
+        self.interface = interface
+        self._body = body
+        self._data = _UNSET
+        self._entities = None
+        self._lazy = lazy
+
+    def _text(self):
+        """Stores ``response`` as a string the first time it is read."""
+        if self._lazy:
+            dict.__setitem__(self, 'response', self._body.decode('utf-8'))
+            self._lazy = False
+            if self._data is not _UNSET:
+                self._body = None
+
+    # Every read of the dictionary goes through _text. Overriding __iter__
+    # also makes dict(), ** and update() read the items through __getitem__.
+
+    def __getitem__(self, key):
+        self._text()
+        return dict.__getitem__(self, key)
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        self._text()
+        return dict.get(self, key, default)
+
+    def items(self):
+        self._text()
+        return dict.items(self)
+
+    def values(self):
+        self._text()
+        return dict.values(self)
+
+    def copy(self):
+        self._text()
+        return dict.copy(self)
+
+    def pop(self, *args):
+        self._text()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._text()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self._text()
+        return dict.setdefault(self, key, default)
+
+    def __eq__(self, other):
+        self._text()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self._text()
+        return dict.__ne__(self, other)
+
+    __hash__ = None
+
+    @property
+    def success(self):
+        return dict.__getitem__(self, 'success')
+
+    @property
+    def code(self):
+        return dict.__getitem__(self, 'code')
+
+    @property
+    def data(self):
+        """
+        The decoded body, decoded on first access only. None when it is not
+        JSON, e.g. for most failures.
+        """
+        if self._data is _UNSET:
+            if self._body is not None:
+                response = self._body
+            else:
+                response = dict.__getitem__(self, 'response')
+            if isinstance(response, (str, bytes)):
+                try:
+                    response = get_codec().loads(response)
+                except ValueError:
+                    response = None
+            self._data = response
+            if not self._lazy:
+                self._body = None
+        return self._data
+
+    @property
+    def entities(self):
+        """
+        The entities of the body as records when the interface has a record
+        type, as decoded dictionaries otherwise. Always a list.
+        """
+        if self._entities is None:
+            data = self.data
+            if data is None:
+                data = []
+            elif not isinstance(data, list):
+                data = [data]
+            record_class = record_type(self.interface) if self.success \
+                else None
+            if record_class is not None:
+                data = records(data, record_class)
+            self._entities = data
+        return self._entities
+
+    @property
+    def entity(self):
+        """The single entity of a get_* call, or None."""
+        entities = self.entities
+        return entities[0] if len(entities) == 1 else None
+
+    def __repr__(self):
+        self._text()
+        return 'ApiResponse({})'.format(dict.__repr__(self))
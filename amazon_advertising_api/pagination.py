@@ -0,0 +1,108 @@
+"""
+Iterators walking the ``startIndex``/``count`` pages of list endpoints.
+
+Only one page is held in memory at a time (two with ``prefetch``), so memory
+stays flat however many entities an account has.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from amazon_advertising_api.errors import ApiError
+from amazon_advertising_api.models import decoded
+
+# A page shorter than requested is taken as the last one, so the default stays
+# within the smallest maximum page size of the list endpoints.
+DEFAULT_PAGE_SIZE = 1000
+
+
+def page_params(data, start, count):
+    params = dict(data or {})
+    params['startIndex'] = start
+    params['count'] = count
+    return params
+
+
+def page_entities(result):
+    """Parsed entities of one page's result dictionary."""
+    if not result['success']:
+        raise ApiError(result)
+    return decoded(result)
+
+
+def paginate(call, data=None, page_size=None, prefetch=False):
+    """
+    Yields the entities of every page.
+
+    :param call: Function taking the query parameters of one page and
+        returning its result dictionary.
+    :param data: Query parameters shared by all pages.
+    :type data: dictionary
+    :param page_size: Entities requested per page.
+    :type page_size: integer
+    :param prefetch: Request the next page on a background thread while the
+        current one is consumed.
+    :type prefetch: boolean
+    """
+    count = page_size or DEFAULT_PAGE_SIZE
+    start = int((data or {}).get('startIndex', 0))
+    if not prefetch:
+        while True:
+            entities = page_entities(call(page_params(data, start, count)))
+            for entity in entities:
+                yield entity
+            if len(entities) < count:
+                return
+            start += len(entities)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(call, page_params(data, start, count))
+    try:
+        while True:
+            entities = page_entities(future.result())
+            future = None
+            if len(entities) >= count:
+                start += len(entities)
+                future = executor.submit(call, page_params(data, start, count))
+            for entity in entities:
+                yield entity
+            if future is None:
+                return
+    finally:
+        if future is not None:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def async_paginate(call, data=None, page_size=None, prefetch=False):
+    """
+    asyncio counterpart of :func:`paginate`. ``call`` returns an awaitable;
+    with ``prefetch`` the next page is requested as a task.
+    """
+    count = page_size or DEFAULT_PAGE_SIZE
+    start = int((data or {}).get('startIndex', 0))
+    if not prefetch:
+        while True:
+            entities = page_entities(
+                await call(page_params(data, start, count)))
+            for entity in entities:
+                yield entity
+            if len(entities) < count:
+                return
+            start += len(entities)
+
+    task = asyncio.ensure_future(call(page_params(data, start, count)))
+    try:
+        while True:
+            entities = page_entities(await task)
+            task = None
+            if len(entities) >= count:
+                start += len(entities)
+                task = asyncio.ensure_future(
+                    call(page_params(data, start, count)))
+            for entity in entities:
+                yield entity
+            if task is None:
+                return
+    finally:
+        if task is not None:
+            task.cancel()
@@ -0,0 +1,212 @@
+"""
+Diff-and-apply planning of entity updates.
+
+:class:`Planner` compares a desired configuration with the current state of
+the entities, taken from an EntityStore or read from the API, and keeps for
+each entity only the updatable fields that differ. The resulting
+:class:`Plan` is sent with ``client.bulk`` in as few update calls as the
+endpoint's batch limit allows; entities already in the desired state cost
+nothing.
+"""
+from amazon_advertising_api.bulk import batch_endpoint, chunked
+from amazon_advertising_api.sync import ALL_STATES, ENTITY_TYPES, ID_FILTER_SIZE
+
+# Bids and budgets closer than this are equal.
+AMOUNT_TOLERANCE = 1e-6
+
+# Update endpoint and updatable fields of each collection.
+UPDATES = {
+    'campaigns': ('update_campaigns',
+                  ('name', 'state', 'dailyBudget', 'startDate', 'endDate',
+                   'premiumBidAdjustment', 'bidding', 'portfolioId')),
+    'ad_groups': ('update_ad_groups', ('name', 'state', 'defaultBid')),
+    'product_ads': ('update_product_ads', ('state',)),
+    'keywords': ('update_keywords', ('state', 'bid')),
+    'negative_keywords': ('update_negative_keywords', ('state',)),
+    'targets': ('update_targets', ('state', 'bid')),
+}
+
+
+def _same(current, desired):
+    if isinstance(current, (int, float)) and \
+            isinstance(desired, (int, float)) and \
+            not isinstance(current, bool) and not isinstance(desired, bool):
+        return abs(current - desired) < AMOUNT_TOLERANCE
+    return current == desired
+
+
+def diff(current, desired, fields):
+    """
+    The fields of ``desired`` that differ from ``current``, or an empty
+    dictionary. Fields outside ``fields`` are ignored.
+    """
+    changes = {}
+    for field in fields:
+        if field not in desired:
+            continue
+        value = desired[field]
+        if current is None or not _same(current.get(field), value):
+            changes[field] = value
+    return changes
+
+
+class Plan(object):
+    """
+    Minimal updates for one collection.
+
+    :ivar name: The collection, e.g. 'keywords'.
+    :ivar endpoint: Update method name, e.g. 'update_keywords'.
+    :ivar updates: Update dictionaries: the id and the changed fields.
+    :ivar unchanged: Desired entities already in their desired state.
+    :ivar missing: Ids of desired entities not found in the current state.
+    :ivar batch_limit: Entities per update call.
+    """
+
+    __slots__ = ('name', 'endpoint', 'updates', 'unchanged', 'missing',
+                 'batch_limit')
+
+    def __init__(self, name, endpoint, batch_limit):
+        self.name = name
+        self.endpoint = endpoint
+        self.batch_limit = batch_limit
+        self.updates = []
+        self.unchanged = 0
+        self.missing = []
+
+    @property
+    def calls(self):
+        """Update calls the plan takes."""
+        return -(-len(self.updates) // self.batch_limit)
+
+    @property
+    def naive_calls(self):
+        """Update calls sending every desired entity would take."""
+        return -(-(len(self.updates) + self.unchanged) // self.batch_limit)
+
+    @property
+    def calls_avoided(self):
+        return self.naive_calls - self.calls
+
+    def __len__(self):
+        return len(self.updates)
+
+    def __repr__(self):
+        return ('Plan({!r}, updates={}, unchanged={}, missing={}, calls={}, '
+                'calls_avoided={})').format(
+            self.name, len(self.updates), self.unchanged, len(self.missing),
+            self.calls, self.calls_avoided)
+
+
+class Planner(object):
+    """
+    Plans and applies minimal updates through an AdvertisingApiV3.
+
+    ::
+
+        planner = Planner(api, store)
+        plan = planner.plan('keywords', [{'keywordId': 1, 'bid': 0.75},
+                                         {'keywordId': 2, 'state': 'paused'}])
+        result = planner.apply(plan)
+
+    :param client: An AdvertisingApiV3.
+    :param store: EntityStore (or sync replica) holding the current state.
+        Without one, the desired entities are read from the API by id.
+    """
+
+    def __init__(self, client, store=None):
+        self.client = client
+        self.store = store
+
+    def plan(self, name, desired):
+        """
+        Compares ``desired`` with the current entities.
+
+        :param name: Collection name, e.g. 'keywords'; see UPDATES.
+        :type name: string
+        :param desired: Dictionaries with the entity id and the fields to
+            set.
+        :type desired: iterable
+        :raises KeyError: ``name`` cannot be planned.
+        :raises ApiError: Reading the current state failed.
+        :returns: A :class:`Plan`.
+        """
+        if name not in UPDATES:
+            raise KeyError('Collection {} cannot be planned.'.format(name))
+        endpoint, fields = UPDATES[name]
+        entity_type = _entity_type(name)
+        id_field = entity_type.id_field
+        plan = Plan(name, endpoint,
+                    batch_endpoint(self.client, endpoint).batch_limit)
+        desired = list(desired)
+        current = self._current(entity_type,
+                                [entity[id_field] for entity in desired])
+        for entity in desired:
+            entity_id = entity[id_field]
+            existing = current.get(entity_id)
+            if existing is None:
+                plan.missing.append(entity_id)
+                continue
+            changes = diff(existing, entity, fields)
+            if changes:
+                update = {id_field: entity_id}
+                update.update(changes)
+                plan.updates.append(update)
+            else:
+                plan.unchanged += 1
+        return plan
+
+    def apply(self, plan, max_workers=None, refresh_store=True):
+        """
+        Sends the updates of ``plan`` in chunked, concurrent update calls.
+
+        :param refresh_store: Write the successful updates into the store.
+        :type refresh_store: boolean
+        :returns: The result dictionary of ``client.bulk``; a 207 with no
+            items when there is nothing to update.
+        """
+        if not plan.updates:
+            return {'success': True, 'code': 207, 'response': []}
+        kwargs = {}
+        if max_workers is not None:
+            kwargs['max_workers'] = max_workers
+        result = self.client.bulk(plan.endpoint, plan.updates, **kwargs)
+        if refresh_store and self.store is not None:
+            self._refresh(plan, result['response'])
+        return result
+
+    def _current(self, entity_type, ids):
+        if self.store is not None:
+            return self.store.entities(self.client.profile_id,
+                                       entity_type.name)
+        iterator = getattr(self.client, entity_type.iterator)
+        current = {}
+        for chunk in chunked(sorted(set(ids)), ID_FILTER_SIZE):
+            for entity in iterator({
+                    entity_type.id_filter: ','.join(map(str, chunk)),
+                    'stateFilter': ALL_STATES}, extended=True):
+                current[entity[entity_type.id_field]] = entity
+        return current
+
+    def _refresh(self, plan, items):
+        entity_type = _entity_type(plan.name)
+        id_field = entity_type.id_field
+        current = self.store.entities(self.client.profile_id, plan.name)
+        updated = []
+        for update, item in zip(plan.updates, items):
+            if item.get('code') != 'SUCCESS':
+                continue
+            entity = current.get(update[id_field])
+            if entity is None:
+                continue
+            if not isinstance(entity, dict):
+                entity = entity.to_dict()
+            updated.append(dict(entity, **update))
+        self.store.upsert(self.client.profile_id, plan.name, updated,
+                          id_field)
+
+
+def _entity_type(name):
+    for entity_type in ENTITY_TYPES:
+        if entity_type.name == name:
+            return entity_type
+    raise KeyError('Collection {} not found.'.format(name))
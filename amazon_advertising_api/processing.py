@@ -0,0 +1,190 @@
+"""
+Report post-processing in a pool of worker processes.
+
+Decompressing and parsing a large report is CPU-bound and, done in
+``get_report``, holds the GIL for the whole payload, so concurrent
+downloads end up parsing one at a time. A :class:`ReportProcessor` hands
+the compressed payload, as downloaded, to a process pool instead. Each
+worker decompresses it, parses the JSON, derives ratio metrics and returns
+the rows as columnar batches (see columnar.py), which travel back to the
+caller as narrowed numeric buffers and dictionary-encoded or UTF-8 text
+buffers rather than as pickled row dictionaries::
+
+    with ReportProcessor(derived=('ctr', 'cpc', 'acos14d')) as processor:
+        res = api.process_report(report_id, processor, metrics)
+        for batch in res['response']:
+            writer.write_batch(batch.to_arrow())
+
+Several downloads can be processed at once by calling ``process_report``
+from several threads (e.g. through ``api.map``).
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import threading
+
+from amazon_advertising_api.codec import get_codec
+from amazon_advertising_api.columnar import (DEFAULT_BATCH_SIZE, FLOAT,
+                                             iter_batches)
+
+# Ratio metrics: name -> (numerator column, denominator column).
+DERIVED_METRICS = {
+    'ctr': ('clicks', 'impressions'),
+    'cpc': ('cost', 'clicks'),
+    'acos7d': ('cost', 'attributedSales7d'),
+    'acos14d': ('cost', 'attributedSales14d'),
+    'acos30d': ('cost', 'attributedSales30d'),
+    'roas7d': ('attributedSales7d', 'cost'),
+    'roas14d': ('attributedSales14d', 'cost'),
+    'roas30d': ('attributedSales30d', 'cost'),
+    'conversionRate14d': ('attributedConversions14d', 'clicks'),
+}
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def derived_metrics(derived):
+    """
+    ``(name, numerator, denominator)`` of the requested ratio metrics.
+
+    :param derived: Names from DERIVED_METRICS, or a dictionary of
+        ``name: (numerator, denominator)`` for others.
+    :raises KeyError: A name is not in DERIVED_METRICS.
+    """
+    if not derived:
+        return []
+    if isinstance(derived, dict):
+        return [(name, pair[0], pair[1]) for name, pair in derived.items()]
+    ratios = []
+    for name in derived:
+        if name not in DERIVED_METRICS:
+            raise KeyError('Derived metric {} not found.'.format(name))
+        ratios.append((name,) + DERIVED_METRICS[name])
+    return ratios
+
+
+def add_ratio(batch, name, numerator, denominator):
+    """
+    Appends the float column ``numerator / denominator`` to a ColumnBatch.
+    Rows where either is missing, or the denominator is 0, are null; so is
+    the whole column when the batch lacks either input column.
+    """
+    count = batch.num_rows
+    top = batch.columns.get(numerator)
+    bottom = batch.columns.get(denominator)
+    kinds = dict(batch.schema)
+    if isinstance(top, list) or isinstance(bottom, list) or \
+            kinds.get(numerator) is None or kinds.get(denominator) is None:
+        top = bottom = None
+    values = array('d', bytes(8 * count))
+    nulls = bytearray(count)
+    if top is not None:
+        top_nulls = batch.nulls.get(numerator)
+        bottom_nulls = batch.nulls.get(denominator)
+        for i in range(count):
+            if bottom[i] and not (top_nulls and top_nulls[i]) and \
+                    not (bottom_nulls and bottom_nulls[i]):
+                values[i] = top[i] / bottom[i]
+            else:
+                nulls[i] = 1
+    else:
+        nulls = bytearray(b'\x01') * count
+    batch.schema = batch.schema + [(name, FLOAT)]
+    batch.columns[name] = values
+    if any(nulls):
+        batch.nulls[name] = nulls
+
+
+def process_payload(payload, metrics=None, schema=None, derived=None,
+                    batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Decompresses (if gzipped) and parses a report or snapshot payload into
+    ColumnBatch objects, with the ``derived`` ratio metrics added.
+
+    Runs in the worker processes; it can also be called directly.
+
+    :param payload: The downloaded file.
+    :type payload: bytes
+    :param metrics: The metrics the report was requested with.
+    :param schema: Column types overriding the derived ones.
+    :type schema: dictionary
+    :param derived: See :func:`derived_metrics`.
+    :returns: List of ColumnBatch.
+    """
+    if payload[:2] == _GZIP_MAGIC:
+        payload = gzip.decompress(payload)
+    rows = get_codec().loads(payload) if payload.strip() else []
+    ratios = derived_metrics(derived)
+    batches = list(iter_batches(rows, metrics, schema, batch_size))
+    del rows
+    for batch in batches:
+        for name, numerator, denominator in ratios:
+            add_ratio(batch, name, numerator, denominator)
+    return batches
+
+
+class ReportProcessor(object):
+    """
+    Process pool that turns downloaded payloads into columnar batches.
+
+    :param max_workers: Worker processes; defaults to the number of CPUs.
+    :type max_workers: integer
+    :param schema: Column types overriding the derived ones.
+    :type schema: dictionary
+    :param derived: Ratio metrics to add. See :func:`derived_metrics`.
+    :param batch_size: Rows per batch.
+    :type batch_size: integer
+    :param executor: Executor to run in instead of a new process pool, e.g.
+        a shared ProcessPoolExecutor.
+    :type executor: concurrent.futures.Executor
+    """
+
+    def __init__(self, max_workers=None, schema=None, derived=None,
+                 batch_size=DEFAULT_BATCH_SIZE, executor=None):
+        # Fail on unknown names here rather than in a worker.
+        derived_metrics(derived)
+        self.max_workers = max_workers
+        self.schema = schema
+        self.derived = derived
+        self.batch_size = batch_size
+        self._executor = executor
+        self._owned = executor is None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, payload, metrics=None):
+        """
+        Schedules a payload for processing.
+
+        :returns: concurrent.futures.Future of the list of ColumnBatch.
+        """
+        return self.executor.submit(process_payload, payload, metrics,
+                                    self.schema, self.derived,
+                                    self.batch_size)
+
+    def process(self, payload, metrics=None):
+        """The batches of a payload, waiting for a worker to finish."""
+        return self.submit(payload, metrics).result()
+
+    def close(self):
+        """Shuts the pool down, if the processor created it."""
+        if not self._owned:
+            # A shared executor stays usable by this processor.
+            return
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,212 @@
+"""
+Client-side rate limiting and throttling retries.
+
+Requests are paced per profile and endpoint family (``sp/keywords``,
+``sp/campaigns``, ``reports``...) by token buckets. A 429 (or 503) response
+pauses the whole family for the ``Retry-After`` the API asked for, halves the
+family's rate when one is configured, and the request is retried with
+jittered exponential backoff. The rate then creeps back up with every
+success, settling just below the point where the API starts throttling.
+"""
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 60.0
+
+# Codes retried after a pause: the request was not processed.
+THROTTLE_CODES = (429, 503)
+
+# Leading path segments naming an ad product rather than a resource.
+_PRODUCTS = ('sp', 'sb', 'sd', 'hsa')
+
+
+def endpoint_family(interface):
+    """
+    The rate limit family of an interface: its ad product and resource,
+    e.g. 'sp/keywords' for 'sp/keywords/extended/123' and 'reports' for
+    'reports/amzn1.report.1'.
+    """
+    parts = interface.split('?', 1)[0].split('/')
+    if parts[0] in _PRODUCTS and len(parts) > 1:
+        return '/'.join(parts[:2])
+    return parts[0]
+
+
+def retry_after(response):
+    """Seconds from a Retry-After header (delta or HTTP date), or None."""
+    value = response.header('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket. Callers reserve a token and sleep for the
+    returned delay themselves, so the bucket serves threads and coroutines
+    alike.
+
+    :param rate: Tokens per second, or None for no pacing.
+    :type rate: float
+    :param burst: Bucket size. Defaults to one second worth of tokens.
+    :type burst: float
+    :param min_rate: Floor the rate is halved down to on throttling.
+    :type min_rate: float
+    """
+
+    def __init__(self, rate=None, burst=None, min_rate=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.min_rate = min_rate or (rate / 20.0 if rate else None)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate is None:
+                return wait
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def pause(self, seconds):
+        """Holds every reservation back for ``seconds``."""
+        with self._lock:
+            self._paused_until = max(self._paused_until,
+                                     time.monotonic() + seconds)
+
+    def throttled(self):
+        """
+        Multiplicative decrease after a throttled request. Requests already
+        in flight are throttled together, so the rate is cut at most once a
+        second.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is not None and now - self._decreased > 1.0:
+                self.rate = max(self.min_rate, self.rate / 2.0)
+                self._decreased = now
+
+    def succeeded(self):
+        """Additive increase back towards the configured rate."""
+        if self.rate is not None and self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate,
+                                self.rate + self.max_rate / 100.0)
+
+
+class RateLimiter(object):
+    """
+    Paces and retries API calls; shared by every client it is given to.
+
+    :param rate: Requests per second allowed per profile and endpoint
+        family, or None to send freely until the API throttles.
+    :type rate: float
+    :param burst: Requests allowed at once before pacing starts.
+    :type burst: float
+    :param retries: Retries of a throttled request. 0 disables retrying.
+    :type retries: integer
+    :param backoff: Base of the exponential backoff, in seconds.
+    :type backoff: float
+    :param max_backoff: Longest backoff computed without a Retry-After;
+        the API's Retry-After is always waited out in full.
+    :type max_backoff: float
+    """
+
+    def __init__(self,
+                 rate=None,
+                 burst=None,
+                 retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._throttles = 0
+        self._retries = 0
+        self._waited = 0.0
+
+    def bucket(self, profile_id, interface):
+        key = (profile_id, endpoint_family(interface))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate, self.burst)
+                    self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, bucket):
+        """Seconds to wait before sending a request through ``bucket``."""
+        wait = bucket.reserve()
+        with self._lock:
+            self._requests += 1
+            self._waited += wait
+        return wait
+
+    def retry_delay(self, bucket, response, attempt):
+        """
+        Seconds to wait before retrying ``response``, or None when it is
+        final: not throttled, or out of retries.
+        """
+        if response.code not in THROTTLE_CODES:
+            bucket.succeeded()
+            return None
+        bucket.throttled()
+        after = retry_after(response)
+        if after is not None:
+            # Honoured in full: retrying earlier is throttled again.
+            delay = after + random.uniform(0, self.backoff)
+        else:
+            delay = random.uniform(0, min(self.max_backoff,
+                                          self.backoff * 2 ** attempt))
+        # Hold back the rest of the family too rather than let it keep
+        # tripping the same limit.
+        bucket.pause(delay)
+        with self._lock:
+            self._throttles += 1
+            if attempt >= self.retries:
+                return None
+            self._retries += 1
+            self._waited += delay
+        return delay
+
+    @property
+    def stats(self):
+        """
+        Counters since creation: requests, throttles (429/503 responses),
+        retries and seconds spent waiting.
+        """
+        with self._lock:
+            return {'requests': self._requests,
+                    'throttles': self._throttles,
+                    'retries': self._retries,
+                    'waited': self._waited}
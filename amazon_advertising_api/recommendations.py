@@ -0,0 +1,287 @@
+"""
+Bid recommendations for many ad groups at once.
+
+The recommendation endpoints take one ad group and at most ``batch_limit``
+keywords or targeting expressions per call. :class:`BidRecommender` takes a
+whole mapping of ad group to keywords (or expressions), drops duplicates,
+answers what it fetched recently from a short-lived cache, splits the rest
+into calls of at most ``batch_limit`` items per ad group and sends them
+concurrently. The results come back as one :class:`RecommendationIndex`::
+
+    recommender = BidRecommender(api)
+    index = recommender.keywords({
+        ad_group_id: [{'keyword': 'shoes', 'matchType': 'exact'}, ...],
+        ...})
+    bid = index.suggested_bid(ad_group_id, {'keyword': 'shoes',
+                                            'matchType': 'exact'})
+
+:class:`AsyncBidRecommender` does the same with AsyncAdvertisingApiV3.
+"""
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+
+from amazon_advertising_api.bulk import (DEFAULT_BULK_WORKERS, _call_chunk,
+                                         _failure, chunk_items, chunked)
+
+# Recommendations move slowly, but not so slowly that a day-old one is useful.
+DEFAULT_RECOMMENDATION_TTL = 900.0
+DEFAULT_MAX_ENTRIES = 200000
+
+# Endpoint of each kind: AdvertisingApiV3 name, AdvertisingApi name.
+RECOMMENDATION_ENDPOINTS = {
+    'keywords': ('list_bid_recommendations_for_keywords',
+                 'get_keyword_bid_recommendations'),
+    'targets': ('list_bid_recommendations_for_targets',
+                'get_bid_recommendations'),
+}
+
+
+def item_key(kind, item):
+    """
+    What identifies a keyword (text and match type) or a targeting
+    expression (its canonical JSON) within an ad group.
+    """
+    if kind == 'keywords':
+        return (item.get('keyword') or item.get('keywordText'),
+                item.get('matchType'))
+    return json.dumps(item, sort_keys=True, separators=(',', ':'))
+
+
+class RecommendationIndex(object):
+    """
+    Recommendations by ad group and keyword or expression.
+
+    :ivar kind: 'keywords' or 'targets'.
+    :ivar calls: API calls made to build the index.
+    :ivar cached: Items answered from the cache.
+    :ivar duplicates: Items dropped because they were asked for twice.
+    """
+
+    __slots__ = ('kind', 'calls', 'cached', 'duplicates', '_entries')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.calls = 0
+        self.cached = 0
+        self.duplicates = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return 'RecommendationIndex({!r}, items={}, calls={}, cached={}, ' \
+            'duplicates={})'.format(self.kind, len(self), self.calls,
+                                    self.cached, self.duplicates)
+
+    def add(self, ad_group_id, item, recommendation):
+        self._entries[(str(ad_group_id), item_key(self.kind, item))] = \
+            (ad_group_id, item, recommendation)
+
+    def get(self, ad_group_id, item, default=None):
+        """The recommendation entry of one keyword or expression."""
+        entry = self._entries.get((str(ad_group_id),
+                                   item_key(self.kind, item)))
+        return default if entry is None else entry[2]
+
+    def suggested_bid(self, ad_group_id, item):
+        """The suggested bid, or None when there is none."""
+        recommendation = self.get(ad_group_id, item) or {}
+        if recommendation.get('code', 'SUCCESS') != 'SUCCESS':
+            return None
+        return (recommendation.get('suggestedBid') or {}).get('suggested')
+
+    def ad_group(self, ad_group_id):
+        """``(item, recommendation)`` pairs of one ad group."""
+        ad_group_id = str(ad_group_id)
+        return [(item, recommendation)
+                for (group, _), (_, item, recommendation)
+                in self._entries.items() if group == ad_group_id]
+
+    def items(self):
+        """``(ad_group_id, item, recommendation)`` of every entry."""
+        return iter(self._entries.values())
+
+    @property
+    def failures(self):
+        """The entries whose recommendation is not a SUCCESS."""
+        return [entry for entry in self._entries.values()
+                if entry[2].get('code', 'SUCCESS') != 'SUCCESS']
+
+
+class BidRecommender(object):
+    """
+    Fetches bid recommendations in bulk, with de-duplication and a TTL
+    cache shared by every fetch of this recommender.
+
+    :param client: An AdvertisingApiV3 (or AdvertisingApi) bound to the
+        profile the ad groups belong to.
+    :param ttl: Seconds a successful recommendation is reused for.
+    :type ttl: float
+    :param max_workers: Calls in flight at once.
+    :type max_workers: integer
+    :param max_entries: Recommendations kept in the cache.
+    :type max_entries: integer
+    """
+
+    def __init__(self, client, ttl=DEFAULT_RECOMMENDATION_TTL,
+                 max_workers=DEFAULT_BULK_WORKERS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.client = client
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def keywords(self, keywords_by_ad_group):
+        """
+        Recommendations for keywords.
+
+        :param keywords_by_ad_group: Ad group id to a list of
+            ``{'keyword', 'matchType'}`` dictionaries.
+        :type keywords_by_ad_group: dictionary
+        :returns: :class:`RecommendationIndex`
+        """
+        return self.fetch('keywords', keywords_by_ad_group)
+
+    def targets(self, expressions_by_ad_group):
+        """
+        Recommendations for targeting expressions.
+
+        :param expressions_by_ad_group: Ad group id to a list of
+            expressions, each a list of ``{'type', 'value'}`` predicates.
+        :type expressions_by_ad_group: dictionary
+        :returns: :class:`RecommendationIndex`
+        """
+        return self.fetch('targets', expressions_by_ad_group)
+
+    def fetch(self, kind, items_by_ad_group):
+        """
+        :param kind: 'keywords' or 'targets'.
+        :raises KeyError: Unknown kind, or the client lacks its endpoint.
+        """
+        index, method, argument, calls = self._plan(kind, items_by_ad_group)
+        if calls:
+            with ThreadPoolExecutor(
+                    max_workers=min(self.max_workers, len(calls))) as executor:
+                results = list(executor.map(
+                    lambda call: _call_chunk(method, argument, call[1],
+                                             {'ad_group_id': call[0]}),
+                    calls))
+            self._merge(index, calls, results)
+        return index
+
+    def clear(self):
+        """Drops every cached recommendation."""
+        with self._lock:
+            self._cache.clear()
+
+    def _endpoint(self, kind):
+        if kind not in RECOMMENDATION_ENDPOINTS:
+            raise KeyError('Recommendation kind {} not found.'.format(kind))
+        endpoints = getattr(self.client, 'endpoints', {})
+        for name in RECOMMENDATION_ENDPOINTS[kind]:
+            if name in endpoints:
+                return endpoints[name], getattr(self.client, name)
+        raise KeyError('The client has no {} bid recommendation endpoint.'
+                       .format(kind))
+
+    def _scope(self):
+        return str(self.client.context().profile_id)
+
+    def _plan(self, kind, items_by_ad_group):
+        """
+        The index filled from the cache, the endpoint method and its list
+        argument, and the ``(ad_group_id, items)`` calls still to make.
+        """
+        endpoint, method = self._endpoint(kind)
+        index = RecommendationIndex(kind)
+        scope = self._scope()
+        now = time.time()
+        calls = []
+        for ad_group_id, items in items_by_ad_group.items():
+            seen = set()
+            missing = []
+            for item in items:
+                key = item_key(kind, item)
+                if key in seen:
+                    index.duplicates += 1
+                    continue
+                seen.add(key)
+                cached = self._cached((scope, kind, str(ad_group_id), key),
+                                      now)
+                if cached is not None:
+                    index.cached += 1
+                    index.add(ad_group_id, item, cached)
+                else:
+                    missing.append(item)
+            for chunk in chunked(missing, endpoint.batch_limit):
+                calls.append((ad_group_id, chunk))
+        index.calls = len(calls)
+        return index, method, endpoint.batch_argument, calls
+
+    def _cached(self, key, now):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _merge(self, index, calls, results):
+        """Adds the call results to the index and caches the successes."""
+        scope = self._scope()
+        expires = time.time() + self.ttl
+        fresh = []
+        for (ad_group_id, items), result in zip(calls, results):
+            recommendations = chunk_items(result, len(items))
+            for item, recommendation in zip(items, recommendations):
+                index.add(ad_group_id, item, recommendation)
+                if recommendation.get('code', 'SUCCESS') == 'SUCCESS':
+                    fresh.append(((scope, index.kind, str(ad_group_id),
+                                   item_key(index.kind, item)),
+                                  recommendation))
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            for key, recommendation in fresh:
+                self._cache[key] = (expires, recommendation)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+
+class AsyncBidRecommender(BidRecommender):
+    """:class:`BidRecommender` for AsyncAdvertisingApiV3; fetches are
+    coroutines."""
+
+    async def keywords(self, keywords_by_ad_group):
+        return await self.fetch('keywords', keywords_by_ad_group)
+
+    async def targets(self, expressions_by_ad_group):
+        return await self.fetch('targets', expressions_by_ad_group)
+
+    async def fetch(self, kind, items_by_ad_group):
+        index, method, argument, calls = self._plan(kind, items_by_ad_group)
+        semaphore = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def send(ad_group_id, items):
+            async with semaphore:
+                try:
+                    return await method(ad_group_id=ad_group_id,
+                                        **{argument: items})
+                except Exception as e:
+                    return _failure(e)
+
+        results = await asyncio.gather(*[send(ad_group_id, items)
+                                         for ad_group_id, items in calls])
+        self._merge(index, calls, results)
+        return index
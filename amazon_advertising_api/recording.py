@@ -0,0 +1,160 @@
+"""
+Record and replay of HTTP exchanges.
+
+:class:`RecordingTransport` wraps a real transport and appends every
+exchange to a JSON lines file; :class:`ReplayTransport` serves those
+exchanges back, in order and without a network, so a captured session can
+be profiled or debugged deterministically::
+
+    transport = RecordingTransport(PooledTransport(), 'session.jsonl')
+    ...
+    api = AdvertisingApiV3(..., transport=ReplayTransport('session.jsonl'))
+
+Requests are matched on method, URL and a hash of the body. Authorization
+headers are not written to the file; response bodies are, so treat
+recordings of live accounts as confidential.
+"""
+import base64
+import hashlib
+from io import BytesIO
+import json
+import threading
+import time
+
+from amazon_advertising_api.transport import (Response, StreamingResponse,
+                                              Transport)
+
+# Request headers left out of recordings.
+REDACTED_HEADERS = frozenset(['authorization'])
+
+
+def body_hash(body):
+    """Hex sha256 of a request body, None for no body."""
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+def exchange_key(method, url, body):
+    """What a replayed request is matched on."""
+    return (method.upper(), url, body_hash(body))
+
+
+class RecordingTransport(Transport):
+    """
+    Transport that records the exchanges of another one.
+
+    Streamed responses are read completely before they are returned, so
+    recording does not suit very large downloads.
+
+    :param transport: The transport requests are sent with.
+    :param path: JSON lines file exchanges are appended to.
+    :type path: string
+    """
+
+    def __init__(self, transport, path):
+        self.transport = transport
+        self.path = path
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, body=None):
+        response = self.transport.request(method, url, headers, body)
+        self.record(method, url, headers, body, response)
+        return response
+
+    def stream(self, method, url, headers=None, body=None):
+        with self.transport.stream(method, url, headers, body) as response:
+            response = Response(response.code, response.reason,
+                                response.headers, response.read())
+        self.record(method, url, headers, body, response)
+        return StreamingResponse(response.code, response.reason,
+                                 response.headers, BytesIO(response.body))
+
+    def record(self, method, url, headers, body, response):
+        """Appends one exchange to the file."""
+        line = json.dumps({
+            'method': method.upper(),
+            'url': url,
+            'request_headers': dict(
+                (name, value) for name, value in (headers or {}).items()
+                if name.lower() not in REDACTED_HEADERS),
+            'body_sha256': body_hash(body),
+            'code': response.code,
+            'reason': response.reason,
+            'headers': [list(header) for header in response.headers],
+            'body': base64.b64encode(response.body).decode('ascii')})
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Transport that answers from a recording.
+
+    Each request gets the next recorded response with the same method, URL
+    and body; once those are used up the last one is repeated, which keeps
+    polling loops working.
+
+    :param path: A file written by :class:`RecordingTransport`.
+    :type path: string
+    :param latency: Seconds added to every replayed exchange.
+    :type latency: float
+    :raises KeyError: On a request that was never recorded.
+    """
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.requests = 0
+        self._exchanges = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                key = (item['method'], item['url'], item['body_sha256'])
+                self._exchanges.setdefault(key, []).append(Response(
+                    item['code'], item['reason'],
+                    [tuple(header) for header in item['headers']],
+                    base64.b64decode(item['body'])))
+
+    def __len__(self):
+        return sum(len(responses) for responses in self._exchanges.values())
+
+    def request(self, method, url, headers=None, body=None):
+        delay, response = self._exchange(method, url, headers, body)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def _exchange(self, method, url, headers=None, body=None):
+        """``(delay, Response)`` for a request."""
+        key = exchange_key(method, url, body)
+        responses = self._exchanges.get(key)
+        if not responses:
+            raise KeyError('No recorded response for {} {}.'.format(
+                method, url))
+        with self._lock:
+            self.requests += 1
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        return self.latency, responses[min(index, len(responses) - 1)]
+
+    def rewind(self):
+        """Serves every recording from its first response again."""
+        with self._lock:
+            self._served.clear()
+
+    def asynchronous(self):
+        """A transport for AsyncAdvertisingApiV3 replaying the same file."""
+        from amazon_advertising_api.emulator import AsyncAdapter
+        return AsyncAdapter(self)
+
@@ -0,0 +1,443 @@
+"""
+Report lifecycle orchestration: request, poll, download.
+
+:class:`ReportJobManager` submits any number of report requests, polls every
+pending report from one scheduler thread and downloads each report as soon as
+it is ready. Poll intervals start from how long earlier reports of the same
+record type took and back off exponentially from there, so a large run makes
+few wasted status calls. :class:`AsyncReportJobManager` does the same for the
+asyncio client.
+"""
+import asyncio
+from concurrent.futures import (CancelledError, Future, ThreadPoolExecutor,
+                                as_completed)
+import heapq
+import os
+import threading
+import time
+
+from amazon_advertising_api.download import DEFAULT_DOWNLOAD_RETRIES
+from amazon_advertising_api.models import decoded
+from amazon_advertising_api.transport import DEFAULT_CHUNK_SIZE
+
+DEFAULT_REPORT_WORKERS = 8
+DEFAULT_INITIAL_INTERVAL = 5.0
+DEFAULT_MAX_INTERVAL = 120.0
+DEFAULT_BACKOFF = 1.5
+
+
+class PollPolicy(object):
+    """
+    Decides when a pending report is polled next.
+
+    The first poll of a report waits for the typical run time of its record
+    type (a moving average of the reports seen so far), or
+    ``initial_interval`` until one has finished. Later polls back off by
+    ``backoff`` up to ``max_interval``.
+
+    Polls only tell that a report finished between the last poll that found
+    it pending and the one that found it done; the run time recorded is the
+    middle of that interval, not the time the success was seen, so the
+    history does not drift towards the poll intervals themselves.
+
+    :param initial_interval: Seconds before the first poll with no history.
+    :type initial_interval: float
+    :param max_interval: Longest wait between polls.
+    :type max_interval: float
+    :param backoff: Growth factor of the wait between polls.
+    :type backoff: float
+    """
+
+    def __init__(self,
+                 initial_interval=DEFAULT_INITIAL_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL,
+                 backoff=DEFAULT_BACKOFF):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def first_delay(self, record_type):
+        with self._lock:
+            expected = self._durations.get(record_type)
+        if expected is None:
+            return self.initial_interval
+        return min(max(expected, self.initial_interval / 4), self.max_interval)
+
+    def next_delay(self, delay):
+        return min(delay * self.backoff, self.max_interval)
+
+    def observe(self, record_type, pending, finished=None):
+        """
+        Records how long a report of ``record_type`` took to finish.
+
+        :param pending: Seconds after its request the report was last seen
+            pending; its run time if ``finished`` is None.
+        :type pending: float
+        :param finished: Seconds after its request it was seen finished.
+        :type finished: float
+        """
+        duration = pending if finished is None else (pending + finished) / 2
+        with self._lock:
+            previous = self._durations.get(record_type)
+            if previous is None:
+                self._durations[record_type] = duration
+            else:
+                self._durations[record_type] = 0.7 * previous + 0.3 * duration
+
+
+class ReportJob(object):
+    """
+    One report moving through request, polling and download.
+
+    :ivar record_type: Report record type, e.g. 'keywords'.
+    :ivar data: Report request body.
+    :ivar report_id: Id assigned by the API once requested.
+    :ivar status: Last status seen: 'SUBMITTING', 'IN_PROGRESS', 'SUCCESS',
+        'FAILURE', or 'CANCELLED' when the manager was closed first.
+    :ivar polls: Status calls made for this report.
+    :ivar future: Resolves to the same result dictionary as ``get_report``,
+        or as ``download_report`` when the manager writes to disk.
+    """
+
+    __slots__ = ('record_type', 'data', 'kwargs', 'report_id', 'status',
+                 'polls', 'submitted', 'pending', 'delay', 'future')
+
+    def __init__(self, record_type, data, kwargs, future):
+        self.record_type = record_type
+        self.data = data
+        self.kwargs = kwargs
+        self.report_id = None
+        self.status = 'SUBMITTING'
+        self.polls = 0
+        self.submitted = time.time()
+        # When the report was last seen pending.
+        self.pending = self.submitted
+        self.delay = None
+        self.future = future
+
+    def result(self, timeout=None):
+        if timeout is None:
+            # asyncio futures take no timeout.
+            return self.future.result()
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    def __repr__(self):
+        return 'ReportJob({!r}, report_id={!r}, status={!r})'.format(
+            self.record_type, self.report_id, self.status)
+
+
+def _parse(res):
+    """The decoded body of a successful call, else None."""
+    if not res['success']:
+        return None
+    return decoded(res)
+
+
+def _failure(message, code=0):
+    return {'success': False,
+            'code': code,
+            'response': message}
+
+
+class _JobRunner(object):
+    """Steps shared by the thread and asyncio managers."""
+
+    def __init__(self, client, policy, directory, decompress, timeout):
+        self.client = client
+        self.policy = policy or PollPolicy()
+        self.directory = directory
+        self.decompress = decompress
+        self.timeout = timeout
+
+    def requested(self, job, res):
+        """
+        Handles the ``request_report`` result. Returns the failure dictionary
+        when the report could not be requested.
+        """
+        status = _parse(res)
+        if status is None:
+            return res
+        if 'reportId' not in status:
+            return _failure('reportId not in response.', res['code'])
+        job.report_id = status['reportId']
+        job.status = status.get('status', 'IN_PROGRESS')
+        job.pending = time.time()
+        job.delay = self.policy.first_delay(job.record_type)
+        return None
+
+    def polled(self, job, res):
+        """
+        Handles a status result: returns the download location once the
+        report is ready, the failure dictionary if it failed, or None while
+        it is pending.
+        """
+        job.polls += 1
+        status = _parse(res)
+        if status is None:
+            return res
+        job.status = status.get('status')
+        now = time.time()
+        if job.status == 'SUCCESS':
+            self.policy.observe(job.record_type, job.pending - job.submitted,
+                                now - job.submitted)
+            return status['location']
+        if job.status == 'FAILURE':
+            return _failure(status.get('statusDetails', 'Report failed.'),
+                            res['code'])
+        if self.timeout is not None and now - job.submitted > self.timeout:
+            return _failure('Report {} timed out.'.format(job.report_id))
+        job.pending = now
+        job.delay = self.policy.next_delay(job.delay)
+        return None
+
+    def path(self, job):
+        extension = '.json' if self.decompress else '.json.gz'
+        return os.path.join(self.directory, '{}{}'.format(job.report_id,
+                                                          extension))
+
+    def download_args(self, job, location):
+        return (location, self.path(job), self.decompress, True,
+                DEFAULT_CHUNK_SIZE, DEFAULT_DOWNLOAD_RETRIES)
+
+
+class ReportJobManager(object):
+    """
+    Requests, polls and downloads many reports concurrently.
+
+    ::
+
+        with ReportJobManager(api) as manager:
+            for date in dates:
+                for record_type in ('campaigns', 'keywords'):
+                    manager.submit(record_type, {'reportDate': date,
+                                                 'metrics': metrics})
+            for job in manager.as_completed():
+                store(job.report_id, job.result())
+
+    :param client: An AdvertisingApi or AdvertisingApiV3.
+    :param max_workers: Threads making request, status and download calls.
+    :type max_workers: integer
+    :param policy: Poll interval policy. Defaults to :class:`PollPolicy`.
+    :type policy: PollPolicy
+    :param directory: Write each report to ``<directory>/<reportId>.json.gz``
+        with ``download_report`` instead of holding it in memory.
+    :type directory: string
+    :param decompress: With ``directory``, write decompressed JSON.
+    :type decompress: boolean
+    :param timeout: Seconds after which a report still pending is given up.
+    :type timeout: float
+    """
+
+    def __init__(self, client,
+                 max_workers=DEFAULT_REPORT_WORKERS,
+                 policy=None,
+                 directory=None,
+                 decompress=False,
+                 timeout=None):
+        self.client = client
+        self._runner = _JobRunner(client, policy, directory, decompress,
+                                  timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = []
+        self._heap = []
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._scheduler = threading.Thread(target=self._schedule,
+                                           name='report-scheduler',
+                                           daemon=True)
+        self._scheduler.start()
+
+    @property
+    def policy(self):
+        return self._runner.policy
+
+    @property
+    def jobs(self):
+        return list(self._jobs)
+
+    def submit(self, record_type, data=None, **kwargs):
+        """
+        Requests a report.
+
+        :param record_type: Report record type, e.g. 'campaigns'.
+        :type record_type: string
+        :param data: Report request body (reportDate, metrics, segment...).
+        :type data: dictionary
+        :param kwargs: Other arguments of the client's ``request_report``,
+            e.g. campaign_type.
+        :returns: :class:`ReportJob`
+        """
+        if self._closed:
+            raise ValueError('ReportJobManager is closed.')
+        job = ReportJob(record_type, data or {}, kwargs, Future())
+        job.future.set_running_or_notify_cancel()
+        self._jobs.append(job)
+        self._executor.submit(self._guard, job, self._request)
+        return job
+
+    def as_completed(self, jobs=None, timeout=None):
+        """Yields jobs (all submitted by default) as they finish."""
+        jobs = self.jobs if jobs is None else list(jobs)
+        by_future = dict((job.future, job) for job in jobs)
+        for future in as_completed(by_future, timeout):
+            yield by_future[future]
+
+    def wait(self, timeout=None):
+        """Blocks until every submitted job has finished."""
+        for _ in self.as_completed(timeout=timeout):
+            pass
+
+    def close(self):
+        """
+        Stops polling. The futures of unfinished jobs raise
+        ``concurrent.futures.CancelledError``.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+        # Nothing resolves them any more: fail them rather than leave
+        # as_completed() and result() waiting forever.
+        for job in self._jobs:
+            if not job.future.done():
+                job.status = 'CANCELLED'
+                job.future.set_exception(CancelledError(
+                    'ReportJobManager closed before report {} finished.'
+                    .format(job.report_id)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.wait()
+        self.close()
+
+    def _guard(self, job, step, *args):
+        try:
+            step(job, *args)
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _request(self, job):
+        res = self.client.request_report(record_type=job.record_type,
+                                         data=job.data, **job.kwargs)
+        failure = self._runner.requested(job, res)
+        if failure is not None:
+            job.status = 'FAILURE'
+            job.future.set_result(failure)
+            return
+        self._schedule_poll(job)
+
+    def _poll(self, job):
+        res = self.client._operation('reports/{}'.format(job.report_id))
+        outcome = self._runner.polled(job, res)
+        if outcome is None:
+            self._schedule_poll(job)
+        elif isinstance(outcome, dict):
+            job.future.set_result(outcome)
+        elif self._runner.directory is not None:
+            job.future.set_result(self.client._download_to_file(
+                *self._runner.download_args(job, outcome)))
+        else:
+            job.future.set_result(self.client._download(outcome))
+
+    def _schedule_poll(self, job):
+        with self._condition:
+            self._counter += 1
+            heapq.heappush(self._heap, (time.time() + job.delay,
+                                        self._counter, job))
+            self._condition.notify()
+
+    def _schedule(self):
+        """Scheduler thread: hands due polls to the worker pool."""
+        with self._condition:
+            while not self._closed:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    job = heapq.heappop(self._heap)[2]
+                    self._executor.submit(self._guard, job, self._poll)
+                wait = self._heap[0][0] - now if self._heap else None
+                self._condition.wait(wait)
+
+
+class AsyncReportJobManager(object):
+    """
+    asyncio counterpart of :class:`ReportJobManager` for
+    AsyncAdvertisingApiV3. Each job is a task; concurrency is bounded by the
+    client's own ``max_concurrency``.
+
+    ::
+
+        manager = AsyncReportJobManager(api)
+        for record_type in ('campaigns', 'keywords'):
+            manager.submit(record_type, {'reportDate': date})
+        async for job in manager.as_completed():
+            store(job.report_id, job.result())
+    """
+
+    def __init__(self, client, policy=None, directory=None, decompress=False,
+                 timeout=None):
+        self.client = client
+        self._runner = _JobRunner(client, policy, directory, decompress,
+                                  timeout)
+        self._jobs = []
+
+    @property
+    def policy(self):
+        return self._runner.policy
+
+    @property
+    def jobs(self):
+        return list(self._jobs)
+
+    def submit(self, record_type, data=None, **kwargs):
+        """Requests a report; see :meth:`ReportJobManager.submit`."""
+        job = ReportJob(record_type, data or {}, kwargs, None)
+        job.future = asyncio.ensure_future(self._run(job))
+        self._jobs.append(job)
+        return job
+
+    async def as_completed(self, jobs=None):
+        """Yields jobs (all submitted by default) as they finish."""
+        jobs = self.jobs if jobs is None else list(jobs)
+        by_future = dict((job.future, job) for job in jobs)
+        pending = set(by_future)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield by_future[future]
+
+    async def wait(self):
+        if self._jobs:
+            await asyncio.wait([job.future for job in self._jobs])
+
+    async def _run(self, job):
+        runner = self._runner
+        res = await self.client.request_report(record_type=job.record_type,
+                                               data=job.data, **job.kwargs)
+        failure = runner.requested(job, res)
+        if failure is not None:
+            job.status = 'FAILURE'
+            return failure
+        while True:
+            await asyncio.sleep(job.delay)
+            res = await self.client._operation(
+                'reports/{}'.format(job.report_id))
+            outcome = runner.polled(job, res)
+            if isinstance(outcome, dict):
+                return outcome
+            if outcome is not None:
+                break
+        if runner.directory is not None:
+            return await self.client._download_to_file(
+                *runner.download_args(job, outcome))
+        return await self.client._download(outcome)
@@ -0,0 +1,279 @@
+"""
+Embedded, indexed entity store.
+
+:class:`EntityStore` holds campaigns, ad groups, ads, keywords and targets
+per profile in :class:`Collection` objects. Each collection keeps a hash
+index on the entity id and secondary indexes on parent ids, state and, for
+targets, the targeting expression, so lookups such as "enabled keywords of
+ad group 42" touch only the matching entities.
+
+Queries return the stored entities themselves, without copying. The store
+implements the replica interface of sync.AccountSync and reads and writes
+the same JSON files as sync.Replica (see files.py), so it can be filled by a
+sync, from snapshot or list responses, or from disk, and used offline
+afterwards.
+"""
+from collections.abc import Mapping
+import json
+
+from amazon_advertising_api.files import read_replica, write_replica
+from amazon_advertising_api.models import decoded
+
+# Id field and indexed fields of each collection.
+COLLECTIONS = {
+    'campaigns': ('campaignId', ('state', 'portfolioId', 'targetingType')),
+    'ad_groups': ('adGroupId', ('campaignId', 'state')),
+    'product_ads': ('adId', ('campaignId', 'adGroupId', 'state', 'asin',
+                             'sku')),
+    'keywords': ('keywordId', ('campaignId', 'adGroupId', 'state',
+                               'matchType', 'keywordText')),
+    'negative_keywords': ('keywordId', ('campaignId', 'adGroupId', 'state')),
+    'targets': ('targetId', ('campaignId', 'adGroupId', 'state',
+                             'expression')),
+}
+
+
+def _index_key(value):
+    """Hashable form of a field value; expressions are lists of dicts."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return value
+
+
+class Collection(Mapping):
+    """
+    Entities of one type, by id, with secondary indexes.
+
+    Entities may be dictionaries or models.Record objects; both are read
+    with ``entity.get(field)``.
+
+    :param id_field: Id field of the entities.
+    :type id_field: string
+    :param indexes: Fields to index.
+    :type indexes: tuple
+    """
+
+    def __init__(self, id_field, indexes=()):
+        self.id_field = id_field
+        self.indexes = tuple(indexes)
+        self._entities = {}
+        self._index = dict((field, {}) for field in self.indexes)
+
+    def __getitem__(self, entity_id):
+        return self._entities[entity_id]
+
+    def __iter__(self):
+        return iter(self._entities)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._entities
+
+    def entities(self):
+        """View of every stored entity."""
+        return self._entities.values()
+
+    def upsert(self, entities):
+        """Adds or replaces entities. Returns the number written."""
+        id_field = self.id_field
+        stored = self._entities
+        count = 0
+        for entity in entities:
+            entity_id = entity[id_field]
+            previous = stored.get(entity_id)
+            if previous is not None:
+                self._unindex(entity_id, previous)
+            stored[entity_id] = entity
+            for field, index in self._index.items():
+                value = entity.get(field)
+                if value is not None:
+                    key = _index_key(value)
+                    ids = index.get(key)
+                    if ids is None:
+                        ids = index[key] = set()
+                    ids.add(entity_id)
+            count += 1
+        return count
+
+    def remove(self, ids):
+        """Drops entities by id. Returns the number dropped."""
+        count = 0
+        for entity_id in ids:
+            entity = self._entities.pop(entity_id, None)
+            if entity is not None:
+                self._unindex(entity_id, entity)
+                count += 1
+        return count
+
+    def clear(self):
+        self._entities.clear()
+        for index in self._index.values():
+            index.clear()
+
+    def _unindex(self, entity_id, entity):
+        for field, index in self._index.items():
+            value = entity.get(field)
+            if value is None:
+                continue
+            key = _index_key(value)
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(entity_id)
+                if not ids:
+                    del index[key]
+
+    def ids(self, field, value):
+        """
+        Ids of the entities whose ``field`` equals ``value``: the index's
+        own set, not a copy, so it must not be modified.
+
+        :raises KeyError: ``field`` is not indexed.
+        """
+        if field not in self._index:
+            raise KeyError('Field {} is not indexed.'.format(field))
+        return self._index[field].get(_index_key(value), frozenset())
+
+    def values_of(self, field):
+        """Distinct values of an indexed field."""
+        if field not in self._index:
+            raise KeyError('Field {} is not indexed.'.format(field))
+        return self._index[field].keys()
+
+    def find(self, **criteria):
+        """
+        Yields the entities matching every ``field=value`` criterion.
+        Indexed fields are intersected, smallest first; other fields are
+        compared on the remaining entities::
+
+            keywords.find(adGroupId=42, state='enabled')
+
+        The candidates are taken when find is called, so the collection can
+        be updated while iterating over the results.
+        """
+        indexed = []
+        other = []
+        for field, value in criteria.items():
+            if field in self._index:
+                indexed.append(self.ids(field, value))
+            else:
+                other.append((field, value))
+        if indexed:
+            indexed.sort(key=len)
+            ids = indexed[0]
+            if len(indexed) > 1:
+                ids = ids.intersection(*indexed[1:])
+            candidates = [self._entities[entity_id] for entity_id in ids]
+        else:
+            candidates = list(self._entities.values())
+        if not other:
+            return iter(candidates)
+        return (entity for entity in candidates
+                if all(entity.get(field) == value for field, value in other))
+
+    def count(self, **criteria):
+        if len(criteria) == 1:
+            (field, value), = criteria.items()
+            if field in self._index:
+                return len(self.ids(field, value))
+        return sum(1 for _ in self.find(**criteria))
+
+
+class EntityStore(object):
+    """
+    Indexed entities of one or more profiles.
+
+    ::
+
+        store = EntityStore.load('account.json')
+        keywords = store.collection(profile_id, 'keywords')
+        for keyword in keywords.find(adGroupId=42, state='enabled'):
+            ...
+
+    :param path: JSON file :meth:`save` writes to, in the sync.Replica
+        format.
+    :type path: string
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._collections = {}
+        self._watermarks = {}
+
+    @classmethod
+    def load(cls, path):
+        """A store filled from a file written by :meth:`save` or a
+        sync.Replica; empty if the file does not exist."""
+        store = cls(path)
+        store._watermarks, profiles = read_replica(path)
+        for profile_id, collections in profiles.items():
+            for name, entities in collections.items():
+                store.collection(profile_id, name).upsert(entities)
+        return store
+
+    def collection(self, profile_id, name):
+        """
+        The collection ``name`` of a profile, created empty on first use.
+
+        :raises KeyError: ``name`` is not one of COLLECTIONS.
+        """
+        key = (str(profile_id), name)
+        collection = self._collections.get(key)
+        if collection is None:
+            if name not in COLLECTIONS:
+                raise KeyError('Collection {} not found.'.format(name))
+            id_field, indexes = COLLECTIONS[name]
+            collection = self._collections[key] = Collection(id_field,
+                                                             indexes)
+        return collection
+
+    def profiles(self):
+        return sorted(set(profile_id for profile_id, _ in self._collections))
+
+    def add_response(self, profile_id, name, result):
+        """
+        Upserts the entities of a list/get result dictionary or of snapshot
+        rows (a list or iterator). Returns the number written.
+
+        :raises ValueError: The result dictionary is a failure.
+        """
+        if isinstance(result, dict):
+            if not result['success']:
+                raise ValueError('Cannot store a failed response: '
+                                 '{}'.format(result['response']))
+            result = decoded(result)
+            if isinstance(result, dict):
+                result = [result]
+        return self.collection(profile_id, name).upsert(result)
+
+    # Replica interface of sync.AccountSync.
+
+    def watermark(self, profile_id):
+        return self._watermarks.get(str(profile_id))
+
+    def set_watermark(self, profile_id, watermark):
+        self._watermarks[str(profile_id)] = watermark
+
+    def entities(self, profile_id, name):
+        return self.collection(profile_id, name)
+
+    def replace(self, profile_id, name, entities, id_field=None):
+        collection = self.collection(profile_id, name)
+        collection.clear()
+        return collection.upsert(entities)
+
+    def upsert(self, profile_id, name, entities, id_field=None):
+        return self.collection(profile_id, name).upsert(entities)
+
+    def remove(self, profile_id, name, ids):
+        return self.collection(profile_id, name).remove(ids)
+
+    def save(self, path=None):
+        """Writes the store to its JSON file, atomically."""
+        profiles = {}
+        for (profile_id, name), collection in self._collections.items():
+            profiles.setdefault(profile_id, {})[name] = [
+                entity if isinstance(entity, dict) else entity.to_dict()
+                for entity in collection.entities()]
+        write_replica(path or self.path, self._watermarks, profiles)
@@ -0,0 +1,305 @@
+"""
+Incremental decoding of gzipped JSON array downloads (reports, snapshots).
+
+:class:`RowDecoder` is fed compressed chunks as they arrive and returns the
+rows completed so far, so a download never exists in memory as a whole: peak
+memory is one network chunk plus the rows not yet consumed. When every row is
+kept anyway, :func:`load_rows` decompresses the chunks as they arrive and
+decodes the whole array at once with the JSON codec (see codec.py), which is
+faster.
+"""
+import codecs
+import json
+from json.scanner import make_scanner
+import re
+import time
+import zlib
+
+from amazon_advertising_api.codec import get_codec
+
+# Upper bound on the decompressed bytes produced from one feed, so a highly
+# compressible chunk cannot balloon the buffer.
+MAX_DECOMPRESSED_CHUNK = 256 * 1024
+
+_DELIMITERS = ' \t\n\r,]'
+_skip_whitespace = re.compile(r'[ \t\n\r]*').match
+_skip_separator = re.compile(r'[ \t\n\r,]*').match
+
+
+class JsonArrayParser(object):
+    """
+    Push parser for a top-level JSON array.
+
+    Text is fed in arbitrary pieces; :meth:`feed` returns the elements it
+    completed. Only the text of the element being parsed is buffered.
+    """
+
+    def __init__(self):
+        self._scan = make_scanner(json.JSONDecoder())
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, text, final=False):
+        """
+        :param text: The next piece of the document.
+        :type text: string
+        :param final: No more text follows.
+        :type final: boolean
+        :returns: List of the elements completed by this piece.
+        :raises ValueError: The document is not a JSON array, or is cut short.
+        """
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+        rows = []
+        buffer = self._buffer
+        end = len(buffer)
+        pos = _skip_whitespace(buffer, 0).end()
+        if not self._started and pos < end:
+            if buffer[pos] != '[':
+                raise ValueError('Expected a JSON array.')
+            self._started = True
+            pos += 1
+        scan = self._scan
+        skip = _skip_separator
+        append = rows.append
+        while self._started and not self._done:
+            pos = skip(buffer, pos).end()
+            if pos == end:
+                break
+            char = buffer[pos]
+            if char == ']':
+                self._done = True
+                pos += 1
+                break
+            try:
+                row, stop = scan(buffer, pos)
+            except StopIteration:
+                # Element incomplete; wait for more text.
+                if final:
+                    raise ValueError('Invalid value in JSON array.')
+                break
+            except ValueError:
+                if final:
+                    raise
+                break
+            if char not in '{["':
+                # A number or literal runs until a delimiter; without one it
+                # may continue in the next piece ("-4." then "5e3").
+                follow = buffer[stop:stop + 1]
+                if follow not in _DELIMITERS or not (follow or final):
+                    if final:
+                        raise ValueError('Invalid value in JSON array.')
+                    break
+            append(row)
+            pos = stop
+        self._pos = pos
+        if final and not self._done:
+            raise ValueError('JSON array is cut short.')
+        return rows
+
+
+class Decompressor(object):
+    """
+    ``zlib.decompressobj`` for gzip or zlib data that carries on into the
+    next member of a multi-member gzip stream (gzip files concatenated), so
+    such a download is not cut off after its first member. Zero padding
+    after the last member is ignored, as the gzip module does.
+    """
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        self.unconsumed_tail = b''
+
+    @property
+    def eof(self):
+        return self._decompressor.eof
+
+    def decompress(self, data, max_length=0):
+        """
+        Decompresses ``data``. Input left over, including the start of the
+        next member, is in :attr:`unconsumed_tail`.
+        """
+        decompressor = self._decompressor
+        text = decompressor.decompress(data, max_length)
+        self.unconsumed_tail = decompressor.unconsumed_tail
+        if decompressor.eof:
+            rest = decompressor.unused_data.lstrip(b'\x00')
+            if rest:
+                self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+                self.unconsumed_tail = rest
+        return text
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class RowDecoder(object):
+    """
+    Turns the compressed chunks of a gzipped (or plain) JSON array download
+    into its rows.
+
+    :param event: instrumentation.RequestEvent the time spent decompressing
+        and parsing is added to.
+    """
+
+    def __init__(self, event=None):
+        # Set from the first chunk: 32 + MAX_WBITS detects a gzip or zlib
+        # header, anything else is taken as plain JSON.
+        self._decompressor = None
+        self._plain = None
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._parser = JsonArrayParser()
+        self._event = event
+
+    def feed(self, data):
+        """Returns the rows completed by the compressed chunk ``data``."""
+        if self._event is not None:
+            return self._timed_feed(data)
+        if self._plain is None:
+            self._plain = data[:1] not in (b'\x1f', b'\x78')
+            if not self._plain:
+                self._decompressor = Decompressor()
+        if self._plain:
+            return self._parser.feed(self._text.decode(data))
+        rows = []
+        decompressor = self._decompressor
+        while data:
+            text = decompressor.decompress(data, MAX_DECOMPRESSED_CHUNK)
+            data = decompressor.unconsumed_tail
+            rows.extend(self._parser.feed(self._text.decode(text)))
+        return rows
+
+    def _timed_feed(self, data):
+        if self._plain is None:
+            self._plain = data[:1] not in (b'\x1f', b'\x78')
+            if not self._plain:
+                self._decompressor = Decompressor()
+        if self._plain:
+            started = time.perf_counter()
+            rows = self._parser.feed(self._text.decode(data))
+            self._event.add('decode', time.perf_counter() - started)
+            return rows
+        rows = []
+        decompressor = self._decompressor
+        decompressing = decoding = 0.0
+        while data:
+            started = time.perf_counter()
+            text = decompressor.decompress(data, MAX_DECOMPRESSED_CHUNK)
+            data = decompressor.unconsumed_tail
+            decompressed = time.perf_counter()
+            rows.extend(self._parser.feed(self._text.decode(text)))
+            decompressing += decompressed - started
+            decoding += time.perf_counter() - decompressed
+        self._event.add('decompress', decompressing)
+        self._event.add('decode', decoding)
+        return rows
+
+    def close(self):
+        """Returns the remaining rows once the download has ended."""
+        text = b''
+        if self._decompressor is not None:
+            text = self._decompressor.flush()
+            if not self._decompressor.eof:
+                raise ValueError('Compressed download is cut short.')
+        return self._parser.feed(self._text.decode(text, final=True),
+                                 final=True)
+
+
+def iter_rows(chunks, event=None):
+    """
+    Yields the rows of a gzipped JSON array given as an iterable of
+    compressed chunks.
+
+    :param event: instrumentation.RequestEvent to time decoding into.
+    """
+    decoder = RowDecoder(event)
+    for chunk in chunks:
+        for row in decoder.feed(chunk):
+            yield row
+    for row in decoder.close():
+        yield row
+
+
+class PayloadLoader(object):
+    """
+    Collects the decompressed chunks of a JSON array download and decodes
+    it in one go on :meth:`close`.
+
+    :param event: instrumentation.RequestEvent to time decompression and
+        decoding into.
+    """
+
+    def __init__(self, event=None):
+        self._event = event
+        self._parts = []
+        self._decompressor = None
+        self._plain = None
+
+    def feed(self, data):
+        if self._plain is None:
+            self._plain = data[:1] not in (b'\x1f', b'\x78')
+            if not self._plain:
+                self._decompressor = Decompressor()
+        if self._plain:
+            self._parts.append(data)
+            return
+        started = time.perf_counter()
+        while data:
+            self._parts.append(self._decompressor.decompress(data))
+            data = self._decompressor.unconsumed_tail
+        if self._event is not None:
+            self._event.add('decompress', time.perf_counter() - started)
+
+    def close(self):
+        """
+        :returns: List of rows.
+        :raises ValueError: The download is not a JSON array, or cut short.
+        """
+        if self._decompressor is not None:
+            self._parts.append(self._decompressor.flush())
+            if not self._decompressor.eof:
+                raise ValueError('Compressed download is cut short.')
+        payload = b''.join(self._parts)
+        self._parts = []
+        started = time.perf_counter()
+        rows = get_codec().loads(payload) if payload.strip() else []
+        if self._event is not None:
+            self._event.add('decode', time.perf_counter() - started)
+        if not isinstance(rows, list):
+            raise ValueError('Expected a JSON array.')
+        return rows
+
+
+def load_rows(chunks, event=None):
+    """
+    All rows of a gzipped JSON array given as an iterable of compressed
+    chunks, as a list.
+
+    :param event: instrumentation.RequestEvent to time decoding into.
+    """
+    loader = PayloadLoader(event)
+    for chunk in chunks:
+        loader.feed(chunk)
+    return loader.close()
+
+
+async def async_load_rows(chunks, event=None):
+    """:func:`load_rows` for an async iterable of chunks."""
+    loader = PayloadLoader(event)
+    async for chunk in chunks:
+        loader.feed(chunk)
+    return loader.close()
+
+
+async def async_iter_rows(chunks, event=None):
+    """:func:`iter_rows` for an async iterable of chunks."""
+    decoder = RowDecoder(event)
+    async for chunk in chunks:
+        for row in decoder.feed(chunk):
+            yield row
+    for row in decoder.close():
+        yield row
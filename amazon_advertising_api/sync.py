@@ -0,0 +1,365 @@
+"""
+Incremental account sync.
+
+:class:`AccountSync` keeps a local replica of a profile's campaigns, ad
+groups, ads, keywords and targets. The first sync loads everything from
+snapshots. Later syncs ask the change history (``list_changes``) which
+entities changed since the profile's watermark and re-read only those, a
+hundred ids per call, so a quiet account syncs in a handful of calls.
+
+The replica is anything with the :class:`Replica` interface; a Replica keeps
+entities in dictionaries and can be saved to and loaded from a JSON file.
+"""
+import time
+
+from amazon_advertising_api.bulk import chunked
+from amazon_advertising_api.errors import ApiError
+from amazon_advertising_api.files import read_replica, write_replica
+from amazon_advertising_api.models import decoded
+from amazon_advertising_api.pagination import DEFAULT_PAGE_SIZE
+from amazon_advertising_api.reports import PollPolicy
+
+# Changes this far back are re-read on every delta sync, covering events the
+# history records late.
+DEFAULT_OVERLAP = 15 * 60.0
+# Older watermarks fall outside the change history; the profile is reloaded.
+MAX_HISTORY_AGE = 90 * 24 * 3600.0
+# Events per list_changes page, the most the API returns.
+HISTORY_PAGE_SIZE = 200
+# Ids per id-filtered listing.
+ID_FILTER_SIZE = 100
+# Entities in every state, so archiving shows up as a change.
+ALL_STATES = 'enabled,paused,archived'
+
+
+class EntityType(object):
+    """
+    How one kind of entity is loaded and re-read.
+
+    :ivar name: Replica collection, e.g. 'keywords'.
+    :ivar event_type: Its entityType in the change history.
+    :ivar snapshot_type: Snapshot record type.
+    :ivar id_field: Id field of the entities.
+    :ivar id_filter: Listing parameter filtering by id.
+    :ivar iterator: Client method listing the entities page by page.
+    """
+
+    __slots__ = ('name', 'event_type', 'snapshot_type', 'id_field',
+                 'id_filter', 'iterator')
+
+    def __init__(self, name, event_type, snapshot_type, id_field, id_filter,
+                 iterator):
+        self.name = name
+        self.event_type = event_type
+        self.snapshot_type = snapshot_type
+        self.id_field = id_field
+        self.id_filter = id_filter
+        self.iterator = iterator
+
+
+ENTITY_TYPES = (
+    EntityType('campaigns', 'CAMPAIGN', 'campaigns', 'campaignId',
+               'campaignIdFilter', 'iter_campaigns'),
+    EntityType('ad_groups', 'AD_GROUP', 'adGroups', 'adGroupId',
+               'adGroupIdFilter', 'iter_ad_groups'),
+    EntityType('product_ads', 'AD', 'productAds', 'adId', 'adIdFilter',
+               'iter_product_ads'),
+    EntityType('keywords', 'KEYWORD', 'keywords', 'keywordId',
+               'keywordIdFilter', 'iter_biddable_keywords'),
+    EntityType('negative_keywords', 'NEGATIVE_KEYWORD', 'negativeKeywords',
+               'keywordId', 'keywordIdFilter', 'iter_negative_keywords'),
+    EntityType('targets', 'PRODUCT_TARGETING', 'targets', 'targetId',
+               'targetIdFilter', 'iter_targets'),
+)
+
+
+class SyncResult(object):
+    """
+    Outcome of one sync.
+
+    :ivar profile_id: The profile synced.
+    :ivar mode: 'full' or 'delta'.
+    :ivar calls: API calls the sync made.
+    :ivar events: Change history events read (delta syncs).
+    :ivar changed: Entities written, by collection.
+    :ivar removed: Entities dropped, by collection.
+    :ivar watermark: The profile's new watermark, in epoch milliseconds.
+    :ivar elapsed: Seconds the sync took.
+    """
+
+    __slots__ = ('profile_id', 'mode', 'calls', 'events', 'changed',
+                 'removed', 'watermark', 'elapsed')
+
+    def __init__(self, profile_id, mode):
+        self.profile_id = profile_id
+        self.mode = mode
+        self.calls = 0
+        self.events = 0
+        self.changed = {}
+        self.removed = {}
+        self.watermark = None
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return ('SyncResult(profile_id={!r}, mode={!r}, calls={}, events={}, '
+                'changed={}, removed={}, elapsed={:.3f})').format(
+            self.profile_id, self.mode, self.calls, self.events,
+            sum(self.changed.values()), sum(self.removed.values()),
+            self.elapsed)
+
+
+class Replica(object):
+    """
+    Local copy of synced entities with a watermark per profile. Profile
+    ids are kept as strings, as they are in the JSON file.
+
+    :param path: JSON file to load from and :meth:`save` to.
+    :type path: string
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._profiles = {}
+        self._watermarks = {}
+        if path is not None:
+            self._watermarks, profiles = read_replica(path)
+            for profile_id, collections in profiles.items():
+                for name, entities in collections.items():
+                    self.replace(profile_id, name, entities,
+                                 _id_field(name))
+
+    def watermark(self, profile_id):
+        """Epoch milliseconds the profile is synced up to, or None."""
+        return self._watermarks.get(str(profile_id))
+
+    def set_watermark(self, profile_id, watermark):
+        self._watermarks[str(profile_id)] = watermark
+
+    def entities(self, profile_id, name):
+        """The entities of a collection, by id."""
+        return self._profiles.get(str(profile_id), {}).get(name, {})
+
+    def replace(self, profile_id, name, entities, id_field):
+        """Replaces a whole collection. Returns the number of entities."""
+        collection = dict((entity[id_field], entity) for entity in entities)
+        self._profiles.setdefault(str(profile_id), {})[name] = collection
+        return len(collection)
+
+    def upsert(self, profile_id, name, entities, id_field):
+        """Adds or replaces entities. Returns the number written."""
+        collection = self._profiles.setdefault(
+            str(profile_id), {}).setdefault(name, {})
+        count = 0
+        for entity in entities:
+            collection[entity[id_field]] = entity
+            count += 1
+        return count
+
+    def remove(self, profile_id, name, ids):
+        """Drops entities by id. Returns the number dropped."""
+        collection = self._profiles.get(str(profile_id), {}).get(name, {})
+        return sum(collection.pop(entity_id, None) is not None
+                   for entity_id in ids)
+
+    def save(self, path=None):
+        """Writes the replica to its JSON file, atomically."""
+        profiles = dict(
+            (profile_id, dict((name, list(collection.values()))
+                              for name, collection in collections.items()))
+            for profile_id, collections in self._profiles.items())
+        write_replica(path or self.path, self._watermarks, profiles)
+
+
+def _id_field(name):
+    for entity_type in ENTITY_TYPES:
+        if entity_type.name == name:
+            return entity_type.id_field
+    raise KeyError('Entity type {} not found.'.format(name))
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _checked(res):
+    if not res['success']:
+        raise ApiError(res)
+    return decoded(res)
+
+
+class AccountSync(object):
+    """
+    Keeps a replica of the client's profile up to date.
+
+    ::
+
+        sync = AccountSync(api, Replica('account.json'))
+        result = sync.sync()    # full load the first time, deltas after
+        sync.replica.save()
+
+    :param client: An AdvertisingApiV3 bound to the profile to sync.
+    :param replica: Where entities and watermarks are kept. Defaults to a
+        new in-memory Replica.
+    :param entity_types: Names of the collections to sync; all by default.
+    :type entity_types: list
+    :param snapshots: Load the initial state from snapshots rather than
+        paginated listings.
+    :type snapshots: boolean
+    :param overlap: Seconds before the watermark a delta sync starts from.
+    :type overlap: float
+    :param poll_policy: Snapshot polling intervals.
+    :type poll_policy: PollPolicy
+    """
+
+    def __init__(self, client, replica=None, entity_types=None,
+                 snapshots=True, overlap=DEFAULT_OVERLAP, poll_policy=None):
+        self.client = client
+        self.replica = replica if replica is not None else Replica()
+        if entity_types is None:
+            self.entity_types = list(ENTITY_TYPES)
+        else:
+            self.entity_types = [t for t in ENTITY_TYPES
+                                 if t.name in entity_types]
+        self.snapshots = snapshots
+        self.overlap = overlap
+        self.poll_policy = poll_policy or PollPolicy()
+
+    @property
+    def profile_id(self):
+        return self.client.profile_id
+
+    def sync(self, full=False):
+        """
+        Brings the replica up to date: a full load when the profile has no
+        watermark, an outdated one, or ``full`` is set; a delta sync
+        otherwise.
+
+        :raises ApiError: A call failed; the watermark is left unchanged.
+        :returns: A :class:`SyncResult`.
+        """
+        started = time.time()
+        watermark = self.replica.watermark(self.profile_id)
+        if watermark is not None and \
+                started - watermark / 1000.0 > MAX_HISTORY_AGE:
+            full = True
+        # Changes made while the sync runs are picked up by the next one.
+        now = _now_ms()
+        if full or watermark is None:
+            result = SyncResult(self.profile_id, 'full')
+            self._full(result)
+        else:
+            result = SyncResult(self.profile_id, 'delta')
+            self._delta(result, watermark - int(self.overlap * 1000), now)
+        self.replica.set_watermark(self.profile_id, now)
+        result.watermark = now
+        result.elapsed = time.time() - started
+        return result
+
+    def _full(self, result):
+        if not self.snapshots:
+            for entity_type in self.entity_types:
+                entities = self._list(result, entity_type,
+                                      {'stateFilter': ALL_STATES})
+                result.changed[entity_type.name] = self.replica.replace(
+                    self.profile_id, entity_type.name, entities,
+                    entity_type.id_field)
+            return
+        pending = {}
+        for entity_type in self.entity_types:
+            res = self.client.request_snapshot(
+                record_type=entity_type.snapshot_type,
+                data={'stateFilter': ALL_STATES})
+            result.calls += 1
+            pending[_checked(res)['snapshotId']] = entity_type
+        for snapshot_id, entity_type in self._finished(result, pending):
+            rows = self.client.stream_snapshot(snapshot_id)
+            # Status, download location and the file itself.
+            result.calls += 3
+            result.changed[entity_type.name] = self.replica.replace(
+                self.profile_id, entity_type.name, rows,
+                entity_type.id_field)
+
+    def _finished(self, result, pending):
+        """Yields ``(snapshot_id, entity_type)`` as snapshots finish."""
+        policy = self.poll_policy
+        started = time.time()
+        first_delay = policy.first_delay('snapshot')
+        # Next poll, delay since the previous one, and when the snapshot was
+        # last seen pending.
+        due = dict((snapshot_id, (started + first_delay, first_delay,
+                                  started))
+                   for snapshot_id in pending)
+        while due:
+            snapshot_id = min(due, key=lambda key: due[key][0])
+            at, delay, last_pending = due[snapshot_id]
+            time.sleep(max(0.0, at - time.time()))
+            status = _checked(self.client.request_snapshot(
+                snapshot_id=snapshot_id))
+            result.calls += 1
+            now = time.time()
+            if status['status'] == 'SUCCESS':
+                del due[snapshot_id]
+                policy.observe('snapshot', last_pending - started,
+                               now - started)
+                yield snapshot_id, pending[snapshot_id]
+            elif status['status'] == 'FAILURE':
+                raise ApiError({'success': False,
+                                'code': 0,
+                                'response': 'Snapshot {} failed: {}'.format(
+                                    snapshot_id, status)})
+            else:
+                delay = policy.next_delay(delay)
+                due[snapshot_id] = (now + delay, delay, now)
+
+    def _delta(self, result, since, until):
+        by_event = dict((t.event_type, t) for t in self.entity_types)
+        changed = dict((t.name, set()) for t in self.entity_types)
+        for event in self._events(result, since, until):
+            entity_type = by_event.get(event.get('entityType'))
+            if entity_type is not None:
+                changed[entity_type.name].add(event['entityId'])
+        for entity_type in self.entity_types:
+            ids = changed[entity_type.name]
+            if not ids:
+                continue
+            found = []
+            for chunk in chunked(sorted(ids), ID_FILTER_SIZE):
+                found.extend(self._list(result, entity_type, {
+                    entity_type.id_filter: ','.join(map(str, chunk)),
+                    'stateFilter': ALL_STATES}))
+            result.changed[entity_type.name] = self.replica.upsert(
+                self.profile_id, entity_type.name, found,
+                entity_type.id_field)
+            # Ids the listing no longer returns were deleted outright.
+            gone = ids.difference(entity[entity_type.id_field]
+                                  for entity in found)
+            if gone:
+                result.removed[entity_type.name] = self.replica.remove(
+                    self.profile_id, entity_type.name, gone)
+
+    def _events(self, result, since, until):
+        event_types = dict((t.event_type, {}) for t in self.entity_types)
+        offset = 0
+        while True:
+            page = _checked(self.client.list_changes({
+                'fromDate': since,
+                'toDate': until,
+                'eventTypes': event_types,
+                'count': HISTORY_PAGE_SIZE,
+                'pageOffset': offset,
+                'sort': {'key': 'DATE', 'direction': 'ASC'}}))
+            result.calls += 1
+            events = page.get('events', [])
+            result.events += len(events)
+            for event in events:
+                yield event
+            offset += len(events)
+            if not events or offset >= page.get('totalRecords', 0):
+                return
+
+    def _list(self, result, entity_type, data):
+        """All entities of a filtered listing, counting the pages read."""
+        iterator = getattr(self.client, entity_type.iterator)
+        entities = list(iterator(data, extended=True))
+        result.calls += len(entities) // DEFAULT_PAGE_SIZE + 1
+        return entities
@@ -0,0 +1,479 @@
+"""
+HTTP transports used by the API clients.
+
+A transport takes a method, an absolute URL, headers and an optional body and
+returns a :class:`Response`. Redirects are never followed; callers that care
+about a 307 (report and snapshot downloads) read the ``Location`` header
+themselves.
+"""
+from collections import deque
+from io import BytesIO
+import http.client as http_client
+import select
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+from amazon_advertising_api.instrumentation import current_event
+
+# Errors raised when the peer closed a kept-alive connection while it was
+# sitting in the pool. The request is replayed once on a fresh connection if
+# it cannot have been processed (see replayable).
+STALE_CONNECTION_ERRORS = (http_client.BadStatusLine,
+                           http_client.CannotSendRequest,
+                           ConnectionError)
+
+# Methods that can be sent again when the connection dropped after the
+# request was written: the server may already have processed it, and a
+# replayed POST would create the entities twice.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 60.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class Response(object):
+    """A fully read HTTP response."""
+
+    __slots__ = ('code', 'reason', 'headers', 'body')
+
+    def __init__(self, code, reason, headers, body):
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.code < 300
+
+    def header(self, name, default=None):
+        """Case-insensitive header lookup."""
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return default
+
+
+class StreamingResponse(object):
+    """
+    An HTTP response whose body is read incrementally.
+
+    :param fp: File-like object the body is read from.
+    :param release: Called with True once the body has been read to the end,
+        or with False when the response is closed early.
+    :ivar event: instrumentation.RequestEvent of the request, if it is being
+        observed; it finishes when the response is released.
+    """
+
+    def __init__(self, code, reason, headers, fp, release=None):
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+        self.event = None
+        self._fp = fp
+        self._release = release
+
+    ok = Response.ok
+    header = Response.header
+
+    def iter_content(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Yields the body in chunks of at most ``chunk_size`` bytes.
+
+        :raises http.client.IncompleteRead: The connection ended before the
+            announced Content-Length.
+        """
+        expected = self.header('Content-Length')
+        received = 0
+        event = self.event
+        try:
+            while True:
+                if event is None:
+                    chunk = self._fp.read(chunk_size)
+                else:
+                    started = time.perf_counter()
+                    chunk = self._fp.read(chunk_size)
+                    event.add('read', time.perf_counter() - started)
+                    event.bytes_received += len(chunk)
+                if not chunk:
+                    break
+                received += len(chunk)
+                yield chunk
+            # Bounded reads return b'' rather than raising at a premature end.
+            if expected is not None and received < int(expected) and \
+                    self.header('Transfer-Encoding') is None:
+                raise http_client.IncompleteRead(b'', int(expected) - received)
+        except BaseException as e:
+            if event is not None and isinstance(e, Exception):
+                event.finish(e)
+            self.close()
+            raise
+        self._finish(True)
+
+    def read(self):
+        """Reads the rest of the body."""
+        return b''.join(self.iter_content())
+
+    def close(self):
+        self._finish(False)
+
+    def _finish(self, complete):
+        release, self._release = self._release, None
+        if release is not None:
+            release(complete)
+        if self.event is not None:
+            self.event.finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Transport(object):
+    """Interface every transport implements."""
+
+    def request(self, method, url, headers=None, body=None):
+        """
+        Sends a single request.
+
+        :param method: HTTP method.
+        :type method: string
+        :param url: Absolute http(s) URL.
+        :type url: string
+        :param headers: Request headers.
+        :type headers: dictionary
+        :param body: Encoded request body.
+        :type body: bytes
+        :returns: :class:`Response`
+        """
+        raise NotImplementedError
+
+    def stream(self, method, url, headers=None, body=None):
+        """
+        Sends a single request, leaving the response body unread.
+
+        Takes the same arguments as :meth:`request`. Transports that cannot
+        stream fall back to this buffered implementation.
+
+        :returns: :class:`StreamingResponse`
+        """
+        res = self.request(method, url, headers, body)
+        return StreamingResponse(res.code, res.reason, res.headers,
+                                 BytesIO(res.body))
+
+    def close(self):
+        pass
+
+
+class ConnectionPool(object):
+    """
+    Idle keep-alive connections to a single scheme/host/port.
+
+    Connections are handed out LIFO so the most recently used (and therefore
+    least likely to have been closed by the server) is reused first.
+    Connections idle for longer than ``idle_timeout`` seconds are discarded.
+    """
+
+    def __init__(self, scheme, host, port,
+                 maxsize=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 timeout=DEFAULT_TIMEOUT,
+                 ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def _new_conn(self):
+        if self.scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+            return http_client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=context)
+        return http_client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout)
+
+    def connect(self, conn, event):
+        """
+        Opens a new connection step by step, adding the time taken by name
+        resolution, the TCP handshake and the TLS handshake to ``event``.
+        """
+        started = time.perf_counter()
+        family, kind, proto, _, address = socket.getaddrinfo(
+            self.host, self.port, 0, socket.SOCK_STREAM)[0]
+        resolved = time.perf_counter()
+        sock = socket.socket(family, kind, proto)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+            connected = time.perf_counter()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.scheme == 'https':
+                context = self.ssl_context or ssl.create_default_context()
+                sock = context.wrap_socket(sock, server_hostname=self.host)
+                event.add('tls', time.perf_counter() - connected)
+        except BaseException:
+            sock.close()
+            raise
+        event.add('dns', resolved - started)
+        event.add('connect', connected - resolved)
+        conn.sock = sock
+
+    def get(self):
+        """
+        Returns a ``(connection, reused)`` tuple, reusing an idle connection
+        when one is available.
+        """
+        now = time.time()
+        with self._lock:
+            while self._idle:
+                conn, released = self._idle.pop()
+                if now - released <= self.idle_timeout and \
+                        not _dropped(conn):
+                    return conn, True
+                conn.close()
+        return self._new_conn(), False
+
+    def put(self, conn):
+        """Returns a connection whose response has been fully read."""
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop()[0].close()
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+
+class PooledTransport(Transport):
+    """
+    Transport that keeps persistent connections per host.
+
+    :param maxsize: Idle connections kept per host. 0 disables reuse.
+    :type maxsize: integer
+    :param idle_timeout: Seconds an idle connection may be reused after.
+    :type idle_timeout: float
+    :param timeout: Socket timeout in seconds.
+    :type timeout: float
+    :param ssl_context: Optional ``ssl.SSLContext`` for https hosts.
+    """
+
+    def __init__(self,
+                 maxsize=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 timeout=DEFAULT_TIMEOUT,
+                 ssl_context=None):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(scheme, host, port,
+                                          maxsize=self.maxsize,
+                                          idle_timeout=self.idle_timeout,
+                                          timeout=self.timeout,
+                                          ssl_context=self.ssl_context)
+                    self._pools[key] = pool
+        return pool
+
+    def request(self, method, url, headers=None, body=None):
+        pool, conn, res = self._open(method, url, headers, body)
+        event = current_event()
+        try:
+            if event is None:
+                data = res.read()
+            else:
+                started = time.perf_counter()
+                data = res.read()
+                event.add('read', time.perf_counter() - started)
+        except BaseException:
+            # The rest of the body is unread; the connection is unusable.
+            conn.close()
+            raise
+        response = Response(res.status, res.reason, res.getheaders(), data)
+        if res.will_close:
+            conn.close()
+        else:
+            pool.put(conn)
+        return response
+
+    def stream(self, method, url, headers=None, body=None):
+        pool, conn, res = self._open(method, url, headers, body)
+
+        def release(complete):
+            if complete and not res.will_close:
+                pool.put(conn)
+            else:
+                conn.close()
+
+        return StreamingResponse(res.status, res.reason, res.getheaders(),
+                                 res, release)
+
+    def _open(self, method, url, headers, body):
+        """
+        Sends a request on a pooled connection and returns
+        ``(pool, connection, http.client.HTTPResponse)`` with the body unread.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        pool = self.pool(scheme, parts.hostname, port)
+        event = current_event()
+
+        conn, reused = pool.get()
+        written = False
+        try:
+            if event is not None and not reused:
+                pool.connect(conn, event)
+            started = time.perf_counter()
+            conn.request(method, path, body=body, headers=headers or {})
+            written = True
+            sent = time.perf_counter()
+            res = conn.getresponse()
+            if event is not None:
+                event.add('send', sent - started)
+                event.add('server', time.perf_counter() - sent)
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not replayable(method, reused, written):
+                raise
+            conn = pool._new_conn()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                res = conn.getresponse()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+        return pool, conn, res
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+def _dropped(conn):
+    """
+    Whether the peer closed an idle connection: it is readable although no
+    response is expected.
+    """
+    if conn.sock is None:
+        return True
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+def replayable(method, reused, written):
+    """
+    Whether a request that failed with a stale connection error can be sent
+    again on a new connection: the connection came from the pool, and either
+    the request was not fully written or sending it twice is harmless.
+    """
+    return reused and (not written or method in IDEMPOTENT_METHODS)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class UrllibTransport(Transport):
+    """
+    Transport that opens a new connection per request via ``urllib``.
+
+    This is the behaviour the clients had before connection pooling; it is
+    kept for comparison and for environments where persistent sockets are
+    undesirable.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, ssl_context=None):
+        self.timeout = timeout
+        self._opener = urllib.request.build_opener(
+            _NoRedirect(), urllib.request.HTTPSHandler(context=ssl_context))
+
+    def request(self, method, url, headers=None, body=None):
+        f = self._open(method, url, headers, body)
+        event = current_event()
+        try:
+            if event is None:
+                return Response(f.code, f.msg, f.headers.items(), f.read())
+            started = time.perf_counter()
+            data = f.read()
+            event.add('read', time.perf_counter() - started)
+            return Response(f.code, f.msg, f.headers.items(), data)
+        finally:
+            f.close()
+
+    def stream(self, method, url, headers=None, body=None):
+        f = self._open(method, url, headers, body)
+        return StreamingResponse(f.code, f.msg, f.headers.items(), f,
+                                 lambda complete: f.close())
+
+    def _open(self, method, url, headers, body):
+        req = urllib.request.Request(url=url, headers=headers or {}, data=body)
+        req.get_method = lambda: method
+        event = current_event()
+        started = time.perf_counter()
+        try:
+            return self._opener.open(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            return e
+        finally:
+            if event is not None:
+                # Connection setup, sending and waiting, all in one.
+                event.add('server', time.perf_counter() - started)
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport():
+    """Returns the process-wide :class:`PooledTransport`."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = PooledTransport()
+    return _default_transport
@@ -0,0 +1,119 @@
+"""
+Encode and decode speed of the installed JSON codecs on API-shaped payloads.
+
+Payloads: a 1000-keyword ``update_keywords`` body and a 100-campaign
+``create_campaigns`` body (encoding); an extended campaign listing, a
+keyword snapshot and a search term report (decoding). Every codec of
+codec.py that is installed is measured, plus ``json.loads`` of the body
+after ``.decode('utf-8')``, the way responses used to be decoded.
+
+    python benchmarks/bench_codec.py --snapshot-rows 50000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server import report_rows, snapshot_rows  # noqa: E402
+from amazon_advertising_api.codec import available, get_codec  # noqa: E402
+
+
+def keyword_updates(count):
+    return [{'keywordId': 10 ** 11 + i, 'state': 'enabled',
+             'bid': round(0.2 + (i % 90) * 0.02, 2)} for i in range(count)]
+
+
+def campaigns(count, extended=False):
+    rows = []
+    for i in range(count):
+        row = {'campaignId': 10 ** 11 + i, 'name': 'Campaign {} – été'.format(i),
+               'campaignType': 'sponsoredProducts', 'targetingType': 'manual',
+               'state': 'enabled', 'dailyBudget': 25.5, 'startDate': '20240101',
+               'premiumBidAdjustment': True,
+               'bidding': {'strategy': 'legacyForSales', 'adjustments': [
+                   {'predicate': 'placementTop', 'percentage': 50}]}}
+        if extended:
+            row.update(creationDate=1700000000000 + i,
+                       lastUpdatedDate=1700000500000 + i,
+                       servingStatus='CAMPAIGN_STATUS_ENABLED')
+        rows.append(row)
+    return rows
+
+
+def best(function, argument, seconds):
+    """
+    Best seconds per call over repeated rounds lasting ``seconds``, with the
+    garbage collector off as in timeit.
+    """
+    function(argument)
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline or len(timings) < 3:
+            started = time.perf_counter()
+            function(argument)
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(timings)
+
+
+def run(args):
+    encode = [('update_keywords x1000', keyword_updates(1000)),
+              ('create_campaigns x100', campaigns(100))]
+    decode = [('list_campaigns_ex x100', campaigns(100, extended=True)),
+              ('snapshot x{}'.format(args.snapshot_rows),
+               snapshot_rows(args.snapshot_rows)),
+              ('report x{}'.format(args.report_rows),
+               report_rows(args.report_rows))]
+    codecs = [get_codec(name) for name in available()]
+    results = []
+
+    for label, obj in encode:
+        size = len(get_codec('json').dumps(obj))
+        for codec in codecs:
+            seconds = best(codec.dumps, obj, args.seconds)
+            results.append(('encode', label, codec.name, size, seconds))
+
+    def decode_text(body):
+        return json.loads(body.decode('utf-8'))
+
+    for label, obj in decode:
+        body = get_codec('json').dumps(obj)
+        for name, loads in [(codec.name, codec.loads) for codec in codecs] + \
+                [('json+decode', decode_text)]:
+            seconds = best(loads, body, args.seconds)
+            results.append(('decode', label, name, len(body), seconds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--snapshot-rows', type=int, default=50000)
+    parser.add_argument('--report-rows', type=int, default=100000)
+    parser.add_argument('--seconds', type=float, default=1.0,
+                        help='Time spent per codec and payload.')
+    args = parser.parse_args()
+
+    print('codecs: {}'.format(', '.join(available())))
+    results = run(args)
+    # Speed-up relative to the standard library codec.
+    baseline = dict(((operation, label), seconds)
+                    for operation, label, name, _, seconds in results
+                    if name == 'json')
+    for operation, label, name, size, seconds in results:
+        key = (operation, label)
+        print('{:<6} {:<24} {:<12} {:10.3f} ms {:8.1f} MB/s {:6.2f}x'.format(
+            operation, label, name, seconds * 1000, size / seconds / 1e6,
+            baseline[key] / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Report download to disk against a local stand-in server, including resume.
+
+Serves a gzipped JSON report behind the usual status -> 307 -> file
+sequence. The file endpoint honours Range requests and can cut the
+connection part way through, so the script exercises:
+
+* resume within one call after the connection drops,
+* resume by a later call from the ``.part`` file left behind,
+* peak memory of ``get_report`` versus ``download_report``.
+
+    python benchmarks/bench_download.py --rows 200000
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_transport import (Handler, client_context, make_certificate,  # noqa: E402
+                             start_server)
+from amazon_advertising_api.advertising_api import AdvertisingApiV3  # noqa: E402
+from amazon_advertising_api.transport import PooledTransport  # noqa: E402
+
+
+class ReportHandler(Handler):
+    payload = b''
+    port = 0
+    # Number of upcoming file requests to cut off after half their bytes.
+    drops = 0
+
+    def do_GET(self):
+        if self.path.startswith('/v2/reports/'):
+            self.send_body(200, json.dumps({
+                'status': 'SUCCESS',
+                'location': 'https://127.0.0.1:{}/location'.format(self.port),
+            }).encode('utf-8'))
+        elif self.path == '/location':
+            self.send_response(307)
+            self.send_header('Location',
+                             'https://127.0.0.1:{}/file'.format(self.port))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path == '/file':
+            self.send_file()
+
+    def send_body(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self):
+        payload = type(self).payload
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(payload):
+                self.send_body(416, b'')
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                start, len(payload) - 1, len(payload)))
+        else:
+            self.send_response(200)
+        body = payload[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if type(self).drops:
+            type(self).drops -= 1
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.close()
+            return
+        self.wfile.write(body)
+
+
+def make_client(port):
+    api = AdvertisingApiV3('client', 'secret', 'na', profile_id='1',
+                           access_token='token',
+                           transport=PooledTransport(ssl_context=client_context()))
+    api.endpoint = '127.0.0.1:{}'.format(port)
+    return api
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    rows = [{'campaignId': i, 'query': 'search term {}'.format(i),
+             'impressions': i * 3, 'clicks': i % 7, 'cost': i * 0.01}
+            for i in range(args.rows)]
+    raw = json.dumps(rows).encode('utf-8')
+    ReportHandler.payload = gzip.compress(raw)
+    del rows
+
+    directory = tempfile.mkdtemp()
+    try:
+        server = start_server(*make_certificate(directory),
+                              handler=ReportHandler)
+        ReportHandler.port = server.server_address[1]
+        api = make_client(ReportHandler.port)
+        path = os.path.join(directory, 'report.json.gz')
+        size = len(ReportHandler.payload)
+        print('report: {} rows, {} bytes gzipped'.format(args.rows, size))
+
+        res, elapsed, peak = measure(lambda: api.get_report('r1'))
+        assert res['success'], res
+        print('{:<34} {:>7.3f}s  peak {:>8.1f} MB'.format(
+            'get_report (in memory)', elapsed, peak / 1e6))
+
+        res, elapsed, peak = measure(
+            lambda: api.download_report('r1', path, decompress=True))
+        assert res['success'], res
+        assert open(path, 'rb').read() == raw
+        print('{:<34} {:>7.3f}s  peak {:>8.1f} MB'.format(
+            'download_report (decompressed)', elapsed, peak / 1e6))
+
+        # Connection dropped half way: resumed within the same call.
+        ReportHandler.drops = 1
+        res = api.download_report('r1', path)
+        result = res['response']
+        assert open(path, 'rb').read() == ReportHandler.payload
+        assert result.attempts == 2 and result.bytes_received == size
+        print('dropped once, resumed in-call:    {}'.format(result))
+
+        # Retries exhausted: the .part file is resumed by the next call.
+        ReportHandler.drops = 1
+        try:
+            api.download_report('r1', path, retries=0)
+        except Exception as e:
+            print('dropped, retries=0 raised:        {}'.format(
+                type(e).__name__))
+        kept = os.path.getsize(path + '.part')
+        res = api.download_report('r1', path)
+        result = res['response']
+        assert result.resumed_from == kept
+        assert result.bytes_received == size - kept
+        assert open(path, 'rb').read() == ReportHandler.payload
+        print('resumed by a later call:          {}'.format(result))
+
+        server.shutdown()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Concurrent report downloads: parsed in threads vs. in a process pool.
+
+Downloads the stand-in server's report ``--reports`` times at once (see
+server.py), first with ``get_report`` from a thread pool, where
+decompression and parsing share the GIL, then with ``process_report``
+handing the payloads to a ReportProcessor. Also prints how many bytes a
+report takes to pickle as row dictionaries and as columnar batches of the
+same columns, which is what crosses the process boundary, and as the
+batches the processor returns, derived metrics included.
+
+    python benchmarks/bench_processing.py --reports 8 --rows 200000
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from harness import make_client  # noqa: E402
+from server import StandIn  # noqa: E402
+from amazon_advertising_api.columnar import iter_batches  # noqa: E402
+from amazon_advertising_api.processing import ReportProcessor  # noqa: E402
+
+METRICS = 'impressions,clicks,cost,attributedSales14d'
+
+
+def timed(label, calls, rows):
+    started = time.perf_counter()
+    results = list(calls())
+    elapsed = time.perf_counter() - started
+    total = sum(rows(res) for res in results)
+    print('{:<16} {:8.3f}s {:12,.0f} rows/s'.format(label, elapsed,
+                                                     total / elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--reports', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with StandIn(profiles=1, report_rows_count=args.rows,
+                 snapshot_rows_count=1) as server:
+        api = make_client(server)
+        ids = ['report-keywords'] * args.reports
+        threads = ThreadPoolExecutor(max_workers=args.reports)
+        print('{} reports of {:,} rows, {} workers'.format(
+            args.reports, args.rows, args.workers))
+
+        rows = timed('threads', lambda: threads.map(api.get_report, ids),
+                     lambda res: len(res['response']))
+        with ReportProcessor(max_workers=args.workers,
+                             derived=('ctr', 'cpc', 'acos14d')) as processor:
+            # Start the workers before timing.
+            processor.process(b'[]')
+            batches = timed(
+                'process pool',
+                lambda: threads.map(lambda report_id: api.process_report(
+                    report_id, processor, METRICS), ids),
+                lambda res: sum(batch.num_rows for batch in res['response']))
+        threads.shutdown()
+        api.transport.close()
+
+    report = rows[0]['response']
+    print('pickled rows                {:12,d} bytes'.format(
+        len(pickle.dumps(report))))
+    # Same columns, no derived metrics.
+    print('pickled batches             {:12,d} bytes'.format(
+        len(pickle.dumps(list(iter_batches(report, METRICS))))))
+    print('pickled batches, derived    {:12,d} bytes'.format(
+        len(pickle.dumps(batches[0]['response']))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Requests/sec through AdvertisingApiV3 with and without connection pooling.
+
+Starts a local HTTPS stand-in for the Advertising API (self-signed
+certificate generated with the ``openssl`` binary) and issues the same
+``list_campaigns`` call repeatedly through each transport.
+
+    python benchmarks/bench_transport.py --requests 500
+"""
+import argparse
+import http.server
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3  # noqa: E402
+from amazon_advertising_api.transport import PooledTransport, UrllibTransport  # noqa: E402
+
+BODY = b'[{"campaignId": 1, "name": "bench", "state": "enabled"}]'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response so headers and body leave in one segment.
+    wbufsize = -1
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_certificate(directory):
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.check_call(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=127.0.0.1'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+class Server(http.server.ThreadingHTTPServer):
+    # Room for many clients connecting at once.
+    request_queue_size = 128
+
+
+def start_server(cert, key, handler=Handler, port=0):
+    server = Server(('127.0.0.1', port), handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def client_context():
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def run(transport, port, requests):
+    api = AdvertisingApiV3('client', 'secret', 'na', profile_id='1',
+                           access_token='token', transport=transport)
+    api.endpoint = '127.0.0.1:{}'.format(port)
+    start = time.perf_counter()
+    for _ in range(requests):
+        res = api.list_campaigns()
+        assert res['success'], res
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        server = start_server(*make_certificate(directory))
+        port = server.server_address[1]
+        transports = [
+            ('urllib (no pooling)', UrllibTransport(ssl_context=client_context())),
+            ('pooled', PooledTransport(ssl_context=client_context())),
+        ]
+        for name, transport in transports:
+            rate = run(transport, port, args.requests)
+            print('{:<22} {:>10.1f} req/s'.format(name, rate))
+            transport.close()
+        server.shutdown()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Reproducible benchmark suite, written as JSON for comparing versions.
+
+Runs the clients against the local stand-in server (see server.py) and
+measures:
+
+* calls/sec and p50/p99 latency of token refreshes, ``list_profiles`` and
+  ``list_campaigns``, sequential and from several threads,
+* time, rows/sec and peak traced memory of report and snapshot downloads,
+* import time of ``AdvertisingApi`` and ``AdvertisingApiV3`` in a fresh
+  interpreter.
+
+    python benchmarks/harness.py --output results.json
+    python benchmarks/harness.py --output new.json --baseline results.json
+
+With ``--baseline`` every metric that got worse by more than
+``--tolerance`` is listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_transport import client_context  # noqa: E402
+from server import StandIn  # noqa: E402
+from amazon_advertising_api.advertising_api import AdvertisingApiV3  # noqa: E402
+from amazon_advertising_api.auth import TokenManager  # noqa: E402
+from amazon_advertising_api.transport import PooledTransport  # noqa: E402
+from amazon_advertising_api.versions import versions  # noqa: E402
+
+# Metric name suffixes, and whether a larger value is better.
+DIRECTIONS = (('_per_sec', True), ('_ms', False), ('_seconds', False),
+              ('_mb', False))
+
+_IMPORT = '''
+import time
+started = time.perf_counter()
+from amazon_advertising_api.advertising_api import {}
+print(time.perf_counter() - started)
+'''
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_stats(samples, elapsed):
+    return {'calls': len(samples),
+            'calls_per_sec': len(samples) / elapsed,
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000}
+
+
+def make_client(server, refresh_token=None):
+    transport = PooledTransport(ssl_context=client_context())
+    token_manager = None
+    if refresh_token is not None:
+        token_manager = TokenManager('client', 'secret', refresh_token,
+                                     server.token_url, transport)
+    api = AdvertisingApiV3('client', 'secret', 'na', profile_id='1000',
+                           access_token='token', transport=transport,
+                           token_manager=token_manager)
+    api.endpoint = server.endpoint
+    return api
+
+
+def timed_calls(call, count, warmup=10):
+    for _ in range(warmup):
+        call()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples, time.perf_counter() - started)
+
+
+def threaded_calls(call, count, threads):
+    samples = []
+    lock = threading.Lock()
+    per_thread = max(1, count // threads)
+
+    def work():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            call()
+            local.append(time.perf_counter() - start)
+        with lock:
+            samples.extend(local)
+
+    call()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    result = latency_stats(samples, time.perf_counter() - started)
+    result['threads'] = threads
+    return result
+
+
+def checked(function):
+    def call():
+        res = function()
+        assert res['success'], res
+        return res
+    return call
+
+
+def download(function, rows, size):
+    """Timing of a download, then its peak memory in a traced second run."""
+    started = time.perf_counter()
+    count = function()
+    elapsed = time.perf_counter() - started
+    assert count == rows, (count, rows)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'rows': rows,
+            'download_bytes': size,
+            'elapsed_seconds': elapsed,
+            'rows_per_sec': rows / elapsed,
+            'peak_mb': peak / 1e6}
+
+
+def import_time(name, runs):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep +
+               os.environ.get('PYTHONPATH', ''))
+    samples = [float(subprocess.check_output(
+        [sys.executable, '-c', _IMPORT.format(name)], env=env))
+        for _ in range(runs)]
+    return {'runs': runs, 'median_seconds': statistics.median(samples),
+            'min_seconds': min(samples)}
+
+
+def run(args):
+    results = {}
+    with StandIn(profiles=args.profiles, report_rows_count=args.report_rows,
+                 snapshot_rows_count=args.snapshot_rows) as server:
+        api = make_client(server, refresh_token='Atzr|bench')
+        results['token_refresh'] = timed_calls(
+            checked(api.token_manager.refresh), args.calls // 4)
+        results['list_profiles'] = timed_calls(
+            checked(api.list_profiles), args.calls)
+        results['list_campaigns'] = timed_calls(
+            checked(api.list_campaigns), args.calls)
+        results['list_campaigns_threaded'] = threaded_calls(
+            checked(api.list_campaigns), args.calls, args.threads)
+        results['get_report'] = download(
+            lambda: len(api.get_report('report-keywords')['response']),
+            args.report_rows, server.file_size('report.json.gz'))
+        results['stream_report'] = download(
+            lambda: sum(1 for _ in api.stream_report('report-keywords')),
+            args.report_rows, server.file_size('report.json.gz'))
+        results['stream_snapshot'] = download(
+            lambda: sum(1 for _ in api.stream_snapshot('snapshot-keywords')),
+            args.snapshot_rows, server.file_size('snapshot.json.gz'))
+        api.transport.close()
+    for name in ('AdvertisingApi', 'AdvertisingApiV3'):
+        results['import_' + name] = import_time(name, args.import_runs)
+    return results
+
+
+def metadata(args):
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'version': versions['application_version'],
+            'commit': commit,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'parameters': vars(args)}
+
+
+def regressions(results, baseline, tolerance):
+    """``(benchmark, metric, old, new)`` of the metrics that got worse."""
+    found = []
+    for name, metrics in sorted(results.items()):
+        old_metrics = baseline.get(name, {})
+        for metric, value in sorted(metrics.items()):
+            old = old_metrics.get(metric)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            for suffix, larger_better in DIRECTIONS:
+                if metric.endswith(suffix):
+                    change = (value - old) / old
+                    if (larger_better and change < -tolerance) or \
+                            (not larger_better and change > tolerance):
+                        found.append((name, metric, old, value))
+                    break
+    return found
+
+
+def report(results):
+    for name, metrics in results.items():
+        print(name)
+        for metric, value in metrics.items():
+            if isinstance(value, float):
+                value = '{:.4g}'.format(value)
+            print('    {:<18} {}'.format(metric, value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='Results file to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative change before a metric '
+                             'counts as a regression.')
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--profiles', type=int, default=20)
+    parser.add_argument('--report-rows', type=int, default=100000)
+    parser.add_argument('--snapshot-rows', type=int, default=50000)
+    parser.add_argument('--import-runs', type=int, default=5)
+    args = parser.parse_args()
+
+    document = {'meta': metadata(args), 'results': run(args)}
+    report(document['results'])
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print('Results written to {}'.format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        found = regressions(document['results'], baseline, args.tolerance)
+        for name, metric, old, new in found:
+            print('REGRESSION {}.{}: {:.4g} -> {:.4g}'.format(
+                name, metric, old, new))
+        if found:
+            sys.exit(1)
+        print('No regressions beyond {:.0%}.'.format(args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
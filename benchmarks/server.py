@@ -0,0 +1,256 @@
+"""
+Local HTTPS stand-in for the Advertising API, used by the benchmarks.
+
+Serves the routes the clients use with canned, deterministic data:
+
+* ``POST /auth/o2/token``: refresh_token grant
+* ``GET /v*/profiles``
+* ``GET /v*/sp/<entities>`` and ``/extended``: paginated with
+  ``startIndex``/``count``
+* ``POST /v*/sp/<record type>/report`` and ``/snapshot``
+* ``GET /v*/reports/<id>`` and ``/v*/snapshots/<id>``: always finished
+* ``GET /v*/reports/<id>/download``: 307 to ``/files/report.json.gz``
+* ``GET /v*/snapshots/<id>/download``: 307 to ``/files/snapshot.json.gz``
+
+API calls are counted per Amazon-Advertising-API-Scope and per access
+token, so that concurrency tests can check what each request was sent with.
+
+    python benchmarks/server.py --port 8443
+"""
+import argparse
+from collections import Counter
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_transport import Handler, make_certificate, start_server  # noqa: E402
+
+DEFAULT_PROFILES = 20
+DEFAULT_ENTITIES = 500
+DEFAULT_REPORT_ROWS = 100000
+DEFAULT_SNAPSHOT_ROWS = 50000
+
+_ENTITY_PATH = re.compile(r'^/v\d+/sp/(\w+)(/extended)?$')
+_REQUEST_PATH = re.compile(r'^/v\d+/sp/(\w+)/(report|snapshot)$')
+_STATUS_PATH = re.compile(r'^/v\d+/(reports|snapshots)/([^/]+)$')
+_DOWNLOAD_PATH = re.compile(r'^/v\d+/(reports|snapshots)/([^/]+)/download$')
+
+
+def report_rows(count):
+    return [{'campaignId': i // 100, 'keywordId': i,
+             'query': 'search term {}'.format(i), 'impressions': i * 3,
+             'clicks': i % 7, 'cost': round(i * 0.01, 2),
+             'attributedSales14d': round(i * 0.05, 2)}
+            for i in range(count)]
+
+
+def snapshot_rows(count):
+    return [{'keywordId': i, 'adGroupId': i // 20, 'campaignId': i // 2000,
+             'keywordText': 'keyword {}'.format(i % 5000),
+             'matchType': 'exact', 'state': 'enabled', 'bid': 0.5}
+            for i in range(count)]
+
+
+def entity_rows(name, count):
+    id_field = {'campaigns': 'campaignId', 'adGroups': 'adGroupId',
+                'keywords': 'keywordId', 'negativeKeywords': 'keywordId',
+                'productAds': 'adId', 'targets': 'targetId'}.get(
+        name, name.rstrip('s') + 'Id')
+    return [{id_field: i, 'campaignId': i // 10,
+             'name': '{} {}'.format(name, i), 'state': 'enabled'}
+            for i in range(count)]
+
+
+class StandInHandler(Handler):
+    """Request handler; :class:`StandIn` sets the data on a subclass."""
+
+    # Larger bodies would otherwise wait for delayed ACKs.
+    disable_nagle_algorithm = True
+    port = 0
+    profiles = b'[]'
+    entities = {}
+    entity_count = DEFAULT_ENTITIES
+    files = {}
+    token_requests = 0
+    scopes = Counter()
+    tokens = Counter()
+    lock = threading.Lock()
+
+    def track(self):
+        with self.lock:
+            self.scopes[self.headers.get('Amazon-Advertising-API-Scope')] += 1
+            self.tokens[self.headers.get('Authorization')] += 1
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        if not parts.path.startswith('/files/'):
+            self.track()
+        path = parts.path
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        if re.match(r'^/v\d+/profiles$', path):
+            return self.send_json(200, self.profiles)
+        match = _DOWNLOAD_PATH.match(path)
+        if match:
+            name = 'report' if match.group(1) == 'reports' else 'snapshot'
+            self.send_response(307)
+            self.send_header('Location', 'https://127.0.0.1:{}/files/{}.json.gz'
+                             .format(self.port, name))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        match = _STATUS_PATH.match(path)
+        if match:
+            kind, record_id = match.groups()
+            key = 'reportId' if kind == 'reports' else 'snapshotId'
+            return self.send_json(200, json.dumps({
+                key: record_id, 'status': 'SUCCESS',
+                'location': 'https://127.0.0.1:{}{}/download'.format(
+                    self.port, path)}).encode('utf-8'))
+        match = _ENTITY_PATH.match(path)
+        if match:
+            return self.send_json(200, self.page(match.group(1), query))
+        if path.startswith('/files/'):
+            body = self.files.get(path[len('/files/'):])
+            if body is not None:
+                return self.send_json(200, body)
+        self.send_json(404, b'{"code": "NOT_FOUND"}')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/auth/o2/token':
+            with self.lock:
+                type(self).token_requests += 1
+                number = self.token_requests
+            grant = dict(urllib.parse.parse_qsl(body.decode('utf-8')))
+            return self.send_json(200, json.dumps({
+                'access_token': 'Atza|bench-{}'.format(number),
+                'refresh_token': grant.get('refresh_token'),
+                'token_type': 'bearer',
+                'expires_in': 3600}).encode('utf-8'))
+        self.track()
+        match = _REQUEST_PATH.match(path)
+        if match:
+            record_type, kind = match.groups()
+            key = 'reportId' if kind == 'report' else 'snapshotId'
+            return self.send_json(202, json.dumps({
+                key: '{}-{}'.format(kind, record_type),
+                'recordType': record_type,
+                'status': 'IN_PROGRESS'}).encode('utf-8'))
+        self.send_json(404, b'{"code": "NOT_FOUND"}')
+
+    def do_PUT(self):
+        self.track()
+        body = json.loads(self.rfile.read(
+            int(self.headers.get('Content-Length', 0))) or b'[]')
+        self.send_json(207, json.dumps(
+            [dict(item, code='SUCCESS') for item in body]).encode('utf-8'))
+
+    def page(self, name, query):
+        cached = self.entities.get(name)
+        if cached is None:
+            cached = self.entities[name] = entity_rows(name,
+                                                        self.entity_count)
+        start = int(query.get('startIndex', 0))
+        count = int(query.get('count', len(cached)))
+        return json.dumps(cached[start:start + count]).encode('utf-8')
+
+    def send_json(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandIn(object):
+    """
+    A running stand-in server.
+
+    :ivar port: The port it listens on, on 127.0.0.1.
+    :ivar endpoint: Value for a client's ``endpoint``.
+    :ivar token_url: Token URL for a TokenManager.
+    """
+
+    def __init__(self, profiles=DEFAULT_PROFILES, entities=DEFAULT_ENTITIES,
+                 report_rows_count=DEFAULT_REPORT_ROWS,
+                 snapshot_rows_count=DEFAULT_SNAPSHOT_ROWS, port=0):
+        self._directory = tempfile.mkdtemp()
+        handler = type('Handler', (StandInHandler,), {
+            'profiles': json.dumps([
+                {'profileId': 1000 + i, 'countryCode': 'US',
+                 'currencyCode': 'USD', 'timezone': 'America/Los_Angeles',
+                 'accountInfo': {'type': 'seller'}}
+                for i in range(profiles)]).encode('utf-8'),
+            'entities': {},
+            'entity_count': entities,
+            'files': {
+                'report.json.gz': gzip.compress(json.dumps(
+                    report_rows(report_rows_count)).encode('utf-8')),
+                'snapshot.json.gz': gzip.compress(json.dumps(
+                    snapshot_rows(snapshot_rows_count)).encode('utf-8'))},
+            'token_requests': 0,
+            'scopes': Counter(),
+            'tokens': Counter(),
+            'lock': threading.Lock()})
+        self.handler = handler
+        self.server = start_server(*make_certificate(self._directory),
+                                   handler=handler, port=port)
+        self.port = handler.port = self.server.server_address[1]
+        self.endpoint = '127.0.0.1:{}'.format(self.port)
+        self.token_url = '127.0.0.1:{}/auth/o2/token'.format(self.port)
+
+    @property
+    def token_requests(self):
+        return self.handler.token_requests
+
+    @property
+    def scopes(self):
+        """API calls received per Amazon-Advertising-API-Scope."""
+        with self.handler.lock:
+            return Counter(self.handler.scopes)
+
+    @property
+    def tokens(self):
+        """API calls received per Authorization header."""
+        with self.handler.lock:
+            return Counter(self.handler.tokens)
+
+    def file_size(self, name):
+        return len(self.handler.files[name])
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--report-rows', type=int, default=DEFAULT_REPORT_ROWS)
+    args = parser.parse_args()
+    with StandIn(report_rows_count=args.report_rows, port=args.port) as server:
+        print('Serving on https://{}'.format(server.endpoint))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Stress test of one thread-safe client shared by many threads.
+
+Runs ``--threads`` threads (64 by default) against the local stand-in
+server (see server.py). They share a single ``thread_safe`` AdvertisingApiV3,
+its connection pool and token manager; each works through its own
+``for_profile`` clone, mixing listings, updates and streamed report
+downloads, while another thread keeps forcing token refreshes. A final
+round fans calls out with ``map`` on the shared executor.
+
+The server counts the calls it received per profile and per access token.
+The run fails (exit status 1) if any call failed, if any profile received
+a different number of calls than its thread made, or if any call carried
+a token the server never issued. The first call of each thread, which
+waits for its connection to be set up, is left out of the latencies.
+
+    python benchmarks/stress_threads.py --threads 64 --calls 50
+"""
+import argparse
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_transport import client_context  # noqa: E402
+from harness import latency_stats  # noqa: E402
+from server import StandIn  # noqa: E402
+from amazon_advertising_api.advertising_api import AdvertisingApiV3  # noqa: E402
+from amazon_advertising_api.auth import TokenManager  # noqa: E402
+from amazon_advertising_api.transport import PooledTransport  # noqa: E402
+
+FIRST_PROFILE = 1000
+
+
+def make_client(server, pool_size):
+    transport = PooledTransport(maxsize=pool_size,
+                                ssl_context=client_context())
+    token_manager = TokenManager('client', 'secret', 'Atzr|stress',
+                                 server.token_url, transport)
+    api = AdvertisingApiV3('client', 'secret', 'na',
+                           profile_id=str(FIRST_PROFILE),
+                           transport=transport, token_manager=token_manager,
+                           thread_safe=True)
+    api.endpoint = server.endpoint
+    return api
+
+
+def worker(api, profile_id, calls, samples, failures, sent):
+    client = api.for_profile(profile_id)
+    for i in range(calls):
+        started = time.perf_counter()
+        if i % 10 == 9:
+            rows = sum(1 for _ in client.stream_report('report-keywords'))
+            ok = rows > 0
+            # Status check and download location.
+            sent[profile_id] += 2
+        elif i % 3 == 2:
+            res = client.update_campaigns([{'campaignId': i, 'state':
+                                            'paused'}])
+            ok = res['success']
+            sent[profile_id] += 1
+        else:
+            res = client.list_campaigns({'startIndex': i, 'count': 10})
+            ok = res['success']
+            sent[profile_id] += 1
+        if i:
+            samples.append(time.perf_counter() - started)
+        if not ok:
+            failures.append((profile_id, i))
+
+
+def refresher(api, stop, interval):
+    while not stop.wait(interval):
+        api.token_manager.refresh()
+
+
+def run(args):
+    problems = []
+    with StandIn(profiles=args.threads, report_rows_count=args.report_rows) \
+            as server:
+        api = make_client(server, args.pool_size)
+        try:
+            api.profile_id = '0'
+            problems.append('profile_id of a thread-safe client changed')
+        except AttributeError:
+            pass
+
+        profiles = [str(FIRST_PROFILE + i) for i in range(args.threads)]
+        samples = []
+        failures = []
+        sent = dict((profile_id, Counter()) for profile_id in profiles)
+        threads = [threading.Thread(target=worker, args=(
+            api, profile_id, args.calls, samples, failures,
+            sent[profile_id])) for profile_id in profiles]
+        stop = threading.Event()
+        token_thread = threading.Thread(
+            target=refresher, args=(api, stop, args.refresh_interval))
+
+        started = time.perf_counter()
+        token_thread.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        token_thread.join()
+        elapsed = time.perf_counter() - started
+
+        mapped = list(api.map(lambda client, profile_id: client.for_profile(
+            profile_id).list_campaigns(), profiles))
+        failures.extend(('map', profile_id) for profile_id, res
+                        in zip(profiles, mapped) if not res['success'])
+
+        scopes = server.scopes
+        for profile_id in profiles:
+            expected = sum(sent[profile_id].values()) + 1
+            if scopes[profile_id] != expected:
+                problems.append('profile {} received {} calls, sent {}'.format(
+                    profile_id, scopes[profile_id], expected))
+        issued = set('Bearer Atza|bench-{}'.format(i + 1)
+                     for i in range(server.token_requests))
+        unknown = [token for token in server.tokens if token not in issued]
+        if unknown:
+            problems.append('calls with tokens never issued: {}'.format(
+                unknown))
+        if failures:
+            problems.append('{} calls failed, e.g. {}'.format(
+                len(failures), failures[:5]))
+        token_refreshes = server.token_requests
+        api.transport.close()
+
+    result = latency_stats(samples, elapsed)
+    result.update(threads=args.threads, token_refreshes=token_refreshes)
+    return result, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--calls', type=int, default=50,
+                        help='Calls per thread.')
+    parser.add_argument('--pool-size', type=int, default=64,
+                        help='Idle connections kept by the shared pool.')
+    parser.add_argument('--refresh-interval', type=float, default=0.05,
+                        help='Seconds between forced token refreshes.')
+    parser.add_argument('--report-rows', type=int, default=1000)
+    args = parser.parse_args()
+
+    result, problems = run(args)
+    for metric, value in result.items():
+        if isinstance(value, float):
+            value = '{:.4g}'.format(value)
+        print('{:<16} {}'.format(metric, value))
+    for problem in problems:
+        print('FAIL {}'.format(problem))
+    if problems:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Transports answering from canned responses, for the client tests."""
+import json
+import socket
+import threading
+
+from amazon_advertising_api.transport import Response, Transport
+
+
+class FakeTransport(Transport):
+    """
+    Answers each request with ``handler(method, url, headers, body)``, a
+    Response, and records the requests it was sent.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def request(self, method, url, headers=None, body=None):
+        self.requests.append((method, url, headers, body))
+        return self.handler(method, url, headers, body)
+
+    def sent(self, method=None):
+        return [r for r in self.requests if method in (None, r[0])]
+
+
+def json_response(payload, code=200, headers=()):
+    return Response(code, 'OK', [('Content-Type', 'application/json')] +
+                    list(headers), json.dumps(payload).encode('utf-8'))
+
+
+class ScriptedServer(object):
+    """
+    HTTP/1.1 server on a local port whose replies are scripted per request.
+
+    Each request, in the order received, takes the next reply from
+    ``replies``: raw response bytes, or None to read the request and close
+    the connection without answering. Connections are kept alive otherwise.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+        self.connections = 0
+        self._sock = socket.socket()
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        self.url = 'http://127.0.0.1:{}'.format(self.port)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,),
+                             daemon=True).start()
+
+    def _handle(self, conn):
+        reader = conn.makefile('rb')
+        with conn, reader:
+            while True:
+                request_line = reader.readline()
+                if not request_line:
+                    return
+                length = 0
+                while True:
+                    line = reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    if name.strip().lower() == 'content-length':
+                        length = int(value)
+                body = reader.read(length)
+                self.requests.append((request_line.split()[0].decode(),
+                                      body))
+                reply = self.replies.pop(0) if self.replies else None
+                if reply is None:
+                    return
+                conn.sendall(reply)
+
+    def close(self):
+        self._sock.close()
+
+
+def http_reply(body=b'{}', code=200, headers=()):
+    lines = ['HTTP/1.1 {} OK'.format(code),
+             'Content-Length: {}'.format(len(body))] + list(headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
@@ -0,0 +1,178 @@
+import asyncio
+import socket
+import unittest
+
+from amazon_advertising_api.async_transport import (AsyncPooledTransport,
+                                                    _encode_head, _iter_body,
+                                                    _read_body, _read_head)
+from tests.fakes import ScriptedServer, http_reply
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def reader_of(*pieces, eof=True):
+    reader = asyncio.StreamReader()
+    for piece in pieces:
+        reader.feed_data(piece)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+async def exchange(method, *pieces, chunk_size=4):
+    """The head, body read in chunks, and body read whole of a response."""
+    data = b''.join(pieces)
+    reader = await reader_of(*pieces)
+    head = await _read_head(reader, method)
+    chunks = [chunk async for chunk in _iter_body(reader, head, chunk_size)]
+    reader = await reader_of(data)
+    whole = await _read_body(reader, await _read_head(reader, method))
+    return head, chunks, whole
+
+
+CHUNKED = (b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+           b'5;name=value\r\nhello\r\n'
+           b'b\r\n, chunked w\r\n'
+           b'4\r\norld\r\n'
+           b'0\r\nX-Trailer: 1\r\n\r\n')
+
+
+class ResponseParserTest(unittest.TestCase):
+
+    def test_content_length(self):
+        head, chunks, whole = run(exchange(
+            'GET', b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n'
+                   b'Content-Type: application/json\r\n\r\n[1, 2, 33]'))
+        self.assertEqual((head.code, head.reason), (200, 'OK'))
+        self.assertEqual(head.length, 10)
+        self.assertTrue(head.keep_alive)
+        self.assertIn(('Content-Type', 'application/json'), head.headers)
+        self.assertEqual(chunks, [b'[1, ', b'2, 3', b'3]'])
+        self.assertEqual(whole, b'[1, 2, 33]')
+
+    def test_chunked_with_extensions_and_trailers(self):
+        head, chunks, whole = run(exchange('GET', CHUNKED))
+        self.assertTrue(head.chunked)
+        self.assertTrue(head.keep_alive)
+        self.assertEqual(b''.join(chunks), b'hello, chunked world')
+        self.assertTrue(all(len(chunk) <= 4 for chunk in chunks))
+        self.assertEqual(whole, b'hello, chunked world')
+
+    def test_chunked_split_at_every_byte(self):
+        async def parse():
+            reader = asyncio.StreamReader()
+            head_task = asyncio.ensure_future(self._body(reader))
+            for i in range(len(CHUNKED)):
+                reader.feed_data(CHUNKED[i:i + 1])
+                await asyncio.sleep(0)
+            reader.feed_eof()
+            return await head_task
+        self.assertEqual(run(parse()), b'hello, chunked world')
+
+    async def _body(self, reader):
+        head = await _read_head(reader, 'GET')
+        return b''.join([chunk async for chunk in _iter_body(reader, head)])
+
+    def test_body_until_close(self):
+        head, chunks, whole = run(exchange(
+            'GET', b'HTTP/1.1 200 OK\r\n\r\nto the ', b'end'))
+        self.assertFalse(head.keep_alive)
+        self.assertEqual(b''.join(chunks), b'to the end')
+        self.assertEqual(whole, b'to the end')
+
+    def test_bodyless_responses(self):
+        for method, status in (('HEAD', b'200 OK'), ('GET', b'204 No Content'),
+                               ('GET', b'304 Not Modified')):
+            head, chunks, whole = run(exchange(
+                method, b'HTTP/1.1 ' + status + b'\r\nContent-Length: 5'
+                        b'\r\n\r\n'))
+            self.assertTrue(head.bodyless)
+            self.assertTrue(head.keep_alive)
+            self.assertEqual((chunks, whole), ([], b''))
+
+    def test_connection_close(self):
+        head, _, _ = run(exchange('GET', b'HTTP/1.1 200 OK\r\nConnection: '
+                                         b'close\r\nContent-Length: 0\r\n\r\n'))
+        self.assertFalse(head.keep_alive)
+        head, _, _ = run(exchange('GET', b'HTTP/1.0 200 OK\r\n'
+                                         b'Content-Length: 0\r\n\r\n'))
+        self.assertFalse(head.keep_alive)
+
+    def test_reason_with_spaces_and_none(self):
+        head, _, _ = run(exchange('GET', b'HTTP/1.1 429 Too Many Requests\r\n'
+                                         b'Content-Length: 0\r\n\r\n'))
+        self.assertEqual(head.reason, 'Too Many Requests')
+        head, _, _ = run(exchange('GET', b'HTTP/1.1 200\r\n'
+                                         b'Content-Length: 0\r\n\r\n'))
+        self.assertEqual((head.code, head.reason), (200, ''))
+
+    def test_truncated_bodies(self):
+        for response in (b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nshort',
+                         b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n'
+                         b'\r\na\r\nshort'):
+            with self.assertRaises(asyncio.IncompleteReadError):
+                run(exchange('GET', response))
+
+
+class RequestHeadTest(unittest.TestCase):
+
+    def test_encode_head(self):
+        head = _encode_head('PUT', '/v2/keywords', 'host.example',
+                            {'Authorization': 'Bearer t'}, b'[]')
+        self.assertEqual(head, b'PUT /v2/keywords HTTP/1.1\r\n'
+                               b'Host: host.example\r\n'
+                               b'Authorization: Bearer t\r\n'
+                               b'Content-Length: 2\r\n'
+                               b'Accept-Encoding: identity\r\n\r\n')
+
+    def test_get_without_body_has_no_length(self):
+        head = _encode_head('GET', '/', 'h', {'Accept-Encoding': 'gzip'},
+                            None)
+        self.assertNotIn(b'Content-Length', head)
+        self.assertEqual(head.count(b'Accept-Encoding'), 1)
+
+
+class AsyncPooledTransportTest(unittest.TestCase):
+
+    def test_reuses_connection(self):
+        server = ScriptedServer([http_reply(b'one'), CHUNKED])
+        self.addCleanup(server.close)
+
+        async def requests():
+            transport = AsyncPooledTransport()
+            try:
+                first = await transport.request('GET', server.url + '/a')
+                second = await transport.stream('GET', server.url + '/b')
+                async with second:
+                    body = await second.read()
+                return first.body, body
+            finally:
+                await transport.close()
+
+        self.assertEqual(run(requests()), (b'one', b'hello, chunked world'))
+        self.assertEqual(server.connections, 1)
+
+    def test_connect_timeout(self):
+        # Connections are queued but never accepted, so the TLS handshake
+        # gets no answer.
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        url = 'https://127.0.0.1:{}/'.format(listener.getsockname()[1])
+
+        async def request():
+            transport = AsyncPooledTransport(timeout=0.2)
+            try:
+                await transport.request('GET', url)
+            finally:
+                await transport.close()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            run(request())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.auth import (AsyncTokenManager, TokenCache,
+                                         TokenManager)
+from tests.fakes import FakeTransport, json_response
+
+
+def token_server(token='new-token'):
+    def answer(method, url, headers, body):
+        return json_response({'access_token': token, 'expires_in': 3600})
+    return answer
+
+
+def unreachable(method, url, headers, body):
+    raise ConnectionError('token endpoint unreachable')
+
+
+class AsyncFakeTransport(object):
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    async def request(self, method, url, headers=None, body=None):
+        self.requests.append((method, url, headers, body))
+        return self.handler(method, url, headers, body)
+
+
+class TokenManagerTest(unittest.TestCase):
+
+    def manager(self, handler, expires_in):
+        manager = TokenManager('id', 'secret', 'refresh', 'token.example',
+                               FakeTransport(handler), access_token='old')
+        manager.expires_at = time.time() + expires_in
+        return manager
+
+    def test_refreshes_inside_margin(self):
+        manager = self.manager(token_server(), 60)
+        self.assertEqual(manager.token(), 'new-token')
+
+    def test_keeps_valid_token_when_refresh_fails(self):
+        manager = self.manager(unreachable, 60)
+        self.assertEqual(manager.token(), 'old')
+
+    def test_raises_when_refresh_fails_after_expiry(self):
+        manager = self.manager(unreachable, -1)
+        with self.assertRaises(ConnectionError):
+            manager.token()
+
+    def test_async_keeps_valid_token_when_refresh_fails(self):
+        manager = AsyncTokenManager('id', 'secret', 'refresh',
+                                    'token.example',
+                                    AsyncFakeTransport(unreachable),
+                                    access_token='old')
+        manager.expires_at = time.time() + 60
+        self.assertEqual(asyncio.run(manager.token()), 'old')
+
+
+class ClientRefreshTokenTest(unittest.TestCase):
+
+    def test_refresh_token_set_after_init(self):
+        transport = FakeTransport(token_server())
+        api = AdvertisingApiV3('id', 'secret', 'na', transport=transport)
+        self.assertFalse(api.do_refresh_token()['success'])
+        api.refresh_token = 'refresh'
+        self.assertEqual(api.do_refresh_token()['response'], 'new-token')
+        self.assertEqual(api.access_token, 'new-token')
+
+    def test_refresh_token_change_updates_manager(self):
+        transport = FakeTransport(token_server())
+        api = AdvertisingApiV3('id', 'secret', 'na', access_token='old',
+                               refresh_token='first', transport=transport)
+        manager = api.token_manager
+        api.refresh_token = 'second'
+        self.assertIs(api.token_manager, manager)
+        self.assertIsNone(api.access_token)
+        api.do_refresh_token()
+        method, url, headers, body = transport.requests[-1]
+        self.assertIn(b'refresh_token=second', body)
+
+
+class AsyncTokenCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'tokens.json')
+
+    def manager(self, transport):
+        return AsyncTokenManager('id', 'secret', 'refresh', 'token.example',
+                                 transport, cache_path=self.path)
+
+    def test_adopts_token_cached_by_another_process(self):
+        TokenCache(self.path).set(TokenCache.key('id', 'refresh'), 'cached',
+                                  time.time() + 3600)
+        transport = AsyncFakeTransport(token_server())
+        res = asyncio.run(self.manager(transport).refresh())
+        self.assertEqual(res['response'], 'cached')
+        self.assertEqual(transport.requests, [])
+
+    def test_waits_for_lock_without_blocking_loop(self):
+        transport = AsyncFakeTransport(token_server())
+        manager = self.manager(transport)
+        lock = TokenCache(self.path).locked()
+        lock.__enter__()
+        released = threading.Event()
+
+        def release():
+            time.sleep(0.2)
+            released.set()
+            lock.__exit__(None, None, None)
+
+        async def run():
+            ticks = 0
+            refresh = asyncio.ensure_future(manager.refresh())
+            while not refresh.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks, refresh.result()
+
+        threading.Thread(target=release).start()
+        ticks, res = asyncio.run(run())
+        self.assertTrue(released.is_set())
+        self.assertGreater(ticks, 5)
+        self.assertEqual(res['response'], 'new-token')
+        self.assertEqual(TokenCache(self.path).get(
+            TokenCache.key('id', 'refresh'))[0], 'new-token')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import json
+import unittest
+
+from amazon_advertising_api.bulk import chunk_items, stitch
+
+
+def ok(payload):
+    return {'success': True, 'code': 207, 'response': json.dumps(payload)}
+
+
+class StitchTest(unittest.TestCase):
+
+    def test_results_in_input_order(self):
+        res = stitch([(ok([{'code': 'SUCCESS', 'keywordId': 1},
+                           {'code': 'SUCCESS', 'keywordId': 2}]), 2),
+                      ({'success': False, 'code': 429,
+                        'response': 'Too Many Requests'}, 1),
+                      (ok({'recommendations': [{'code': 'SUCCESS'}]}), 1)])
+        self.assertFalse(res['success'])
+        self.assertEqual(res['code'], 429)
+        self.assertEqual([item['code'] for item in res['response']],
+                         ['SUCCESS', 'SUCCESS', '429', 'SUCCESS'])
+
+    def test_response_of_wrong_length_fails_its_entities(self):
+        res = stitch([(ok({'code': 'SUCCESS'}), 2),
+                      (ok([{'code': 'SUCCESS', 'keywordId': 3}]), 1)])
+        self.assertEqual([item['code'] for item in res['response']],
+                         ['0', '0', 'SUCCESS'])
+        self.assertIn('Expected 2 results', res['response'][0]['details'])
+
+    def test_single_entity_dict(self):
+        self.assertEqual(chunk_items(ok({'code': 'SUCCESS'}), 1),
+                         [{'code': 'SUCCESS'}])
+
+    def test_undecodable_response(self):
+        items = chunk_items({'success': True, 'code': 207,
+                             'response': 'not json'}, 2)
+        self.assertEqual([item['code'] for item in items], ['0', '0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import unittest
+
+from amazon_advertising_api.advertising_api import (AdvertisingApi,
+                                                    AdvertisingApiV3)
+from amazon_advertising_api.cache import (MemoryBackend, ResponseCache,
+                                          SqliteBackend, cache_family)
+from tests.fakes import FakeTransport, json_response
+
+
+class CampaignServer(object):
+    """Serves one campaign whose state PUTs change."""
+
+    def __init__(self):
+        self.state = 'enabled'
+
+    def __call__(self, method, url, headers, body):
+        if method == 'PUT':
+            self.state = json.loads(body)[0]['state']
+            return json_response([{'campaignId': 1, 'code': 'SUCCESS'}],
+                                 207)
+        return json_response([{'campaignId': 1, 'state': self.state}])
+
+
+class CacheFamilyTest(unittest.TestCase):
+
+    def test_v1_writes_map_to_sp_family(self):
+        self.assertEqual(cache_family('campaigns'), 'sp/campaigns')
+        self.assertEqual(cache_family('keywords/123'), 'sp/keywords')
+        self.assertEqual(cache_family('negativeKeywords'),
+                         'sp/negativeKeywords')
+
+    def test_other_families_unchanged(self):
+        self.assertEqual(cache_family('sp/keywords/extended/1'),
+                         'sp/keywords')
+        self.assertEqual(cache_family('sb/campaigns'), 'sb/campaigns')
+        self.assertEqual(cache_family('profiles'), 'profiles')
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def client(self, cls, backend=None):
+        self.server = CampaignServer()
+        self.transport = FakeTransport(self.server)
+        self.cache = ResponseCache(backend)
+        return cls('id', 'secret', 'na', profile_id='1',
+                   access_token='token', transport=self.transport,
+                   cache=self.cache)
+
+    def test_repeated_read_is_served_from_cache(self):
+        api = self.client(AdvertisingApiV3)
+        api.list_campaigns()
+        api.list_campaigns()
+        self.assertEqual(len(self.transport.sent('GET')), 1)
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+    def test_v1_write_invalidates_v1_read(self):
+        api = self.client(AdvertisingApi)
+        self.assertEqual(api.list_campaigns().data[0]['state'], 'enabled')
+        api.update_campaigns([{'campaignId': 1, 'state': 'paused'}])
+        res = api.list_campaigns()
+        self.assertEqual(res.data[0]['state'], 'paused')
+        self.assertEqual(len(self.transport.sent('GET')), 2)
+        self.assertEqual(self.cache.stats['hits'], 0)
+
+    def test_v1_write_invalidates_sqlite_entries(self):
+        api = self.client(AdvertisingApi, SqliteBackend(':memory:'))
+        api.list_campaigns()
+        api.update_campaigns([{'campaignId': 1, 'state': 'paused'}])
+        self.assertEqual(api.list_campaigns().data[0]['state'], 'paused')
+
+    def test_write_keeps_other_scopes(self):
+        api = self.client(AdvertisingApi)
+        other = api.for_profile('2')
+        other.list_campaigns()
+        api.update_campaigns([{'campaignId': 1, 'state': 'paused'}])
+        other.list_campaigns()
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+
+class MemoryBackendTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(MemoryBackend(max_entries=2))
+        for key in ('a', 'b', 'c'):
+            request = ('GET', 'https://host/v2/sp/campaigns?k=' + key, {},
+                       None)
+            lookup_key, entry, request = cache.lookup('1', 'sp/campaigns',
+                                                      request)
+            cache.update('1', 'sp/campaigns', request, lookup_key, entry,
+                         json_response([]))
+        self.assertEqual(len(cache.backend), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
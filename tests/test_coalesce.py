@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.coalesce import SingleFlight
+from tests.fakes import FakeTransport, json_response
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_identical_gets_share_one_request(self):
+        release = threading.Event()
+
+        def answer(method, url, headers, body):
+            release.wait(5)
+            return json_response({'campaignId': int(url.rsplit('/', 1)[1])})
+
+        transport = FakeTransport(answer)
+        flights = SingleFlight()
+        executor = ThreadPoolExecutor(max_workers=8)
+        self.addCleanup(executor.shutdown)
+        api = AdvertisingApiV3('id', 'secret', 'na', profile_id='1',
+                               access_token='token', transport=transport,
+                               coalescer=flights, executor=executor)
+        results = api.map('get_campaign', [1, 2, 1, 2, 1, 2, 1, 2])
+        threading.Timer(0.2, release.set).start()
+        campaigns = [res.data['campaignId'] for res in results]
+        self.assertEqual(campaigns, [1, 2] * 4)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(flights.stats, {'flights': 2, 'coalesced': 6,
+                                         'in_flight': 0})
+
+    def test_writes_are_not_coalesced(self):
+        self.assertIsNone(SingleFlight.key('1', ('PUT', 'https://h/x', {},
+                                                 b'[]')))
+
+    def test_error_reaches_every_caller(self):
+        flights = SingleFlight()
+
+        def fail():
+            raise ConnectionError('down')
+
+        with self.assertRaises(ConnectionError):
+            flights.do('key', fail)
+        self.assertEqual(flights.stats['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
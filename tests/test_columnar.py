@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import pickle
+import unittest
+
+from amazon_advertising_api.columnar import (FLOAT, INT, STRING, ColumnBatch,
+                                             iter_batches, schema_for)
+from amazon_advertising_api.processing import (ReportProcessor,
+                                               process_payload)
+
+METRICS = 'impressions,clicks,cost,attributedSales14d'
+
+
+def report_rows(count):
+    return [{'campaignId': i // 100, 'keywordId': 10 ** 12 + i,
+             'query': 'search term {}'.format(i), 'impressions': i * 3,
+             'clicks': i % 7, 'cost': round(i * 0.01, 2),
+             'attributedSales14d': round(i * 0.05, 2),
+             'matchType': ('exact', 'phrase', None)[i % 3]}
+            for i in range(count)]
+
+
+def rows_of(batches):
+    rows = []
+    for batch in batches:
+        names = [name for name, _ in batch.schema]
+        for i in range(batch.num_rows):
+            row = {}
+            for name in names:
+                nulls = batch.nulls.get(name)
+                row[name] = None if nulls and nulls[i] else \
+                    batch.columns[name][i]
+            rows.append(row)
+    return rows
+
+
+class ColumnBatchTest(unittest.TestCase):
+
+    def test_schema_from_metrics(self):
+        self.assertEqual(schema_for(['keywordId', 'cost', 'clicks', 'query']),
+                         [('keywordId', INT), ('cost', FLOAT),
+                          ('clicks', INT), ('query', STRING)])
+
+    def test_batches_and_nulls(self):
+        rows = [{'clicks': 1, 'cost': 0.5}, {'clicks': None, 'cost': ''},
+                {'clicks': 3, 'cost': 1.5}]
+        batch, = iter_batches(rows, 'clicks,cost')
+        self.assertEqual(list(batch.columns['clicks']), [1, 0, 3])
+        self.assertEqual(bytes(batch.nulls['clicks']), b'\x00\x01\x00')
+        self.assertEqual(len(list(iter_batches(rows, batch_size=2))), 2)
+
+    def test_campaign_snapshot_rows(self):
+        rows = [{'campaignId': 123456789, 'name': 'Brand - exact',
+                 'campaignType': 'sponsoredProducts', 'targetingType': 'manual',
+                 'premiumBidAdjustment': True, 'dailyBudget': 25.0,
+                 'startDate': '20200101', 'state': 'enabled',
+                 'bidding': {'strategy': 'legacyForSales', 'adjustments': [
+                     {'predicate': 'placementTop', 'percentage': 50}]}},
+                {'campaignId': 123456790, 'name': 'Generic',
+                 'campaignType': 'sponsoredProducts', 'targetingType': 'auto',
+                 'premiumBidAdjustment': False, 'dailyBudget': 10,
+                 'startDate': '20200102', 'state': 'paused',
+                 'bidding': {'adjustments': [], 'strategy': 'autoForSales'}}]
+        batch, = iter_batches(rows)
+        types = dict(batch.schema)
+        self.assertEqual(types['bidding'], STRING)
+        self.assertEqual(types['premiumBidAdjustment'], STRING)
+        self.assertEqual(types['dailyBudget'], FLOAT)
+        self.assertEqual(batch.columns['bidding'][1],
+                         '{"adjustments":[],"strategy":"autoForSales"}')
+        self.assertEqual(json.loads(batch.columns['bidding'][0]),
+                         rows[0]['bidding'])
+        self.assertEqual(batch.columns['premiumBidAdjustment'],
+                         ['True', 'False'])
+
+    def test_float_names(self):
+        for name in ('bid', 'defaultBid', 'cost', 'attributedSales14d',
+                     'attributedSales14dSameSKU', 'clickThroughRate'):
+            self.assertEqual(schema_for([name]), [(name, FLOAT)])
+        for name in ('bidding', 'premiumBidAdjustment', 'bidOptimization',
+                     'budgetType', 'costType'):
+            self.assertEqual(schema_for([name]), [(name, STRING)])
+
+    def test_bad_value(self):
+        batch = ColumnBatch([('clicks', INT)])
+        with self.assertRaises(ValueError):
+            batch.append({'clicks': 'many'})
+        self.assertEqual(batch.num_rows, 0)
+
+    def test_pickle_round_trip(self):
+        rows = report_rows(3000)
+        batches = list(iter_batches(rows, METRICS, batch_size=1000))
+        restored = pickle.loads(pickle.dumps(batches))
+        self.assertEqual(rows_of(restored), rows_of(batches))
+        for before, after in zip(batches, restored):
+            self.assertEqual(after.schema, before.schema)
+            for name, kind in after.schema:
+                if kind != STRING:
+                    self.assertEqual(after.columns[name].typecode,
+                                     before.columns[name].typecode)
+
+    def test_pickle_unique_strings_with_nulls(self):
+        batch, = iter_batches([{'query': 'q{}'.format(i) if i % 5 else None}
+                               for i in range(100)] + [{'query': 'caf\xe9'}])
+        restored = pickle.loads(pickle.dumps(batch))
+        self.assertEqual(restored.columns['query'], batch.columns['query'])
+
+    def test_pickle_empty_batch(self):
+        batch = ColumnBatch([('clicks', INT), ('query', STRING)])
+        restored = pickle.loads(pickle.dumps(batch))
+        self.assertEqual(restored.num_rows, 0)
+        self.assertEqual(list(restored.columns['clicks']), [])
+
+    def test_pickled_batches_smaller_than_rows(self):
+        rows = report_rows(20000)
+        batches = list(iter_batches(rows, METRICS))
+        self.assertLess(len(pickle.dumps(batches)),
+                        0.8 * len(pickle.dumps(rows)))
+
+
+class ProcessPayloadTest(unittest.TestCase):
+
+    def test_gzip_payload_with_derived_metrics(self):
+        rows = [{'keywordId': 1, 'clicks': 2, 'impressions': 100,
+                 'cost': 1.0}, {'keywordId': 2, 'clicks': 0,
+                                'impressions': 0, 'cost': 0.0}]
+        payload = gzip.compress(json.dumps(rows).encode('utf-8'))
+        batch, = process_payload(payload, 'clicks,impressions,cost',
+                                 derived=('ctr', 'cpc'))
+        self.assertEqual(batch.columns['ctr'][0], 0.02)
+        self.assertEqual(batch.columns['cpc'][0], 0.5)
+        self.assertEqual(bytes(batch.nulls['ctr']), b'\x00\x01')
+
+    def test_empty_payload(self):
+        self.assertEqual(process_payload(b''), [])
+        self.assertEqual(process_payload(b'[]'), [])
+
+    def test_close_keeps_shared_executor(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        payload = json.dumps([{'clicks': 1}]).encode('utf-8')
+        with ReportProcessor(executor=executor) as processor:
+            processor.process(payload)
+        self.assertIs(processor.executor, executor)
+        batch, = processor.process(payload)
+        self.assertEqual(list(batch.columns['clicks']), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.emulator import Emulator
+
+
+class ClientConcurrencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = Emulator()
+        self.profile_ids = self.emulator.populate(profiles=2, campaigns=2,
+                                                  ad_groups=1, keywords=1)
+        self.api = AdvertisingApiV3('id', 'secret', 'na',
+                                    profile_id=self.profile_ids[0],
+                                    access_token='token',
+                                    transport=self.emulator)
+
+    def test_map_in_input_order(self):
+        campaigns = self.emulator.entities(self.profile_ids[0],
+                                           'sp/campaigns')
+        ids = [campaign['campaignId'] for campaign in reversed(campaigns)]
+        results = self.api.map('get_campaign', ids, timeout=10)
+        self.assertEqual([res.data['campaignId'] for res in results], ids)
+
+    def test_map_rejects_unknown_arguments(self):
+        with self.assertRaises(TypeError):
+            self.api.map('get_campaign', [1], extended=True)
+
+    def test_fan_out_callable(self):
+        def count(client, state):
+            res = client.list_campaigns({'stateFilter': state})
+            return dict(res, response=len(res.data))
+
+        results = self.api.fan_out(self.profile_ids, count, state='enabled')
+        self.assertEqual(sorted((item.profile_id, item.result['response'])
+                                for item in results),
+                         [(profile_id, 2) for profile_id in self.profile_ids])
+
+
+if __name__ == '__main__':
+    unittest.main()
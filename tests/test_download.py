@@ -0,0 +1,224 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.async_api import AsyncAdvertisingApiV3
+from amazon_advertising_api.download import PartialFile, _decompress_file
+from amazon_advertising_api.transport import (Response, StreamingResponse,
+                                              Transport)
+
+ROWS = [{'campaignId': i, 'query': 'term {}'.format(i)} for i in range(2000)]
+RAW = json.dumps(ROWS).encode('utf-8')
+PAYLOAD = gzip.compress(RAW)
+
+
+class _Interrupted(io.RawIOBase):
+    """Reads ``data`` and then fails as a reset connection would."""
+
+    def __init__(self, data):
+        self._fp = io.BytesIO(data)
+
+    def read(self, size=-1):
+        chunk = self._fp.read(size)
+        if not chunk:
+            raise ConnectionResetError('connection reset by peer')
+        return chunk
+
+
+class ReportServer(Transport):
+    """
+    Serves a finished report behind the status, 307 and file sequence. The
+    next ``drops`` file transfers are cut off after ``cut`` bytes; the next
+    ``resets`` redirects fail before any byte is sent.
+    """
+
+    def __init__(self, payload=PAYLOAD, drops=0, cut=1000, resets=0):
+        self.payload = payload
+        self.drops = drops
+        self.cut = cut
+        self.resets = resets
+        self.ranges = []
+
+    def request(self, method, url, headers=None, body=None):
+        if '/reports/' in url:
+            return Response(200, 'OK', [], json.dumps({
+                'status': 'SUCCESS',
+                'location': 'https://files.example/location'}).encode())
+        if self.resets:
+            self.resets -= 1
+            raise ConnectionResetError('connection reset by peer')
+        return Response(307, 'Temporary Redirect',
+                        [('Location', 'https://files.example/file')], b'')
+
+    def stream(self, method, url, headers=None, body=None):
+        match = re.match(r'bytes=(\d+)-$', (headers or {}).get('Range', ''))
+        start = int(match.group(1)) if match else 0
+        self.ranges.append(start if match else None)
+        if start >= len(self.payload):
+            return StreamingResponse(416, 'Range Not Satisfiable', [],
+                                     io.BytesIO(b''))
+        body = self.payload[start:]
+        code, headers = 200, [('Content-Length', str(len(body)))]
+        if match:
+            code = 206
+            headers.append(('Content-Range', 'bytes {}-{}/{}'.format(
+                start, len(self.payload) - 1, len(self.payload))))
+        fp = io.BytesIO(body)
+        if self.drops:
+            self.drops -= 1
+            fp = _Interrupted(body[:self.cut])
+        return StreamingResponse(code, 'OK', headers, fp)
+
+
+class AsyncReportServer(object):
+    """The asyncio face of a ReportServer."""
+
+    def __init__(self, server):
+        self.server = server
+
+    async def request(self, method, url, headers=None, body=None):
+        return self.server.request(method, url, headers, body)
+
+    async def stream(self, method, url, headers=None, body=None):
+        return _AsyncStreamingResponse(
+            self.server.stream(method, url, headers, body))
+
+
+class _AsyncStreamingResponse(object):
+
+    def __init__(self, response):
+        self._response = response
+        self.code = response.code
+        self.headers = response.headers
+        self.event = None
+
+    ok = Response.ok
+    header = Response.header
+
+    async def iter_content(self, chunk_size):
+        for chunk in self._response.iter_content(chunk_size):
+            yield chunk
+
+    async def read(self):
+        return self._response.read()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._response.close()
+
+
+class DownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'report.json.gz')
+
+    def client(self, server):
+        return AdvertisingApiV3('id', 'secret', 'na', profile_id='1',
+                                access_token='token', transport=server)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_resumes_interrupted_transfer_with_range(self):
+        server = ReportServer(drops=2, cut=1000)
+        res = self.client(server).download_report('r1', self.path,
+                                                  chunk_size=256)
+        self.assertTrue(res['success'])
+        self.assertEqual(server.ranges, [None, 1000, 2000])
+        self.assertEqual(self.read(), PAYLOAD)
+        result = res['response']
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(result.bytes_received, len(PAYLOAD))
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_later_call_resumes_part_file(self):
+        server = ReportServer(drops=1, cut=1500)
+        api = self.client(server)
+        with self.assertRaises(ConnectionResetError):
+            api.download_report('r1', self.path, retries=0)
+        self.assertEqual(os.path.getsize(self.path + '.part'), 1500)
+        res = api.download_report('r1', self.path, decompress=True)
+        self.assertEqual(server.ranges, [None, 1500])
+        self.assertEqual(res['response'].resumed_from, 1500)
+        self.assertEqual(self.read(), RAW)
+
+    def test_retries_reset_during_redirect(self):
+        server = ReportServer(drops=1, resets=1)
+        res = self.client(server).download_report('r1', self.path)
+        self.assertEqual(self.read(), PAYLOAD)
+        self.assertEqual(res['response'].attempts, 3)
+
+    def test_restarts_on_416(self):
+        with open(self.path + '.part', 'wb') as f:
+            f.write(b'x' * (len(PAYLOAD) + 10))
+        server = ReportServer()
+        self.client(server).download_report('r1', self.path)
+        self.assertEqual(server.ranges, [len(PAYLOAD) + 10, None])
+        self.assertEqual(self.read(), PAYLOAD)
+
+    def test_async_resumes_interrupted_transfer(self):
+        server = ReportServer(drops=1, cut=700, resets=1)
+        api = AsyncAdvertisingApiV3('id', 'secret', 'na', profile_id='1',
+                                    access_token='token',
+                                    transport=AsyncReportServer(server))
+        res = asyncio.run(api.download_report('r1', self.path,
+                                              decompress=True))
+        self.assertTrue(res['success'])
+        self.assertEqual(server.ranges, [None, 700])
+        self.assertEqual(self.read(), RAW)
+
+
+class DecompressTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.source = os.path.join(directory, 'report.json.gz')
+        self.destination = os.path.join(directory, 'report.json')
+
+    def decompress(self, data):
+        with open(self.source, 'wb') as f:
+            f.write(data)
+        _decompress_file(self.source, self.destination, 512)
+        with open(self.destination, 'rb') as f:
+            return f.read()
+
+    def test_gzip_and_plain(self):
+        self.assertEqual(self.decompress(PAYLOAD), RAW)
+        self.assertEqual(self.decompress(RAW), RAW)
+
+    def test_multi_member_gzip(self):
+        half = len(RAW) // 2
+        members = gzip.compress(RAW[:half]) + gzip.compress(RAW[half:])
+        self.assertEqual(self.decompress(members), RAW)
+        with self.assertRaises(EOFError):
+            self.decompress(members[:-20])
+
+    def test_truncated_gzip_raises(self):
+        with self.assertRaises(EOFError):
+            self.decompress(PAYLOAD[:-20])
+        self.assertFalse(os.path.exists(self.destination))
+
+    def test_part_file_kept_when_finish_fails(self):
+        part = PartialFile(self.destination)
+        with open(part.part_path, 'wb') as f:
+            f.write(PAYLOAD[:len(PAYLOAD) // 2])
+        with self.assertRaises(EOFError):
+            part.finish(decompress=True)
+        self.assertTrue(os.path.exists(part.part_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.emulator import Emulator
+
+
+class GeneratedMethodTest(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = Emulator()
+        profile_id, = self.emulator.populate(campaigns=1, ad_groups=1,
+                                             keywords=0, product_ads=2)
+        self.ads = self.emulator.entities(profile_id, 'sp/productAds')
+        self.api = AdvertisingApiV3('id', 'secret', 'na',
+                                    profile_id=profile_id,
+                                    access_token='token',
+                                    transport=self.emulator)
+
+    def test_ignored_extended_flag_is_accepted(self):
+        first, second = [ad['adId'] for ad in self.ads]
+        self.assertTrue(self.api.archive_product_ad(first)['success'])
+        self.assertTrue(self.api.archive_product_ad(second,
+                                                    extended=True)['success'])
+        self.assertEqual([ad['state'] for ad in self.ads],
+                         ['archived', 'archived'])
+
+    def test_extended_flag_selects_interface(self):
+        ad_id = self.ads[0]['adId']
+        self.assertNotIn('servingStatus',
+                         self.api.get_product_ad(ad_id).data)
+        self.assertIn('servingStatus',
+                      self.api.get_product_ad(ad_id, extended=True).data)
+
+
+if __name__ == '__main__':
+    unittest.main()
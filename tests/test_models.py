@@ -0,0 +1,80 @@
+import copy
+import json
+import unittest
+
+from amazon_advertising_api.advertising_api import _operation_result
+from amazon_advertising_api.auth import token_result
+from amazon_advertising_api.models import ApiResponse, Campaign, decoded
+from amazon_advertising_api.transport import Response
+
+BODY = b'[{"campaignId": 1, "name": "caf\\u00e9", "state": "enabled"}]'
+TEXT = BODY.decode('utf-8')
+
+
+def result():
+    return _operation_result(Response(200, 'OK', [], BODY), 'sp/campaigns')
+
+
+class ApiResponseTest(unittest.TestCase):
+
+    def test_response_is_not_decoded_until_read(self):
+        res = result()
+        self.assertTrue(res._lazy)
+        self.assertEqual(res.data[0]['name'], 'café')
+        self.assertTrue(res._lazy)
+        self.assertEqual(res['response'], TEXT)
+        self.assertFalse(res._lazy)
+        self.assertIsNone(res._body)
+
+    def test_reads_as_the_old_dictionary(self):
+        expected = {'success': True, 'code': 200, 'response': TEXT}
+        self.assertEqual(result(), expected)
+        self.assertEqual(dict(result()), expected)
+        self.assertEqual(dict(**result()), expected)
+        self.assertEqual(result().copy(), expected)
+        self.assertEqual(sorted(result().items()), sorted(expected.items()))
+        self.assertEqual(result().get('response'), TEXT)
+        self.assertEqual(json.loads(json.dumps(result())), expected)
+        self.assertEqual(copy.copy(result()), expected)
+        self.assertIn(repr(TEXT), repr(result()))
+
+    def test_failure_keeps_message(self):
+        res = _operation_result(Response(404, 'Not Found', [], b'missing'),
+                                'sp/campaigns')
+        self.assertFalse(res.success)
+        self.assertEqual(res['response'], "Not Found: b'missing'")
+        self.assertIsNone(res.data)
+        self.assertEqual(res.entities, [])
+
+    def test_entities_are_records(self):
+        campaign = result().entity
+        self.assertIsInstance(campaign, Campaign)
+        self.assertEqual(campaign.campaign_id, 1)
+        self.assertEqual(campaign['state'], 'enabled')
+
+    def test_decoded_reuses_data(self):
+        res = result()
+        self.assertIs(decoded(res), res.data)
+        self.assertEqual(decoded({'response': TEXT}), res.data)
+
+    def test_eager_response(self):
+        res = ApiResponse(True, 200, TEXT, 'sp/campaigns')
+        self.assertEqual(res.data[0]['campaignId'], 1)
+        self.assertEqual(res['response'], TEXT)
+
+
+class TokenResultTest(unittest.TestCase):
+
+    def test_access_token(self):
+        res = token_result(Response(200, 'OK', [],
+                                    b'{"access_token": "a", "expires_in": 60}'))
+        self.assertEqual((res['response'], res['expires_in']), ('a', 60.0))
+
+    def test_missing_access_token(self):
+        for body in (b'{"error": "access_token"}', b'not json', b'[]'):
+            res = token_result(Response(200, 'OK', [], body))
+            self.assertFalse(res['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from amazon_advertising_api.ratelimit import (RateLimiter, TokenBucket,
+                                              endpoint_family, retry_after)
+from amazon_advertising_api.transport import Response
+
+
+def throttled(after=None):
+    headers = [] if after is None else [('Retry-After', str(after))]
+    return Response(429, 'Too Many Requests', headers, b'')
+
+
+class RetryDelayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(backoff=0.5, max_backoff=60.0)
+        self.bucket = self.limiter.bucket('1', 'sp/keywords')
+
+    def test_retry_after_is_honoured_beyond_max_backoff(self):
+        delay = self.limiter.retry_delay(self.bucket, throttled(120), 0)
+        self.assertGreaterEqual(delay, 120.0)
+        self.assertLessEqual(delay, 120.5)
+
+    def test_computed_backoff_is_capped(self):
+        delay = self.limiter.retry_delay(self.bucket, throttled(), 20)
+        self.assertIsNone(delay)
+        limiter = RateLimiter(retries=50, backoff=0.5, max_backoff=2.0)
+        bucket = limiter.bucket('1', 'sp/keywords')
+        for attempt in range(20):
+            self.assertLessEqual(
+                limiter.retry_delay(bucket, throttled(), attempt), 2.0)
+
+    def test_success_is_final(self):
+        self.assertIsNone(self.limiter.retry_delay(
+            self.bucket, Response(200, 'OK', [], b''), 0))
+
+    def test_out_of_retries(self):
+        self.assertIsNone(self.limiter.retry_delay(
+            self.bucket, throttled(1), self.limiter.retries))
+        self.assertEqual(self.limiter.stats['throttles'], 1)
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_endpoint_family(self):
+        self.assertEqual(endpoint_family('sp/keywords/extended/1'),
+                         'sp/keywords')
+        self.assertEqual(endpoint_family('reports/amzn1.report.1'), 'reports')
+
+    def test_retry_after(self):
+        self.assertEqual(retry_after(throttled(3)), 3.0)
+        self.assertIsNone(retry_after(throttled()))
+        self.assertIsNone(retry_after(throttled('soon')))
+
+    def test_bucket_paces_beyond_burst(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertGreater(bucket.reserve(), 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+from concurrent.futures import CancelledError
+import threading
+import unittest
+
+from amazon_advertising_api.reports import PollPolicy, ReportJobManager
+
+
+def result(payload, code=200):
+    return {'success': True, 'code': code, 'response': payload}
+
+
+class FakeReportClient(object):
+    """Reports that finish after ``polls`` status calls, or never."""
+
+    def __init__(self, polls=None):
+        self.polls = polls
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def request_report(self, record_type=None, data=None, **kwargs):
+        report_id = 'report-{}'.format(record_type)
+        return result({'reportId': report_id, 'status': 'IN_PROGRESS'}, 202)
+
+    def _operation(self, interface):
+        with self._lock:
+            count = self.calls[interface] = self.calls.get(interface, 0) + 1
+        if self.polls is not None and count >= self.polls:
+            return result({'status': 'SUCCESS',
+                           'location': 'https://files.example/' + interface})
+        return result({'status': 'IN_PROGRESS'})
+
+    def _download(self, location):
+        return result([{'location': location}])
+
+
+class PollPolicyTest(unittest.TestCase):
+
+    def test_records_middle_of_uncertainty(self):
+        policy = PollPolicy(initial_interval=4.0)
+        policy.observe('keywords', 10.0, 20.0)
+        self.assertEqual(policy.first_delay('keywords'), 15.0)
+
+    def test_exact_duration(self):
+        policy = PollPolicy(initial_interval=4.0)
+        policy.observe('keywords', 12.0)
+        policy.observe('keywords', 22.0)
+        self.assertAlmostEqual(policy.first_delay('keywords'), 15.0)
+
+    def test_backoff_is_capped(self):
+        policy = PollPolicy(max_interval=10.0, backoff=2.0)
+        self.assertEqual(policy.next_delay(4.0), 8.0)
+        self.assertEqual(policy.next_delay(8.0), 10.0)
+
+
+class ReportJobManagerTest(unittest.TestCase):
+
+    def policy(self):
+        return PollPolicy(initial_interval=0.01, max_interval=0.02)
+
+    def test_downloads_finished_reports(self):
+        client = FakeReportClient(polls=3)
+        with ReportJobManager(client, policy=self.policy()) as manager:
+            jobs = [manager.submit(record_type)
+                    for record_type in ('campaigns', 'keywords')]
+        for job in jobs:
+            self.assertEqual(job.status, 'SUCCESS')
+            self.assertEqual(job.polls, 3)
+            self.assertTrue(job.result(1)['success'])
+
+    def test_close_cancels_unfinished_jobs(self):
+        manager = ReportJobManager(FakeReportClient(), policy=self.policy())
+        job = manager.submit('keywords')
+        manager.close()
+        self.assertEqual(list(manager.as_completed(timeout=1)), [job])
+        manager.wait(timeout=1)
+        self.assertEqual(job.status, 'CANCELLED')
+        with self.assertRaises(CancelledError):
+            job.result(1)
+
+    def test_exception_in_block_cancels_jobs(self):
+        with self.assertRaises(KeyError):
+            with ReportJobManager(FakeReportClient(),
+                                  policy=self.policy()) as manager:
+                job = manager.submit('keywords')
+                raise KeyError('stop')
+        with self.assertRaises(CancelledError):
+            job.result(1)
+
+    def test_submit_after_close(self):
+        manager = ReportJobManager(FakeReportClient(), policy=self.policy())
+        manager.close()
+        with self.assertRaises(ValueError):
+            manager.submit('keywords')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from amazon_advertising_api.store import EntityStore
+from amazon_advertising_api.sync import Replica
+
+
+def keyword(keyword_id, ad_group_id, state='enabled'):
+    return {'keywordId': keyword_id, 'adGroupId': ad_group_id,
+            'campaignId': 1, 'state': state, 'matchType': 'exact',
+            'keywordText': 'kw{}'.format(keyword_id)}
+
+
+class CollectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = EntityStore()
+        self.keywords = self.store.collection('1', 'keywords')
+        self.keywords.upsert([keyword(1, 10), keyword(2, 10),
+                              keyword(3, 20), keyword(4, 20, 'paused')])
+
+    def ids(self, **criteria):
+        return sorted(kw['keywordId'] for kw in self.keywords.find(**criteria))
+
+    def test_find_intersects_indexes(self):
+        self.assertEqual(self.ids(adGroupId=20, state='enabled'), [3])
+        self.assertEqual(self.ids(state='enabled'), [1, 2, 3])
+
+    def test_find_compares_unindexed_fields(self):
+        self.assertEqual(self.ids(keywordId=2), [2])
+
+    def test_upsert_reindexes(self):
+        self.keywords.upsert([keyword(1, 10, 'paused')])
+        self.assertEqual(self.ids(state='paused'), [1, 4])
+        self.assertEqual(self.keywords.count(state='enabled'), 2)
+
+    def test_update_while_iterating_find(self):
+        for kw in self.keywords.find(state='enabled'):
+            self.store.upsert('1', 'keywords', [dict(kw, state='paused')])
+        self.assertEqual(self.ids(state='paused'), [1, 2, 3, 4])
+        self.assertEqual(self.ids(state='enabled'), [])
+
+    def test_remove_while_iterating_find(self):
+        for kw in self.keywords.find(campaignId=1):
+            self.store.remove('1', 'keywords', [kw['keywordId']])
+        self.assertEqual(len(self.keywords), 0)
+
+    def test_unknown_collection(self):
+        with self.assertRaises(KeyError):
+            self.store.collection('1', 'widgets')
+
+
+class FileTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'account.json')
+
+    def test_store_and_replica_share_files(self):
+        replica = Replica(self.path)
+        replica.replace(1, 'keywords', [keyword(1, 10), keyword(2, 20)],
+                        'keywordId')
+        replica.set_watermark(1, 1600000000000)
+        replica.save()
+
+        store = EntityStore.load(self.path)
+        self.assertEqual(store.watermark(1), 1600000000000)
+        self.assertEqual(store.collection(1, 'keywords').count(adGroupId=20),
+                         1)
+        store.upsert('1', 'keywords', [keyword(3, 20)])
+        store.save()
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                         ['account.json'])
+        self.assertEqual(sorted(Replica(self.path).entities(1, 'keywords')),
+                         [1, 2, 3])
+
+    def test_missing_file_loads_empty(self):
+        self.assertEqual(EntityStore.load(self.path).profiles(), [])
+        self.assertIsNone(Replica(self.path).watermark(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
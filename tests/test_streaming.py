@@ -0,0 +1,112 @@
+import gzip
+import json
+import unittest
+
+from amazon_advertising_api.streaming import (JsonArrayParser, RowDecoder,
+                                              iter_rows, load_rows)
+
+DOCUMENT = (' [ {"query": "a \\"quoted\\", [bracketed] term", "n": -12.5e3},'
+            '\n {"text": "caf\\u00e9 \\\\ \\/ \\n tab\\t", "ok": true},'
+            ' "plain \\u2603", 12345678901234567890, -0.25, 1E-3, true,'
+            ' false, null, [1, [2, {"x": []}]], {}, "é☃", 0 ] ')
+ROWS = json.loads(DOCUMENT)
+
+
+def parse(pieces):
+    parser = JsonArrayParser()
+    rows = []
+    for piece in pieces[:-1]:
+        rows.extend(parser.feed(piece))
+    rows.extend(parser.feed(pieces[-1], final=True))
+    return rows
+
+
+class JsonArrayParserTest(unittest.TestCase):
+
+    def test_whole_document(self):
+        self.assertEqual(parse([DOCUMENT]), ROWS)
+
+    def test_every_split_point(self):
+        for i in range(len(DOCUMENT) + 1):
+            self.assertEqual(parse([DOCUMENT[:i], DOCUMENT[i:]]), ROWS,
+                             'split at {}: {!r}'.format(i, DOCUMENT[i - 3:i]))
+
+    def test_one_character_at_a_time(self):
+        self.assertEqual(parse(list(DOCUMENT)), ROWS)
+
+    def test_rows_are_returned_as_completed(self):
+        parser = JsonArrayParser()
+        self.assertEqual(parser.feed('[{"a": 1}, {"b"'), [{'a': 1}])
+        self.assertEqual(parser.feed(': 2}, 3'), [{'b': 2}])
+        self.assertEqual(parser.feed('4]'), [34])
+        self.assertEqual(parser.feed('', final=True), [])
+
+    def test_number_waits_for_delimiter(self):
+        parser = JsonArrayParser()
+        self.assertEqual(parser.feed('[-4.'), [])
+        self.assertEqual(parser.feed('5e'), [])
+        self.assertEqual(parser.feed('3, 1'), [-4.5e3])
+        self.assertEqual(parser.feed(']', final=True), [1])
+
+    def test_empty_array(self):
+        self.assertEqual(parse(['[', ' ]']), [])
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            parse(['{"a": 1}'])
+
+    def test_cut_short(self):
+        for document in ('[1, 2', '[{"a": 1}', '["abc', '[tr', '[1,', ''):
+            with self.assertRaises(ValueError, msg=document):
+                parse([document])
+
+    def test_invalid_value(self):
+        for document in ('[1, nope]', '[1x]', '["\\q"]'):
+            with self.assertRaises(ValueError, msg=document):
+                parse([document])
+
+
+class RowDecoderTest(unittest.TestCase):
+
+    def chunks(self, data, size):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_gzip_chunks(self):
+        payload = gzip.compress(DOCUMENT.encode('utf-8'))
+        for size in (1, 7, 64, len(payload)):
+            self.assertEqual(list(iter_rows(self.chunks(payload, size))),
+                             ROWS)
+            self.assertEqual(load_rows(self.chunks(payload, size)), ROWS)
+
+    def test_plain_chunks_split_inside_utf8(self):
+        payload = DOCUMENT.encode('utf-8')
+        self.assertEqual(list(iter_rows(self.chunks(payload, 1))), ROWS)
+        self.assertEqual(load_rows(self.chunks(payload, 3)), ROWS)
+
+    def test_truncated_gzip(self):
+        payload = gzip.compress(DOCUMENT.encode('utf-8'))[:-12]
+        with self.assertRaises(ValueError):
+            list(iter_rows([payload]))
+        with self.assertRaises(ValueError):
+            load_rows([payload])
+
+    def test_multi_member_gzip(self):
+        data = DOCUMENT.encode('utf-8')
+        payload = b''.join(gzip.compress(data[i:i + 40])
+                           for i in range(0, len(data), 40)) + b'\0' * 8
+        for size in (1, 7, 64, len(payload)):
+            self.assertEqual(list(iter_rows(self.chunks(payload, size))),
+                             ROWS)
+            self.assertEqual(load_rows(self.chunks(payload, size)), ROWS)
+        with self.assertRaises(ValueError):
+            load_rows([payload[:-20]])
+
+    def test_empty_download(self):
+        self.assertEqual(load_rows([]), [])
+        decoder = RowDecoder()
+        self.assertEqual(decoder.feed(gzip.compress(b'[]')), [])
+        self.assertEqual(decoder.close(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from amazon_advertising_api.advertising_api import AdvertisingApiV3
+from amazon_advertising_api.emulator import Emulator
+from amazon_advertising_api.reports import PollPolicy
+from amazon_advertising_api.sync import AccountSync, Replica
+
+
+class AccountSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'account.json')
+        self.emulator = Emulator()
+        self.profile_id, = self.emulator.populate(
+            campaigns=2, ad_groups=2, keywords=3)
+        # An integer profile id, as callers often pass one.
+        self.api = AdvertisingApiV3('id', 'secret', 'na',
+                                    profile_id=int(self.profile_id),
+                                    access_token='token',
+                                    transport=self.emulator)
+
+    def sync(self, replica):
+        return AccountSync(self.api, replica, entity_types=['keywords'],
+                           poll_policy=PollPolicy(initial_interval=0.0)).sync()
+
+    def keywords(self, replica):
+        return replica.entities(self.profile_id, 'keywords')
+
+    def test_delta_after_save_and_load(self):
+        replica = Replica(self.path)
+        result = self.sync(replica)
+        self.assertEqual(result.mode, 'full')
+        self.assertEqual(result.changed, {'keywords': 12})
+        replica.save()
+
+        keyword, deleted = self.emulator.entities(self.profile_id,
+                                                  'sp/keywords')[:2]
+        self.api.update_keywords(
+            [{'keywordId': keyword['keywordId'], 'bid': 9.99}])
+        self.emulator.remove(self.profile_id, 'sp/keywords',
+                             [deleted['keywordId']])
+
+        replica = Replica(self.path)
+        self.assertIsNotNone(replica.watermark(int(self.profile_id)))
+        self.assertEqual(len(self.keywords(replica)), 12)
+        result = self.sync(replica)
+        self.assertEqual(result.mode, 'delta')
+        self.assertEqual(result.removed, {'keywords': 1})
+        keywords = self.keywords(replica)
+        self.assertEqual(len(keywords), 11)
+        self.assertNotIn(deleted['keywordId'], keywords)
+        self.assertEqual(keywords[keyword['keywordId']]['bid'], 9.99)
+
+        replica.save()
+        self.assertEqual(self.keywords(Replica(self.path)), keywords)
+
+
+if __name__ == '__main__':
+    unittest.main()
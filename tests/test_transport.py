@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from amazon_advertising_api.async_transport import AsyncPooledTransport
+from amazon_advertising_api.transport import PooledTransport, replayable
+from tests.fakes import ScriptedServer, http_reply
+
+
+class ReplayableTest(unittest.TestCase):
+
+    def test_unwritten_request_is_always_replayed(self):
+        self.assertTrue(replayable('POST', True, False))
+
+    def test_written_request_is_replayed_only_if_idempotent(self):
+        self.assertTrue(replayable('GET', True, True))
+        self.assertTrue(replayable('PUT', True, True))
+        self.assertFalse(replayable('POST', True, True))
+
+    def test_fresh_connection_is_never_replayed(self):
+        self.assertFalse(replayable('GET', False, False))
+
+
+class _Connection(object):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _BrokenResponse(object):
+
+    def read(self):
+        raise ConnectionResetError('connection reset while reading')
+
+
+class ReadFailureTest(unittest.TestCase):
+
+    def test_connection_closed_when_body_read_fails(self):
+        conn = _Connection()
+        transport = PooledTransport()
+        transport._open = lambda *args: (None, conn, _BrokenResponse())
+        with self.assertRaises(ConnectionResetError):
+            transport.request('GET', 'http://127.0.0.1/a')
+        self.assertTrue(conn.closed)
+
+
+class StaleConnectionTest(unittest.TestCase):
+    """The second request on a kept-alive connection is dropped unanswered
+    after the server read it."""
+
+    def setUp(self):
+        self.server = ScriptedServer([http_reply(), None, http_reply()])
+        self.addCleanup(self.server.close)
+
+    def methods(self):
+        return [method for method, _ in self.server.requests]
+
+    def test_get_is_replayed(self):
+        transport = PooledTransport()
+        self.addCleanup(transport.close)
+        transport.request('GET', self.server.url + '/a')
+        res = transport.request('GET', self.server.url + '/a')
+        self.assertEqual(res.code, 200)
+        self.assertEqual(self.methods(), ['GET', 'GET', 'GET'])
+
+    def test_post_is_not_replayed(self):
+        transport = PooledTransport()
+        self.addCleanup(transport.close)
+        transport.request('GET', self.server.url + '/a')
+        with self.assertRaises(ConnectionError):
+            transport.request('POST', self.server.url + '/a', body=b'[]')
+        self.assertEqual(self.methods(), ['GET', 'POST'])
+
+    def test_async_get_is_replayed(self):
+        async def run():
+            transport = AsyncPooledTransport()
+            try:
+                await transport.request('GET', self.server.url + '/a')
+                return await transport.request('GET', self.server.url + '/a')
+            finally:
+                await transport.close()
+        self.assertEqual(asyncio.run(run()).code, 200)
+        self.assertEqual(self.methods(), ['GET', 'GET', 'GET'])
+
+    def test_async_post_is_not_replayed(self):
+        async def run():
+            transport = AsyncPooledTransport()
+            try:
+                await transport.request('GET', self.server.url + '/a')
+                await transport.request('POST', self.server.url + '/a',
+                                        body=b'[]')
+            finally:
+                await transport.close()
+        with self.assertRaises((ConnectionError,
+                                asyncio.IncompleteReadError)):
+            asyncio.run(run())
+        self.assertEqual(self.methods(), ['GET', 'POST'])
+
+
+if __name__ == '__main__':
+    unittest.main()